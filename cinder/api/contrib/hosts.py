@@ -26,7 +26,7 @@ from cinder.api import xmlutil
 from cinder import db
 from cinder import exception
 from cinder.openstack.common import log as logging
-from cinder.openstack.common import timeutils
+from cinder import servicegroup
 from cinder import utils
 from cinder.volume import api as volume_api
 
@@ -95,9 +95,9 @@ class HostDeserializer(wsgi.XMLDeserializer):
 
 def _list_hosts(req, service=None):
     """Returns a summary list of hosts."""
-    curr_time = timeutils.utcnow()
     context = req.environ['cinder.context']
     services = db.service_get_all(context, False)
+    servicegroup_api = servicegroup.API()
     zone = ''
     if 'zone' in req.GET:
         zone = req.GET['zone']
@@ -105,20 +105,20 @@ def _list_hosts(req, service=None):
         services = [s for s in services if s['availability_zone'] == zone]
     hosts = []
     for host in services:
-        delta = curr_time - (host['updated_at'] or host['created_at'])
-        alive = abs(utils.total_seconds(delta)) <= CONF.service_down_time
+        alive = servicegroup_api.is_up(host)
+        updated_at = servicegroup_api.get_updated_time(host)
         status = (alive and "available") or "unavailable"
         active = 'enabled'
         if host['disabled']:
             active = 'disabled'
         LOG.debug('status, active and update: %s, %s, %s' %
-                  (status, active, host['updated_at']))
+                  (status, active, updated_at))
         hosts.append({'host_name': host['host'],
                       'service': host['topic'],
                       'zone': host['availability_zone'],
                       'service-status': status,
                       'service-state': active,
-                      'last-update': host['updated_at']})
+                      'last-update': updated_at})
     if service:
         hosts = [host for host in hosts
                  if host["service"] == service]
@@ -23,7 +23,7 @@ from cinder.api import xmlutil
 from cinder import db
 from cinder import exception
 from cinder.openstack.common import log as logging
-from cinder.openstack.common import timeutils
+from cinder import servicegroup
 from cinder import utils
 
 
@@ -79,8 +79,8 @@ class ServiceController(wsgi.Controller):
         context = req.environ['cinder.context']
         authorize(context)
         detailed = self.ext_mgr.is_loaded('os-extended-services')
-        now = timeutils.utcnow()
         services = db.service_get_all(context)
+        servicegroup_api = servicegroup.API()
 
         host = ''
         if 'host' in req.GET:
@@ -103,8 +103,7 @@ class ServiceController(wsgi.Controller):
 
         svcs = []
         for svc in services:
-            delta = now - (svc['updated_at'] or svc['created_at'])
-            alive = abs(utils.total_seconds(delta)) <= CONF.service_down_time
+            alive = servicegroup_api.is_up(svc)
             art = (alive and "up") or "down"
             active = 'enabled'
             if svc['disabled']:
@@ -112,7 +111,8 @@ class ServiceController(wsgi.Controller):
             ret_fields = {'binary': svc['binary'], 'host': svc['host'],
                           'zone': svc['availability_zone'],
                           'status': active, 'state': art,
-                          'updated_at': svc['updated_at']}
+                          'updated_at':
+                          servicegroup_api.get_updated_time(svc)}
             if detailed:
                 ret_fields['disabled_reason'] = svc['disabled_reason']
             svcs.append(ret_fields)
@@ -14,7 +14,9 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
 import inspect
+import json
 import math
 import time
 
@@ -327,11 +329,29 @@ class DictSerializer(ActionDispatcher):
         return ""
 
 
+def _json_default(value):
+    """Convert a value the json module cannot encode by itself.
+
+    View builders return plain dicts and lists whose only non-JSON values
+    are usually datetimes, so those are formatted directly (identically
+    to timeutils.strtime()) and everything else goes through
+    jsonutils.to_primitive() like jsonutils.dumps() would do.
+    """
+    if type(value) is datetime.datetime and value.year >= 1900:
+        return '%04d-%02d-%02dT%02d:%02d:%02d.%06d' % (
+            value.year, value.month, value.day, value.hour, value.minute,
+            value.second, value.microsecond)
+    return jsonutils.to_primitive(value)
+
+
+_JSON_ENCODER = json.JSONEncoder(default=_json_default)
+
+
 class JSONDictSerializer(DictSerializer):
     """Default JSON request body serialization."""
 
     def default(self, data):
-        return jsonutils.dumps(data)
+        return _JSON_ENCODER.encode(data)
 
 
 class XMLDictSerializer(DictSerializer):
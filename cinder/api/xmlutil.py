@@ -135,6 +135,10 @@ class ConstantSelector(object):
 class TemplateElement(object):
     """Represent an element in the template."""
 
+    # Bumped whenever children are added or removed anywhere, which
+    # invalidates the render plans compiled so far.
+    _generation = 0
+
     def __init__(self, tag, attrib=None, selector=None, subselector=None,
                  **extra):
         """Initialize an element.
@@ -173,6 +177,7 @@ class TemplateElement(object):
         self._text = None
         self._children = []
         self._childmap = {}
+        self._plans = {}
 
         # Run the incoming attributes through set() so that they
         # become selectorized
@@ -220,6 +225,7 @@ class TemplateElement(object):
 
         self._children.append(elem)
         self._childmap[elem.tag] = elem
+        TemplateElement._generation += 1
 
     def extend(self, elems):
         """Append children to the element."""
@@ -241,6 +247,7 @@ class TemplateElement(object):
         # Update the children
         self._children.extend(elemlist)
         self._childmap.update(elemmap)
+        TemplateElement._generation += 1
 
     def insert(self, idx, elem):
         """Insert a child element at the given index."""
@@ -254,6 +261,7 @@ class TemplateElement(object):
 
         self._children.insert(idx, elem)
         self._childmap[elem.tag] = elem
+        TemplateElement._generation += 1
 
     def remove(self, elem):
         """Remove a child element."""
@@ -267,6 +275,7 @@ class TemplateElement(object):
 
         self._children.remove(elem)
         del self._childmap[elem.tag]
+        TemplateElement._generation += 1
 
     def get(self, key):
         """Get an attribute.
@@ -387,11 +396,15 @@ class TemplateElement(object):
         #If parent is not none and has same tagname
         if parent is not None:
             for i in range(0, len(tagnameList)):
+                # Compare the attributes first, it is much cheaper than
+                # searching the children of the parent.
+                parentattrib = parent.attrib
+                if (len(parentattrib) != len(tmpattrib) or
+                        not cmp(parentattrib, tmpattrib) == 0):
+                    break
                 tmpInsertPos = parent.find(tagnameList[i])
                 if tmpInsertPos is None:
                     break
-                elif not cmp(parent.attrib, tmpattrib) == 0:
-                    break
                 parent = tmpInsertPos
                 insertIndex = i + 1
 
@@ -473,6 +486,26 @@ class TemplateElement(object):
         # corresponding datum for the next step down the tree
         return elems
 
+    def get_plan(self, patches):
+        """Return the render plan of this element with its patches.
+
+        The plan is compiled the first time a given set of patches is
+        rendered and reused until a template is modified.
+
+        :param patches: A list of other template elements that are
+                        applied when rendering this template element.
+        """
+
+        key = tuple(patches)
+        try:
+            generation, plan = self._plans[key]
+        except KeyError:
+            generation = None
+        if generation != TemplateElement._generation:
+            plan = RenderPlan([self] + list(patches))
+            self._plans[key] = (TemplateElement._generation, plan)
+        return plan
+
     def will_render(self, datum):
         """Hook method.
 
@@ -538,6 +571,58 @@ class TemplateElement(object):
                 (' '.join(contents), ''.join(children), self.tag))
 
 
+class RenderPlan(object):
+    """Precomputed traversal of merged template elements.
+
+    A template element and the elements of the same position in the
+    attached slave templates are merged by tag.  Working out the merge
+    only depends on the templates, so it is done once and the result
+    is used for every object rendered.
+    """
+
+    def __init__(self, siblings):
+        """Compile a render plan.
+
+        :param siblings: The TemplateElement instances rendered
+                         together; the first one is rendered and the
+                         others are applied to it as patches.
+        """
+
+        self.element = siblings[0]
+        self.patches = siblings[1:]
+        self.children = []
+
+        seen = set()
+        for idx, sibling in enumerate(siblings):
+            for child in sibling:
+                # Have we handled this child already?
+                if child.tag in seen:
+                    continue
+                seen.add(child.tag)
+
+                # Determine the child's siblings
+                nieces = [child]
+                for sib in siblings[idx + 1:]:
+                    if child.tag in sib:
+                        nieces.append(sib[child.tag])
+                self.children.append(RenderPlan(nieces))
+
+    def render(self, parent, obj, nsmap=None):
+        """Render an object following the plan.
+
+        Same as Template._serialize(), returns the first
+        etree.Element instance rendered, or None.
+        """
+
+        elems = self.element.render(parent, obj, self.patches, nsmap)
+        for child in self.children:
+            for elem, datum in elems:
+                child.render(elem, datum)
+
+        if elems:
+            return elems[0][0]
+
+
 def SubTemplateElement(parent, tag, attrib=None, selector=None,
                        subselector=None, **extra):
     """Create a template element as a child of another.
@@ -659,7 +744,8 @@ class Template(object):
         nsmap = self._nsmap()
 
         # Form the element tree
-        return self._serialize(None, obj, siblings, nsmap)
+        plan = siblings[0].get_plan(siblings[1:])
+        return plan.render(None, obj, nsmap)
 
     def _siblings(self):
         """Hook method for computing root siblings.
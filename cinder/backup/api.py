@@ -27,7 +27,7 @@ from cinder import context
 from cinder.db import base
 from cinder import exception
 from cinder.openstack.common import log as logging
-from cinder import utils
+from cinder import servicegroup
 
 import cinder.policy
 import cinder.volume
@@ -51,6 +51,7 @@ class API(base.Base):
     def __init__(self, db_driver=None):
         self.backup_rpcapi = backup_rpcapi.BackupAPI()
         self.volume_api = cinder.volume.API()
+        self.servicegroup_api = servicegroup.API()
         super(API, self).__init__(db_driver)
 
     def get(self, context, backup_id):
@@ -94,7 +95,7 @@ class API(base.Base):
         for srv in services:
             if (srv['availability_zone'] == volume['availability_zone'] and
                     srv['host'] == volume_host and
-                    utils.service_is_up(srv)):
+                    self.servicegroup_api.is_up(srv)):
                 return True
         return False
 
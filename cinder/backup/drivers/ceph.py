@@ -232,25 +232,23 @@ class CephBackupDriver(BackupDriver):
 
         return (old_format, features)
 
+    def _get_rados_pool(self):
+        """Return the connections to the backup Ceph cluster.
+
+        They are shared with the RBD volume driver when it uses the same
+        user and ceph.conf.
+        """
+        return rbd_driver.RADOSConnectionPool.get_pool(
+            self.rados, self._ceph_backup_user, self._ceph_backup_conf)
+
     def _connect_to_rados(self, pool=None):
         """Establish connection to the backup Ceph cluster."""
-        client = self.rados.Rados(rados_id=self._ceph_backup_user,
-                                  conffile=self._ceph_backup_conf)
-        try:
-            client.connect()
-            pool_to_open = strutils.safe_encode(pool or self._ceph_backup_pool)
-            ioctx = client.open_ioctx(pool_to_open)
-            return client, ioctx
-        except self.rados.Error:
-            # shutdown cannot raise an exception
-            client.shutdown()
-            raise
+        pool_to_open = strutils.safe_encode(pool or self._ceph_backup_pool)
+        return self._get_rados_pool().get(pool_to_open)
 
-    def _disconnect_from_rados(self, client, ioctx):
-        """Terminate connection with the backup Ceph cluster."""
-        # closing an ioctx cannot raise an exception
-        ioctx.close()
-        client.shutdown()
+    def _disconnect_from_rados(self, client, ioctx, error=None):
+        """Release the connection to the backup Ceph cluster."""
+        self._get_rados_pool().put(client, ioctx, error=error)
 
     def _get_backup_base_name(self, volume_id, backup_id=None,
                               diff_format=False):
@@ -187,7 +187,8 @@ class BackupManager(manager.SchedulerDependentManager):
             self._init_volume_driver(ctxt, mgr.driver)
 
         LOG.info(_("Cleaning up incomplete backup operations."))
-        volumes = self.db.volume_get_all_by_host(ctxt, self.host)
+        volumes = self.db.volume_get_all_by_host(ctxt, self.host,
+                                                 use_slave=False)
         for volume in volumes:
             backend = self._get_volume_backend(host=volume['host'])
             if volume['status'] == 'backing-up':
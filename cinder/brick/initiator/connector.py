@@ -13,12 +13,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import contextlib
 import os
 import socket
 import time
 
+import eventlet
+
 from cinder.brick import exception
 from cinder.brick import executor
+from cinder.brick.initiator import device_watcher
 from cinder.brick.initiator import host_driver
 from cinder.brick.initiator import linuxfc
 from cinder.brick.initiator import linuxscsi
@@ -26,13 +30,22 @@ from cinder.brick.remotefs import remotefs
 from cinder.openstack.common.gettextutils import _
 from cinder.openstack.common import lockutils
 from cinder.openstack.common import log as logging
-from cinder.openstack.common import loopingcall
 from cinder.openstack.common import processutils as putils
 
 LOG = logging.getLogger(__name__)
 
 synchronized = lockutils.synchronized_with_prefix('brick-')
 DEVICE_SCAN_ATTEMPTS_DEFAULT = 3
+ISCSI_LOGIN_CONCURRENCY = 8
+
+
+@contextlib.contextmanager
+def _timed(timings, step):
+    start = time.time()
+    try:
+        yield
+    finally:
+        timings[step] = time.time() - start
 
 
 def get_connector_properties(root_helper, my_ip):
@@ -61,6 +74,7 @@ class InitiatorConnector(executor.Executor):
     def __init__(self, root_helper, driver=None,
                  execute=putils.execute,
                  device_scan_attempts=DEVICE_SCAN_ATTEMPTS_DEFAULT,
+                 device_scan_timeout=None,
                  *args, **kwargs):
         super(InitiatorConnector, self).__init__(root_helper, execute=execute,
                                                  *args, **kwargs)
@@ -68,6 +82,7 @@ class InitiatorConnector(executor.Executor):
             driver = host_driver.HostDriver()
         self.set_driver(driver)
         self.device_scan_attempts = device_scan_attempts
+        self.device_scan_timeout = device_scan_timeout
 
     def set_driver(self, driver):
         """The driver is used to find used LUNs."""
@@ -147,6 +162,62 @@ class InitiatorConnector(executor.Executor):
             return False
         return True
 
+    @staticmethod
+    def _find_existing_path(paths):
+        for path in paths:
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _wait_for_device(self, paths, rescan, backoff):
+        """Wait for one of the device paths to show up.
+
+        Up to device_scan_attempts times, rescan(tries) is called and
+        the device is waited for backoff(tries) seconds.  The wait ends
+        as soon as one of the paths is created.  If a device_scan_timeout
+        is set, the whole discovery is bounded by it instead, and the
+        last wait lasts until that deadline.
+
+        :returns: (path found or None, number of rescans done)
+        """
+        deadline = None
+        if self.device_scan_timeout is not None:
+            deadline = time.time() + self.device_scan_timeout
+        directories = set(os.path.dirname(path) for path in paths)
+
+        tries = 0
+        with device_watcher.DeviceWatcher(directories) as watcher:
+            while True:
+                path = self._find_existing_path(paths)
+                if path is not None:
+                    return path, tries
+
+                last_wait = tries >= self.device_scan_attempts
+                if deadline is None:
+                    if last_wait:
+                        return None, tries
+                    wait = None
+                else:
+                    wait = deadline - time.time()
+                    if wait <= 0:
+                        return None, tries
+
+                if not last_wait:
+                    rescan(tries)
+                    tries += 1
+                    if wait is None:
+                        wait = backoff(tries)
+                    else:
+                        wait = min(wait, backoff(tries))
+
+                due = time.time() + wait
+                while watcher.wait(due - time.time()):
+                    if self._find_existing_path(paths) is not None:
+                        break
+
+                if last_wait:
+                    return self._find_existing_path(paths), tries
+
     def connect_volume(self, connection_properties):
         """Connect to a volume.
 
@@ -178,6 +249,10 @@ class ISCSIConnector(InitiatorConnector):
                                              device_scan_attempts,
                                              *args, **kwargs)
         self.use_multipath = use_multipath
+        # Seconds spent in each step of the last connect_volume()
+        self.connect_timings = {}
+        # Set while logging into several portals at once
+        self._session_table = None
 
     def set_execute(self, execute):
         super(ISCSIConnector, self).set_execute(execute)
@@ -194,38 +269,41 @@ class ISCSIConnector(InitiatorConnector):
         """
 
         device_info = {'type': 'block'}
+        timings = {}
 
         if self.use_multipath:
             #multipath installed, discovering other targets if available
             target_portal = connection_properties['target_portal']
-            out = self._run_iscsiadm_bare(['-m',
-                                          'discovery',
-                                          '-t',
-                                          'sendtargets',
-                                          '-p',
-                                          target_portal],
-                                          check_exit_code=[0, 255])[0] \
-                or ""
-
+            with _timed(timings, 'discovery'):
+                out = self._run_iscsiadm_bare(['-m',
+                                              'discovery',
+                                              '-t',
+                                              'sendtargets',
+                                              '-p',
+                                              target_portal],
+                                              check_exit_code=[0, 255])[0] \
+                    or ""
+
+            props_list = []
             for ip, iqn in self._get_target_portals_from_iscsiadm_output(out):
                 props = connection_properties.copy()
                 props['target_portal'] = ip
                 props['target_iqn'] = iqn
-                self._connect_to_iscsi_portal(props)
+                props_list.append(props)
+
+            with _timed(timings, 'login'):
+                self._connect_to_iscsi_portals(props_list)
 
-            self._rescan_iscsi()
+            with _timed(timings, 'rescan'):
+                self._rescan_iscsi()
         else:
-            self._connect_to_iscsi_portal(connection_properties)
+            with _timed(timings, 'login'):
+                self._connect_to_iscsi_portal(connection_properties)
 
         host_device = self._get_device_path(connection_properties)
 
         # The /dev/disk/by-path/... node is not always present immediately
-        # TODO(justinsb): This retry-with-delay is a pattern, move to utils?
-        tries = 0
-        while not os.path.exists(host_device):
-            if tries >= self.device_scan_attempts:
-                raise exception.VolumeDeviceNotFound(device=host_device)
-
+        def _rescan(tries):
             LOG.warn(_("ISCSI volume not yet found at: %(host_device)s. "
                        "Will rescan & retry.  Try number: %(tries)s"),
                      {'host_device': host_device,
@@ -234,9 +312,11 @@ class ISCSIConnector(InitiatorConnector):
             # The rescan isn't documented as being necessary(?), but it helps
             self._run_iscsiadm(connection_properties, ("--rescan",))
 
-            tries = tries + 1
-            if not os.path.exists(host_device):
-                time.sleep(tries ** 2)
+        with _timed(timings, 'device_wait'):
+            found, tries = self._wait_for_device([host_device], _rescan,
+                                                 lambda tries: tries ** 2)
+        if found is None:
+            raise exception.VolumeDeviceNotFound(device=host_device)
 
         if tries != 0:
             LOG.debug(_("Found iSCSI node %(host_device)s "
@@ -245,11 +325,18 @@ class ISCSIConnector(InitiatorConnector):
 
         if self.use_multipath:
             #we use the multipath device instead of the single path device
-            self._rescan_multipath()
-            multipath_device = self._get_multipath_device_name(host_device)
+            with _timed(timings, 'multipath'):
+                self._rescan_multipath()
+                multipath_device = self._get_multipath_device_name(
+                    host_device)
             if multipath_device is not None:
                 host_device = multipath_device
 
+        self.connect_timings = timings
+        LOG.debug(_("Connected iSCSI volume %(device)s, seconds per step: "
+                    "%(timings)s"),
+                  {'device': host_device, 'timings': timings})
+
         device_info['path'] = host_device
         return device_info
 
@@ -428,12 +515,10 @@ class ISCSIConnector(InitiatorConnector):
 
         #duplicate logins crash iscsiadm after load,
         #so we scan active sessions to see if the node is logged in.
-        out = self._run_iscsiadm_bare(["-m", "session"],
-                                      run_as_root=True,
-                                      check_exit_code=[0, 1, 21])[0] or ""
-
-        portals = [{'portal': p.split(" ")[2], 'iqn': p.split(" ")[3]}
-                   for p in out.splitlines() if p.startswith("tcp:")]
+        if self._session_table is not None:
+            portals = self._session_table
+        else:
+            portals = self._get_iscsi_sessions()
 
         stripped_portal = connection_properties['target_portal'].split(",")[0]
         if len(portals) == 0 or len([s for s in portals
@@ -451,14 +536,36 @@ class ISCSIConnector(InitiatorConnector):
                 #as this might be one of many paths,
                 #only set successful logins to startup automatically
                 if err.exit_code in [15]:
-                    self._iscsiadm_update(connection_properties,
-                                          "node.startup",
-                                          "automatic")
+                    self._set_startup_automatic(connection_properties)
                     return
 
-            self._iscsiadm_update(connection_properties,
-                                  "node.startup",
-                                  "automatic")
+            self._set_startup_automatic(connection_properties)
+
+    def _set_startup_automatic(self, connection_properties):
+        self._iscsiadm_update(connection_properties,
+                              "node.startup",
+                              "automatic")
+
+    def _get_iscsi_sessions(self):
+        out = self._run_iscsiadm_bare(["-m", "session"],
+                                      run_as_root=True,
+                                      check_exit_code=[0, 1, 21])[0] or ""
+
+        return [{'portal': p.split(" ")[2], 'iqn': p.split(" ")[3]}
+                for p in out.splitlines() if p.startswith("tcp:")]
+
+    def _connect_to_iscsi_portals(self, props_list):
+        """Log into the portals of all the paths of a volume at once.
+
+        The active sessions are listed a single time for all portals and
+        the logins run concurrently.
+        """
+        self._session_table = self._get_iscsi_sessions()
+        try:
+            pool = eventlet.GreenPool(ISCSI_LOGIN_CONCURRENCY)
+            list(pool.imap(self._connect_to_iscsi_portal, props_list))
+        finally:
+            self._session_table = None
 
     def _disconnect_from_iscsi_portal(self, connection_properties):
         self._iscsiadm_update(connection_properties, "node.startup", "manual",
@@ -613,42 +720,29 @@ class FibreChannelConnector(InitiatorConnector):
         # The /dev/disk/by-path/... node is not always present immediately
         # We only need to find the first device.  Once we see the first device
         # multipath will have any others.
-        def _wait_for_device_discovery(host_devices):
-            tries = self.tries
-            for device in host_devices:
-                LOG.debug(_("Looking for Fibre Channel dev %(device)s"),
-                          {'device': device})
-                if os.path.exists(device):
-                    self.host_device = device
-                    # get the /dev/sdX device.  This is used
-                    # to find the multipath device.
-                    self.device_name = os.path.realpath(device)
-                    raise loopingcall.LoopingCallDone()
-
-            if self.tries >= self.device_scan_attempts:
-                msg = _("Fibre Channel volume device not found.")
-                LOG.error(msg)
-                raise exception.NoFibreChannelVolumeDeviceFound()
+        LOG.debug(_("Looking for Fibre Channel devs %(devices)s"),
+                  {'devices': host_devices})
 
+        def _rescan(tries):
             LOG.warn(_("Fibre volume not yet found. "
                        "Will rescan & retry.  Try number: %(tries)s"),
                      {'tries': tries})
 
             self._linuxfc.rescan_hosts(hbas)
-            self.tries = self.tries + 1
-
-        self.host_device = None
-        self.device_name = None
-        self.tries = 0
-        timer = loopingcall.FixedIntervalLoopingCall(
-            _wait_for_device_discovery, host_devices)
-        timer.start(interval=2).wait()
-
-        tries = self.tries
-        if self.host_device is not None and self.device_name is not None:
-            LOG.debug(_("Found Fibre Channel volume %(name)s "
-                        "(after %(tries)s rescans)"),
-                      {'name': self.device_name, 'tries': tries})
+
+        self.host_device, tries = self._wait_for_device(host_devices, _rescan,
+                                                        lambda tries: 2)
+        if self.host_device is None:
+            msg = _("Fibre Channel volume device not found.")
+            LOG.error(msg)
+            raise exception.NoFibreChannelVolumeDeviceFound()
+
+        # get the /dev/sdX device.  This is used
+        # to find the multipath device.
+        self.device_name = os.path.realpath(self.host_device)
+        LOG.debug(_("Found Fibre Channel volume %(name)s "
+                    "(after %(tries)s rescans)"),
+                  {'name': self.device_name, 'tries': tries})
 
         # see if the new drive is part of a multipath
         # device.  If so, we'll use the multipath device.
@@ -764,33 +858,25 @@ class AoEConnector(InitiatorConnector):
         else:
             self._aoe_discover()
 
-        waiting_status = {'tries': 0}
-
         #NOTE(jbr_): Device path is not always present immediately
-        def _wait_for_discovery(aoe_path):
-            if os.path.exists(aoe_path):
-                raise loopingcall.LoopingCallDone
-
-            if waiting_status['tries'] >= self.device_scan_attempts:
-                raise exception.VolumeDeviceNotFound(device=aoe_path)
-
+        def _rediscover(tries):
             LOG.warn(_("AoE volume not yet found at: %(path)s. "
                        "Try number: %(tries)s"),
                      {'path': aoe_device,
-                      'tries': waiting_status['tries']})
+                      'tries': tries})
 
             self._aoe_discover()
-            waiting_status['tries'] += 1
 
-        timer = loopingcall.FixedIntervalLoopingCall(_wait_for_discovery,
-                                                     aoe_path)
-        timer.start(interval=2).wait()
+        found, tries = self._wait_for_device([aoe_path], _rediscover,
+                                             lambda tries: 2)
+        if found is None:
+            raise exception.VolumeDeviceNotFound(device=aoe_path)
 
-        if waiting_status['tries']:
+        if tries:
             LOG.debug(_("Found AoE device %(path)s "
                         "(after %(tries)s rediscover)"),
                       {'path': aoe_path,
-                       'tries': waiting_status['tries']})
+                       'tries': tries})
 
         return device_info
 
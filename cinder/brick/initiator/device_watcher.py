@@ -0,0 +1,131 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Wait for device nodes to be created by udev.
+
+Connectors used to sleep between checks for a device path, so a device
+that showed up right after a check was only noticed when the sleep was
+over.  DeviceWatcher watches the directories the device links are created
+in (e.g. /dev/disk/by-path) with inotify and wakes the waiter up as soon
+as anything is created there.  When inotify is not available, or one of
+the directories does not exist yet, it falls back to short poll intervals.
+"""
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import time
+
+from cinder.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.5
+
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = 0o2000000
+_IN_ATTRIB = 0x00000004
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_WATCH_MASK = _IN_ATTRIB | _IN_MOVED_TO | _IN_CREATE
+
+_libc = None
+
+
+def _get_libc():
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                               use_errno=True)
+            libc.inotify_init1
+            libc.inotify_add_watch
+        except (OSError, AttributeError):
+            libc = False
+        _libc = libc
+    return _libc
+
+
+class DeviceWatcher(object):
+    """Waits until something is created in a set of directories."""
+
+    def __init__(self, directories, poll_interval=POLL_INTERVAL):
+        self.poll_interval = poll_interval
+        self._fd = None
+        self._polling = True
+
+        libc = _get_libc()
+        if not libc:
+            return
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if fd < 0:
+            LOG.debug('inotify is not available: %s' %
+                      os.strerror(ctypes.get_errno()))
+            return
+        self._fd = fd
+
+        watched = 0
+        for directory in directories:
+            if libc.inotify_add_watch(fd, directory, _WATCH_MASK) >= 0:
+                watched += 1
+        # Directories which do not exist yet are covered by polling.
+        self._polling = watched < len(directories)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
+
+    def _drain(self):
+        # A single read is enough, events left over only make the next
+        # select() return right away.  Reading until EAGAIN would block
+        # with eventlet's green os.read().
+        try:
+            os.read(self._fd, 65536)
+        except OSError as exc:
+            if exc.errno != errno.EAGAIN:
+                raise
+
+    def wait(self, timeout):
+        """Wait for a change for at most ``timeout`` seconds.
+
+        Returns True when the watched directories may have changed, and
+        False once the timeout elapsed without noticing any change.
+        """
+        if timeout <= 0:
+            return False
+
+        if self._polling:
+            wait = min(timeout, self.poll_interval)
+        else:
+            wait = timeout
+
+        if self._fd is None:
+            time.sleep(wait)
+            return wait < timeout
+
+        readable = select.select([self._fd], [], [], wait)[0]
+        if readable:
+            self._drain()
+            return True
+        return wait < timeout
@@ -157,30 +157,125 @@ class TgtAdm(TargetAdmin):
                         "id:%(vol_id)s: %(e)s")
                       % {'vol_id': name, 'e': e})
 
-    def create_iscsi_target(self, name, tid, lun, path,
-                            chap_auth=None, **kwargs):
-        # Note(jdg) tid and lun aren't used by TgtAdm but remain for
-        # compatibility
+    def _get_targets(self):
+        """Return {iqn: (tid, has_backing_lun)} from a single listing."""
+        (out, err) = self._execute('tgt-admin', '--show', run_as_root=True)
+        targets = {}
+        iqn = None
+        for line in out.split('\n'):
+            if line.startswith('Target '):
+                parsed = line.split()
+                if len(parsed) < 3:
+                    iqn = None
+                    continue
+                iqn = parsed[2]
+                targets[iqn] = (parsed[1][:-1], False)
+            elif iqn is not None and line == '        LUN: 1':
+                targets[iqn] = (targets[iqn][0], True)
+        return targets
+
+    def _persist_conf(self, name, path, chap_auth=None):
+        if chap_auth is None:
+            return self.VOLUME_CONF % (name, path)
+        return self.VOLUME_CONF_WITH_CHAP_AUTH % (name, path, chap_auth)
+
+    def _persist_file_matches(self, name, path, chap_auth=None):
+        volume_path = os.path.join(self.volumes_dir, name.split(':')[1])
+        try:
+            with open(volume_path) as f:
+                return f.read() == self._persist_conf(name, path, chap_auth)
+        except IOError:
+            return False
 
+    def _write_persist_file(self, name, path, chap_auth=None):
         fileutils.ensure_tree(self.volumes_dir)
 
         vol_id = name.split(':')[1]
-        if chap_auth is None:
-            volume_conf = self.VOLUME_CONF % (name, path)
-        else:
-            volume_conf = self.VOLUME_CONF_WITH_CHAP_AUTH % (name,
-                                                             path, chap_auth)
-
-        LOG.info(_('Creating iscsi_target for: %s') % vol_id)
-        volumes_dir = self.volumes_dir
-        volume_path = os.path.join(volumes_dir, vol_id)
+        volume_conf = self._persist_conf(name, path, chap_auth)
 
+        volume_path = os.path.join(self.volumes_dir, vol_id)
         f = open(volume_path, 'w+')
         f.write(volume_conf)
         f.close()
         LOG.debug(_('Created volume path %(vp)s,\n'
                     'content: %(vc)s')
                   % {'vp': volume_path, 'vc': volume_conf})
+        return volume_path
+
+    def ensure_iscsi_targets(self, targets):
+        """Make sure a batch of targets is exported.
+
+        The running targets are listed once and only the ones which are
+        missing get their persist file written and are brought up with
+        ``tgt-admin --update``.  Targets whose backing lun is missing go
+        through create_iscsi_target(), which knows how to recreate it.
+        Running targets whose persist file is missing or stale get it
+        rewritten, so they survive a restart of tgtd.
+
+        :param targets: list of (name, path, chap_auth) tuples
+        :returns: dict of target name to the exception raised for it
+        """
+        failures = {}
+        existing = self._get_targets()
+        applied = []
+        for name, path, chap_auth in targets:
+            vol_id = name.split(':')[1]
+            if name in existing:
+                if not existing[name][1]:
+                    self._ensure_one_target(name, path, chap_auth, failures)
+                elif not self._persist_file_matches(name, path, chap_auth):
+                    self._write_persist_file(name, path, chap_auth)
+                continue
+
+            LOG.info(_('Creating iscsi_target for: %s') % vol_id)
+            volume_path = self._write_persist_file(name, path, chap_auth)
+            try:
+                self._execute('tgt-admin', '--update', name,
+                              run_as_root=True)
+            except putils.ProcessExecutionError as e:
+                LOG.warning(_("Failed to create iscsi target for volume "
+                              "id:%(vol_id)s: %(e)s")
+                            % {'vol_id': vol_id, 'e': e})
+                os.unlink(volume_path)
+                failures[name] = exception.ISCSITargetCreateFailed(
+                    volume_id=vol_id)
+                continue
+            applied.append((name, path, chap_auth))
+
+        LOG.debug(_('%(applied)d of %(total)d targets were missing')
+                  % {'applied': len(applied), 'total': len(targets)})
+        if not applied:
+            return failures
+
+        existing = self._get_targets()
+        for name, path, chap_auth in applied:
+            if name not in existing:
+                LOG.error(_("Failed to create iscsi target for volume "
+                            "id:%(vol_id)s. Please ensure your tgtd config "
+                            "file contains 'include %(volumes_dir)s/*'") %
+                          {'vol_id': name.split(':')[1],
+                           'volumes_dir': self.volumes_dir})
+                failures[name] = exception.NotFound()
+            elif not existing[name][1]:
+                self._ensure_one_target(name, path, chap_auth, failures)
+        return failures
+
+    def _ensure_one_target(self, name, path, chap_auth, failures):
+        try:
+            self.create_iscsi_target(name, 0, 0, path, chap_auth,
+                                     check_exit_code=False)
+        except Exception as exc:
+            failures[name] = exc
+
+    def create_iscsi_target(self, name, tid, lun, path,
+                            chap_auth=None, **kwargs):
+        # Note(jdg) tid and lun aren't used by TgtAdm but remain for
+        # compatibility
+
+        vol_id = name.split(':')[1]
+        LOG.info(_('Creating iscsi_target for: %s') % vol_id)
+        volumes_dir = self.volumes_dir
+        volume_path = self._write_persist_file(name, path, chap_auth)
 
         old_persist_file = None
         old_name = kwargs.get('old_name', None)
@@ -505,6 +600,46 @@ class LioAdm(TargetAdmin):
 
         return None
 
+    def _get_targets(self):
+        (out, err) = self._execute('cinder-rtstool',
+                                   'get-targets',
+                                   run_as_root=True)
+        return set(line.strip() for line in out.split('\n') if line.strip())
+
+    def ensure_iscsi_targets(self, targets):
+        """Make sure a batch of targets is exported.
+
+        The targets are listed once and only the missing ones are created.
+
+        :param targets: list of (name, path, chap_auth) tuples
+        :returns: dict of target name to the exception raised for it
+        """
+        failures = {}
+        existing = self._get_targets()
+        created = []
+        for name, path, chap_auth in targets:
+            if name in existing:
+                continue
+            vol_id = name.split(':')[1]
+            LOG.info(_('Creating iscsi_target for volume: %s') % vol_id)
+            try:
+                self._create_target(name, path, chap_auth, vol_id)
+            except exception.ISCSITargetCreateFailed as exc:
+                failures[name] = exc
+                continue
+            created.append(name)
+
+        LOG.debug(_('%(created)d of %(total)d targets were missing')
+                  % {'created': len(created), 'total': len(targets)})
+        if created:
+            existing = self._get_targets()
+            for name in created:
+                if name not in existing:
+                    LOG.error(_("Failed to create iscsi target for volume "
+                                "id:%s.") % name.split(':')[1])
+                    failures[name] = exception.NotFound()
+        return failures
+
     def create_iscsi_target(self, name, tid, lun, path,
                             chap_auth=None, **kwargs):
         # tid and lun are not used
@@ -513,6 +648,18 @@ class LioAdm(TargetAdmin):
 
         LOG.info(_('Creating iscsi_target for volume: %s') % vol_id)
 
+        self._create_target(name, path, chap_auth, vol_id)
+
+        iqn = '%s%s' % (self.iscsi_target_prefix, vol_id)
+        tid = self._get_target(iqn)
+        if tid is None:
+            LOG.error(_("Failed to create iscsi target for volume "
+                        "id:%s.") % vol_id)
+            raise exception.NotFound()
+
+        return tid
+
+    def _create_target(self, name, path, chap_auth, vol_id):
         # rtstool requires chap_auth, but unit tests don't provide it
         chap_auth_userid = 'test_id'
         chap_auth_password = 'test_pass'
@@ -541,15 +688,6 @@ class LioAdm(TargetAdmin):
 
             raise exception.ISCSITargetCreateFailed(volume_id=vol_id)
 
-        iqn = '%s%s' % (self.iscsi_target_prefix, vol_id)
-        tid = self._get_target(iqn)
-        if tid is None:
-            LOG.error(_("Failed to create iscsi target for volume "
-                        "id:%s.") % vol_id)
-            raise exception.NotFound()
-
-        return tid
-
     def remove_iscsi_target(self, tid, lun, vol_id, vol_name, **kwargs):
         LOG.info(_('Removing iscsi_target: %s') % vol_id)
         vol_uuid_name = vol_name
@@ -19,6 +19,7 @@ LVM class for performing LVM operations.
 
 import math
 import re
+import time
 
 import itertools
 
@@ -36,7 +37,7 @@ class LVM(executor.Executor):
 
     def __init__(self, vg_name, root_helper, create_vg=False,
                  physical_volumes=None, lvm_type='default',
-                 executor=putils.execute):
+                 executor=putils.execute, cache_interval=0):
 
         """Initialize the LVM object.
 
@@ -50,6 +51,9 @@ class LVM(executor.Executor):
         :param physical_volumes: List of PVs to build VG on
         :param lvm_type: VG and Volume type (default, or thin)
         :param executor: Execute method to use, None uses common/processutils
+        :param cache_interval: Seconds for which LV and VG information is
+                               served from memory between full lvs/vgs
+                               refreshes, 0 disables caching
 
         """
         super(LVM, self).__init__(execute=executor, root_helper=root_helper)
@@ -66,6 +70,17 @@ class LVM(executor.Executor):
         self._supports_snapshot_lv_activation = None
         self._supports_lvchange_ignoreskipactivation = None
 
+        # In-memory view of the VG, kept current by our own operations
+        # and refreshed every cache_interval seconds or after an error.
+        self._cache_interval = cache_interval
+        self._lv_cache = None
+        self._lv_cache_time = 0
+        self._vg_cache_time = 0
+        self.cache_stats = {'lvs_calls': 0,
+                            'lvs_calls_saved': 0,
+                            'vgs_calls': 0,
+                            'vgs_calls_saved': 0}
+
         if create_vg and physical_volumes is not None:
             self.pv_list = physical_volumes
 
@@ -260,13 +275,82 @@ class LVM(executor.Executor):
 
         return lv_list
 
+    def _cache_is_fresh(self, cache_time):
+        return (self._cache_interval > 0 and
+                time.time() - cache_time < self._cache_interval)
+
+    def invalidate_cache(self):
+        """Force the next lookup to refresh LV and VG info from LVM."""
+        self._lv_cache = None
+        self._lv_cache_time = 0
+        self._vg_cache_time = 0
+
+    def _refresh_lv_cache(self):
+        self.cache_stats['lvs_calls'] += 1
+        self.lv_list = self.get_all_volumes(self._root_helper, self.vg_name)
+        self._lv_cache = dict((lv['name'], lv) for lv in self.lv_list)
+        self._lv_cache_time = time.time()
+
+    def _add_to_cache(self, name, size_gb, vg_delta=None):
+        if size_gb is None:
+            self.invalidate_cache()
+        else:
+            self._update_cache(name, size_gb, vg_delta)
+
+    def _update_cache(self, name, size_gb=None, vg_delta=None):
+        """Apply the result of one of our own operations to the cache.
+
+        :param name: Name of the LV that was changed
+        :param size_gb: New size of the LV in GB, None if it was removed
+        :param vg_delta: VG space consumed by the change in GB, None if
+                         unknown, in which case the VG info is refreshed
+        """
+        if self._lv_cache is None or vg_delta is None:
+            self._vg_cache_time = 0
+        else:
+            self.vg_free_space -= vg_delta
+            if size_gb is None:
+                self.vg_lv_count -= 1
+            elif name not in self._lv_cache:
+                self.vg_lv_count += 1
+
+        if self._lv_cache is None:
+            return
+        if size_gb is None:
+            self._lv_cache.pop(name, None)
+        else:
+            self._lv_cache[name] = {'vg': self.vg_name,
+                                    'name': name,
+                                    'size': '%.2f' % size_gb}
+        self.lv_list = self._lv_cache.values()
+
+    def _cached_size_gb(self, name):
+        """Size in GB of an LV known to the cache, None otherwise."""
+        if self._lv_cache is None or name not in self._lv_cache:
+            return None
+        return self._size_str_to_gb('%sg' % self._lv_cache[name]['size'])
+
+    @staticmethod
+    def _size_str_to_gb(size_str):
+        """Convert an lvcreate/lvextend size string to GB, None if unknown."""
+        multipliers = {'m': 1.0 / 1024, 'g': 1, 't': 1024}
+        try:
+            return float(size_str[:-1]) * multipliers[size_str[-1].lower()]
+        except (KeyError, ValueError):
+            return None
+
     def get_volumes(self):
         """Get all LV's associated with this instantiation (VG).
 
         :returns: List of Dictionaries with LV info
 
         """
-        self.lv_list = self.get_all_volumes(self._root_helper, self.vg_name)
+        if self._lv_cache is not None and \
+                self._cache_is_fresh(self._lv_cache_time):
+            self.cache_stats['lvs_calls_saved'] += 1
+            return self.lv_list
+
+        self._refresh_lv_cache()
         return self.lv_list
 
     def get_volume(self, name):
@@ -364,6 +448,14 @@ class LVM(executor.Executor):
         :returns: Dictionaries of VG info
 
         """
+        if self._cache_is_fresh(self._vg_cache_time):
+            self.cache_stats['vgs_calls_saved'] += 1
+            if self.vg_thin_pool is not None:
+                self.vg_thin_pool_free_space = self._get_thin_pool_free_space(
+                    self.vg_name, self.vg_thin_pool)
+            return
+
+        self.cache_stats['vgs_calls'] += 1
         vg_list = self.get_all_volume_groups(self._root_helper, self.vg_name)
 
         if len(vg_list) != 1:
@@ -374,14 +466,15 @@ class LVM(executor.Executor):
         self.vg_free_space = float(vg_list[0]['available'])
         self.vg_lv_count = int(vg_list[0]['lv_count'])
         self.vg_uuid = vg_list[0]['uuid']
+        self._vg_cache_time = time.time()
 
         if self.vg_thin_pool is not None:
-            for lv in self.get_all_volumes(self._root_helper, self.vg_name):
-                if lv['name'] == self.vg_thin_pool:
-                    self.vg_thin_pool_size = lv['size']
-                    tpfs = self._get_thin_pool_free_space(self.vg_name,
-                                                          self.vg_thin_pool)
-                    self.vg_thin_pool_free_space = tpfs
+            lv = self.get_volume(self.vg_thin_pool)
+            if lv is not None:
+                self.vg_thin_pool_size = lv['size']
+                tpfs = self._get_thin_pool_free_space(self.vg_name,
+                                                      self.vg_thin_pool)
+                self.vg_thin_pool_free_space = tpfs
 
     def _calculate_thin_pool_size(self):
         """Calculates the correct size for a thin pool.
@@ -436,9 +529,12 @@ class LVM(executor.Executor):
                                           'size': size_str,
                                           'free': self.vg_free_space})
 
-        self._execute(*cmd,
-                      root_helper=self._root_helper,
-                      run_as_root=True)
+        try:
+            self._execute(*cmd,
+                          root_helper=self._root_helper,
+                          run_as_root=True)
+        finally:
+            self.invalidate_cache()
 
         self.vg_thin_pool = name
         return size_str
@@ -478,8 +574,15 @@ class LVM(executor.Executor):
             LOG.error(_('Cmd     :%s') % err.cmd)
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
+            self.invalidate_cache()
             raise
 
+        size_gb = self._size_str_to_gb(size_str)
+        vg_delta = None
+        if lv_type != 'thin' and mirror_count == 0:
+            vg_delta = size_gb
+        self._add_to_cache(name, size_gb, vg_delta)
+
     def create_lv_snapshot(self, name, source_lv_name, lv_type='default'):
         """Creates a snapshot of a logical volume.
 
@@ -508,8 +611,13 @@ class LVM(executor.Executor):
             LOG.error(_('Cmd     :%s') % err.cmd)
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
+            self.invalidate_cache()
             raise
 
+        size_gb = self._cached_size_gb(source_lv_name)
+        vg_delta = size_gb if lv_type != 'thin' else None
+        self._add_to_cache(name, size_gb, vg_delta)
+
     def _mangle_lv_name(self, name):
         # Linux LVM reserves name that starts with snapshot, so that
         # such volume name can't be created. Mangle it.
@@ -565,6 +673,11 @@ class LVM(executor.Executor):
                           root_helper=self._root_helper, run_as_root=True,
                           check_exit_code=False)
 
+        vg_delta = None
+        size_gb = self._cached_size_gb(name)
+        if self.vg_thin_pool is None and size_gb is not None:
+            vg_delta = -size_gb
+
         try:
             need_force_remove = False
             # LV removal seems to be a race with udev in
@@ -604,10 +717,16 @@ class LVM(executor.Executor):
             LOG.debug(_('Attempting udev settle and retry of lvremove...'))
             run_udevadm_settle()
 
-            self._execute('lvremove',
-                          '-f',
-                          '%s/%s' % (self.vg_name, name),
-                          root_helper=self._root_helper, run_as_root=True)
+            try:
+                self._execute('lvremove',
+                              '-f',
+                              '%s/%s' % (self.vg_name, name),
+                              root_helper=self._root_helper, run_as_root=True)
+            except putils.ProcessExecutionError:
+                self.invalidate_cache()
+                raise
+
+        self._update_cache(name, vg_delta=vg_delta)
 
     def revert(self, snapshot_name):
         """Revert an LV from snapshot.
@@ -643,8 +762,16 @@ class LVM(executor.Executor):
             LOG.error(_('Cmd     :%s') % err.cmd)
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
+            self.invalidate_cache()
             raise
 
+        size_gb = self._size_str_to_gb(new_size)
+        old_size_gb = self._cached_size_gb(lv_name)
+        vg_delta = None
+        if self.vg_thin_pool is None and None not in (size_gb, old_size_gb):
+            vg_delta = size_gb - old_size_gb
+        self._add_to_cache(lv_name, size_gb, vg_delta)
+
     def vg_mirror_free_space(self, mirror_count):
         free_capacity = 0.0
 
@@ -681,4 +808,12 @@ class LVM(executor.Executor):
             LOG.error(_('Cmd     :%s') % err.cmd)
             LOG.error(_('StdOut  :%s') % err.stdout)
             LOG.error(_('StdErr  :%s') % err.stderr)
+            self.invalidate_cache()
             raise
+
+        if self._lv_cache is not None and lv_name in self._lv_cache:
+            lv = self._lv_cache.pop(lv_name)
+            self._lv_cache[new_name] = dict(lv, name=new_name)
+            self.lv_list = self._lv_cache.values()
+        else:
+            self.invalidate_cache()
@@ -164,6 +164,13 @@ global_opts = [
                default='/etc/cinder/rootwrap.conf',
                help='Path to the rootwrap configuration file to use for '
                     'running commands as root'),
+    cfg.BoolOpt('use_rootwrap_daemon',
+                default=False,
+                help='Run commands that need root through a long-lived '
+                     'cinder-rootwrap-daemon instead of starting '
+                     'cinder-rootwrap for every command. Requires a sudoers '
+                     'entry for cinder-rootwrap-daemon. Falls back to '
+                     'cinder-rootwrap if the daemon cannot be started'),
     cfg.BoolOpt('monkey_patch',
                 default=False,
                 help='Enable monkey patching'),
@@ -39,6 +39,11 @@ these objects be simple dictionaries.
 :enable_new_services:  when adding a new service to the database, is it in the
                        pool of available hardware (Default: True)
 
+:slave_connection:  optional connection string of a read-only replica.  The
+                    functions taking a `use_slave` argument read from it
+                    unless they are called with `use_slave=False`, which
+                    callers that must see their own writes do.
+
 """
 
 from oslo.config import cfg
@@ -79,6 +84,14 @@ IMPL = db_api.DBAPI(backend_mapping=_BACKEND_MAPPING)
 ###################
 
 
+def get_pool_stats():
+    """Return the connection pool statistics of each database engine."""
+    return IMPL.get_pool_stats()
+
+
+###################
+
+
 def service_destroy(context, service_id):
     """Destroy the service or raise if it does not exist."""
     return IMPL.service_destroy(context, service_id)
@@ -94,9 +107,9 @@ def service_get_by_host_and_topic(context, host, topic):
     return IMPL.service_get_by_host_and_topic(context, host, topic)
 
 
-def service_get_all(context, disabled=None):
+def service_get_all(context, disabled=None, use_slave=True):
     """Get all services."""
-    return IMPL.service_get_all(context, disabled)
+    return IMPL.service_get_all(context, disabled, use_slave=use_slave)
 
 
 def service_get_all_by_topic(context, topic, disabled=None):
@@ -109,13 +122,13 @@ def service_get_all_by_host(context, host):
     return IMPL.service_get_all_by_host(context, host)
 
 
-def service_get_all_volume_sorted(context):
+def service_get_all_volume_sorted(context, use_slave=True):
     """Get all volume services sorted by volume count.
 
     :returns: a list of (Service, volume_count) tuples.
 
     """
-    return IMPL.service_get_all_volume_sorted(context)
+    return IMPL.service_get_all_volume_sorted(context, use_slave=use_slave)
 
 
 def service_get_by_args(context, host, binary):
@@ -128,6 +141,16 @@ def service_create(context, values):
     return IMPL.service_create(context, values)
 
 
+def service_heartbeat(context, service_id, availability_zone):
+    """Record a heartbeat of a service with a single UPDATE.
+
+    Increments report_count and sets availability_zone and updated_at.
+    Raises ServiceNotFound if service does not exist.
+
+    """
+    return IMPL.service_heartbeat(context, service_id, availability_zone)
+
+
 def service_update(context, service_id, values):
     """Set the given properties on an service and update it.
 
@@ -206,22 +229,23 @@ def volume_get(context, volume_id):
 
 
 def volume_get_all(context, marker, limit, sort_key, sort_dir,
-                   filters=None):
+                   filters=None, use_slave=True):
     """Get all volumes."""
     return IMPL.volume_get_all(context, marker, limit, sort_key, sort_dir,
-                               filters=filters)
+                               filters=filters, use_slave=use_slave)
 
 
-def volume_get_all_by_host(context, host):
+def volume_get_all_by_host(context, host, use_slave=True):
     """Get all volumes belonging to a host."""
-    return IMPL.volume_get_all_by_host(context, host)
+    return IMPL.volume_get_all_by_host(context, host, use_slave=use_slave)
 
 
 def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
-                              sort_dir, filters=None):
+                              sort_dir, filters=None, use_slave=True):
     """Get all volumes belonging to a project."""
     return IMPL.volume_get_all_by_project(context, project_id, marker, limit,
-                                          sort_key, sort_dir, filters=filters)
+                                          sort_key, sort_dir, filters=filters,
+                                          use_slave=use_slave)
 
 
 def volume_get_iscsi_target_num(context, volume_id):
@@ -256,14 +280,15 @@ def snapshot_get(context, snapshot_id):
     return IMPL.snapshot_get(context, snapshot_id)
 
 
-def snapshot_get_all(context):
+def snapshot_get_all(context, use_slave=True):
     """Get all snapshots."""
-    return IMPL.snapshot_get_all(context)
+    return IMPL.snapshot_get_all(context, use_slave=use_slave)
 
 
-def snapshot_get_all_by_project(context, project_id):
+def snapshot_get_all_by_project(context, project_id, use_slave=True):
     """Get all snapshots belonging to a project."""
-    return IMPL.snapshot_get_all_by_project(context, project_id)
+    return IMPL.snapshot_get_all_by_project(context, project_id,
+                                            use_slave=use_slave)
 
 
 def snapshot_get_all_for_volume(context, volume_id):
@@ -287,12 +312,14 @@ def snapshot_data_get_for_project(context, project_id, volume_type_id=None):
                                               volume_type_id)
 
 
-def snapshot_get_active_by_window(context, begin, end=None, project_id=None):
+def snapshot_get_active_by_window(context, begin, end=None, project_id=None,
+                                  use_slave=True):
     """Get all the snapshots inside the window.
 
     Specifying a project_id will filter for a certain project.
     """
-    return IMPL.snapshot_get_active_by_window(context, begin, end, project_id)
+    return IMPL.snapshot_get_active_by_window(context, begin, end, project_id,
+                                              use_slave=use_slave)
 
 
 ####################
@@ -407,12 +434,14 @@ def volume_type_destroy(context, id):
     return IMPL.volume_type_destroy(context, id)
 
 
-def volume_get_active_by_window(context, begin, end=None, project_id=None):
+def volume_get_active_by_window(context, begin, end=None, project_id=None,
+                                use_slave=True):
     """Get all the volumes inside the window.
 
     Specifying a project_id will filter for a certain project.
     """
-    return IMPL.volume_get_active_by_window(context, begin, end, project_id)
+    return IMPL.volume_get_active_by_window(context, begin, end, project_id,
+                                            use_slave=use_slave)
 
 
 ####################
@@ -677,9 +706,10 @@ def quota_usage_get(context, project_id, resource):
     return IMPL.quota_usage_get(context, project_id, resource)
 
 
-def quota_usage_get_all_by_project(context, project_id):
+def quota_usage_get_all_by_project(context, project_id, use_slave=True):
     """Retrieve all usage associated with a given resource."""
-    return IMPL.quota_usage_get_all_by_project(context, project_id)
+    return IMPL.quota_usage_get_all_by_project(context, project_id,
+                                               use_slave=use_slave)
 
 
 ###################
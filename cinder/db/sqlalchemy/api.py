@@ -19,11 +19,14 @@
 """Implementation of SQLAlchemy backend."""
 
 
+import functools
 import sys
 import uuid
 import warnings
 
+from eventlet import corolocal
 from oslo.config import cfg
+import sqlalchemy
 from sqlalchemy.exc import IntegrityError
 from sqlalchemy import or_
 from sqlalchemy.orm import joinedload, joinedload_all
@@ -41,17 +44,135 @@ from cinder.openstack.common import timeutils
 from cinder.openstack.common import uuidutils
 
 
+slave_opts = [
+    cfg.StrOpt('slave_connection',
+               default=None,
+               secret=True,
+               help='The SQLAlchemy connection string of a read-only '
+                    'replica of the database. When set, DB API calls which '
+                    'are safe to run on a replica are routed to it'),
+]
+
 CONF = cfg.CONF
+CONF.register_opts(slave_opts, 'database')
 LOG = logging.getLogger(__name__)
 
 db_session.set_defaults(sql_connection='sqlite:///$state_path/$sqlite_db',
                         sqlite_db='cinder.sqlite')
 
 get_engine = db_session.get_engine
-get_session = db_session.get_session
 
 _DEFAULT_QUOTA_NAME = 'default'
 
+_SLAVE_ENGINE = None
+_SLAVE_MAKERS = {}
+_POOL_STATS = {}
+_INSTRUMENTED = {}
+
+# Greenthread local, set while a read_only_safe function runs.
+_READ_STATE = corolocal.local()
+
+
+def _instrument_engine(name, engine):
+    """Count connections and checkouts of the pool of an engine."""
+    if _INSTRUMENTED.get(name) is engine:
+        return
+    _INSTRUMENTED[name] = engine
+    stats = _POOL_STATS[name] = {'connects': 0, 'checkouts': 0,
+                                 'checked_out': 0}
+
+    def _on_connect(dbapi_conn, connection_rec):
+        stats['connects'] += 1
+
+    def _on_checkout(dbapi_conn, connection_rec, connection_proxy):
+        stats['checkouts'] += 1
+        stats['checked_out'] += 1
+
+    def _on_checkin(dbapi_conn, connection_rec):
+        stats['checked_out'] -= 1
+
+    sqlalchemy.event.listen(engine, 'connect', _on_connect)
+    sqlalchemy.event.listen(engine, 'checkout', _on_checkout)
+    sqlalchemy.event.listen(engine, 'checkin', _on_checkin)
+
+
+def _get_slave_maker(autocommit, expire_on_commit):
+    global _SLAVE_ENGINE
+    if _SLAVE_ENGINE is None:
+        _SLAVE_ENGINE = db_session.create_engine(
+            CONF.database.slave_connection)
+        _instrument_engine('slave', _SLAVE_ENGINE)
+    key = (autocommit, expire_on_commit)
+    if key not in _SLAVE_MAKERS:
+        _SLAVE_MAKERS[key] = db_session.get_maker(_SLAVE_ENGINE, autocommit,
+                                                  expire_on_commit)
+    return _SLAVE_MAKERS[key]
+
+
+def get_session(use_slave=False, autocommit=True, expire_on_commit=False,
+                sqlite_fk=False):
+    """Return a session, on the read-only replica if asked and possible.
+
+    Sessions created while a read_only_safe function runs go to the
+    replica as well.  sqlite_fk only matters for writes, which never
+    go to the replica.
+    """
+    if ((use_slave or getattr(_READ_STATE, 'use_slave', False)) and
+            CONF.database.slave_connection):
+        return _get_slave_maker(autocommit, expire_on_commit)()
+    _instrument_engine('primary', get_engine())
+    return db_session.get_session(autocommit=autocommit,
+                                  expire_on_commit=expire_on_commit,
+                                  sqlite_fk=sqlite_fk)
+
+
+def cleanup_slave():
+    global _SLAVE_ENGINE
+    for maker in _SLAVE_MAKERS.values():
+        maker.close_all()
+    _SLAVE_MAKERS.clear()
+    if _SLAVE_ENGINE is not None:
+        _SLAVE_ENGINE.dispose()
+        _SLAVE_ENGINE = None
+
+
+def get_pool_stats():
+    """Return the connection pool statistics of each engine in use.
+
+    Besides the connect and checkout counters, pools which have a size
+    (i.e. not SQLite) report it along with their overflow.
+    """
+    stats = {}
+    for name, engine in _INSTRUMENTED.items():
+        engine_stats = dict(_POOL_STATS[name])
+        pool = engine.pool
+        if hasattr(pool, 'size') and hasattr(pool, 'overflow'):
+            engine_stats['pool_size'] = pool.size()
+            engine_stats['overflow'] = pool.overflow()
+        stats[name] = engine_stats
+    return stats
+
+
+def read_only_safe(f):
+    """Decorator routing a read-only DB API function to the replica.
+
+    Data read from the replica may lag behind the primary database.
+    Callers which have to see their own writes pass ``use_slave=False``.
+    """
+
+    @functools.wraps(f)
+    def wrapper(*args, **kwargs):
+        use_slave = kwargs.pop('use_slave', True)
+        # A session handed in by the caller is used as is.
+        use_slave = use_slave and kwargs.get('session') is None
+        previous = getattr(_READ_STATE, 'use_slave', False)
+        _READ_STATE.use_slave = use_slave
+        try:
+            return f(*args, **kwargs)
+        finally:
+            _READ_STATE.use_slave = previous
+    return wrapper
+
 
 def get_backend():
     """The backend is this module itself."""
@@ -269,6 +390,7 @@ def service_get(context, service_id):
 
 
 @require_admin_context
+@read_only_safe
 def service_get_all(context, disabled=None):
     query = model_query(context, models.Service)
 
@@ -325,6 +447,7 @@ def _service_get_all_topic_subquery(context, session, topic, subq, label):
 
 
 @require_admin_context
+@read_only_safe
 def service_get_all_volume_sorted(context):
     session = get_session()
     with session.begin():
@@ -365,6 +488,20 @@ def service_create(context, values):
     return service_ref
 
 
+@require_admin_context
+def service_heartbeat(context, service_id, availability_zone):
+    # NOTE: the increment is done by the database, so there is no need to
+    # read the row first and concurrent reports cannot get lost.
+    result = model_query(context, models.Service, read_deleted="no").\
+        filter_by(id=service_id).\
+        update({'report_count': models.Service.report_count + 1,
+                'availability_zone': availability_zone,
+                'updated_at': timeutils.utcnow()},
+               synchronize_session=False)
+    if not result:
+        raise exception.ServiceNotFound(service_id=service_id)
+
+
 @require_admin_context
 def service_update(context, service_id, values):
     session = get_session()
@@ -601,6 +738,7 @@ def quota_usage_get(context, project_id, resource):
 
 
 @require_context
+@read_only_safe
 def quota_usage_get_all_by_project(context, project_id):
     authorize_project_context(context, project_id)
 
@@ -1110,6 +1248,7 @@ def volume_get(context, volume_id):
 
 
 @require_admin_context
+@read_only_safe
 def volume_get_all(context, marker, limit, sort_key, sort_dir,
                    filters=None):
     """Retrieves all volumes.
@@ -1138,11 +1277,13 @@ def volume_get_all(context, marker, limit, sort_key, sort_dir,
 
 
 @require_admin_context
+@read_only_safe
 def volume_get_all_by_host(context, host):
     return _volume_get_query(context).filter_by(host=host).all()
 
 
 @require_context
+@read_only_safe
 def volume_get_all_by_project(context, project_id, marker, limit, sort_key,
                               sort_dir, filters=None):
     """"Retrieves all volumes in a project.
@@ -1549,6 +1690,7 @@ def snapshot_get(context, snapshot_id):
 
 
 @require_admin_context
+@read_only_safe
 def snapshot_get_all(context):
     return model_query(context, models.Snapshot).\
         options(joinedload('snapshot_metadata')).\
@@ -1565,6 +1707,7 @@ def snapshot_get_all_for_volume(context, volume_id):
 
 
 @require_context
+@read_only_safe
 def snapshot_get_all_by_project(context, project_id):
     authorize_project_context(context, project_id)
     return model_query(context, models.Snapshot).\
@@ -1599,6 +1742,7 @@ def snapshot_data_get_for_project(context, project_id, volume_type_id=None):
 
 
 @require_context
+@read_only_safe
 def snapshot_get_active_by_window(context, begin, end=None, project_id=None):
     """Return snapshots that were active during window."""
 
@@ -1920,6 +2064,7 @@ def volume_type_destroy(context, id):
 
 
 @require_context
+@read_only_safe
 def volume_get_active_by_window(context,
                                 begin,
                                 end=None,
@@ -10,8 +10,19 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import functools
+import time
+
 # For more information please visit: https://wiki.openstack.org/wiki/TaskFlow
+import taskflow.engines
+from taskflow import states
 from taskflow import task
+from taskflow.utils import misc
+
+from cinder.openstack.common.gettextutils import _
+from cinder.openstack.common import log as logging
+
+LOG = logging.getLogger(__name__)
 
 
 def _make_task_name(cls, addons=None):
@@ -34,3 +45,127 @@ class CinderTask(task.Task):
         super(CinderTask, self).__init__(_make_task_name(self.__class__,
                                                          addons),
                                          **kwargs)
+
+
+def _short_task_name(task_name):
+    # Drops the module path _make_task_name() puts in front.
+    base_name, sep, extra = task_name.partition(';')
+    return base_name.rsplit('.', 1)[-1] + sep + extra
+
+
+class _TaskStats(object):
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, duration):
+        self.count += 1
+        self.sum += duration
+        self.max = max(self.max, duration)
+
+    def to_dict(self):
+        return {'count': self.count, 'sum': self.sum, 'max': self.max}
+
+
+_TASK_STATS = {}
+
+
+def get_task_stats():
+    """Returns {task name: {'count': ..., 'sum': ..., 'max': ...}}.
+
+    Durations, in seconds, of the task executions timed by TaskTimer since
+    the process started.
+    """
+    return dict((name, stats.to_dict())
+                for name, stats in _TASK_STATS.items())
+
+
+class TaskTimer(object):
+    """Times the tasks an engine runs.
+
+    Execution times are added to the process wide task statistics, see
+    get_task_stats(), and once the flow is done one line with the time
+    spent in each of its tasks is logged at debug level.
+    """
+
+    def __init__(self, engine, logger):
+        self._engine = engine
+        self._logger = logger
+        self._started = {}
+        self._durations = []
+        self._flow_started = None
+        engine.task_notifier.register(misc.TransitionNotifier.ANY,
+                                      self._task_receiver)
+        engine.notifier.register(misc.TransitionNotifier.ANY,
+                                 self._flow_receiver)
+
+    def _task_receiver(self, state, details):
+        task_name = details['task_name']
+        if state in (states.RUNNING, states.REVERTING):
+            self._started[task_name] = time.time()
+        elif state in (states.SUCCESS, states.FAILURE, states.REVERTED):
+            started = self._started.pop(task_name, None)
+            if started is None:
+                return
+            duration = time.time() - started
+            name = _short_task_name(task_name)
+            if state == states.REVERTED:
+                name = '%s (revert)' % name
+            else:
+                stats = _TASK_STATS.get(name)
+                if stats is None:
+                    stats = _TASK_STATS[name] = _TaskStats()
+                stats.add(duration)
+            self._durations.append((name, duration))
+
+    def _flow_receiver(self, state, details):
+        if state == states.RUNNING:
+            self._flow_started = time.time()
+            self._durations = []
+        elif (state in (states.SUCCESS, states.FAILURE, states.REVERTED) and
+                self._flow_started is not None):
+            self._logger.debug(
+                _('Flow %(flow)s %(state)s in %(duration).3fs: %(tasks)s'),
+                {'flow': details['flow_name'],
+                 'state': state,
+                 'duration': time.time() - self._flow_started,
+                 'tasks': ', '.join('%s %.3fs' % task_duration
+                                    for task_duration in self._durations)})
+            self._flow_started = None
+
+
+class PrebuiltFlow(object):
+    """A flow built once and reused by later requests.
+
+    Building a flow instantiates all of its tasks, which work out what
+    they require by introspection.  load() only binds the inputs of a
+    request, through the engine store, to a flow which is already built.
+    Tasks of a prebuilt flow must thus not keep request specific state.
+
+    A built flow is used by one engine at a time.  It goes back to the
+    free list once its engine is done, so concurrent requests never share
+    tasks, and more flows get built only when requests overlap.
+    """
+
+    def __init__(self, build_flow, *args, **kwargs):
+        self._build_flow = functools.partial(build_flow, *args, **kwargs)
+        self._free = []
+
+    def load(self, store, logger=LOG):
+        """Loads (but does not run) an engine for the given store."""
+        try:
+            flow = self._free.pop()
+        except IndexError:
+            flow = self._build_flow()
+        engine = taskflow.engines.load(flow, store=store)
+        TaskTimer(engine, logger)
+        engine.notifier.register(misc.TransitionNotifier.ANY,
+                                 self._release, kwargs={'flow': flow})
+        return engine
+
+    def _release(self, state, flow, details):
+        if (state in (states.SUCCESS, states.FAILURE, states.REVERTED) and
+                flow not in self._free):
+            self._free.append(flow)
@@ -52,12 +52,15 @@ This module provides Manager, a base class for managers.
 """
 
 
+import copy
+
 from oslo.config import cfg
 from oslo import messaging
 
 from cinder.db import base
 from cinder.openstack.common import log as logging
 from cinder.openstack.common import periodic_task
+from cinder.openstack.common import uuidutils
 from cinder.scheduler import rpcapi as scheduler_rpcapi
 from cinder import version
 
@@ -115,6 +118,14 @@ class SchedulerDependentManager(Manager):
         self.last_capabilities = None
         self.service_name = service_name
         self.scheduler_rpcapi = scheduler_rpcapi.SchedulerAPI()
+        # Every distinct set of capabilities sent to the schedulers gets a
+        # new generation.  While nothing changes only the generation is
+        # sent, so the schedulers know the capabilities they hold are
+        # still current.  The counter restarts with the process, so it is
+        # paired with a seed unique to this process.
+        self._capabilities_seed = uuidutils.generate_uuid()
+        self._capabilities_generation = 0
+        self._published_capabilities = None
         super(SchedulerDependentManager, self).__init__(host, db_driver)
 
     def update_service_capabilities(self, capabilities):
@@ -122,12 +133,31 @@ class SchedulerDependentManager(Manager):
         self.last_capabilities = capabilities
 
     @periodic_task.periodic_task
-    def _publish_service_capabilities(self, context):
-        """Pass data back to the scheduler at a periodic interval."""
-        if self.last_capabilities:
-            LOG.debug(_('Notifying Schedulers of capabilities ...'))
-            self.scheduler_rpcapi.update_service_capabilities(
-                context,
-                self.service_name,
-                self.host,
+    def _publish_service_capabilities(self, context, force=False):
+        """Pass data back to the scheduler at a periodic interval.
+
+        The full capabilities are only sent when they changed since the
+        last report or when force is set, otherwise a keep-alive carrying
+        the current generation is sent instead.
+        """
+        if not self.last_capabilities:
+            return
+        if self.last_capabilities != self._published_capabilities:
+            self._capabilities_generation += 1
+            self._published_capabilities = copy.deepcopy(
                 self.last_capabilities)
+            force = True
+
+        if force:
+            LOG.debug(_('Notifying Schedulers of capabilities '
+                        '(generation %d) ...'), self._capabilities_generation)
+            capabilities = self.last_capabilities
+        else:
+            capabilities = None
+        self.scheduler_rpcapi.update_service_capabilities(
+            context,
+            self.service_name,
+            self.host,
+            capabilities,
+            generation=[self._capabilities_seed,
+                        self._capabilities_generation])
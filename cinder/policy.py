@@ -13,13 +13,25 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
-"""Policy Engine For Cinder"""
+"""Policy Engine For Cinder
 
+The rules loaded into the common policy brain are compiled into a tree of
+small check objects the first time they are used, so a rule string is only
+split and its handler only looked up once per policy load.  Checks for the
+stock ``rule``, ``role`` and generic kinds are evaluated directly against
+the request context; any other kind (``http`` or a custom registered
+handler) is delegated to its registered function unchanged.
+"""
+
+import re
+import time
+import weakref
 
 from oslo.config import cfg
 
 from cinder import exception
 from cinder.openstack.common.gettextutils import _
+from cinder.openstack.common import log as logging
 from cinder.openstack.common import policy
 from cinder import utils
 
@@ -30,30 +42,59 @@ policy_opts = [
                help=_('JSON file representing policy')),
     cfg.StrOpt('policy_default_rule',
                default='default',
-               help=_('Rule checked when requested rule is not found')), ]
+               help=_('Rule checked when requested rule is not found')),
+    cfg.IntOpt('policy_file_check_interval',
+               default=5,
+               help=_('Seconds between checks of the policy file for '
+                      'modifications, 0 checks it on every policy '
+                      'enforcement')),
+    cfg.BoolOpt('policy_cache_decisions',
+                default=True,
+                help=_('Remember policy decisions for the lifetime of a '
+                       'request context, so repeated checks of the same '
+                       'action and target are not evaluated again')), ]
 
 CONF = cfg.CONF
 CONF.register_opts(policy_opts)
 
+LOG = logging.getLogger(__name__)
+
 _POLICY_PATH = None
 _POLICY_CACHE = {}
+_POLICY_CHECKED = 0
+_RULES = None
+_DECISIONS = weakref.WeakKeyDictionary()
+
+_TARGET_KEY_RE = re.compile(r'%\((\w+)\)s')
+_MISSING = object()
 
 
 def reset():
     global _POLICY_PATH
     global _POLICY_CACHE
+    global _POLICY_CHECKED
+    global _RULES
     _POLICY_PATH = None
     _POLICY_CACHE = {}
+    _POLICY_CHECKED = 0
+    _RULES = None
+    _DECISIONS.clear()
     policy.reset()
 
 
 def init():
     global _POLICY_PATH
     global _POLICY_CACHE
+    global _POLICY_CHECKED
+    now = time.time()
+    if (_POLICY_CACHE and
+            now - _POLICY_CHECKED < CONF.policy_file_check_interval):
+        return
     if not _POLICY_PATH:
         _POLICY_PATH = utils.find_config(CONF.policy_file)
     utils.read_cached_file(_POLICY_PATH, _POLICY_CACHE,
                            reload_func=_set_brain)
+    _POLICY_CHECKED = now
 
 
 def _set_brain(data):
@@ -94,11 +135,15 @@ def enforce(context, action, target):
     """
     init()
 
-    match_list = ('rule:%s' % action,)
-    credentials = context.to_dict()
+    rules = _get_rules()
+    if rules is None:
+        match_list = ('rule:%s' % action,)
+        policy.enforce(match_list, target, context.to_dict(),
+                       exception.PolicyNotAuthorized, action=action)
+        return
 
-    policy.enforce(match_list, target, credentials,
-                   exception.PolicyNotAuthorized, action=action)
+    if not _check_cached(rules, context, action, target):
+        raise exception.PolicyNotAuthorized(action=action)
 
 
 def check_is_admin(roles):
@@ -116,4 +161,282 @@ def check_is_admin(roles):
     target = {'project_id': ''}
     credentials = {'roles': roles}
 
-    return policy.enforce(match_list, target, credentials)
+    rules = _get_rules()
+    if rules is None:
+        return policy.enforce(match_list, target, credentials)
+    return bool(rules.check(action, target, credentials))
+
+
+def _get_rules():
+    """Return the compiled form of the current policy brain.
+
+    The brain may be replaced directly through the common policy module,
+    so it is compiled again whenever it is not the one compiled last.
+    Returns None when there is no plain brain to compile, in which case
+    the common policy code has to be used.
+    """
+    global _RULES
+    brain = policy._BRAIN
+    if brain is None or type(brain) is not policy.Brain:
+        return None
+    if _RULES is None or _RULES.brain is not brain:
+        _RULES = _CompiledRules(brain)
+    return _RULES
+
+
+def _check_cached(rules, context, action, target):
+    if not CONF.policy_cache_decisions:
+        return rules.check(action, target, _ContextCredentials(context))
+
+    key = rules.decision_key(action, target, context)
+    if key is None:
+        return rules.check(action, target, _ContextCredentials(context))
+
+    try:
+        cached_rules, decisions = _DECISIONS[context]
+    except (KeyError, TypeError):
+        cached_rules = None
+    if cached_rules is not rules:
+        decisions = {}
+        try:
+            _DECISIONS[context] = (rules, decisions)
+        except TypeError:
+            # Contexts that cannot be weakly referenced are not cached.
+            pass
+
+    try:
+        return decisions[key]
+    except KeyError:
+        result = bool(rules.check(action, target,
+                                  _ContextCredentials(context)))
+        decisions[key] = result
+        return result
+
+
+class _ContextCredentials(object):
+    """Credentials of a request context, looked up as they are needed.
+
+    Behaves like the dictionary returned by ``context.to_dict()`` for the
+    lookups done by the policy checks, without building the whole
+    dictionary for every check.
+    """
+
+    _ATTRIBUTES = frozenset(['user_id', 'project_id', 'project_name',
+                             'domain', 'user_domain', 'project_domain',
+                             'is_admin', 'read_deleted', 'roles',
+                             'remote_address', 'request_id', 'auth_token',
+                             'quota_class', 'service_catalog', 'tenant',
+                             'user'])
+
+    def __init__(self, context):
+        self._context = context
+        self._dict = None
+
+    def to_dict(self):
+        if self._dict is None:
+            self._dict = self._context.to_dict()
+        return self._dict
+
+    def __contains__(self, kind):
+        return kind in self._ATTRIBUTES or kind in self.to_dict()
+
+    def __getitem__(self, kind):
+        if kind in self._ATTRIBUTES:
+            return getattr(self._context, kind)
+        return self.to_dict()[kind]
+
+
+def _as_dict(credentials):
+    if isinstance(credentials, _ContextCredentials):
+        return credentials.to_dict()
+    return credentials
+
+
+class _TrueCheck(object):
+    def __call__(self, rules, target, creds):
+        return True
+
+
+class _FalseCheck(object):
+    def __call__(self, rules, target, creds):
+        return False
+
+
+class _OrCheck(object):
+    def __init__(self, checks):
+        self.checks = checks
+
+    def __call__(self, rules, target, creds):
+        for check in self.checks:
+            if check(rules, target, creds):
+                return True
+        return False
+
+
+class _AndCheck(object):
+    def __init__(self, checks):
+        self.checks = checks
+
+    def __call__(self, rules, target, creds):
+        # NOTE: every item is evaluated, like Brain.check() does.
+        return all([check(rules, target, creds) for check in self.checks])
+
+
+class _RuleCheck(object):
+    def __init__(self, name):
+        self.name = name
+
+    def __call__(self, rules, target, creds):
+        return rules.check(self.name, target, creds)
+
+
+class _RoleCheck(object):
+    def __init__(self, role):
+        self.role = role.lower()
+
+    def __call__(self, rules, target, creds):
+        return self.role in [x.lower() for x in creds['roles']]
+
+
+class _GenericCheck(object):
+    def __init__(self, kind, match):
+        self.kind = kind
+        self.match = match
+        self.target_keys = _TARGET_KEY_RE.findall(match)
+
+    def __call__(self, rules, target, creds):
+        match = self.match % target
+        if self.kind in creds:
+            return match == unicode(creds[self.kind])
+        return False
+
+
+class _DelegateCheck(object):
+    """Calls a handler registered with the common policy code."""
+
+    def __init__(self, func, kind, match):
+        self.func = func
+        self.kind = kind
+        self.match = match
+
+    def __call__(self, rules, target, creds):
+        return self.func(rules.brain, self.kind, self.match, target,
+                         _as_dict(creds))
+
+
+class _CompiledRules(object):
+    """The rules of a policy brain compiled into check trees."""
+
+    def __init__(self, brain):
+        self.brain = brain
+        self.default_rule = brain.default_rule
+        self.rules = dict((name, self._compile(match_list))
+                          for name, match_list in brain.rules.items())
+        self._key_specs = {}
+
+    def _compile(self, match_list):
+        if not match_list:
+            return _TrueCheck()
+        or_checks = []
+        for and_list in match_list:
+            if isinstance(and_list, basestring):
+                and_list = (and_list,)
+            or_checks.append(_AndCheck([self._compile_item(item)
+                                        for item in and_list]))
+        return _OrCheck(or_checks)
+
+    def _compile_item(self, match):
+        try:
+            kind, value = match.split(':', 1)
+        except Exception:
+            LOG.exception(_("Failed to understand rule %r") % match)
+            # If the rule is invalid, fail closed
+            return _FalseCheck()
+
+        checks = policy.Brain._checks
+        func = checks.get(kind, checks.get(None))
+        if func is None:
+            LOG.error(_("No handler for matches of kind %s") % kind)
+            return _FalseCheck()
+        if func is policy._check_rule:
+            return _RuleCheck(value)
+        if func is policy._check_role:
+            return _RoleCheck(value)
+        if func is policy._check_generic:
+            return _GenericCheck(kind, value)
+        return _DelegateCheck(func, kind, value)
+
+    def _lookup(self, name):
+        try:
+            return self.rules[name]
+        except KeyError:
+            if self.default_rule and name != self.default_rule:
+                return _RuleCheck(self.default_rule)
+            return _FalseCheck()
+
+    def check(self, name, target, creds):
+        """Evaluate rule ``name`` against a target and credentials."""
+        return self._lookup(name)(self, target, creds)
+
+    def _collect(self, check, target_keys, cred_keys, seen):
+        """Gather the inputs a check depends on.
+
+        Returns False if the check depends on something other than target
+        and credential values, so its result must not be remembered.
+        """
+        if isinstance(check, (_OrCheck, _AndCheck)):
+            return all([self._collect(c, target_keys, cred_keys, seen)
+                        for c in check.checks])
+        if isinstance(check, _RuleCheck):
+            if check.name in seen:
+                return True
+            seen.add(check.name)
+            return self._collect(self._lookup(check.name), target_keys,
+                                 cred_keys, seen)
+        if isinstance(check, _RoleCheck):
+            cred_keys.add('roles')
+        elif isinstance(check, _GenericCheck):
+            cred_keys.add(check.kind)
+            target_keys.update(check.target_keys)
+        elif isinstance(check, _DelegateCheck):
+            return False
+        return True
+
+    def _key_spec(self, action):
+        try:
+            return self._key_specs[action]
+        except KeyError:
+            target_keys = set()
+            cred_keys = set()
+            if self._collect(_RuleCheck(action), target_keys, cred_keys,
+                             set()):
+                spec = (tuple(sorted(target_keys)), tuple(sorted(cred_keys)))
+            else:
+                spec = None
+            self._key_specs[action] = spec
+            return spec
+
+    def decision_key(self, action, target, context):
+        """Key identifying everything the decision for ``action`` uses.
+
+        Returns None if the decision cannot be remembered.
+        """
+        spec = self._key_spec(action)
+        if spec is None:
+            return None
+        target_keys, cred_keys = spec
+        creds = _ContextCredentials(context)
+        values = [action]
+        for key in target_keys:
+            values.append(target.get(key, _MISSING))
+        for key in cred_keys:
+            value = creds[key] if key in creds else _MISSING
+            if isinstance(value, list):
+                value = tuple(value)
+            values.append(value)
+        key = tuple(values)
+        try:
+            hash(key)
+        except TypeError:
+            return None
+        return key
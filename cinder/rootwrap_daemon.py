@@ -0,0 +1,322 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Long-lived privileged helper used instead of per-command rootwrap.
+
+Running a command through ``sudo cinder-rootwrap`` starts a new Python
+interpreter and parses every filter file for each call.  The daemon is
+started once per service with::
+
+    sudo cinder-rootwrap-daemon /etc/cinder/rootwrap.conf
+
+It loads the rootwrap filters a single time, listens on a Unix socket in
+a private directory owned by the invoking user and runs the commands it
+receives if they match a filter, exactly like cinder-rootwrap would.  The
+parent passes a random key on stdin which every request has to present,
+and the daemon exits as soon as that stdin is closed.
+
+Requests and replies are length-prefixed JSON documents so that the
+client side can use plain (eventlet-friendly) sockets.  Command output is
+carried as latin-1 text, which maps every byte value one to one.
+"""
+
+import json
+import os
+import random
+import shutil
+import signal
+import socket
+import struct
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+from eventlet.green import subprocess as green_subprocess
+from eventlet import greenthread
+
+from cinder.openstack.common.gettextutils import _
+from cinder.openstack.common import log as logging
+from cinder.openstack.common import processutils
+
+
+LOG = logging.getLogger(__name__)
+
+# Same exit codes as cinder-rootwrap, so callers see identical failures.
+RC_UNAUTHORIZED = 99
+RC_NOEXECFOUND = 96
+
+_HEADER = struct.Struct('!I')
+
+
+class DaemonUnavailable(Exception):
+    pass
+
+
+def _send(sock, obj):
+    data = json.dumps(obj)
+    sock.sendall(_HEADER.pack(len(data)) + data)
+
+
+def _recv_exactly(sock, size):
+    chunks = []
+    while size > 0:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise EOFError()
+        chunks.append(chunk)
+        size -= len(chunk)
+    return ''.join(chunks)
+
+
+def _recv(sock):
+    (size,) = _HEADER.unpack(_recv_exactly(sock, _HEADER.size))
+    return json.loads(_recv_exactly(sock, size))
+
+
+def _subprocess_setup():
+    signal.signal(signal.SIGPIPE, signal.SIG_DFL)
+
+
+class _Server(object):
+    """Runs filtered commands on behalf of a single parent service."""
+
+    def __init__(self, config_file, key):
+        from oslo.rootwrap import wrapper
+        from six import moves
+
+        rawconfig = moves.configparser.RawConfigParser()
+        rawconfig.read(config_file)
+        self.wrapper = wrapper
+        self.config = wrapper.RootwrapConfig(rawconfig)
+        self.filters = wrapper.load_filters(self.config.filters_path)
+        self.key = key
+
+    def run_command(self, userargs, process_input):
+        wrapper = self.wrapper
+        try:
+            filtermatch = wrapper.match_filter(
+                self.filters, userargs, exec_dirs=self.config.exec_dirs)
+            command = filtermatch.get_command(
+                userargs, exec_dirs=self.config.exec_dirs)
+        except wrapper.FilterMatchNotExecutable as exc:
+            return (RC_NOEXECFOUND, '',
+                    'Executable not found: %s (filter match = %s)' %
+                    (exc.match.exec_path, exc.match.name))
+        except wrapper.NoFilterMatched:
+            return (RC_UNAUTHORIZED, '',
+                    'Unauthorized command: %s (no filter matched)' %
+                    ' '.join(userargs))
+
+        obj = subprocess.Popen(command,
+                               stdin=subprocess.PIPE,
+                               stdout=subprocess.PIPE,
+                               stderr=subprocess.PIPE,
+                               close_fds=True,
+                               preexec_fn=_subprocess_setup,
+                               env=filtermatch.get_environment(userargs))
+        stdout, stderr = obj.communicate(process_input)
+        return (obj.returncode, stdout.decode('latin-1'),
+                stderr.decode('latin-1'))
+
+    def handle(self, conn):
+        try:
+            request = _recv(conn)
+            if request.get('key') != self.key:
+                return
+            process_input = request.get('stdin')
+            if process_input is not None:
+                process_input = process_input.encode('latin-1')
+            rc, stdout, stderr = self.run_command(request['cmd'],
+                                                  process_input)
+            _send(conn, {'rc': rc, 'stdout': stdout, 'stderr': stderr})
+        except (EOFError, ValueError, socket.error):
+            pass
+        finally:
+            conn.close()
+
+    def serve(self, listener):
+        while True:
+            conn, _addr = listener.accept()
+            worker = threading.Thread(target=self.handle, args=(conn,))
+            worker.daemon = True
+            worker.start()
+
+
+def _chown_to_caller(path):
+    uid = int(os.environ.get('SUDO_UID', os.getuid()))
+    gid = int(os.environ.get('SUDO_GID', os.getgid()))
+    os.chown(path, uid, gid)
+
+
+def main():
+    """Entry point of cinder-rootwrap-daemon."""
+    if len(sys.argv) != 2:
+        sys.stderr.write('usage: %s <rootwrap config file>\n' % sys.argv[0])
+        sys.exit(1)
+
+    key = sys.stdin.readline().strip()
+    server = _Server(sys.argv[1], key)
+
+    tmpdir = tempfile.mkdtemp(prefix='cinder-rootwrap-')
+    _chown_to_caller(tmpdir)
+    path = os.path.join(tmpdir, 'rootwrap.sock')
+
+    listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    listener.bind(path)
+    listener.listen(64)
+    _chown_to_caller(path)
+
+    serving = threading.Thread(target=server.serve, args=(listener,))
+    serving.daemon = True
+    serving.start()
+
+    sys.stdout.write(path + '\n')
+    sys.stdout.flush()
+
+    # The parent holds our stdin open for as long as it wants us around.
+    sys.stdin.read()
+    shutil.rmtree(tmpdir, ignore_errors=True)
+    os._exit(0)
+
+
+class Client(object):
+    """Runs commands through a cinder-rootwrap-daemon started on demand.
+
+    Once the daemon failed to start, it is not started again for
+    retry_interval seconds, so that a daemon which cannot run does not cost
+    a failed sudo on every command.
+    """
+
+    def __init__(self, daemon_cmd, retry_interval=60):
+        self.daemon_cmd = daemon_cmd
+        self.retry_interval = retry_interval
+        self._process = None
+        self._path = None
+        self._key = None
+        self._failed_at = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        """Return False while a failed start is being backed off from."""
+        return (self._failed_at is None or
+                time.time() - self._failed_at >= self.retry_interval)
+
+    def _ensure_started(self):
+        with self._lock:
+            if self._process is not None and self._process.poll() is None:
+                return
+            if not self.available():
+                raise DaemonUnavailable(
+                    _('Rootwrap daemon failed to start less than %d seconds '
+                      'ago') % self.retry_interval)
+            self._key = os.urandom(16).encode('hex')
+            try:
+                self._process = green_subprocess.Popen(
+                    self.daemon_cmd,
+                    stdin=green_subprocess.PIPE,
+                    stdout=green_subprocess.PIPE,
+                    close_fds=True)
+                self._process.stdin.write(self._key + '\n')
+                self._process.stdin.flush()
+                self._path = self._process.stdout.readline().strip()
+            except (OSError, IOError) as exc:
+                self._process = None
+                self._failed_at = time.time()
+                raise DaemonUnavailable(exc)
+            if not self._path:
+                self._process = None
+                self._failed_at = time.time()
+                raise DaemonUnavailable(_('Rootwrap daemon did not start'))
+            self._failed_at = None
+            LOG.info(_('Started rootwrap daemon listening on %s') %
+                     self._path)
+
+    def stop(self):
+        """Ask the daemon to exit by closing its stdin."""
+        with self._lock:
+            if self._process is None:
+                return
+            self._process.stdin.close()
+            self._process.wait()
+            self._process = None
+
+    def _call(self, cmd, process_input):
+        self._ensure_started()
+        if process_input is not None:
+            process_input = process_input.decode('latin-1')
+
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            try:
+                sock.connect(self._path)
+            except socket.error as exc:
+                raise DaemonUnavailable(exc)
+
+            # Past this point the command may have run, so a failure must
+            # not be retried through rootwrap.
+            try:
+                _send(sock, {'key': self._key, 'cmd': cmd,
+                             'stdin': process_input})
+                reply = _recv(sock)
+            except (EOFError, ValueError, socket.error) as exc:
+                raise processutils.ProcessExecutionError(
+                    cmd=' '.join(cmd),
+                    description=_('Lost connection to rootwrap daemon: '
+                                  '%s') % exc)
+        finally:
+            sock.close()
+        return (reply['rc'], reply['stdout'].encode('latin-1'),
+                reply['stderr'].encode('latin-1'))
+
+    def execute(self, *cmd, **kwargs):
+        """Same contract as processutils.execute() with run_as_root=True.
+
+        :raises: DaemonUnavailable if the daemon cannot be reached, in
+                 which case the command has not been run.
+        """
+        process_input = kwargs.pop('process_input', None)
+        check_exit_code = kwargs.pop('check_exit_code', [0])
+        delay_on_retry = kwargs.pop('delay_on_retry', True)
+        attempts = kwargs.pop('attempts', 1)
+        ignore_exit_code = False
+
+        if isinstance(check_exit_code, bool):
+            ignore_exit_code = not check_exit_code
+            check_exit_code = [0]
+        elif isinstance(check_exit_code, int):
+            check_exit_code = [check_exit_code]
+
+        cmd = map(str, cmd)
+        while attempts > 0:
+            attempts -= 1
+            LOG.debug(_('Running cmd (rootwrap daemon): %s'), ' '.join(cmd))
+            rc, stdout, stderr = self._call(cmd, process_input)
+            if ignore_exit_code or rc in check_exit_code:
+                return stdout, stderr
+
+            LOG.debug(_('Result was %s') % rc)
+            if not attempts:
+                raise processutils.ProcessExecutionError(
+                    exit_code=rc, stdout=stdout, stderr=stderr,
+                    cmd=' '.join(cmd))
+            LOG.debug(_('%r failed. Retrying.'), cmd)
+            if delay_on_retry:
+                greenthread.sleep(random.randint(20, 200) / 100.0)
+
+
+if __name__ == '__main__':
+    main()
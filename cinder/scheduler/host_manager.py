@@ -21,13 +21,15 @@ import UserDict
 
 from oslo.config import cfg
 
+from cinder import context as cinder_context
 from cinder import db
 from cinder import exception
 from cinder.openstack.common import log as logging
 from cinder.openstack.common.scheduler import filters
 from cinder.openstack.common.scheduler import weights
 from cinder.openstack.common import timeutils
-from cinder import utils
+from cinder import servicegroup
+from cinder.volume import rpcapi as volume_rpcapi
 
 
 host_manager_opts = [
@@ -43,7 +45,12 @@ host_manager_opts = [
                 default=[
                     'CapacityWeigher'
                 ],
-                help='Which weigher class names to use for weighing hosts.')
+                help='Which weigher class names to use for weighing hosts.'),
+    cfg.IntOpt('scheduler_capabilities_max_age',
+               default=600,
+               help='Seconds after which the capabilities of a volume '
+                    'service that stopped reporting are no longer used to '
+                    'schedule volumes. 0 means never'),
 ]
 
 CONF = cfg.CONF
@@ -164,6 +171,7 @@ class HostManager(object):
 
     def __init__(self):
         self.service_states = {}  # { <host>: {<service>: {cap k : v}}}
+        self.service_generations = {}  # { <host>: <generation> }
         self.host_state_map = {}
         self.filter_handler = filters.HostFilterHandler('cinder.scheduler.'
                                                         'filters')
@@ -171,6 +179,7 @@ class HostManager(object):
         self.weight_handler = weights.HostWeightHandler('cinder.scheduler.'
                                                         'weights')
         self.weight_classes = self.weight_handler.get_all_classes()
+        self.servicegroup_api = servicegroup.API()
 
         default_filters = ['AvailabilityZoneFilter',
                            'CapacityFilter',
@@ -260,14 +269,37 @@ class HostManager(object):
                                                        hosts,
                                                        weight_properties)
 
-    def update_service_capabilities(self, service_name, host, capabilities):
-        """Update the per-service capabilities based on this notification."""
+    def update_service_capabilities(self, service_name, host, capabilities,
+                                    generation=None):
+        """Update the per-service capabilities based on this notification.
+
+        Capabilities of None with a generation is a keep-alive: the service
+        still has the capabilities it reported for that generation.  If
+        those are not the ones known here, a full report is requested.
+        """
         if service_name != 'volume':
             LOG.debug(_('Ignoring %(service_name)s service update '
                         'from %(host)s'),
                       {'service_name': service_name, 'host': host})
             return
 
+        # A (seed, counter) pair, which turns into a list on the wire.
+        if isinstance(generation, list):
+            generation = tuple(generation)
+
+        if capabilities is None:
+            known = self.service_states.get(host)
+            if (known is None or
+                    self.service_generations.get(host) != generation):
+                LOG.debug(_("Requesting capabilities of %(host)s, "
+                            "generation %(generation)s is unknown."),
+                          {'host': host, 'generation': generation})
+                self._request_service_capabilities(host)
+                return
+            self.service_states[host] = dict(known,
+                                             timestamp=timeutils.utcnow())
+            return
+
         LOG.debug(_("Received %(service_name)s service update from "
                     "%(host)s.") %
                   {'service_name': service_name, 'host': host})
@@ -276,6 +308,19 @@ class HostManager(object):
         capab_copy = dict(capabilities)
         capab_copy["timestamp"] = timeutils.utcnow()  # Reported time
         self.service_states[host] = capab_copy
+        self.service_generations[host] = generation
+
+    def _request_service_capabilities(self, host):
+        volume_rpcapi.VolumeAPI().publish_service_capabilities(
+            cinder_context.get_admin_context(), host=host)
+
+    def _capabilities_expired(self, capabilities):
+        max_age = CONF.scheduler_capabilities_max_age
+        if not max_age or not capabilities:
+            return False
+        timestamp = capabilities.get('timestamp')
+        return (timestamp is not None and
+                timeutils.is_older_than(timestamp, max_age))
 
     def get_all_host_states(self, context):
         """Returns a dict of all the hosts the HostManager knows about.
@@ -295,10 +340,17 @@ class HostManager(object):
         active_hosts = set()
         for service in volume_services:
             host = service['host']
-            if not utils.service_is_up(service):
+            if not self.servicegroup_api.is_up(service):
                 LOG.warn(_("volume service is down. (host: %s)") % host)
                 continue
             capabilities = self.service_states.get(host, None)
+            if self._capabilities_expired(capabilities):
+                LOG.warn(_("Capabilities of volume service %s are too old, "
+                           "ignoring the host until it reports again.") %
+                         host)
+                del self.service_states[host]
+                self.service_generations.pop(host, None)
+                continue
             host_state = self.host_state_map.get(host)
             if host_state:
                 # copy capabilities to host_state.capabilities
@@ -51,7 +51,7 @@ LOG = logging.getLogger(__name__)
 class SchedulerManager(manager.Manager):
     """Chooses a host to create volumes."""
 
-    RPC_API_VERSION = '1.5'
+    RPC_API_VERSION = '1.6'
 
     target = messaging.Target(version=RPC_API_VERSION)
 
@@ -77,13 +77,19 @@ class SchedulerManager(manager.Manager):
         self.request_service_capabilities(ctxt)
 
     def update_service_capabilities(self, context, service_name=None,
-                                    host=None, capabilities=None, **kwargs):
-        """Process a capability update from a service node."""
-        if capabilities is None:
+                                    host=None, capabilities=None,
+                                    generation=None, **kwargs):
+        """Process a capability update from a service node.
+
+        When a generation is given, capabilities of None means the service
+        still has the capabilities it last reported for that generation.
+        """
+        if capabilities is None and generation is None:
             capabilities = {}
         self.driver.update_service_capabilities(service_name,
                                                 host,
-                                                capabilities)
+                                                capabilities,
+                                                generation=generation)
 
     def create_volume(self, context, topic, volume_id, snapshot_id=None,
                       image_id=None, request_spec=None,
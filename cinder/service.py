@@ -33,6 +33,7 @@ from cinder.openstack.common import log as logging
 from cinder.openstack.common import loopingcall
 from cinder.openstack.common import service
 from cinder import rpc
+from cinder import servicegroup
 from cinder import version
 from cinder import wsgi
 
@@ -93,6 +94,7 @@ class Service(service.Service):
         self.basic_config_check()
         self.saved_args, self.saved_kwargs = args, kwargs
         self.timers = []
+        self.servicegroup_api = servicegroup.API()
 
     def start(self):
         version_string = version.version_string()
@@ -106,6 +108,12 @@ class Service(service.Service):
                                                  self.host,
                                                  self.binary)
             self.service_id = service_ref['id']
+            zone = CONF.storage_availability_zone
+            if zone != service_ref['availability_zone']:
+                # Heartbeats of servicegroup drivers other than the DB one
+                # do not update the services table.
+                db.service_update(ctxt, self.service_id,
+                                  {'availability_zone': zone})
         except exception.NotFound:
             self._create_service_ref(ctxt)
 
@@ -243,22 +251,19 @@ class Service(service.Service):
         """Update the state of this service in the datastore."""
         ctxt = context.get_admin_context()
         zone = CONF.storage_availability_zone
-        state_catalog = {}
+        service = {'id': self.service_id,
+                   'host': self.host,
+                   'binary': self.binary,
+                   'topic': self.topic}
         try:
             try:
-                service_ref = db.service_get(ctxt, self.service_id)
+                self.servicegroup_api.heartbeat(ctxt, service, zone)
             except exception.NotFound:
                 LOG.debug(_('The service database object disappeared, '
                             'Recreating it.'))
                 self._create_service_ref(ctxt)
-                service_ref = db.service_get(ctxt, self.service_id)
-
-            state_catalog['report_count'] = service_ref['report_count'] + 1
-            if zone != service_ref['availability_zone']:
-                state_catalog['availability_zone'] = zone
-
-            db.service_update(ctxt,
-                              self.service_id, state_catalog)
+                service['id'] = self.service_id
+                self.servicegroup_api.heartbeat(ctxt, service, zone)
 
             # TODO(termie): make this pattern be more elegant.
             if getattr(self, 'model_disconnected', False):
@@ -0,0 +1,40 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Service liveness.
+
+Services report a heartbeat every report_interval seconds and the
+scheduler, the backup API and cinder-manage ask whether a service is up.
+Where the heartbeats are kept is up to the servicegroup driver.
+"""
+
+from oslo.config import cfg
+
+from cinder.openstack.common import importutils
+
+servicegroup_opts = [
+    cfg.StrOpt('servicegroup_driver',
+               default='cinder.servicegroup.drivers.db.DbDriver',
+               help='The full class name of the driver keeping track of '
+                    'service heartbeats'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(servicegroup_opts)
+
+
+def API():
+    cls = importutils.import_class(CONF.servicegroup_driver)
+    return cls()
@@ -0,0 +1,40 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Base class for servicegroup drivers."""
+
+
+class ServiceGroupDriver(object):
+    """Keeps track of service heartbeats.
+
+    ``service`` is a services table row, or a dict with at least its id,
+    host, binary and topic.
+    """
+
+    def heartbeat(self, context, service, availability_zone):
+        """Record that the service is alive.
+
+        Raises ServiceNotFound when the service record has to be created
+        again.
+        """
+        raise NotImplementedError()
+
+    def is_up(self, service):
+        """Return whether the service reported recently enough."""
+        raise NotImplementedError()
+
+    def get_updated_time(self, service):
+        """Return the UTC datetime of the last heartbeat, or None."""
+        raise NotImplementedError()
@@ -0,0 +1,32 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Heartbeats kept in the updated_at column of the services table."""
+
+from cinder import db
+from cinder.servicegroup import driver
+from cinder import utils
+
+
+class DbDriver(driver.ServiceGroupDriver):
+
+    def heartbeat(self, context, service, availability_zone):
+        db.service_heartbeat(context, service['id'], availability_zone)
+
+    def is_up(self, service):
+        return utils.service_is_up(service)
+
+    def get_updated_time(self, service):
+        return service['updated_at']
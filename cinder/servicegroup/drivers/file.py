@@ -0,0 +1,113 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Heartbeats kept as one small file per service in a directory.
+
+Reporting a heartbeat does not write to the database.  The directory
+acts as a simple key-value store: it may be local for an all-in-one
+deployment or on storage shared by all the cinder nodes.  The services
+table row is only read once every service_down_time seconds, so that a
+deleted row still gets recreated by the service.
+"""
+
+import datetime
+import os
+import tempfile
+import time
+
+from oslo.config import cfg
+
+from cinder import db
+from cinder.openstack.common import excutils
+from cinder.openstack.common import fileutils
+from cinder.openstack.common.gettextutils import _
+from cinder.openstack.common import log as logging
+from cinder.servicegroup import driver
+
+
+LOG = logging.getLogger(__name__)
+
+file_opts = [
+    cfg.StrOpt('servicegroup_file_path',
+               default='$state_path/servicegroup',
+               help='Directory holding the service heartbeats of the file '
+                    'servicegroup driver. It has to be shared by all the '
+                    'nodes running cinder services'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(file_opts)
+CONF.import_opt('service_down_time', 'cinder.common.config')
+
+
+class FileDriver(driver.ServiceGroupDriver):
+
+    def __init__(self):
+        # Service id to the time its row was last seen in the database.
+        self._row_checked = {}
+
+    def _path(self, service):
+        key = '%s.%s' % (service['binary'], service['host'])
+        return os.path.join(CONF.servicegroup_file_path,
+                            key.replace(os.sep, '_'))
+
+    def _read(self, service):
+        try:
+            with open(self._path(service)) as f:
+                return float(f.read())
+        except (IOError, ValueError):
+            return None
+
+    def _check_row(self, context, service):
+        now = time.time()
+        last_check = self._row_checked.get(service['id'])
+        if (last_check is not None and
+                abs(now - last_check) < CONF.service_down_time):
+            return
+        # Raises ServiceNotFound, so that the service recreates its row.
+        db.service_get(context, service['id'])
+        self._row_checked[service['id']] = now
+
+    def heartbeat(self, context, service, availability_zone):
+        self._check_row(context, service)
+        fileutils.ensure_tree(CONF.servicegroup_file_path)
+        path = self._path(service)
+        # Written to a temporary file first, readers never see a partially
+        # written timestamp.
+        fd, tmp_path = tempfile.mkstemp(dir=CONF.servicegroup_file_path,
+                                        prefix='.heartbeat-')
+        try:
+            try:
+                os.write(fd, '%f' % time.time())
+            finally:
+                os.close(fd)
+            os.rename(tmp_path, path)
+        except Exception:
+            with excutils.save_and_reraise_exception():
+                fileutils.delete_if_exists(tmp_path)
+
+    def is_up(self, service):
+        last_heartbeat = self._read(service)
+        if last_heartbeat is None:
+            LOG.debug(_('No heartbeat found for %(binary)s on %(host)s'),
+                      {'binary': service['binary'], 'host': service['host']})
+            return False
+        return abs(time.time() - last_heartbeat) <= CONF.service_down_time
+
+    def get_updated_time(self, service):
+        last_heartbeat = self._read(service)
+        if last_heartbeat is None:
+            return None
+        return datetime.datetime.utcfromtimestamp(last_heartbeat)
@@ -23,6 +23,7 @@ from cinder import db
 from cinder import exception
 from cinder.openstack.common import timeutils
 from cinder import policy
+from cinder.servicegroup import driver as servicegroup_driver
 from cinder import test
 from cinder.tests.api import fakes
 from datetime import datetime
@@ -171,6 +172,24 @@ class ServicesTest(test.TestCase):
                      'updated_at': datetime(2012, 9, 18, 8, 3, 38)}]}
         self.assertEqual(response, res_dict)
 
+    def test_services_list_uses_servicegroup_driver(self):
+        heartbeat = datetime(2012, 10, 29, 13, 42, 10)
+
+        class FakeDriver(servicegroup_driver.ServiceGroupDriver):
+            def is_up(self, service):
+                return service['host'] == 'host2'
+
+            def get_updated_time(self, service):
+                return heartbeat
+
+        self.stubs.Set(services.servicegroup, 'API', FakeDriver)
+        res_dict = self.controller.index(FakeRequest())
+
+        self.assertEqual(['down', 'down', 'up', 'up'],
+                         [svc['state'] for svc in res_dict['services']])
+        self.assertEqual([heartbeat] * 4,
+                         [svc['updated_at'] for svc in res_dict['services']])
+
     def test_services_detail(self):
         self.ext_mgr.extensions['os-extended-services'] = True
         self.controller = services.ServiceController(self.ext_mgr)
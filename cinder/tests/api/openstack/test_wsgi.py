@@ -10,11 +10,13 @@
 # License for the specific language governing permissions and limitations
 # under the License.
 
+import datetime
 import inspect
 import webob
 
 from cinder.api.openstack import wsgi
 from cinder import exception
+from cinder.openstack.common import jsonutils
 from cinder import test
 from cinder.tests.api import fakes
 
@@ -185,6 +187,14 @@ class JSONDictSerializerTest(test.TestCase):
         result = result.replace('\n', '').replace(' ', '')
         self.assertEqual(expected_json, result)
 
+    def test_json_matches_jsonutils(self):
+        input_dict = dict(volume=dict(created_at=datetime.datetime(
+            2014, 1, 2, 3, 4, 5, 6), name=u'vol\u00e9', size=1,
+            metadata={'a': None}, items=(1, 2)))
+        serializer = wsgi.JSONDictSerializer()
+        self.assertEqual(jsonutils.dumps(input_dict),
+                         serializer.serialize(input_dict))
+
 
 class TextDeserializerTest(test.TestCase):
     def test_dispatch_default(self):
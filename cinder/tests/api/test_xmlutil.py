@@ -654,6 +654,53 @@ class TemplateTest(test.TestCase):
         result = result.replace('\n', '').replace(' ', '')
         self.assertEqual(expected_xml, result)
 
+    def _plan_templates(self):
+        root = xmlutil.TemplateElement('test', selector='test', name='name')
+        value = xmlutil.SubTemplateElement(root, 'value', selector='values')
+        value.text = xmlutil.Selector()
+        master = xmlutil.MasterTemplate(root, 1)
+
+        root_slave = xmlutil.TemplateElement('test', selector='test')
+        image = xmlutil.SubTemplateElement(root_slave, 'image',
+                                           selector='image', id='id')
+        image.text = xmlutil.Selector('name')
+        slave = xmlutil.SlaveTemplate(root_slave, 1)
+        return master, slave
+
+    def test_serialize_uses_render_plan(self):
+        obj = {'test': {'name': 'foobar',
+                        'values': [1, 2, 3],
+                        'image': {'name': 'image_foobar', 'id': 42}}}
+        master, slave = self._plan_templates()
+        master.attach(slave)
+
+        expected = etree.tostring(master._serialize(None, obj,
+                                                    master._siblings(),
+                                                    master._nsmap()))
+        self.assertEqual(expected, etree.tostring(master.make_tree(obj)))
+
+        # The plan is compiled once per set of attached slaves
+        plan = master.root.get_plan([slave.root])
+        copied = master.copy()
+        self.assertEqual(expected, etree.tostring(copied.make_tree(obj)))
+        self.assertIs(plan, master.root.get_plan([slave.root]))
+        self.assertIsNot(plan, master.root.get_plan([]))
+
+    def test_render_plan_recompiled_after_change(self):
+        obj = {'test': {'name': 'foobar', 'values': [1],
+                        'image': {'name': 'image_foobar', 'id': 42},
+                        'extra': 'text'}}
+        master, slave = self._plan_templates()
+        master.attach(slave)
+        plan = master.root.get_plan([slave.root])
+        self.assertIsNone(master.make_tree(obj).find('extra'))
+
+        extra = xmlutil.SubTemplateElement(slave.root, 'extra',
+                                           selector='extra')
+        extra.text = xmlutil.Selector()
+        self.assertIsNot(plan, master.root.get_plan([slave.root]))
+        self.assertEqual('text', master.make_tree(obj).find('extra').text)
+
 
 class MasterTemplateBuilder(xmlutil.TemplateBuilder):
     def construct(self):
@@ -20,9 +20,9 @@ import mox
 
 from cinder.brick import exception
 from cinder.brick.initiator import connector
+from cinder.brick.initiator import device_watcher
 from cinder.brick.initiator import host_driver
 from cinder.openstack.common import log as logging
-from cinder.openstack.common import loopingcall
 from cinder.openstack.common import processutils as putils
 from cinder import test
 
@@ -35,6 +35,8 @@ class ConnectorTestCase(test.TestCase):
         super(ConnectorTestCase, self).setUp()
         self.cmds = []
         self.stubs.Set(os.path, 'exists', lambda x: True)
+        self.stubs.Set(device_watcher.DeviceWatcher, 'wait',
+                       lambda watcher, timeout: False)
 
     def fake_execute(self, *cmd, **kwargs):
         self.cmds.append(string.join(cmd))
@@ -229,6 +231,57 @@ class ISCSIConnectorTestCase(ConnectorTestCase):
                            'type': 'block'}
         self.assertEqual(expected_result, result)
 
+    def test_connect_volume_with_multipath_batches_logins(self):
+        iqn = 'iqn.2010-10.org.openstack:volume-00000001'
+        portals = ['10.0.2.15:3260', '10.0.3.15:3260', '10.0.4.15:3260']
+        discovery = '\n'.join(['%s,1 %s' % (portal, iqn)
+                               for portal in portals])
+        # The first portal is already logged in
+        sessions = 'tcp: [1] %s,1 %s\n' % (portals[0], iqn)
+
+        def fake_execute(*cmd, **kwargs):
+            self.cmds.append(' '.join(cmd))
+            if 'discovery' in cmd:
+                return discovery, None
+            if cmd[1:] == ('-m', 'session'):
+                return sessions, None
+            return '', None
+
+        multipath = connector.ISCSIConnector(None, execute=fake_execute,
+                                             use_multipath=True)
+        self.stubs.Set(multipath, '_get_multipath_device_name',
+                       lambda x: '/dev/mapper/fake')
+        vol = {'id': 1, 'name': 'volume-00000001'}
+        connection_info = self.iscsi_connection(vol, portals[0], iqn)
+
+        result = multipath.connect_volume(connection_info['data'])
+
+        self.assertEqual('/dev/mapper/fake', result['path'])
+        self.assertEqual(1, self.cmds.count('iscsiadm -m session'))
+        logins = [cmd for cmd in self.cmds if cmd.endswith('--login')]
+        self.assertEqual(2, len(logins))
+        self.assertFalse([cmd for cmd in logins if portals[0] in cmd])
+        # Only the portals logged into here start up automatically.
+        startup = [cmd for cmd in self.cmds if 'node.startup' in cmd]
+        self.assertEqual(['iscsiadm -m node -T %s -p %s --op update '
+                          '-n node.startup -v automatic' % (iqn, portal)
+                          for portal in portals[1:]], sorted(startup))
+        self.assertEqual(set(['discovery', 'login', 'rescan', 'device_wait',
+                              'multipath']),
+                         set(multipath.connect_timings))
+
+    def test_connect_volume_records_timings(self):
+        location = '10.0.2.15:3260'
+        iqn = 'iqn.2010-10.org.openstack:volume-00000001'
+        vol = {'id': 1, 'name': 'volume-00000001'}
+        connection_info = self.iscsi_connection(vol, location, iqn)
+        self.connector.connect_volume(connection_info['data'])
+        self.assertEqual(set(['login', 'device_wait']),
+                         set(self.connector.connect_timings))
+        self.assertIn('iscsiadm -m node -T %s -p %s --op update '
+                      '-n node.startup -v automatic' % (iqn, location),
+                      self.cmds)
+
     def test_connect_volume_with_not_found_device(self):
         self.stubs.Set(os.path, 'exists', lambda x: False)
         self.stubs.Set(time, 'sleep', lambda x: None)
@@ -241,6 +294,42 @@ class ISCSIConnectorTestCase(ConnectorTestCase):
                           self.connector.connect_volume,
                           connection_info['data'])
 
+    def _connect_with_device_after_waits(self, waits):
+        state = {'waits': 0}
+
+        def fake_wait(watcher, timeout):
+            state['waits'] += 1
+            return True
+
+        self.stubs.Set(os.path, 'exists',
+                       lambda x: state['waits'] >= waits)
+        self.stubs.Set(device_watcher.DeviceWatcher, 'wait', fake_wait)
+        location = '10.0.2.15:3260'
+        iqn = 'iqn.2010-10.org.openstack:volume-00000001'
+        vol = {'id': 1, 'name': 'volume-00000001'}
+        connection_info = self.iscsi_connection(vol, location, iqn)
+        self.connector.connect_volume(connection_info['data'])
+        return [cmd for cmd in self.cmds if cmd.endswith('--rescan')]
+
+    def test_connect_volume_device_shows_up_while_waiting(self):
+        # The device is created during the first wait after the rescan,
+        # so it is picked up without waiting for the backoff to expire.
+        rescans = self._connect_with_device_after_waits(1)
+        self.assertEqual(1, len(rescans))
+
+    def test_connect_volume_with_scan_timeout(self):
+        self.stubs.Set(os.path, 'exists', lambda x: False)
+        self.connector.device_scan_timeout = 0
+        location = '10.0.2.15:3260'
+        iqn = 'iqn.2010-10.org.openstack:volume-00000001'
+        vol = {'id': 1, 'name': 'volume-00000001'}
+        connection_info = self.iscsi_connection(vol, location, iqn)
+        self.assertRaises(exception.VolumeDeviceNotFound,
+                          self.connector.connect_volume,
+                          connection_info['data'])
+        self.assertFalse([cmd for cmd in self.cmds
+                          if cmd.endswith('--rescan')])
+
     def test_get_target_portals_from_iscsiadm_output(self):
         connector = self.connector
         test_output = '''10.15.84.19:3260 iqn.1992-08.com.netapp:sn.33615311
@@ -443,30 +532,6 @@ class FibreChannelConnectorTestCase(ConnectorTestCase):
                           connection_info['data'])
 
 
-class FakeFixedIntervalLoopingCall(object):
-    def __init__(self, f=None, *args, **kw):
-        self.args = args
-        self.kw = kw
-        self.f = f
-        self._stop = False
-
-    def stop(self):
-        self._stop = True
-
-    def wait(self):
-        return self
-
-    def start(self, interval, initial_delay=None):
-        while not self._stop:
-            try:
-                self.f(*self.args, **self.kw)
-            except loopingcall.LoopingCallDone:
-                return self
-            except Exception:
-                LOG.exception(_('in fixed duration looping call'))
-                raise
-
-
 class AoEConnectorTestCase(ConnectorTestCase):
     """Test cases for AoE initiator class."""
     def setUp(self):
@@ -475,9 +540,6 @@ class AoEConnectorTestCase(ConnectorTestCase):
         self.connector = connector.AoEConnector('sudo')
         self.connection_properties = {'target_shelf': 'fake_shelf',
                                       'target_lun': 'fake_lun'}
-        self.stubs.Set(loopingcall,
-                       'FixedIntervalLoopingCall',
-                       FakeFixedIntervalLoopingCall)
 
     def tearDown(self):
         self.mox.VerifyAll()
@@ -0,0 +1,73 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import tempfile
+import time
+
+import eventlet
+
+from cinder.brick.initiator import device_watcher
+from cinder import test
+
+
+class DeviceWatcherTestCase(test.TestCase):
+
+    def setUp(self):
+        super(DeviceWatcherTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+    def _create_link_later(self, name, delay):
+        def _create():
+            eventlet.sleep(delay)
+            os.symlink('/dev/null', os.path.join(self.tmpdir, name))
+        return eventlet.spawn(_create)
+
+    @test.testtools.skipUnless(device_watcher._get_libc(),
+                               'inotify is not available')
+    def test_wait_wakes_up_on_create(self):
+        with device_watcher.DeviceWatcher([self.tmpdir]) as watcher:
+            self.assertFalse(watcher._polling)
+            creator = self._create_link_later('ip-lun-1', 0.1)
+            start = time.time()
+            self.assertTrue(watcher.wait(10))
+            self.assertTrue(time.time() - start < 5)
+            creator.wait()
+
+    def test_wait_times_out(self):
+        with device_watcher.DeviceWatcher([self.tmpdir]) as watcher:
+            self.assertFalse(watcher.wait(0.05))
+            self.assertFalse(watcher.wait(0))
+
+    def test_polls_for_missing_directory(self):
+        missing = os.path.join(self.tmpdir, 'by-path')
+        with device_watcher.DeviceWatcher([missing],
+                                          poll_interval=0.01) as watcher:
+            self.assertTrue(watcher._polling)
+            # Polling reports a possible change after every interval
+            # until the timeout is used up.
+            self.assertTrue(watcher.wait(1))
+            self.assertFalse(watcher.wait(0.005))
+
+    def test_polls_without_inotify(self):
+        self.stubs.Set(device_watcher, '_libc', False)
+        self.stubs.Set(time, 'sleep', lambda seconds: None)
+        with device_watcher.DeviceWatcher([self.tmpdir],
+                                          poll_interval=0.5) as watcher:
+            self.assertIsNone(watcher._fd)
+            self.assertTrue(watcher.wait(2))
+            self.assertFalse(watcher.wait(0.5))
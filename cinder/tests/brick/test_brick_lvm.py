@@ -265,3 +265,83 @@ class BrickLvmTestCase(test.TestCase):
 
     def test_get_mirrored_available_capacity(self):
         self.assertEqual(self.vg.vg_mirror_free_space(1), 2.0)
+
+
+class BrickLvmCacheTestCase(test.TestCase):
+    def setUp(self):
+        super(BrickLvmCacheTestCase, self).setUp()
+        self.calls = []
+        self.stubs.Set(processutils, 'execute', self.fake_execute)
+        self.vg = brick.LVM('fake-vg', 'sudo', False, None, 'default',
+                            self.fake_execute, cache_interval=60)
+
+    def fake_execute(self, *cmd, **kwargs):
+        self.calls.append(cmd)
+        cmd_string = ', '.join(cmd)
+        data = "\n"
+        if 'vgs, --noheadings, -o, name, fake-vg' in cmd_string:
+            data = "  fake-vg\n"
+        elif 'vgs, --noheadings, --unit=g' in cmd_string:
+            data = "  fake-vg:10.00:8.00:2:"\
+                   "kVxztV-dKpG-Rz7E-xtKY-jeju-QsYU-SLG6Z1\n"
+        elif 'lvs, --noheadings, --unit=g, -o, vg_name,name,size' in \
+                cmd_string:
+            data = "  fake-vg fake-1 1.00\n"
+            data += "  fake-vg fake-2 1.00\n"
+        return (data, "")
+
+    def _count(self, command):
+        return len([c for c in self.calls if command in c])
+
+    def test_get_volume_cached(self):
+        self.assertEqual('fake-1', self.vg.get_volume('fake-1')['name'])
+        self.assertEqual('fake-2', self.vg.get_volume('fake-2')['name'])
+        self.assertIsNone(self.vg.get_volume('fake-3'))
+        self.assertEqual(1, self._count('lvs'))
+        self.assertEqual(2, self.vg.cache_stats['lvs_calls_saved'])
+
+    def test_cache_expires(self):
+        self.vg.get_volume('fake-1')
+        self.vg._lv_cache_time -= 61
+        self.vg.get_volume('fake-1')
+        self.assertEqual(2, self._count('lvs'))
+
+    def test_cache_disabled(self):
+        self.vg._cache_interval = 0
+        self.vg.get_volume('fake-1')
+        self.vg.get_volume('fake-1')
+        self.assertEqual(2, self._count('lvs'))
+
+    def test_local_updates(self):
+        self.vg.update_volume_group_info()
+        self.vg.get_volumes()
+
+        self.vg.create_volume('fake-3', '2g')
+        self.assertEqual('2.00', self.vg.get_volume('fake-3')['size'])
+        self.vg.extend_volume('fake-3', '3g')
+        self.assertEqual('3.00', self.vg.get_volume('fake-3')['size'])
+        self.vg.rename_volume('fake-3', 'fake-4')
+        self.assertIsNone(self.vg.get_volume('fake-3'))
+        self.vg.delete('fake-1')
+        self.assertIsNone(self.vg.get_volume('fake-1'))
+
+        self.vg.update_volume_group_info()
+        self.assertEqual(6.0, self.vg.vg_free_space)
+        self.assertEqual(2, self.vg.vg_lv_count)
+        self.assertEqual('fake-4', self.vg.get_volume('fake-4')['name'])
+        self.assertEqual(1, self._count('lvs'))
+        self.assertEqual(1, self.vg.cache_stats['vgs_calls'])
+        self.assertEqual(1, self.vg.cache_stats['vgs_calls_saved'])
+
+    def test_error_invalidates_cache(self):
+        self.vg.get_volumes()
+
+        def failing_execute(*cmd, **kwargs):
+            raise processutils.ProcessExecutionError()
+
+        self.vg.set_execute(failing_execute)
+        self.assertRaises(processutils.ProcessExecutionError,
+                          self.vg.rename_volume, 'fake-1', 'fake-3')
+        self.vg.set_execute(self.fake_execute)
+        self.vg.get_volume('fake-1')
+        self.assertEqual(2, self._count('lvs'))
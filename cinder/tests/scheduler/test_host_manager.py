@@ -16,6 +16,8 @@
 Tests For HostManager
 """
 
+import datetime
+
 import mock
 
 from oslo.config import cfg
@@ -117,6 +119,88 @@ class HostManagerTestCase(test.TestCase):
                     'host3': host3_volume_capabs}
         self.assertDictMatch(service_states, expected)
 
+    @mock.patch('cinder.volume.rpcapi.VolumeAPI.'
+                'publish_service_capabilities')
+    @mock.patch('cinder.openstack.common.timeutils.utcnow')
+    def test_update_service_capabilities_keepalive(self, _mock_utcnow,
+                                                   _mock_publish):
+        now = datetime.datetime(2014, 1, 1, 12, 0, 0)
+        later = now + datetime.timedelta(seconds=60)
+        _mock_utcnow.return_value = now
+        service_states = self.host_manager.service_states
+        capabs = dict(free_capacity_gb=4321)
+
+        # Nothing known about host1 yet, a full report is requested.
+        self.host_manager.update_service_capabilities('volume', 'host1',
+                                                      None, generation=1)
+        self.assertEqual(1, _mock_publish.call_count)
+        self.assertEqual('host1', _mock_publish.call_args[1]['host'])
+        self.assertDictMatch(service_states, {})
+
+        self.host_manager.update_service_capabilities('volume', 'host1',
+                                                      capabs, generation=1)
+        self.assertDictMatch(service_states,
+                             {'host1': dict(capabs, timestamp=now)})
+
+        # Same generation only refreshes the timestamp.
+        _mock_utcnow.return_value = later
+        self.host_manager.update_service_capabilities('volume', 'host1',
+                                                      None, generation=1)
+        self.assertDictMatch(service_states,
+                             {'host1': dict(capabs, timestamp=later)})
+        self.assertEqual(1, _mock_publish.call_count)
+
+        # A generation that was never received is requested again.
+        self.host_manager.update_service_capabilities('volume', 'host1',
+                                                      None, generation=2)
+        self.assertEqual(2, _mock_publish.call_count)
+        self.assertDictMatch(service_states,
+                             {'host1': dict(capabs, timestamp=later)})
+
+    @mock.patch('cinder.volume.rpcapi.VolumeAPI.publish_service_capabilities')
+    def test_update_service_capabilities_keepalive_restarted(self,
+                                                             _mock_publish):
+        capabs = dict(free_capacity_gb=4321)
+        self.host_manager.update_service_capabilities('volume', 'host1',
+                                                      capabs,
+                                                      generation=['a', 1])
+        self.host_manager.update_service_capabilities('volume', 'host1',
+                                                      None,
+                                                      generation=['a', 1])
+        self.assertFalse(_mock_publish.called)
+
+        # The service restarted and counts from 1 again.
+        self.host_manager.update_service_capabilities('volume', 'host1',
+                                                      None,
+                                                      generation=['b', 1])
+        self.assertEqual(1, _mock_publish.call_count)
+
+    @mock.patch('cinder.db.service_get_all_by_topic')
+    @mock.patch('cinder.utils.service_is_up')
+    def test_get_all_host_states_expired_capabilities(
+            self, _mock_service_is_up, _mock_service_get_all_by_topic):
+        self.flags(scheduler_capabilities_max_age=600)
+        _mock_service_is_up.return_value = True
+        _mock_service_get_all_by_topic.return_value = [
+            dict(id=1, host='host1', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+            dict(id=2, host='host2', topic='volume', disabled=False,
+                 availability_zone='zone1', updated_at=timeutils.utcnow()),
+        ]
+        capabs = dict(total_capacity_gb=1024, free_capacity_gb=512,
+                      reserved_percentage=0)
+        self.host_manager.update_service_capabilities('volume', 'host1',
+                                                      capabs, generation=1)
+        self.host_manager.update_service_capabilities('volume', 'host2',
+                                                      capabs, generation=1)
+        self.host_manager.service_states['host2']['timestamp'] = (
+            timeutils.utcnow() - datetime.timedelta(seconds=601))
+
+        self.host_manager.get_all_host_states('fake_context')
+        self.assertEqual(['host1'], self.host_manager.host_state_map.keys())
+        self.assertEqual(['host1'], self.host_manager.service_states.keys())
+        self.assertNotIn('host2', self.host_manager.service_generations)
+
     @mock.patch('cinder.db.service_get_all_by_topic')
     @mock.patch('cinder.utils.service_is_up')
     def test_get_all_host_states(self, _mock_service_is_up,
@@ -84,6 +84,16 @@ class SchedulerRpcAPITestCase(test.TestCase):
                                  capabilities='fake_capabilities',
                                  fanout=True)
 
+    def test_update_service_capabilities_generation(self):
+        self._test_scheduler_api('update_service_capabilities',
+                                 rpc_method='cast',
+                                 service_name='fake_name',
+                                 host='fake_host',
+                                 capabilities=None,
+                                 generation=3,
+                                 fanout=True,
+                                 version='1.6')
+
     def test_create_volume(self):
         self._test_scheduler_api('create_volume',
                                  rpc_method='cast',
@@ -66,7 +66,22 @@ class SchedulerManagerTestCase(test.TestCase):
         self.manager.update_service_capabilities(self.context,
                                                  service_name=service,
                                                  host=host)
-        _mock_update_cap.assert_called_once_with(service, host, {})
+        _mock_update_cap.assert_called_once_with(service, host, {},
+                                                 generation=None)
+
+    @mock.patch('cinder.scheduler.driver.Scheduler.'
+                'update_service_capabilities')
+    def test_update_service_capabilities_keepalive(self, _mock_update_cap):
+        # Test a keep-alive is not turned into empty capabilities
+        service = 'fake_service'
+        host = 'fake_host'
+
+        self.manager.update_service_capabilities(self.context,
+                                                 service_name=service,
+                                                 host=host,
+                                                 generation=3)
+        _mock_update_cap.assert_called_once_with(service, host, None,
+                                                 generation=3)
 
     @mock.patch('cinder.scheduler.driver.Scheduler.'
                 'update_service_capabilities')
@@ -80,7 +95,8 @@ class SchedulerManagerTestCase(test.TestCase):
                                                  service_name=service,
                                                  host=host,
                                                  capabilities=capabilities)
-        _mock_update_cap.assert_called_once_with(service, host, capabilities)
+        _mock_update_cap.assert_called_once_with(service, host, capabilities,
+                                                 generation=None)
 
     @mock.patch('cinder.scheduler.driver.Scheduler.schedule_create_volume')
     @mock.patch('cinder.db.volume_update')
@@ -179,7 +179,8 @@ class TestBlockDeviceDriver(cinder.test.TestCase):
         self.mox.StubOutWithMock(context, 'get_admin_context')
         context.get_admin_context()
         api.volume_get_all_by_host(None,
-                                   self.configuration.host) \
+                                   self.configuration.host,
+                                   use_slave=False) \
             .AndReturn([TEST_VOLUME1, TEST_VOLUME2])
         self.mox.StubOutWithMock(self.drv, 'local_path')
         path1 = self.drv.local_path(TEST_VOLUME1).AndReturn('/dev/loop1')
@@ -245,6 +245,7 @@ class CoraidDriverTestCase(test.TestCase):
         configuration.coraid_repository_key = fake_coraid_repository_key
         configuration.use_multipath_for_image_xfer = False
         configuration.num_volume_device_scan_tries = 3
+        configuration.volume_device_scan_timeout = None
         configuration.volume_dd_blocksize = '1M'
         self.fake_rpc = FakeRpc()
 
@@ -788,6 +789,7 @@ class CoraidDriverImageTestCases(CoraidDriverTestCase):
 
         utils.brick_get_connector('aoe',
                                   device_scan_attempts=3,
+                                  device_scan_timeout=None,
                                   use_multipath=False,
                                   conn=mox.IgnoreArg()).\
             AndReturn(aoe_initiator)
@@ -16,9 +16,13 @@
 
 import time
 
+import mock
+
 from cinder import context
+from cinder import exception
 from cinder import test
 from cinder.volume.flows.api import create_volume
+from cinder.volume.flows.manager import create_volume as create_volume_manager
 
 
 class fake_scheduler_rpc_api(object):
@@ -50,6 +54,14 @@ class fake_volume_api(object):
         self.test_inst.assertEqual(image_id, request_spec['image_id'])
 
 
+class fake_reschedule_rpc_api(object):
+    def __init__(self):
+        self.contexts = []
+
+    def create_volume(self, ctxt, topic, volume_id, **kwargs):
+        self.contexts.append(ctxt)
+
+
 class fake_db(object):
 
     def volume_get(self, *args, **kwargs):
@@ -105,6 +117,30 @@ class CreateVolumeFlowTestCase(test.TestCase):
 
         task._cast_create_volume(self.ctxt, spec, props)
 
+    @mock.patch('cinder.volume.utils.notify_about_volume_usage')
+    def test_prebuilt_manager_flow_reschedules_with_request_context(
+            self, _notify):
+        db = mock.Mock()
+        db.volume_get.return_value = {'id': 'vol1', 'name': 'volume-vol1',
+                                      'size': 1, 'status': 'creating'}
+        driver = mock.Mock(initialized=True)
+        driver.create_volume.side_effect = exception.CinderException()
+        scheduler_rpcapi = fake_reschedule_rpc_api()
+        prebuilt = create_volume_manager.get_prebuilt_flow(
+            db, driver, scheduler_rpcapi, 'host1', True)
+
+        reschedule_contexts = []
+        for _i in range(2):
+            reschedule_context = self.ctxt.deepcopy()
+            reschedule_contexts.append(reschedule_context)
+            store = create_volume_manager.get_store(
+                self.ctxt, 'vol1', reschedule_context, {'volume_id': 'vol1'},
+                {})
+            engine = prebuilt.load(store)
+            self.assertRaises(exception.CinderException, engine.run)
+
+        self.assertEqual(reschedule_contexts, scheduler_rpcapi.contexts)
+
     def tearDown(self):
         self.stubs.UnsetAll()
         super(CreateVolumeFlowTestCase, self).tearDown()
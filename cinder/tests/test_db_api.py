@@ -15,11 +15,17 @@
 
 
 import datetime
+import os
+import shutil
+import tempfile
 
 from oslo.config import cfg
+import sqlalchemy
 
 from cinder import context
 from cinder import db
+from cinder.db.sqlalchemy import api as sqlalchemy_api
+from cinder.db.sqlalchemy import models
 from cinder import exception
 from cinder.openstack.common import uuidutils
 from cinder.quota import ReservableResource
@@ -150,6 +156,22 @@ class DBAPIServiceTestCase(BaseTest):
         self.assertRaises(exception.ServiceNotFound,
                           db.service_update, self.ctxt, 100500, {})
 
+    def test_service_heartbeat(self):
+        service = self._create_service({'availability_zone': 'zone1'})
+        db.service_heartbeat(self.ctxt, service['id'], 'zone2')
+        db.service_heartbeat(self.ctxt, service['id'], 'zone2')
+        updated_service = db.service_get(self.ctxt, service['id'])
+        self.assertEqual(5, updated_service['report_count'])
+        self.assertEqual('zone2', updated_service['availability_zone'])
+        self.assertIsNotNone(updated_service['updated_at'])
+
+    def test_service_heartbeat_not_found_exception(self):
+        service = self._create_service({})
+        db.service_destroy(self.ctxt, service['id'])
+        self.assertRaises(exception.ServiceNotFound,
+                          db.service_heartbeat, self.ctxt, service['id'],
+                          'nova')
+
     def test_service_get(self):
         service1 = self._create_service({})
         real_service1 = db.service_get(self.ctxt, service1['id'])
@@ -1260,3 +1282,81 @@ class DBAPIBackupTestCase(BaseTest):
     def test_backup_not_found(self):
         self.assertRaises(exception.BackupNotFound, db.backup_get, self.ctxt,
                           'notinbase')
+
+
+class DBAPISlaveConnectionTestCase(BaseTest):
+
+    """Tests for routing read-only calls to the replica."""
+
+    def setUp(self):
+        super(DBAPISlaveConnectionTestCase, self).setUp()
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        url = 'sqlite:///%s' % os.path.join(tmpdir, 'slave.sqlite')
+        self.slave_engine = sqlalchemy.create_engine(url)
+        models.BASE.metadata.create_all(self.slave_engine)
+        self.addCleanup(self.slave_engine.dispose)
+        self.addCleanup(sqlalchemy_api.cleanup_slave)
+        self._set_slave_connection(url)
+
+        # Only on the primary, as if replication had not caught up yet.
+        self.volume = db.volume_create(self.ctxt, {'host': 'h1'})
+
+    def _set_slave_connection(self, url):
+        CONF.set_override('slave_connection', url, group='database')
+        self.addCleanup(CONF.clear_override, 'slave_connection',
+                        group='database')
+
+    def _insert_on_slave(self, volume_id):
+        self.slave_engine.execute(models.Volume.__table__.insert(),
+                                  id=volume_id, host='h1', deleted=False)
+
+    def test_read_only_safe_calls_use_slave(self):
+        self.assertEqual([], db.volume_get_all_by_host(self.ctxt, 'h1'))
+
+        replicated = uuidutils.generate_uuid()
+        self._insert_on_slave(replicated)
+        self.assertEqual([replicated],
+                         [volume['id'] for volume in
+                          db.volume_get_all_by_host(self.ctxt, 'h1')])
+
+    def test_use_slave_false_reads_primary(self):
+        self.assertEqual([self.volume['id']],
+                         [volume['id'] for volume in
+                          db.volume_get_all_by_host(self.ctxt, 'h1',
+                                                    use_slave=False)])
+
+    def test_other_calls_use_primary(self):
+        self.assertEqual(self.volume['id'],
+                         db.volume_get(self.ctxt, self.volume['id'])['id'])
+        # The routing does not leak out of read-only calls.
+        db.volume_get_all_by_host(self.ctxt, 'h1')
+        db.volume_update(self.ctxt, self.volume['id'], {'host': 'h2'})
+        self.assertEqual('h2',
+                         db.volume_get(self.ctxt, self.volume['id'])['host'])
+
+    def test_without_slave_connection(self):
+        self._set_slave_connection(None)
+        self.assertEqual([self.volume['id']],
+                         [volume['id'] for volume in
+                          db.volume_get_all_by_host(self.ctxt, 'h1')])
+
+    def test_slave_session_options(self):
+        session = sqlalchemy_api.get_session(use_slave=True,
+                                             autocommit=False,
+                                             expire_on_commit=True)
+        self.assertFalse(session.autocommit)
+        self.assertTrue(session.expire_on_commit)
+        self.assertEqual(self.slave_engine.url, session.bind.url)
+        session = sqlalchemy_api.get_session(use_slave=True)
+        self.assertTrue(session.autocommit)
+        self.assertFalse(session.expire_on_commit)
+
+    def test_pool_stats(self):
+        db.volume_get_all_by_host(self.ctxt, 'h1')
+        db.volume_get_all_by_host(self.ctxt, 'h1', use_slave=False)
+        stats = db.get_pool_stats()
+        self.assertEqual(['primary', 'slave'], sorted(stats.keys()))
+        for engine_stats in stats.values():
+            self.assertTrue(engine_stats['checkouts'] >= 1)
+            self.assertEqual(0, engine_stats['checked_out'])
@@ -26,6 +26,7 @@ from cinder import exception
 from cinder.openstack.common import log as logging
 from cinder import test
 from cinder import units
+from cinder.volume.drivers.emc import emc_smis_common
 from cinder.volume.drivers.emc.emc_smis_common import EMCSMISCommon
 from cinder.volume.drivers.emc.emc_smis_fc import EMCSMISFCDriver
 from cinder.volume.drivers.emc.emc_smis_iscsi import EMCSMISISCSIDriver
@@ -1088,6 +1089,54 @@ class EMCSMISISCSIDriverTestCase(test.TestCase):
                           self.data.failed_extend_vol,
                           '10')
 
+    def test_config_file_parsed_once(self):
+        common = self.driver.common
+        with mock.patch.object(emc_smis_common, 'parseString',
+                               wraps=emc_smis_common.parseString) as parse:
+            self.assertEqual('0', common._get_timeout())
+            self.assertIsNone(common._get_masking_view())
+            self.assertFalse(parse.called)
+
+            mtime = os.path.getmtime(self.config_file_path) + 10
+            os.utime(self.config_file_path, (mtime, mtime))
+            common._get_timeout()
+            common._get_masking_view()
+            self.assertEqual(1, parse.call_count)
+
+    def test_services_and_pools_enumerated_once(self):
+        # Every operation reconnects, so hand out the same connection to
+        # count the enumerations across operations.
+        conn = FakeEcomConnection()
+        self.stubs.Set(EMCSMISCommon, '_get_ecom_connection',
+                       lambda *args: conn)
+        with mock.patch.object(conn, 'EnumerateInstanceNames',
+                               wraps=conn.EnumerateInstanceNames) as enum:
+            self.driver.create_volume(self.data.test_volume)
+            self.assertEqual(
+                [mock.call('EMC_VirtualProvisioningPool'),
+                 mock.call('EMC_UnifiedStoragePool'),
+                 mock.call('EMC_StorageConfigurationService')],
+                enum.call_args_list)
+
+            self.driver.create_volume(self.data.test_volume)
+            self.assertEqual(3, enum.call_count)
+
+    def test_wait_for_job_complete_backoff(self):
+        sleeps = []
+        self.stubs.Set(time, 'sleep', sleeps.append)
+        states = [2L, 4L, 4L, 4L, 4L, 4L, 4L, 7L]
+        job = {'JobState': None, 'ErrorCode': 0, 'ErrorDescription': ''}
+
+        def fake_get_instance(name, LocalOnly=False):
+            job['JobState'] = states.pop(0)
+            return job
+
+        common = self.driver.common
+        self.stubs.Set(common.conn, 'GetInstance', fake_get_instance)
+        self.assertEqual((0, ''),
+                         common._wait_for_job_complete({'Job': 'job'}))
+        self.assertEqual([0.5, 1, 2, 4, 8, 10, 10], sleeps)
+
     def _cleanup(self):
         bExists = os.path.exists(self.config_file_path)
         if bExists:
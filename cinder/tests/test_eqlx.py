@@ -208,9 +208,13 @@ class DellEQLSanISCSIDriverTestCase(test.TestCase):
     def test_do_setup(self):
         self.driver._eql_execute = self.mox.\
             CreateMock(self.driver._eql_execute)
+        self.driver._eql_execute_batch = self.mox.\
+            CreateMock(self.driver._eql_execute_batch)
         fake_group_ip = '10.1.2.3'
-        for feature in ('confirmation', 'paging', 'events', 'formatoutput'):
-            self.driver._eql_execute('cli-settings', feature, 'off')
+        self.driver._eql_execute_batch(
+            *[('cli-settings', feature, 'off')
+              for feature in ('confirmation', 'paging', 'events',
+                              'formatoutput')])
         self.driver._eql_execute('grpparams', 'show').\
             AndReturn(['Group-Ipaddress: %s' % fake_group_ip])
         self.mox.ReplayAll()
@@ -305,6 +309,28 @@ class DellEQLSanISCSIDriverTestCase(test.TestCase):
         self.assertRaises(processutils.ProcessExecutionError,
                           self.driver._ssh_execute, ssh, cmd)
 
+    def test_ssh_execute_batch(self):
+        ssh = self.mox.CreateMock(paramiko.SSHClient)
+        chan = self.mox.CreateMock(paramiko.Channel)
+        transport = self.mox.CreateMock(paramiko.Transport)
+        self.mox.StubOutWithMock(self.driver, '_get_output')
+        self.mox.StubOutWithMock(chan, 'invoke_shell')
+        ssh.get_transport().AndReturn(transport)
+        transport.open_session().AndReturn(chan)
+        chan.invoke_shell()
+        self.driver._get_output(chan).AndReturn(['motd'])
+        chan.send('stty columns 255' + '\r')
+        self.driver._get_output(chan).AndReturn([])
+        chan.send('first command' + '\r')
+        self.driver._get_output(chan).AndReturn(['first'])
+        chan.send('second command' + '\r')
+        self.driver._get_output(chan).AndReturn(['second'])
+        chan.close()
+        self.mox.ReplayAll()
+        self.assertEqual([['first'], ['second']],
+                         self.driver._ssh_execute_batch(
+                             ssh, ['first command', 'second command']))
+
     def test_with_timeout(self):
         @eqlx.with_timeout
         def no_timeout(cmd, *args, **kwargs):
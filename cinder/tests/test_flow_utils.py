@@ -0,0 +1,87 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+from taskflow.patterns import linear_flow
+
+from cinder import exception
+from cinder import flow_utils
+from cinder import test
+
+
+class AddTask(flow_utils.CinderTask):
+
+    default_provides = 'total'
+
+    def execute(self, x, y):
+        return x + y
+
+
+class CheckTask(flow_utils.CinderTask):
+
+    def execute(self, total):
+        if total < 0:
+            raise exception.InvalidInput(reason='negative')
+
+
+class PrebuiltFlowTestCase(test.TestCase):
+
+    def setUp(self):
+        super(PrebuiltFlowTestCase, self).setUp()
+        self.stubs.Set(flow_utils, '_TASK_STATS', {})
+        self.built = 0
+        self.prebuilt = flow_utils.PrebuiltFlow(self._build_flow, 'test')
+
+    def _build_flow(self, name):
+        self.built += 1
+        flow = linear_flow.Flow(name)
+        flow.add(AddTask(), CheckTask())
+        return flow
+
+    def _run(self, x, y):
+        engine = self.prebuilt.load({'x': x, 'y': y})
+        engine.run()
+        return engine.storage.fetch('total')
+
+    def test_load_reuses_flow(self):
+        self.assertEqual(0, self.built)
+        self.assertEqual(3, self._run(1, 2))
+        self.assertEqual(7, self._run(3, 4))
+        self.assertEqual(1, self.built)
+
+    def test_overlapping_requests_get_own_flow(self):
+        engine1 = self.prebuilt.load({'x': 1, 'y': 2})
+        engine2 = self.prebuilt.load({'x': 3, 'y': 4})
+        self.assertEqual(2, self.built)
+        engine2.run()
+        engine1.run()
+        self.assertEqual(3, engine1.storage.fetch('total'))
+        self.assertEqual(7, engine2.storage.fetch('total'))
+
+        self._run(5, 6)
+        self.assertEqual(2, self.built)
+
+    def test_flow_released_after_failure(self):
+        self.assertRaises(exception.InvalidInput, self._run, 1, -2)
+        self.assertEqual(3, self._run(1, 2))
+        self.assertEqual(1, self.built)
+
+    def test_task_stats(self):
+        self._run(1, 2)
+        self.assertRaises(exception.InvalidInput, self._run, 1, -2)
+        stats = flow_utils.get_task_stats()
+        self.assertEqual(['AddTask', 'CheckTask'], sorted(stats))
+        self.assertEqual(2, stats['AddTask']['count'])
+        self.assertEqual(2, stats['CheckTask']['count'])
+        self.assertTrue(stats['AddTask']['max'] >= 0)
@@ -18,6 +18,7 @@ import contextlib
 import errno
 import mock
 import os
+import shutil
 import tempfile
 
 import mox as mox_lib
@@ -1855,3 +1856,54 @@ class GlusterFsDriverTestCase(test.TestCase):
         self.assertRaises(exception.InvalidVolume,
                           drv.backup_volume,
                           ctxt, backup, IgnoreArg())
+
+    def test_qemu_img_info_cached(self):
+        drv = self._driver
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        volume = {'name': 'volume-%s' % self.VOLUME_UUID}
+        path = os.path.join(tmp_dir, volume['name'])
+        with open(path, 'w') as f:
+            f.write('data')
+
+        info = imageutils.QemuImgInfo()
+        info.image = path
+        info.backing_file = '/some/dir/base'
+        with mock.patch.object(image_utils, 'qemu_img_info',
+                               return_value=info) as mock_info:
+            first = drv._qemu_img_info(path)
+            second = drv._qemu_img_info(path)
+            self.assertEqual(1, mock_info.call_count)
+            self.assertEqual(volume['name'], second.image)
+            self.assertEqual('base', second.backing_file)
+            self.assertIsNot(first, second)
+
+            # A file which changed is read again.
+            with open(path, 'a') as f:
+                f.write('more data')
+            drv._qemu_img_info(path)
+            self.assertEqual(2, mock_info.call_count)
+
+            drv._invalidate_image_info(volume)
+            drv._qemu_img_info(path)
+            self.assertEqual(3, mock_info.call_count)
+
+    def test_read_info_file_cached(self):
+        drv = self._driver
+        tmp_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmp_dir)
+        info_path = os.path.join(tmp_dir, 'volume-%s.info' % self.VOLUME_UUID)
+        drv._write_info_file(info_path, {'active': 'volume-1'})
+
+        with mock.patch.object(drv, '_read_file',
+                               wraps=drv._read_file) as mock_read:
+            snap_info = drv._read_info_file(info_path)
+            snap_info['active'] = 'changed'
+            self.assertEqual({'active': 'volume-1'},
+                             drv._read_info_file(info_path))
+            self.assertEqual(1, mock_read.call_count)
+
+            drv._write_info_file(info_path, {'active': 'volume-1.snap'})
+            self.assertEqual({'active': 'volume-1.snap'},
+                             drv._read_info_file(info_path))
+            self.assertEqual(2, mock_read.call_count)
@@ -14,15 +14,17 @@
 
 """Unit tests for OpenStack Cinder HP MSA driver."""
 
+import socket
+
 import lxml.etree as etree
 import mock
-import urllib2
 
 from cinder import exception
 from cinder import test
 from cinder.volume.drivers.san.hp import hp_msa_client as msa
 from cinder.volume.drivers.san.hp import hp_msa_common
 from cinder.volume.drivers.san.hp import hp_msa_fc
+from cinder.volume import http_pool
 
 
 session_key = 'JSESS0004eb8a82b08fd5'
@@ -113,46 +115,75 @@ class TestHPMSAClient(test.TestCase):
         self.ip = '10.0.0.1'
         self.client = msa.HPMSAClient(self.ip, self.login, self.passwd)
 
-    @mock.patch('urllib2.urlopen')
-    def test_login(self, mock_url_open):
-        m = mock.Mock()
-        m.read.side_effect = [resp_login]
-        mock_url_open.return_value = m
+    @mock.patch.object(http_pool.HTTPConnectionPool, 'request')
+    def test_login(self, mock_request):
+        response = mock.Mock(status=200)
+        mock_request.return_value = (response, resp_login)
         self.client.login()
         self.assertEqual(session_key, self.client._session_key)
+        url = mock_request.call_args[0][1]
+        self.assertTrue(url.startswith('/api/login/'))
 
-        m.read.side_effect = [resp_badlogin]
+        mock_request.return_value = (response, resp_badlogin)
         self.assertRaises(msa.HPMSAAuthenticationError,
                           self.client.login)
 
+    def test_connection(self):
+        self.assertEqual(('10.0.0.1', 80, False),
+                         (self.client._pool.host, self.client._pool.port,
+                          self.client._pool.use_ssl))
+        client = msa.HPMSAClient(self.ip, self.login, self.passwd,
+                                 protocol='https')
+        self.assertEqual((443, True),
+                         (client._pool.port, client._pool.use_ssl))
+        self.assertIsNone(self.client._pool.timeout)
+        client = msa.HPMSAClient(self.ip, self.login, self.passwd, timeout=10)
+        self.assertEqual(10, client._pool.timeout)
+
     def test_build_request_url(self):
         url = self.client._build_request_url('/path', None)
-        self.assertEqual('http://10.0.0.1/api/path', url)
+        self.assertEqual('/api/path', url)
         url = self.client._build_request_url('/path', None, arg1='val1')
-        self.assertEqual('http://10.0.0.1/api/path/arg1/val1', url)
+        self.assertEqual('/api/path/arg1/val1', url)
         url = self.client._build_request_url('/path', 'arg1')
-        self.assertEqual('http://10.0.0.1/api/path/arg1', url)
+        self.assertEqual('/api/path/arg1', url)
         url = self.client._build_request_url('/path', 'arg1', arg2='val2')
-        self.assertEqual('http://10.0.0.1/api/path/arg2/val2/arg1', url)
+        self.assertEqual('/api/path/arg2/val2/arg1', url)
         url = self.client._build_request_url('/path', ['arg1', 'arg3'],
                                              arg2='val2')
-        self.assertEqual('http://10.0.0.1/api/path/arg2/val2/arg1/arg3', url)
+        self.assertEqual('/api/path/arg2/val2/arg1/arg3', url)
 
-    @mock.patch('urllib2.urlopen')
-    def test_request(self, mock_url_open):
+    @mock.patch.object(http_pool.HTTPConnectionPool, 'request')
+    def test_request(self, mock_request):
         self.client._session_key = session_key
 
-        m = mock.Mock()
-        m.read.side_effect = [response_ok, malformed_xml,
-                              urllib2.URLError("error")]
-        mock_url_open.return_value = m
+        response = mock.Mock(status=200)
+        mock_request.side_effect = [(response, response_ok),
+                                    (response, malformed_xml),
+                                    socket.error("error"),
+                                    (mock.Mock(status=500), response_ok)]
         ret = self.client._request('/path', None)
         self.assertTrue(type(ret) == etree._Element)
+        mock_request.assert_called_with(
+            'GET', '/api/path',
+            headers={'dataType': 'api', 'sessionKey': session_key},
+            resend=False)
+        self.assertRaises(msa.HPMSAConnectionError, self.client._request,
+                          '/path', None)
         self.assertRaises(msa.HPMSAConnectionError, self.client._request,
                           '/path', None)
         self.assertRaises(msa.HPMSAConnectionError, self.client._request,
                           '/path', None)
 
+    @mock.patch.object(http_pool.HTTPConnectionPool, 'request')
+    def test_request_show_resendable(self, mock_request):
+        self.client._session_key = session_key
+        mock_request.return_value = (mock.Mock(status=200), response_ok)
+        self.client._request('/show/vdisks', 'vdisk')
+        self.assertTrue(mock_request.call_args[1]['resend'])
+        self.client._request('/create/volume', 'vol', vdisk='vdisk')
+        self.assertFalse(mock_request.call_args[1]['resend'])
+
     def test_assert_response_ok(self):
         ok_tree = etree.XML(response_ok)
         not_ok_tree = etree.XML(response_not_ok)
@@ -206,6 +237,7 @@ class TestHPMSAClient(test.TestCase):
 
 class FakeConfiguration(object):
     msa_vdisk = 'OpenStack'
+    msa_api_timeout = 60
     san_ip = '10.0.0.1'
     san_login = 'manage'
     san_password = '!manage'
@@ -209,3 +209,128 @@ class ISERTgtAdmTestCase(TgtAdmTestCase):
     def setUp(self):
         super(ISERTgtAdmTestCase, self).setUp()
         self.flags(iscsi_helper='iseradm')
+
+
+class EnsureTargetsTestCase(test.TestCase):
+
+    TGT_SHOW = "\n".join([
+        'Target 1: iqn.2010-10.org.openstack:volume-1',
+        '    System information:',
+        '        Driver: iscsi',
+        '    LUN information:',
+        '        LUN: 0',
+        '            Type: controller',
+        '        LUN: 1',
+        '            Type: disk',
+        'Target 2: iqn.2010-10.org.openstack:volume-2',
+        '    System information:',
+        '        Driver: iscsi',
+        '    LUN information:',
+        '        LUN: 0',
+        '            Type: controller',
+        ''])
+
+    def setUp(self):
+        super(EnsureTargetsTestCase, self).setUp()
+        self.cmds = []
+        self.listings = []
+        self.persist_tempdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.persist_tempdir, True)
+
+    def fake_execute(self, *cmd, **kwargs):
+        self.cmds.append(string.join(cmd))
+        if cmd[:2] in (('tgt-admin', '--show'),
+                       ('cinder-rtstool', 'get-targets')):
+            return self.listings.pop(0), ''
+        return '', ''
+
+    def _targets(self, *vol_ids):
+        return [('iqn.2010-10.org.openstack:volume-%s' % vol_id,
+                 '/dev/cinder-volumes/volume-%s' % vol_id, None)
+                for vol_id in vol_ids]
+
+    def test_tgtadm_get_targets(self):
+        tgtadm = iscsi.TgtAdm('sudo', self.persist_tempdir,
+                              execute=self.fake_execute)
+        self.listings = [self.TGT_SHOW]
+        self.assertEqual({'iqn.2010-10.org.openstack:volume-1': ('1', True),
+                          'iqn.2010-10.org.openstack:volume-2': ('2', False)},
+                         tgtadm._get_targets())
+
+    def test_tgtadm_only_updates_missing_targets(self):
+        tgtadm = iscsi.TgtAdm('sudo', self.persist_tempdir,
+                              execute=self.fake_execute)
+        with_new_target = self.TGT_SHOW + "\n".join([
+            'Target 3: iqn.2010-10.org.openstack:volume-3',
+            '    LUN information:',
+            '        LUN: 0',
+            '        LUN: 1',
+            ''])
+        self.listings = [self.TGT_SHOW, with_new_target]
+        self.mox.StubOutWithMock(tgtadm, 'create_iscsi_target')
+        # Target 2 lacks its backing lun, so it takes the slow path.
+        tgtadm.create_iscsi_target('iqn.2010-10.org.openstack:volume-2',
+                                   0, 0, '/dev/cinder-volumes/volume-2',
+                                   None, check_exit_code=False)
+        self.mox.ReplayAll()
+
+        failures = tgtadm.ensure_iscsi_targets(self._targets(1, 2, 3))
+
+        self.assertEqual({}, failures)
+        self.assertEqual(['tgt-admin --show',
+                          'tgt-admin --update '
+                          'iqn.2010-10.org.openstack:volume-3',
+                          'tgt-admin --show'], self.cmds)
+        # Target 1 is running but had no persist file.
+        self.assertEqual(['volume-1', 'volume-3'],
+                         sorted(os.listdir(self.persist_tempdir)))
+
+    def test_tgtadm_rewrites_stale_persist_files(self):
+        tgtadm = iscsi.TgtAdm('sudo', self.persist_tempdir,
+                              execute=self.fake_execute)
+        self.listings = [self.TGT_SHOW]
+        persist_file = os.path.join(self.persist_tempdir, 'volume-1')
+        with open(persist_file, 'w') as f:
+            f.write('stale')
+
+        self.assertEqual({}, tgtadm.ensure_iscsi_targets(self._targets(1)))
+        self.assertEqual(['tgt-admin --show'], self.cmds)
+        with open(persist_file) as f:
+            self.assertEqual(tgtadm._persist_conf(*self._targets(1)[0]),
+                             f.read())
+        self.assertTrue(tgtadm._persist_file_matches(*self._targets(1)[0]))
+
+    def test_tgtadm_reports_targets_which_did_not_come_up(self):
+        tgtadm = iscsi.TgtAdm('sudo', self.persist_tempdir,
+                              execute=self.fake_execute)
+        self.listings = [self.TGT_SHOW, self.TGT_SHOW]
+
+        failures = tgtadm.ensure_iscsi_targets(self._targets(1, 3))
+
+        self.assertEqual(['iqn.2010-10.org.openstack:volume-3'],
+                         failures.keys())
+
+    def test_tgtadm_nothing_missing(self):
+        tgtadm = iscsi.TgtAdm('sudo', self.persist_tempdir,
+                              execute=self.fake_execute)
+        self.listings = [self.TGT_SHOW]
+
+        self.assertEqual({}, tgtadm.ensure_iscsi_targets(self._targets(1)))
+        self.assertEqual(['tgt-admin --show'], self.cmds)
+
+    def test_lioadm_only_creates_missing_targets(self):
+        self.stubs.Set(iscsi.LioAdm, '_verify_rtstool', lambda obj: None)
+        lioadm = iscsi.LioAdm('sudo', execute=self.fake_execute)
+        self.listings = ['iqn.2010-10.org.openstack:volume-1\n',
+                         'iqn.2010-10.org.openstack:volume-1\n'
+                         'iqn.2010-10.org.openstack:volume-2\n']
+
+        failures = lioadm.ensure_iscsi_targets(self._targets(1, 2))
+
+        self.assertEqual({}, failures)
+        self.assertEqual(['cinder-rtstool get-targets',
+                          'cinder-rtstool create '
+                          '/dev/cinder-volumes/volume-2 '
+                          'iqn.2010-10.org.openstack:volume-2 '
+                          'test_id test_pass',
+                          'cinder-rtstool get-targets'], self.cmds)
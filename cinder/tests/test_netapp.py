@@ -657,6 +657,20 @@ class NetAppDirectCmodeISCSIDriverTestCase(test.TestCase):
         self.driver.create_volume(self.volume)
         self.driver.extend_volume(self.volume, 4)
 
+    def test_get_lun_from_table_by_name(self):
+        self.driver.lun_table = {}
+        self.stubs.Set(self.driver, '_get_lun_list',
+                       lambda: self.fail('All luns listed'))
+        lun = self.driver._get_lun_from_table('lun1')
+        self.assertEqual('/vol/navneet/lun1', lun.metadata['Path'])
+
+    def test_get_lun_from_table_falls_back_to_list(self):
+        self.driver.lun_table = {}
+        lun = self.driver._get_lun_from_table('lun3')
+        self.assertEqual('/vol/navneet/lun3', lun.metadata['Path'])
+        self.assertRaises(exception.VolumeNotFound,
+                          self.driver._get_lun_from_table, 'lun_missing')
+
 
 class NetAppDriverNegativeTestCase(test.TestCase):
     """Test case for NetAppDriver"""
@@ -1176,6 +1190,23 @@ class NetAppDirect7modeISCSIDriverTestCase_NV(
         self.assertRaises(exception.VolumeBackendAPIException,
                           drv.check_for_setup_error)
 
+    def test_get_lun_from_table_by_name(self):
+        self.driver.lun_table = {}
+        self.driver.volume_list = ['vol0', 'vol1']
+        self.stubs.Set(self.driver, '_get_lun_list',
+                       lambda: self.fail('All luns listed'))
+        lun = self.driver._get_lun_from_table('lun1')
+        self.assertEqual('/vol/vol1/lun1', lun.metadata['Path'])
+
+    def test_get_lun_from_table_falls_back_to_list(self):
+        self.driver.lun_table = {}
+        self.stubs.Set(self.driver, '_get_lun_by_args',
+                       lambda **args: self.fail('Lun looked up by path'))
+        lun = self.driver._get_lun_from_table('lun1')
+        self.assertEqual('/vol/vol1/lun1', lun.metadata['Path'])
+        self.assertRaises(exception.VolumeNotFound,
+                          self.driver._get_lun_from_table, 'lun_missing')
+
 
 class NetAppDirect7modeISCSIDriverTestCase_WV(
         NetAppDirect7modeISCSIDriverTestCase_NV):
@@ -1207,6 +1238,77 @@ class NetAppDirect7modeISCSIDriverTestCase_WV(
         return configuration
 
 
+class FakeKeepAliveHTTPConnection(FakeDirectCmodeHTTPConnection):
+    """Counts the connections opened and the requests sent on them."""
+
+    opened = []
+
+    def __init__(self, host, port=None, timeout=None):
+        super(FakeKeepAliveHTTPConnection, self).__init__(host, timeout)
+        self.requests = 0
+        self.closed = False
+        self.headers = None
+        self.opened.append(self)
+
+    def request(self, method, path, data=None, headers=None):
+        if self.closed:
+            raise httplib.BadStatusLine('')
+        self.requests += 1
+        self.headers = headers
+        super(FakeKeepAliveHTTPConnection, self).request(method, path, data,
+                                                         headers)
+
+    def getresponse(self):
+        # The fake server answers with HTTP/1.0, pretend to keep it alive.
+        response = super(FakeKeepAliveHTTPConnection, self).getresponse()
+        response.will_close = False
+        return response
+
+    def close(self):
+        self.closed = True
+
+
+class NetAppApiServerTests(test.TestCase):
+    """Tests the connections of NaServer."""
+
+    def setUp(self):
+        super(NetAppApiServerTests, self).setUp()
+        self.stubs.Set(FakeKeepAliveHTTPConnection, 'opened', [])
+        self.stubs.Set(httplib, 'HTTPConnection',
+                       FakeKeepAliveHTTPConnection)
+        self.server = NaServer('127.0.0.1')
+        self.server.set_transport_type('http')
+        self.server.set_port('80')
+        self.server.set_username('admin')
+        self.server.set_password('pass')
+
+    def _invoke(self):
+        return self.server.invoke_successfully(NaElement('vserver-get-iter'))
+
+    def test_connection_reused(self):
+        self._invoke()
+        self._invoke()
+        opened = FakeKeepAliveHTTPConnection.opened
+        self.assertEqual(1, len(opened))
+        self.assertEqual(2, opened[0].requests)
+        self.assertEqual('Basic YWRtaW46cGFzcw==',
+                         opened[0].headers['Authorization'])
+
+    def test_reconnect_after_idle_close(self):
+        self._invoke()
+        FakeKeepAliveHTTPConnection.opened[0].closed = True
+        self._invoke()
+        self.assertEqual(2, len(FakeKeepAliveHTTPConnection.opened))
+
+    def test_new_connection_after_settings_change(self):
+        self._invoke()
+        self.server.set_password('secret')
+        self._invoke()
+        opened = FakeKeepAliveHTTPConnection.opened
+        self.assertEqual(2, len(opened))
+        self.assertTrue(opened[0].closed)
+
+
 class NetAppApiElementTransTests(test.TestCase):
     """Test case for NetApp api element translations."""
 
@@ -18,7 +18,8 @@ Unit tests for OpenStack Cinder volume driver
 """
 
 import base64
-import urllib2
+import mimetools
+import StringIO
 
 import mox as mox_lib
 
@@ -32,6 +33,7 @@ from cinder.volume.drivers.nexenta import iscsi
 from cinder.volume.drivers.nexenta import jsonrpc
 from cinder.volume.drivers.nexenta import nfs
 from cinder.volume.drivers.nexenta import utils
+from cinder.volume import http_pool
 
 
 class TestNexentaISCSIDriver(test.TestCase):
@@ -67,6 +69,7 @@ class TestNexentaISCSIDriver(test.TestCase):
         self.configuration.nexenta_volume = 'cinder'
         self.configuration.nexenta_rest_port = 2000
         self.configuration.nexenta_rest_protocol = 'http'
+        self.configuration.nexenta_rest_timeout = 60
         self.configuration.nexenta_iscsi_target_portal_port = 3260
         self.configuration.nexenta_target_prefix = 'iqn:'
         self.configuration.nexenta_target_group_prefix = 'cinder/'
@@ -340,6 +343,15 @@ class TestNexentaISCSIDriver(test.TestCase):
         self.assertEqual(False, stats['QoS_support'])
 
 
+class FakeHTTPResponse(object):
+
+    def __init__(self, status, headers_status):
+        self.status = status
+        self.reason = 'reason'
+        self.msg = mimetools.Message(StringIO.StringIO(''))
+        self.msg.status = headers_status
+
+
 class TestNexentaJSONRPC(test.TestCase):
     HOST = 'example.com'
     URL = 'http://%s/' % HOST
@@ -351,81 +363,78 @@ class TestNexentaJSONRPC(test.TestCase):
         'Basic %s' % base64.b64encode('%s:%s' % (USER, PASSWORD)),
         'Content-Type': 'application/json'
     }
-    REQUEST = 'the request'
+    DATA = '{"object": null, "params": ["arg1", "arg2"], "method": null}'
 
     def setUp(self):
         super(TestNexentaJSONRPC, self).setUp()
         self.proxy = jsonrpc.NexentaJSONProxy(
             'http', self.HOST, 2000, '/', self.USER, self.PASSWORD, auto=True)
-        self.mox.StubOutWithMock(urllib2, 'Request', True)
-        self.mox.StubOutWithMock(urllib2, 'urlopen')
-        self.resp_mock = self.mox.CreateMockAnything()
-        self.resp_info_mock = self.mox.CreateMockAnything()
-        self.resp_mock.info().AndReturn(self.resp_info_mock)
-        urllib2.urlopen(self.REQUEST).AndReturn(self.resp_mock)
+        self.requests = []
+        self.responses = []
+
+        def fake_request(pool, method, url, body=None, headers=None):
+            self.requests.append((str(pool), method, url, body, headers))
+            return self.responses.pop(0)
+
+        self.stubs.Set(http_pool.HTTPConnectionPool, 'request', fake_request)
+
+    def _add_response(self, data, status=200, headers_status=''):
+        response = FakeHTTPResponse(status, headers_status)
+        self.responses.append((response, data))
 
     def test_call(self):
-        urllib2.Request(
-            'http://%s:2000/' % self.HOST,
-            '{"object": null, "params": ["arg1", "arg2"], "method": null}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        self.resp_info_mock.status = ''
-        self.resp_mock.read().AndReturn(
-            '{"error": null, "result": "the result"}')
-        self.mox.ReplayAll()
+        self._add_response('{"error": null, "result": "the result"}')
         result = self.proxy('arg1', 'arg2')
         self.assertEqual(result, "the result")
+        self.assertEqual([('http://%s:2000' % self.HOST, 'POST', '/',
+                           self.DATA, self.HEADERS)], self.requests)
 
     def test_call_deep(self):
-        urllib2.Request(
-            'http://%s:2000/' % self.HOST,
-            '{"object": "obj1.subobj", "params": ["arg1", "arg2"],'
-            ' "method": "meth"}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        self.resp_info_mock.status = ''
-        self.resp_mock.read().AndReturn(
-            '{"error": null, "result": "the result"}')
-        self.mox.ReplayAll()
+        self._add_response('{"error": null, "result": "the result"}')
         result = self.proxy.obj1.subobj.meth('arg1', 'arg2')
         self.assertEqual(result, "the result")
+        self.assertEqual('{"object": "obj1.subobj", "params": '
+                         '["arg1", "arg2"], "method": "meth"}',
+                         self.requests[0][3])
+
+    def test_connections_reused(self):
+        self._add_response('{"error": null, "result": "the result"}')
+        self._add_response('{"error": null, "result": "the result"}')
+        self.proxy.obj1.meth('arg1')
+        self.proxy.obj2.meth('arg2')
+        self.assertEqual(['http'], self.proxy.pools.keys())
+
+    def test_timeout(self):
+        proxy = jsonrpc.NexentaJSONProxy(
+            'http', self.HOST, 2000, '/', self.USER, self.PASSWORD,
+            timeout=10)
+        self._add_response('{"error": null, "result": "the result"}')
+        proxy.obj1.meth('arg1')
+        self.assertEqual(10, proxy.pools['http'].timeout)
 
     def test_call_auto(self):
-        urllib2.Request(
-            'http://%s:2000/' % self.HOST,
-            '{"object": null, "params": ["arg1", "arg2"], "method": null}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        urllib2.Request(
-            'https://%s:2000/' % self.HOST,
-            '{"object": null, "params": ["arg1", "arg2"], "method": null}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        self.resp_info_mock.status = 'EOF in headers'
-        self.resp_mock.read().AndReturn(
-            '{"error": null, "result": "the result"}')
-        urllib2.urlopen(self.REQUEST).AndReturn(self.resp_mock)
-        self.mox.ReplayAll()
+        self._add_response('', headers_status='EOF in headers')
+        self._add_response('{"error": null, "result": "the result"}')
         result = self.proxy('arg1', 'arg2')
         self.assertEqual(result, "the result")
+        self.assertEqual(['http://%s:2000' % self.HOST,
+                          'https://%s:2000' % self.HOST],
+                         [request[0] for request in self.requests])
 
     def test_call_error(self):
-        urllib2.Request(
-            'http://%s:2000/' % self.HOST,
-            '{"object": null, "params": ["arg1", "arg2"], "method": null}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        self.resp_info_mock.status = ''
-        self.resp_mock.read().AndReturn(
+        self._add_response(
             '{"error": {"message": "the error"}, "result": "the result"}')
-        self.mox.ReplayAll()
         self.assertRaises(jsonrpc.NexentaJSONException,
                           self.proxy, 'arg1', 'arg2')
 
     def test_call_fail(self):
-        urllib2.Request(
-            'http://%s:2000/' % self.HOST,
-            '{"object": null, "params": ["arg1", "arg2"], "method": null}',
-            self.HEADERS).AndReturn(self.REQUEST)
-        self.resp_info_mock.status = 'EOF in headers'
+        self._add_response('', headers_status='EOF in headers')
         self.proxy.auto = False
-        self.mox.ReplayAll()
+        self.assertRaises(jsonrpc.NexentaJSONException,
+                          self.proxy, 'arg1', 'arg2')
+
+    def test_call_bad_status(self):
+        self._add_response('Unauthorized', status=401)
         self.assertRaises(jsonrpc.NexentaJSONException,
                           self.proxy, 'arg1', 'arg2')
 
@@ -473,6 +482,7 @@ class TestNexentaNfsDriver(test.TestCase):
         self.configuration.nfs_mount_point_base = '/mnt/test'
         self.configuration.nfs_mount_options = None
         self.configuration.nexenta_nms_cache_volroot = False
+        self.configuration.nexenta_rest_timeout = 60
         self.nms_mock = self.mox.CreateMockAnything()
         for mod in ('appliance', 'folder', 'server', 'volume', 'netstorsvc',
                     'snapshot'):
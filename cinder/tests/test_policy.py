@@ -19,6 +19,7 @@
 import os.path
 import urllib2
 
+import mock
 from oslo.config import cfg
 import six
 
@@ -231,3 +232,126 @@ class ContextIsAdminPolicyTestCase(test.TestCase):
         self.assertFalse(ctx.is_admin)
         ctx = context.RequestContext('fake', 'fake', roles=['admin'])
         self.assertTrue(ctx.is_admin)
+
+
+class PolicyFileCheckIntervalTestCase(test.TestCase):
+
+    def setUp(self):
+        super(PolicyFileCheckIntervalTestCase, self).setUp()
+        # since is_admin is defined by policy, create context before reset
+        self.context = context.RequestContext('fake', 'fake')
+        policy.reset()
+        self.addCleanup(policy.reset)
+
+    def _enforce_with_policy(self, tmpdir, interval):
+        tmpfilename = os.path.join(tmpdir, 'policy')
+        self.flags(policy_file=tmpfilename,
+                   policy_file_check_interval=interval)
+        with open(tmpfilename, "w") as policyfile:
+            policyfile.write("""{"example:test": []}""")
+
+        with mock.patch.object(os.path, 'getmtime',
+                               wraps=os.path.getmtime) as getmtime:
+            for _i in range(3):
+                policy.enforce(self.context, "example:test", {})
+        return getmtime.call_count
+
+    def test_file_checked_once_per_interval(self):
+        with utils.tempdir() as tmpdir:
+            self.assertEqual(1, self._enforce_with_policy(tmpdir, 60))
+
+    def test_file_checked_every_time_without_interval(self):
+        with utils.tempdir() as tmpdir:
+            self.assertEqual(3, self._enforce_with_policy(tmpdir, 0))
+
+
+class CompiledPolicyTestCase(test.TestCase):
+
+    def setUp(self):
+        super(CompiledPolicyTestCase, self).setUp()
+        policy.reset()
+        policy.init()
+        self.addCleanup(policy.reset)
+        self.rules = {
+            "admin_or_owner": [["role:admin"], ["project_id:%(project_id)s"]],
+            "default": [["rule:admin_or_owner"]],
+            "example:owner": [["rule:admin_or_owner"]],
+            "example:get_http": [["http:http://www.example.com"]],
+            "example:bad": [["nocolon"]],
+        }
+        common_policy.set_brain(common_policy.Brain(self.rules, 'default'))
+        self.context = context.RequestContext('fake', 'fake', roles=['member'])
+
+    def test_rules_compiled_once_per_brain(self):
+        policy.enforce(self.context, "example:owner", {'project_id': 'fake'})
+        compiled = policy._RULES
+        policy.enforce(self.context, "example:owner", {'project_id': 'fake'})
+        self.assertIs(compiled, policy._RULES)
+
+        common_policy.set_brain(common_policy.Brain({}, 'default'))
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, "example:owner",
+                          {'project_id': 'fake'})
+        self.assertIsNot(compiled, policy._RULES)
+
+    def test_invalid_rule_fails_closed(self):
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, "example:bad", {})
+
+    def test_missing_rule_uses_default(self):
+        policy.enforce(self.context, "example:noexist", {'project_id': 'fake'})
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, "example:noexist",
+                          {'project_id': 'other'})
+
+    def test_context_not_converted_for_local_checks(self):
+        with mock.patch.object(self.context, 'to_dict') as to_dict:
+            policy.enforce(self.context, "example:owner",
+                           {'project_id': 'fake'})
+        self.assertFalse(to_dict.called)
+
+    def test_decision_remembered_per_context(self):
+        target = {'project_id': 'fake', 'size': 1}
+        other = context.RequestContext('fake', 'fake', roles=['member'])
+        with mock.patch.object(policy._CompiledRules, 'check',
+                               wraps=policy._get_rules().check) as check:
+            policy.enforce(self.context, "example:owner", target)
+            evaluated = check.call_count
+            self.assertTrue(evaluated)
+            policy.enforce(self.context, "example:owner",
+                           {'project_id': 'fake', 'size': 2})
+            self.assertEqual(evaluated, check.call_count)
+
+            policy.enforce(other, "example:owner", target)
+            self.assertEqual(2 * evaluated, check.call_count)
+
+    def test_decision_depends_on_target(self):
+        policy.enforce(self.context, "example:owner", {'project_id': 'fake'})
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, "example:owner",
+                          {'project_id': 'other'})
+
+    def test_decision_depends_on_roles(self):
+        target = {'project_id': 'other'}
+        self.assertRaises(exception.PolicyNotAuthorized, policy.enforce,
+                          self.context, "example:owner", target)
+        self.context.roles.append('admin')
+        policy.enforce(self.context, "example:owner", target)
+
+    def test_decision_not_remembered_for_http(self):
+        urlopen = mock.Mock(side_effect=lambda url, data:
+                            six.StringIO("True"))
+        self.stubs.Set(urllib2, 'urlopen', urlopen)
+        policy.enforce(self.context, "example:get_http", {})
+        policy.enforce(self.context, "example:get_http", {})
+        self.assertEqual(2, urlopen.call_count)
+
+    def test_decision_cache_disabled(self):
+        self.flags(policy_cache_decisions=False)
+        target = {'project_id': 'fake'}
+        with mock.patch.object(policy._CompiledRules, 'check',
+                               wraps=policy._get_rules().check) as check:
+            policy.enforce(self.context, "example:owner", target)
+            evaluated = check.call_count
+            policy.enforce(self.context, "example:owner", target)
+        self.assertEqual(2 * evaluated, check.call_count)
@@ -16,6 +16,8 @@
 #    under the License.
 
 
+import contextlib
+import eventlet
 import mock
 import os
 import tempfile
@@ -130,6 +132,26 @@ class TestUtil(test.TestCase):
                           driver.ascii_str, 'foo' + unichr(300))
 
 
+class FakeImage(object):
+
+    def __init__(self):
+        self.unprotected = []
+        self.removed = []
+        self.closed = False
+
+    def unprotect_snap(self, snap):
+        self.unprotected.append(snap)
+
+    def remove_snap(self, snap):
+        self.removed.append(snap)
+
+    def list_snaps(self):
+        return []
+
+    def close(self):
+        self.closed = True
+
+
 class RBDTestCase(test.TestCase):
 
     def setUp(self):
@@ -143,6 +165,8 @@ class RBDTestCase(test.TestCase):
         self.cfg.rbd_ceph_conf = None
         self.cfg.rbd_secret_uuid = None
         self.cfg.rbd_user = None
+        self.cfg.rbd_flatten_workers = 0
+        self.cfg.rbd_flatten_wait_timeout = 300
         self.cfg.volume_dd_blocksize = '1M'
 
         mock_exec = mock.Mock()
@@ -278,6 +302,19 @@ class RBDTestCase(test.TestCase):
         proxy.create_snap.assert_called_with(*args)
         proxy.protect_snap.assert_called_with(*args)
 
+    @common_mocks
+    def test_create_snapshot_flatten_timeout(self):
+        self.cfg.rbd_flatten_wait_timeout = 10
+        flattener = mock.Mock()
+        flattener.wait.return_value = False
+        self.driver._flattener = flattener
+
+        self.assertRaises(exception.VolumeIsBusy,
+                          self.driver.create_snapshot, self.snapshot)
+        flattener.wait.assert_called_once_with(
+            self.snapshot['volume_name'], queued=True, timeout=10)
+        self.assertFalse(self.mock_proxy.called)
+
     @common_mocks
     def test_delete_snapshot(self):
         proxy = self.mock_proxy.return_value
@@ -447,6 +484,194 @@ class RBDTestCase(test.TestCase):
             self.mock_rbd.Image.remove_snap.assert_called_once()
             self.mock_rbd.Image.close.assert_called_once()
 
+    @common_mocks
+    def test_create_cloned_volume_flatten_in_background(self):
+        src_name = u'volume-00000001'
+        dst_name = u'volume-00000002'
+
+        self.flags(rbd_max_clone_depth=2)
+        self.cfg.rbd_flatten_workers = 1
+        self.mock_rbd.RBD.clone = mock.Mock()
+        self.mock_rbd.Image.flatten = mock.Mock()
+        self.mock_rbd.Image.create_snap = mock.Mock()
+        self.mock_rbd.Image.protect_snap = mock.Mock()
+
+        with contextlib.nested(
+            mock.patch.object(self.driver, '_get_clone_depth',
+                              return_value=2),
+            mock.patch.object(driver.RBDFlattener, 'queue')
+        ) as (mock_get_clone_depth, mock_queue):
+            self.driver.create_cloned_volume(dict(name=dst_name),
+                                             dict(name=src_name))
+
+            self.assertTrue(self.mock_rbd.RBD.clone.called)
+            self.assertFalse(self.mock_rbd.Image.flatten.called)
+            self.assertEqual([mock.call(str(dst_name)),
+                              mock.call(str(src_name), after=str(dst_name))],
+                             mock_queue.call_args_list)
+
+    @common_mocks
+    def test_create_cloned_volume_twice_from_deep_source(self):
+        self.flags(rbd_max_clone_depth=2)
+        self.cfg.rbd_flatten_workers = 2
+        self.mock_rbd.RBD.clone = mock.Mock()
+        self.mock_rbd.Image.create_snap = mock.Mock()
+        self.mock_rbd.Image.protect_snap = mock.Mock()
+        depths = {'volume-00000001': 2}
+        flattened = []
+
+        def fake_flatten_volume(volume_name):
+            eventlet.sleep(0)
+            flattened.append(volume_name)
+            depths[volume_name] = 0
+
+        with contextlib.nested(
+            mock.patch.object(self.driver, '_get_clone_depth',
+                              side_effect=lambda c, name, **kw: depths[name]),
+            mock.patch.object(self.driver, '_flatten_volume',
+                              side_effect=fake_flatten_volume)
+        ):
+            self.driver.create_cloned_volume(dict(name='volume-00000002'),
+                                             dict(name='volume-00000001'))
+            self.driver.create_cloned_volume(dict(name='volume-00000003'),
+                                             dict(name='volume-00000001'))
+            self.driver._wait_for_flatten('volume-00000003')
+
+        # The source was flattened after the first clone, so the second
+        # clone is shallow and is not flattened.
+        self.assertEqual(['volume-00000002', 'volume-00000001'], flattened)
+
+    @common_mocks
+    def test_flatten_volume(self):
+        client = self.mock_client.return_value
+        client.__enter__.return_value = client
+        self.mock_rbd.Image.flatten = mock.Mock()
+        self.driver._flatten_rados = mock.Mock()
+        self.driver._flatten_rados.get.return_value = ('cluster', 'ioctx')
+        parent_info = ('rbd', 'volume-00000001',
+                       'volume-00000002.clone_snap')
+
+        with contextlib.nested(
+            mock.patch.object(self.driver, '_get_clone_info',
+                              return_value=parent_info),
+            mock.patch.object(self.driver, '_delete_clone_parent_refs'),
+            mock.patch.object(driver.tpool, 'execute',
+                              side_effect=lambda f: f())
+        ) as (mock_get_clone_info, mock_delete_refs, mock_execute):
+            self.driver._flatten_volume('volume-00000002')
+
+            self.assertTrue(self.mock_rbd.Image.flatten.called)
+            self.driver._flatten_rados.put.assert_called_once_with(
+                'cluster', 'ioctx', error=None)
+            mock_delete_refs.assert_called_once_with(
+                client, 'volume-00000001', 'volume-00000002.clone_snap')
+
+    @common_mocks
+    def test_flatten_deleted_volume(self):
+        self.mock_rbd.Image = mock.Mock(
+            side_effect=self.mock_rbd.ImageNotFound)
+        self.driver._flatten_rados = mock.Mock()
+        self.driver._flatten_rados.get.return_value = ('cluster', 'ioctx')
+
+        with mock.patch.object(self.driver,
+                               '_delete_clone_parent_refs') as \
+                mock_delete_refs:
+            self.driver._flatten_volume('volume-00000002')
+            self.assertFalse(mock_delete_refs.called)
+            self.driver._flatten_rados.put.assert_called_once_with(
+                'cluster', 'ioctx', error=None)
+
+    @common_mocks
+    def test_create_cloned_volume_lost_flatten(self):
+        src_name = u'volume-00000001'
+        dst_name = u'volume-00000002'
+
+        self.flags(rbd_max_clone_depth=2)
+        self.cfg.rbd_flatten_workers = 1
+        self.mock_rbd.RBD.clone = mock.Mock()
+        self.mock_rbd.Image.create_snap = mock.Mock()
+        self.mock_rbd.Image.protect_snap = mock.Mock()
+
+        with contextlib.nested(
+            mock.patch.object(self.driver, '_get_clone_depth',
+                              return_value=3),
+            mock.patch.object(self.driver, '_flatten_volume'),
+            mock.patch.object(driver.RBDFlattener, 'queue')
+        ) as (mock_get_clone_depth, mock_flatten, mock_queue):
+            self.driver.create_cloned_volume(dict(name=dst_name),
+                                             dict(name=src_name))
+
+            mock_get_clone_depth.assert_called_once_with(
+                self.mock_client.return_value.__enter__.return_value,
+                str(src_name), check_limit=False)
+            mock_flatten.assert_called_once_with(str(src_name))
+            self.assertTrue(self.mock_rbd.RBD.clone.called)
+            self.assertFalse(mock_queue.called)
+
+    @common_mocks
+    def test_queue_deep_clones(self):
+        self.flags(rbd_max_clone_depth=2)
+        self.cfg.rbd_flatten_workers = 1
+        self.cfg.rbd_flatten_scan_on_startup = True
+        self.mock_rbd.RBD.list = mock.Mock(
+            return_value=['volume-1', 'volume-2', 'volume-3.deleted',
+                          'volume-4', 'volume-', 'instance-1_disk'])
+        depths = {'volume-1': 2, 'volume-2': 3}
+
+        def fake_get_clone_depth(client, name, check_limit=True):
+            self.assertFalse(check_limit)
+            if name not in depths:
+                raise self.mock_rbd.ImageNotFound()
+            return depths[name]
+
+        with contextlib.nested(
+            mock.patch.object(self.driver, '_get_clone_depth',
+                              side_effect=fake_get_clone_depth),
+            mock.patch.object(driver.RBDFlattener, 'queue'),
+            mock.patch.object(driver.greenthread, 'spawn_n',
+                              side_effect=lambda f: f()),
+            mock.patch.object(driver.tpool, 'execute',
+                              side_effect=lambda f, *a, **kw: f(*a, **kw))
+        ) as (mock_get_clone_depth, mock_queue, mock_spawn, mock_execute):
+            self.driver.do_setup(None)
+
+            self.assertEqual(['volume-1', 'volume-2', 'volume-4'],
+                             [c[0][1] for c in
+                              mock_get_clone_depth.call_args_list])
+            # The listing and every depth lookup ran in a native thread.
+            self.assertEqual(4, mock_execute.call_count)
+            mock_queue.assert_called_once_with('volume-2')
+
+    @common_mocks
+    def test_no_deep_clones_scan_by_default(self):
+        self.cfg.rbd_flatten_workers = 1
+        self.cfg.rbd_flatten_scan_on_startup = False
+        with mock.patch.object(driver.greenthread, 'spawn_n') as mock_spawn:
+            self.driver.do_setup(None)
+            self.assertFalse(mock_spawn.called)
+
+    @common_mocks
+    def test_delete_clone_parent_refs_deleted_parent(self):
+        client = mock.Mock()
+        parent = FakeImage()
+        self.mock_rbd.Image = mock.Mock(
+            side_effect=[self.mock_rbd.ImageNotFound(), parent])
+        self.mock_rbd.RBD.remove = mock.Mock()
+
+        with mock.patch.object(self.driver, '_get_clone_info',
+                               return_value=(None, None, None)):
+            self.driver._delete_clone_parent_refs(
+                client, 'volume-00000001', 'volume-00000002.clone_snap')
+
+        self.assertEqual([mock.call(client.ioctx, 'volume-00000001'),
+                          mock.call(client.ioctx, 'volume-00000001.deleted')],
+                         self.mock_rbd.Image.call_args_list)
+        self.assertEqual(['volume-00000002.clone_snap'], parent.unprotected)
+        self.assertEqual(['volume-00000002.clone_snap'], parent.removed)
+        self.assertTrue(parent.closed)
+        self.mock_rbd.RBD.remove.assert_called_once_with(
+            client.ioctx, 'volume-00000001.deleted')
+
     @common_mocks
     def test_good_locations(self):
         locations = ['rbd://fsid/pool/image/snap',
@@ -724,6 +949,185 @@ class RBDTestCase(test.TestCase):
         self.mock_rados.Rados.shutdown.assert_called_once()
 
 
+class FakeIoctx(object):
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.closed = 0
+
+    def close(self):
+        self.closed += 1
+
+
+class FakeRados(object):
+
+    Error = MockException
+
+    def __init__(self):
+        self.clients = []
+        self.connect_error = None
+
+    def Rados(self, rados_id, conffile):
+        client = FakeRadosClient(self.connect_error)
+        self.clients.append(client)
+        return client
+
+
+class FakeRadosClient(object):
+
+    def __init__(self, connect_error=None):
+        self.connect_error = connect_error
+        self.probe_error = None
+        self.connects = 0
+        self.shutdowns = 0
+        self.opened = []
+
+    def connect(self):
+        self.connects += 1
+        if self.connect_error:
+            raise self.connect_error
+
+    def get_cluster_stats(self):
+        if self.probe_error:
+            raise self.probe_error
+        return {}
+
+    def open_ioctx(self, pool):
+        ioctx = FakeIoctx(pool)
+        self.opened.append(ioctx)
+        return ioctx
+
+    def shutdown(self):
+        self.shutdowns += 1
+
+
+class RADOSConnectionPoolTestCase(test.TestCase):
+
+    def setUp(self):
+        super(RADOSConnectionPoolTestCase, self).setUp()
+        self.stubs.Set(driver.RADOSConnectionPool, '_pools', {})
+        self.rados = FakeRados()
+        self.pool = driver.RADOSConnectionPool.get_pool(self.rados, 'cinder',
+                                                        '/etc/ceph/ceph.conf')
+
+    def test_get_pool_shared(self):
+        self.assertIs(self.pool, driver.RADOSConnectionPool.get_pool(
+            self.rados, 'cinder', '/etc/ceph/ceph.conf'))
+        self.assertIsNot(self.pool, driver.RADOSConnectionPool.get_pool(
+            self.rados, 'backup', '/etc/ceph/ceph.conf'))
+
+    def test_connection_reused(self):
+        client, ioctx = self.pool.get('volumes')
+        self.pool.put(client, ioctx)
+        client2, ioctx2 = self.pool.get('volumes')
+        self.assertIs(client, client2)
+        self.assertIs(ioctx, ioctx2)
+
+        client3, ioctx3 = self.pool.get('backups')
+        self.assertIs(client, client3)
+        self.assertIsNot(ioctx, ioctx3)
+
+        self.assertEqual(1, len(self.rados.clients))
+        self.assertEqual(1, client.connects)
+        self.assertEqual(['volumes', 'backups'],
+                         [i.pool for i in client.opened])
+        self.assertEqual(0, client.shutdowns)
+
+    def test_failed_probe_reconnects(self):
+        client, ioctx = self.pool.get('volumes')
+        self.pool.put(client, ioctx, error=MockException())
+        self.assertEqual(1, ioctx.closed)
+
+        client.probe_error = MockException()
+        client2, ioctx2 = self.pool.get('volumes')
+        self.assertIsNot(client, client2)
+        self.assertEqual(1, client.shutdowns)
+        self.assertEqual(1, client2.connects)
+
+    def test_retired_client_shut_down_when_released(self):
+        client, ioctx = self.pool.get('volumes')
+        self.pool.check_interval = -1
+        client.probe_error = MockException()
+        client2, ioctx2 = self.pool.get('volumes')
+        self.assertIsNot(client, client2)
+        self.assertEqual(0, client.shutdowns)
+
+        self.pool.put(client, ioctx)
+        self.assertEqual(1, ioctx.closed)
+        self.assertEqual(1, client.shutdowns)
+
+    def test_connect_error(self):
+        self.rados.connect_error = MockException()
+        self.assertRaises(MockException, self.pool.get, 'volumes')
+        self.assertEqual(1, self.rados.clients[0].shutdowns)
+
+
+class FakeFlattenDriver(object):
+
+    def __init__(self):
+        self.flattened = []
+        self.error = None
+        self.delay = 0
+
+    def _flatten_volume(self, volume_name):
+        eventlet.sleep(self.delay)
+        if self.error:
+            raise self.error
+        self.flattened.append(volume_name)
+
+
+class RBDFlattenerTestCase(test.TestCase):
+
+    def setUp(self):
+        super(RBDFlattenerTestCase, self).setUp()
+        self.driver = FakeFlattenDriver()
+        self.flattener = driver.RBDFlattener(self.driver, 1)
+
+    def test_queue_and_wait(self):
+        self.flattener.queue('volume-1')
+        self.flattener.queue('volume-2')
+        self.flattener.queue('volume-1')
+        self.assertTrue(self.flattener.is_pending('volume-2'))
+
+        self.flattener.wait('volume-1')
+        self.flattener.wait('volume-2')
+        self.assertEqual(['volume-1', 'volume-2'], self.driver.flattened)
+        self.assertFalse(self.flattener.is_pending('volume-1'))
+        self.assertEqual(0, self.flattener._threads)
+
+    def test_wait_only_running(self):
+        self.flattener.queue('volume-1')
+        # Not started yet, so nothing to wait for.
+        self.flattener.wait('volume-1', queued=False)
+        self.assertEqual([], self.driver.flattened)
+        self.flattener.wait('volume-1')
+        self.assertEqual(['volume-1'], self.driver.flattened)
+
+    def test_wait_prioritizes(self):
+        self.flattener.queue('volume-1')
+        self.flattener.queue('volume-2')
+        self.flattener.queue('volume-3', after='volume-2')
+        self.flattener.wait('volume-3')
+        self.assertEqual(['volume-2', 'volume-3'], self.driver.flattened)
+        self.flattener.wait('volume-1')
+
+    def test_wait_timeout(self):
+        self.driver.delay = 0.2
+        self.flattener.queue('volume-1')
+        self.assertFalse(self.flattener.wait('volume-1', timeout=0.01))
+        self.assertTrue(self.flattener.is_pending('volume-1'))
+        self.assertTrue(self.flattener.wait('volume-2', timeout=0.01))
+
+    def test_failure_does_not_stop_worker(self):
+        self.driver.error = Exception('flatten failed')
+        self.flattener.queue('volume-1')
+        self.flattener.wait('volume-1')
+        self.driver.error = None
+        self.flattener.queue('volume-2')
+        self.flattener.wait('volume-2')
+        self.assertEqual(['volume-2'], self.driver.flattened)
+
+
 class RBDImageIOWrapperTestCase(test.TestCase):
     def setUp(self):
         super(RBDImageIOWrapperTestCase, self).setUp()
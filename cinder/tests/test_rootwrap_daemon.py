@@ -0,0 +1,103 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from eventlet.green import subprocess as green_subprocess
+import mock
+
+from cinder.openstack.common import processutils
+from cinder import rootwrap_daemon
+from cinder import test
+
+
+class RootwrapDaemonTestCase(test.TestCase):
+    """Runs a real daemon, without sudo, against a private filter set."""
+
+    def setUp(self):
+        super(RootwrapDaemonTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+
+        filters_dir = os.path.join(self.tmpdir, 'rootwrap.d')
+        os.mkdir(filters_dir)
+        with open(os.path.join(filters_dir, 'test.filters'), 'w') as f:
+            f.write('[Filters]\n'
+                    'cat: CommandFilter, cat, root\n'
+                    'false: CommandFilter, false, root\n')
+        config_file = os.path.join(self.tmpdir, 'rootwrap.conf')
+        with open(config_file, 'w') as f:
+            f.write('[DEFAULT]\n'
+                    'filters_path=%s\n'
+                    'exec_dirs=/sbin,/usr/sbin,/bin,/usr/bin\n' % filters_dir)
+
+        self.client = rootwrap_daemon.Client(
+            [sys.executable, '-m', 'cinder.rootwrap_daemon', config_file])
+        self.addCleanup(self.client.stop)
+
+    def test_execute(self):
+        data = ''.join(chr(i) for i in range(256))
+        out, err = self.client.execute('cat', process_input=data)
+        self.assertEqual(data, out)
+        self.assertEqual('', err)
+
+    def test_daemon_is_reused(self):
+        self.client.execute('cat', process_input='a')
+        process = self.client._process
+        self.client.execute('cat', process_input='b')
+        self.assertIs(process, self.client._process)
+
+    def test_exit_code(self):
+        self.assertRaises(processutils.ProcessExecutionError,
+                          self.client.execute, 'false')
+        self.client.execute('false', check_exit_code=False)
+        self.client.execute('false', check_exit_code=[0, 1])
+        exc = self.assertRaises(processutils.ProcessExecutionError,
+                                self.client.execute, 'cat',
+                                process_input='', check_exit_code=[1])
+        self.assertEqual(0, exc.exit_code)
+
+    def test_unauthorized_command(self):
+        exc = self.assertRaises(processutils.ProcessExecutionError,
+                                self.client.execute, 'ls', '/')
+        self.assertEqual(rootwrap_daemon.RC_UNAUTHORIZED, exc.exit_code)
+
+    def test_daemon_unavailable(self):
+        client = rootwrap_daemon.Client(['/nonexistent-rootwrap-daemon'])
+        self.assertRaises(rootwrap_daemon.DaemonUnavailable,
+                          client.execute, 'cat')
+        self.assertFalse(client.available())
+
+    def test_failed_start_backs_off(self):
+        client = rootwrap_daemon.Client(['/nonexistent-rootwrap-daemon'],
+                                        retry_interval=60)
+        with mock.patch.object(green_subprocess, 'Popen',
+                               side_effect=OSError()) as mock_popen:
+            self.assertRaises(rootwrap_daemon.DaemonUnavailable,
+                              client.execute, 'cat')
+            self.assertRaises(rootwrap_daemon.DaemonUnavailable,
+                              client.execute, 'cat')
+            self.assertEqual(1, mock_popen.call_count)
+
+            with mock.patch.object(time, 'time',
+                                   return_value=time.time() + 61):
+                self.assertTrue(client.available())
+                self.assertRaises(rootwrap_daemon.DaemonUnavailable,
+                                  client.execute, 'cat')
+            self.assertEqual(2, mock_popen.call_count)
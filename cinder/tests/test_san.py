@@ -0,0 +1,105 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the base SAN driver."""
+
+import contextlib
+
+import mock
+
+from cinder.openstack.common import processutils
+from cinder import test
+from cinder.volume import configuration as conf
+from cinder.volume.drivers.san import san
+
+
+class FakeSSHPool(object):
+
+    def __init__(self):
+        self.free = ['ssh1', 'ssh2']
+        self.checked_out = []
+
+    def get(self):
+        ssh = self.free.pop(0)
+        self.checked_out.append(ssh)
+        return ssh
+
+    def put(self, ssh):
+        self.checked_out.remove(ssh)
+        self.free.append(ssh)
+
+    @contextlib.contextmanager
+    def item(self):
+        ssh = self.get()
+        try:
+            yield ssh
+        finally:
+            self.put(ssh)
+
+    def get_stats(self):
+        return {'size': 2}
+
+
+class SanDriverTestCase(test.TestCase):
+
+    def setUp(self):
+        super(SanDriverTestCase, self).setUp()
+        self.configuration = conf.Configuration(None)
+        self.driver = san.SanDriver(configuration=self.configuration)
+        self.pool = FakeSSHPool()
+        self.driver.sshpool = self.pool
+        self.used = []
+        patcher = mock.patch.object(processutils, 'ssh_execute',
+                                    side_effect=self._fake_ssh_execute)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _fake_ssh_execute(self, ssh, command, check_exit_code=True):
+        self.used.append(ssh)
+        if command == 'fail':
+            raise processutils.ProcessExecutionError(cmd=command)
+        return command, ''
+
+    def test_run_ssh_checks_out_per_command(self):
+        self.driver._run_ssh(['cmd1'])
+        self.driver._run_ssh(['cmd2'])
+        self.assertEqual(['ssh1', 'ssh2'], self.used)
+        self.assertEqual([], self.pool.checked_out)
+
+    def test_session_keeps_one_connection(self):
+        with self.driver._ssh_session():
+            self.assertEqual([], self.pool.checked_out)
+            self.assertEqual(('cmd1', ''), self.driver._run_ssh(['cmd1']))
+            with self.driver._ssh_session():
+                self.driver._run_ssh(['cmd2'])
+            self.driver._run_ssh(['cmd3'])
+            self.assertEqual(['ssh1'], self.pool.checked_out)
+        self.assertEqual(['ssh1'] * 3, self.used)
+        self.assertEqual([], self.pool.checked_out)
+
+    def test_session_replaces_connection_after_error(self):
+        with self.driver._ssh_session():
+            self.assertRaises(processutils.ProcessExecutionError,
+                              self.driver._run_ssh, ['fail'])
+            self.assertEqual([], self.pool.checked_out)
+            self.driver._run_ssh(['cmd'])
+        self.assertEqual(['ssh1', 'ssh2'], self.used)
+        self.assertEqual([], self.pool.checked_out)
+
+    def test_get_connection_stats(self):
+        self.assertEqual({'ssh': {'size': 2}},
+                         self.driver.get_connection_stats())
+        self.driver.sshpool = None
+        self.assertEqual({}, self.driver.get_connection_stats())
@@ -29,6 +29,7 @@ from cinder import db
 from cinder import exception
 from cinder import manager
 from cinder import service
+from cinder.servicegroup.drivers import db as sg_db
 from cinder import test
 from cinder import wsgi
 
@@ -147,8 +148,9 @@ class ServiceTestCase(test.TestCase):
                                        binary).AndRaise(exception.NotFound())
         service.db.service_create(mox.IgnoreArg(),
                                   service_create).AndReturn(service_ref)
-        service.db.service_get(mox.IgnoreArg(),
-                               mox.IgnoreArg()).AndRaise(Exception())
+        self.mox.StubOutWithMock(sg_db.db, 'service_heartbeat')
+        sg_db.db.service_heartbeat(mox.IgnoreArg(), service_ref['id'],
+                                   'nova').AndRaise(Exception())
 
         self.mox.ReplayAll()
         serv = service.Service(host,
@@ -180,10 +182,9 @@ class ServiceTestCase(test.TestCase):
                                        binary).AndRaise(exception.NotFound())
         service.db.service_create(mox.IgnoreArg(),
                                   service_create).AndReturn(service_ref)
-        service.db.service_get(mox.IgnoreArg(),
-                               service_ref['id']).AndReturn(service_ref)
-        service.db.service_update(mox.IgnoreArg(), service_ref['id'],
-                                  mox.ContainsKeyValue('report_count', 1))
+        self.mox.StubOutWithMock(sg_db.db, 'service_heartbeat')
+        sg_db.db.service_heartbeat(mox.IgnoreArg(), service_ref['id'],
+                                   'nova')
 
         self.mox.ReplayAll()
         serv = service.Service(host,
@@ -196,6 +197,39 @@ class ServiceTestCase(test.TestCase):
 
         self.assertFalse(serv.model_disconnected)
 
+    def test_report_state_recreates_service(self):
+        host = 'foo'
+        binary = 'bar'
+        topic = 'test'
+        service_ref = {'host': host,
+                       'binary': binary,
+                       'topic': topic,
+                       'report_count': 0,
+                       'availability_zone': 'nova',
+                       'id': 1}
+        new_service_ref = dict(service_ref, id=2)
+
+        service.db.service_get_by_args(mox.IgnoreArg(),
+                                       host,
+                                       binary).AndReturn(service_ref)
+        self.mox.StubOutWithMock(sg_db.db, 'service_heartbeat')
+        sg_db.db.service_heartbeat(
+            mox.IgnoreArg(), 1, 'nova').AndRaise(
+                exception.ServiceNotFound(service_id=1))
+        service.db.service_create(mox.IgnoreArg(),
+                                  mox.IgnoreArg()).AndReturn(new_service_ref)
+        sg_db.db.service_heartbeat(mox.IgnoreArg(), 2, 'nova')
+
+        self.mox.ReplayAll()
+        serv = service.Service(host,
+                               binary,
+                               topic,
+                               'cinder.tests.test_service.FakeManager')
+        serv.start()
+        serv.report_state()
+        self.assertEqual(2, serv.service_id)
+        self.assertFalse(serv.model_disconnected)
+
     def test_service_with_long_report_interval(self):
         CONF.set_override('service_down_time', 10)
         CONF.set_override('report_interval', 10)
@@ -0,0 +1,135 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import datetime
+import os
+import shutil
+import tempfile
+import time
+
+import mock
+
+from cinder import context
+from cinder import db
+from cinder import exception
+from cinder.openstack.common import timeutils
+from cinder import servicegroup
+from cinder.servicegroup.drivers import db as db_driver
+from cinder.servicegroup.drivers import file as file_driver
+from cinder import test
+
+
+class ServiceGroupAPITestCase(test.TestCase):
+
+    def test_default_driver(self):
+        self.assertIsInstance(servicegroup.API(), db_driver.DbDriver)
+
+    def test_configured_driver(self):
+        self.flags(servicegroup_driver='cinder.servicegroup.drivers.file.'
+                                       'FileDriver')
+        self.assertIsInstance(servicegroup.API(), file_driver.FileDriver)
+
+
+class DbDriverTestCase(test.TestCase):
+
+    def setUp(self):
+        super(DbDriverTestCase, self).setUp()
+        self.ctxt = context.get_admin_context()
+        self.flags(service_down_time=60)
+        self.driver = db_driver.DbDriver()
+        self.service = db.service_create(self.ctxt,
+                                         {'host': 'host1',
+                                          'binary': 'cinder-volume',
+                                          'topic': 'cinder-volume',
+                                          'report_count': 0})
+
+    def tearDown(self):
+        timeutils.clear_time_override()
+        super(DbDriverTestCase, self).tearDown()
+
+    def test_heartbeat(self):
+        now = datetime.datetime(2014, 1, 1, 12, 0, 0)
+        timeutils.set_time_override(now)
+        self.driver.heartbeat(self.ctxt, self.service, 'nova')
+        service = db.service_get(self.ctxt, self.service['id'])
+        self.assertEqual(1, service['report_count'])
+        self.assertEqual(now, self.driver.get_updated_time(service))
+        self.assertTrue(self.driver.is_up(service))
+
+        timeutils.advance_time_seconds(61)
+        self.assertFalse(self.driver.is_up(service))
+
+    def test_heartbeat_deleted_service(self):
+        db.service_destroy(self.ctxt, self.service['id'])
+        self.assertRaises(exception.ServiceNotFound,
+                          self.driver.heartbeat, self.ctxt, self.service,
+                          'nova')
+
+
+class FileDriverTestCase(test.TestCase):
+
+    def setUp(self):
+        super(FileDriverTestCase, self).setUp()
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.path = os.path.join(self.tmpdir, 'servicegroup')
+        self.flags(servicegroup_file_path=self.path,
+                   service_down_time=60)
+        self.driver = file_driver.FileDriver()
+        self.service = {'id': 1,
+                        'host': 'host1@lvm',
+                        'binary': 'cinder-volume',
+                        'topic': 'cinder-volume'}
+        patcher = mock.patch.object(db, 'service_get')
+        self.service_get = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_no_heartbeat(self):
+        self.assertFalse(self.driver.is_up(self.service))
+        self.assertIsNone(self.driver.get_updated_time(self.service))
+
+    @mock.patch.object(time, 'time')
+    def test_heartbeat(self, mock_time):
+        mock_time.return_value = 1388577600.0
+        self.driver.heartbeat(None, self.service, 'nova')
+        self.assertEqual(['cinder-volume.host1@lvm'], os.listdir(self.path))
+        self.assertTrue(self.driver.is_up(self.service))
+        self.assertEqual(datetime.datetime(2014, 1, 1, 12, 0, 0),
+                         self.driver.get_updated_time(self.service))
+
+        mock_time.return_value += 61
+        self.assertFalse(self.driver.is_up(self.service))
+
+        self.driver.heartbeat(None, self.service, 'nova')
+        self.assertTrue(self.driver.is_up(self.service))
+
+    def test_heartbeat_does_not_write_db(self):
+        with mock.patch.object(db, 'service_heartbeat') as heartbeat:
+            self.driver.heartbeat(None, self.service, 'nova')
+        self.assertFalse(heartbeat.called)
+        self.assertTrue(self.driver.is_up(self.service))
+
+    @mock.patch.object(time, 'time')
+    def test_heartbeat_checks_service_row(self, mock_time):
+        mock_time.return_value = 1388577600.0
+        self.driver.heartbeat('ctxt', self.service, 'nova')
+        self.driver.heartbeat('ctxt', self.service, 'nova')
+        self.service_get.assert_called_once_with('ctxt', 1)
+
+        mock_time.return_value += 60
+        self.service_get.side_effect = exception.ServiceNotFound(
+            service_id=1)
+        self.assertRaises(exception.ServiceNotFound,
+                          self.driver.heartbeat, 'ctxt', self.service, 'nova')
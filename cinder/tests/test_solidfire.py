@@ -46,6 +46,7 @@ class SolidFireVolumeTestCase(test.TestCase):
         self.configuration.san_is_local = True
         self.configuration.sf_emulate_512 = True
         self.configuration.sf_account_prefix = 'cinder'
+        self.configuration.sf_api_timeout = 60
 
         super(SolidFireVolumeTestCase, self).setUp()
         self.stubs.Set(SolidFireDriver, '_issue_api_request',
@@ -2663,3 +2663,91 @@ class StorwizeHelpersTestCase(test.TestCase):
         with mock.patch.object(ssh.StorwizeSSH, 'lslicense') as lslicense:
             lslicense.return_value = fake_license
             self.assertTrue(self.helpers.compression_enabled())
+
+    def _fake_lshost(self, hosts):
+        def lshost(host=None):
+            if host is None:
+                raw = 'id!name\n' + ''.join('%d!%s\n' % (i, name) for i, name
+                                            in enumerate(sorted(hosts)))
+                return ssh.CLIResponse(raw, with_header=True)
+            if host not in hosts:
+                raise exception.VolumeBackendAPIException(data='CMMVC5754E')
+            raw = 'name!%s\n' % host
+            raw += ''.join('iscsi_name!%s\n' % port for port in hosts[host])
+            return ssh.CLIResponse(raw, with_header=False)
+        return lshost
+
+    def test_get_host_from_connector_uses_index(self):
+        hosts = {'host1': ['iqn.1'], 'host2': ['iqn.2']}
+        self.helpers.host_index_ttl = 300
+        with mock.patch.object(ssh.StorwizeSSH, 'lshost') as lshost:
+            lshost.side_effect = self._fake_lshost(hosts)
+            self.assertEqual('host2', self.helpers.get_host_from_connector(
+                {'initiator': 'iqn.2'}))
+            self.assertEqual(3, lshost.call_count)
+
+            # A hit is only checked against its host, a miss is trusted.
+            lshost.reset_mock()
+            self.assertEqual('host1', self.helpers.get_host_from_connector(
+                {'initiator': 'iqn.1'}))
+            self.assertIsNone(self.helpers.get_host_from_connector(
+                {'initiator': 'iqn.3'}))
+            lshost.assert_called_once_with(host='host1')
+
+    def test_get_host_from_connector_index_mismatch(self):
+        hosts = {'host1': ['iqn.1']}
+        with mock.patch.object(ssh.StorwizeSSH, 'lshost') as lshost:
+            lshost.side_effect = self._fake_lshost(hosts)
+            self.helpers.get_host_from_connector({'initiator': 'iqn.1'})
+            del hosts['host1']
+            hosts['host3'] = ['iqn.1']
+            self.assertEqual('host3', self.helpers.get_host_from_connector(
+                {'initiator': 'iqn.1'}))
+
+    def test_index_follows_create_delete_host(self):
+        hosts = {}
+        self.helpers.host_index_ttl = 300
+        with mock.patch.object(ssh.StorwizeSSH, 'lshost') as lshost:
+            lshost.side_effect = self._fake_lshost(hosts)
+            connector = {'host': 'compute1', 'initiator': 'iqn.1'}
+            self.assertIsNone(self.helpers.get_host_from_connector(connector))
+            with mock.patch.object(ssh.StorwizeSSH, 'mkhost'):
+                host_name = self.helpers.create_host(connector)
+            hosts[host_name] = ['iqn.1']
+            self.assertEqual(host_name,
+                             self.helpers.get_host_from_connector(connector))
+
+            with mock.patch.object(ssh.StorwizeSSH, 'rmhost'):
+                self.helpers.delete_host(host_name)
+            del hosts[host_name]
+            lshost.reset_mock()
+            self.assertIsNone(self.helpers.get_host_from_connector(connector))
+            self.assertFalse(lshost.called)
+
+    def test_host_created_elsewhere(self):
+        hosts = {}
+        self.helpers.host_index_ttl = 300
+        connector = {'host': 'compute1', 'initiator': 'iqn.1'}
+        with mock.patch.object(ssh.StorwizeSSH, 'lshost') as lshost:
+            lshost.side_effect = self._fake_lshost(hosts)
+            self.assertIsNone(self.helpers.get_host_from_connector(connector))
+            hosts['other'] = ['iqn.1']
+            # The miss is trusted until asked to rebuild the index.
+            self.assertIsNone(self.helpers.get_host_from_connector(connector))
+            self.assertEqual('other', self.helpers.get_host_from_connector(
+                connector, rebuild_index=True))
+
+            self.helpers._build_host_index()
+            del hosts['other']
+            self.helpers._build_host_index()
+            hosts['other'] = ['iqn.1']
+            # mkhost fails because the port already belongs to a host.
+            with mock.patch.object(ssh.StorwizeSSH, 'mkhost') as mkhost:
+                mkhost.side_effect = exception.VolumeBackendAPIException(
+                    data='CMMVC6581E')
+                self.assertEqual('other',
+                                 self.helpers.create_host(connector))
+
+                hosts.clear()
+                self.assertRaises(exception.VolumeBackendAPIException,
+                                  self.helpers.create_host, connector)
@@ -20,6 +20,7 @@ import socket
 import tempfile
 import uuid
 
+import eventlet
 import mock
 from oslo.config import cfg
 import paramiko
@@ -31,6 +32,7 @@ from cinder.brick.initiator import linuxfc
 from cinder import exception
 from cinder.openstack.common import processutils as putils
 from cinder.openstack.common import timeutils
+from cinder import rootwrap_daemon
 from cinder import test
 from cinder import utils
 
@@ -127,6 +129,55 @@ grep foo
             os.unlink(tmpfilename2)
 
 
+class RootwrapDaemonExecuteTestCase(test.TestCase):
+    def setUp(self):
+        super(RootwrapDaemonExecuteTestCase, self).setUp()
+        self.flags(use_rootwrap_daemon=True)
+        self.client = mock.Mock()
+        patchers = [mock.patch.object(utils, '_get_rootwrap_daemon',
+                                      return_value=self.client),
+                    mock.patch.object(os, 'geteuid', return_value=1000),
+                    mock.patch.object(putils, 'execute')]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_execute_uses_daemon(self):
+        self.client.execute.return_value = ('out', 'err')
+        self.assertEqual(('out', 'err'),
+                         utils.execute('lvs', run_as_root=True,
+                                       root_helper=utils.get_root_helper(),
+                                       check_exit_code=False))
+        self.client.execute.assert_called_once_with('lvs',
+                                                    check_exit_code=False)
+        self.assertFalse(putils.execute.called)
+
+    def test_execute_falls_back_to_rootwrap(self):
+        self.client.execute.side_effect = (
+            rootwrap_daemon.DaemonUnavailable())
+        utils.execute('lvs', run_as_root=True)
+        putils.execute.assert_called_once_with(
+            'lvs', run_as_root=True, root_helper=utils.get_root_helper())
+
+    def test_execute_daemon_backing_off(self):
+        self.client.available.return_value = False
+        utils.execute('lvs', run_as_root=True)
+        self.assertFalse(self.client.execute.called)
+        putils.execute.assert_called_once_with(
+            'lvs', run_as_root=True, root_helper=utils.get_root_helper())
+
+    def test_execute_custom_root_helper(self):
+        utils.execute('lvs', run_as_root=True, root_helper='sudo')
+        self.assertFalse(self.client.execute.called)
+        putils.execute.assert_called_once_with(
+            'lvs', run_as_root=True, root_helper='sudo')
+
+    def test_execute_not_as_root(self):
+        utils.execute('ls')
+        self.assertFalse(self.client.execute.called)
+        putils.execute.assert_called_once_with('ls')
+
+
 class GetFromPathTestCase(test.TestCase):
     def test_tolerates_nones(self):
         f = utils.get_from_path
@@ -730,6 +781,12 @@ class FakeSSHClient(object):
     def set_missing_host_key_policy(self, policy):
         pass
 
+    def load_system_host_keys(self):
+        pass
+
+    def load_host_keys(self, filename):
+        pass
+
     def connect(self, ip, port=22, username=None, password=None,
                 pkey=None, timeout=10):
         pass
@@ -761,6 +818,9 @@ class FakeTransport(object):
     def is_active(self):
         return self.active
 
+    def send_ignore(self):
+        pass
+
 
 class SSHPoolTestCase(test.TestCase):
     """Unit test for SSH Connection Pool."""
@@ -827,6 +887,105 @@ class SSHPoolTestCase(test.TestCase):
 
         self.assertNotEqual(first_id, third_id)
 
+    @mock.patch('paramiko.SSHClient')
+    def test_check_idle_replaces_dead_connections(self, mock_sshclient):
+        mock_sshclient.side_effect = lambda: FakeSSHClient()
+        sshpool = utils.SSHPool("127.0.0.1", 22, 10,
+                                "test",
+                                password="test",
+                                min_size=2,
+                                max_size=4)
+        # The min_size connections are opened up front.
+        self.assertEqual(2, len(sshpool.free_items))
+        dead, alive = list(sshpool.free_items)
+        dead.get_transport().active = False
+
+        sshpool.check_idle()
+
+        self.assertEqual(2, sshpool.current_size)
+        self.assertEqual(2, len(sshpool.free_items))
+        self.assertIn(alive, sshpool.free_items)
+        self.assertNotIn(dead, sshpool.free_items)
+        stats = sshpool.get_stats()
+        self.assertEqual(3, stats['created'])
+        self.assertEqual(1, stats['replaced'])
+
+    @mock.patch('paramiko.SSHClient')
+    def test_check_idle_failed_probe(self, mock_sshclient):
+        mock_sshclient.side_effect = lambda: FakeSSHClient()
+        sshpool = utils.SSHPool("127.0.0.1", 22, 10,
+                                "test",
+                                password="test",
+                                min_size=1,
+                                max_size=1)
+        ssh = sshpool.free_items[0]
+        ssh.get_transport().send_ignore = mock.Mock(
+            side_effect=EOFError())
+
+        sshpool.check_idle()
+
+        self.assertEqual(1, sshpool.current_size)
+        self.assertIsNot(ssh, sshpool.free_items[0])
+
+    @mock.patch('paramiko.SSHClient')
+    def test_check_idle_wakes_waiter(self, mock_sshclient):
+        mock_sshclient.side_effect = lambda: FakeSSHClient()
+        sshpool = utils.SSHPool("127.0.0.1", 22, 10,
+                                "test",
+                                password="test",
+                                min_size=1,
+                                max_size=1)
+        ssh = sshpool.free_items[0]
+        # The probe yields, the waiter then blocks on the empty pool.
+        ssh.get_transport().send_ignore = lambda: eventlet.sleep(0)
+        waiter = eventlet.spawn(sshpool.get)
+
+        sshpool.check_idle()
+
+        with eventlet.Timeout(1):
+            self.assertIs(ssh, waiter.wait())
+        self.assertEqual(0, len(sshpool.free_items))
+
+    @mock.patch('paramiko.SSHClient')
+    def test_stats(self, mock_sshclient):
+        mock_sshclient.side_effect = lambda: FakeSSHClient()
+        sshpool = utils.SSHPool("127.0.0.1", 22, 10,
+                                "test",
+                                password="test",
+                                min_size=1,
+                                max_size=2)
+        with sshpool.item():
+            with sshpool.item():
+                pass
+        stats = sshpool.get_stats()
+        self.assertEqual(2, stats['gets'])
+        self.assertEqual(2, stats['created'])
+        self.assertEqual(2, stats['size'])
+        self.assertEqual(2, stats['idle'])
+        self.assertTrue(stats['max_wait'] >= stats['avg_wait'] >= 0)
+
+    @mock.patch('cinder.openstack.common.loopingcall.'
+                'FixedIntervalLoopingCall')
+    @mock.patch('paramiko.SSHClient')
+    def test_start_health_check(self, mock_sshclient, mock_loopingcall):
+        mock_sshclient.side_effect = lambda: FakeSSHClient()
+        sshpool = utils.SSHPool("127.0.0.1", 22, 10,
+                                "test",
+                                password="test",
+                                min_size=1,
+                                max_size=1)
+        sshpool.start_health_check(0)
+        self.assertFalse(mock_loopingcall.called)
+
+        sshpool.start_health_check(60)
+        sshpool.start_health_check(60)
+        mock_loopingcall.assert_called_once_with(sshpool.check_idle)
+        mock_loopingcall.return_value.start.assert_called_once_with(
+            interval=60, initial_delay=60)
+
+        sshpool.stop_health_check()
+        mock_loopingcall.return_value.stop.assert_called_once_with()
+
 
 class BrickUtils(test.TestCase):
     """Unit test to test the brick utility
@@ -158,6 +158,8 @@ class VMwareEsxVmdkDriverTestCase(test.TestCase):
         self._config.vmware_task_poll_interval = self.TASK_POLL_INTERVAL
         self._config.vmware_image_transfer_timeout_secs = self.IMG_TX_TIMEOUT
         self._config.vmware_max_objects_retrieval = self.MAX_OBJECTS
+        self._config.vmware_backing_index_ttl = 0
+        self._config.vmware_inventory_cache_ttl = 0
         self._driver = vmdk.VMwareEsxVmdkDriver(configuration=self._config)
         api_retry_count = self._config.vmware_api_retry_count,
         task_poll_interval = self._config.vmware_task_poll_interval,
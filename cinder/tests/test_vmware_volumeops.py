@@ -103,6 +103,145 @@ class VolumeOpsTestCase(test.TestCase):
         self.vops.continue_retrieval.assert_called_once_with(retrieve_result2)
         self.vops.cancel_retrieval.assert_called_with(retrieve_result)
 
+    def test_get_backing_indexed(self):
+        vops = volumeops.VMwareVolumeOps(self.session, self.MAX_OBJECTS,
+                                         backing_index_ttl=600)
+        vm1 = self.vm('vol-1')
+        vm1.obj = mock.sentinel.vm1
+        vm2 = self.vm('vol-2')
+        vm2.obj = mock.sentinel.vm2
+        page1 = mock.Mock(spec=object)
+        page1.objects = [vm1]
+        page2 = mock.Mock(spec=object)
+        page2.objects = [vm2]
+        vops.continue_retrieval = mock.Mock(side_effect=[page2, None])
+        vops.get_entity_name = mock.Mock(return_value='vol-1')
+        self.session.invoke_api.return_value = page1
+
+        # The first lookup lists all the VMs.
+        self.assertEqual(mock.sentinel.vm2, vops.get_backing('vol-2'))
+        self.assertEqual(2, vops.continue_retrieval.call_count)
+        self.session.invoke_api.assert_called_once_with(vim_util,
+                                                        'get_objects',
+                                                        self.session.vim,
+                                                        'VirtualMachine',
+                                                        self.MAX_OBJECTS)
+
+        # Later ones only check the name of the indexed backing.
+        self.session.invoke_api.reset_mock()
+        self.assertEqual(mock.sentinel.vm1, vops.get_backing('vol-1'))
+        vops.get_entity_name.assert_called_once_with(mock.sentinel.vm1)
+        self.assertFalse(self.session.invoke_api.called)
+
+    def test_get_backing_indexed_stale(self):
+        vops = volumeops.VMwareVolumeOps(self.session, self.MAX_OBJECTS,
+                                         backing_index_ttl=600)
+        vops._backing_index = {'vol-1': mock.sentinel.old_vm}
+        vops._backing_index_time = volumeops.time.time()
+        vops.get_entity_name = mock.Mock(
+            side_effect=error_util.VimFaultException(
+                ['ManagedObjectNotFound'], 'not found'))
+        vm = self.vm('vol-1')
+        vm.obj = mock.sentinel.new_vm
+        page = mock.Mock(spec=object)
+        page.objects = [vm]
+        self.session.invoke_api.return_value = page
+        vops.continue_retrieval = mock.Mock(return_value=None)
+
+        self.assertEqual(mock.sentinel.new_vm, vops.get_backing('vol-1'))
+        self.assertIsNone(vops.get_backing('vol-2'))
+
+    def test_backing_index_follows_operations(self):
+        vops = volumeops.VMwareVolumeOps(self.session, self.MAX_OBJECTS,
+                                         backing_index_ttl=600)
+        backing = mock.Mock(value='vm-1')
+        vops._index_backing('vol-1', backing)
+        self.assertEqual({'vol-1': backing}, vops._backing_index)
+        vops.delete_backing(mock.Mock(value='vm-1'))
+        self.assertEqual({}, vops._backing_index)
+
+    def test_inventory_cache(self):
+        vops = volumeops.VMwareVolumeOps(self.session, self.MAX_OBJECTS,
+                                         inventory_cache_ttl=300)
+        datastore = mock.Mock(value='ds-1')
+        summary = mock.Mock(spec=object)
+        summary.name = 'ds1'
+        summary.freeSpace = 10 * units.GiB
+        self.session.invoke_api.return_value = summary
+
+        self.assertEqual(summary, vops.get_summary(datastore))
+        self.assertEqual(summary, vops.get_summary(mock.Mock(value='ds-1')))
+        self.session.invoke_api.assert_called_once_with(vim_util,
+                                                        'get_object_property',
+                                                        self.session.vim,
+                                                        datastore,
+                                                        'summary')
+
+        # Space used by our own backings is accounted for right away.
+        vops._consume_space('ds1', units.MiB)
+        self.assertEqual(9 * units.GiB,
+                         vops.get_summary(datastore).freeSpace)
+
+    def test_inventory_cache_follows_operations(self):
+        vops = volumeops.VMwareVolumeOps(self.session, self.MAX_OBJECTS,
+                                         inventory_cache_ttl=300)
+        datastore = mock.Mock(value='ds-1')
+        backing = mock.Mock(value='vm-1')
+        vops._cached(('summary', 'ds-1'), mock.Mock())
+        vops._cached(('dc', 'vm-1'), mock.Mock())
+        vops._cached(('dc', 'vm-2'), mock.Mock())
+        vops._get_relocate_spec = mock.Mock()
+        vops._get_clone_spec = mock.Mock()
+        vops._get_folder = mock.Mock()
+
+        # Copying disks uses space this cache cannot account for.
+        vops.relocate_backing(backing, datastore, mock.sentinel.rp,
+                              mock.sentinel.host)
+        self.assertNotIn(('summary', 'ds-1'), vops._inventory)
+        vops._cached(('summary', 'ds-1'), mock.Mock())
+        vops.clone_backing('vol-2', backing, mock.sentinel.snapshot,
+                           volumeops.FULL_CLONE_TYPE, datastore)
+        self.assertNotIn(('summary', 'ds-1'), vops._inventory)
+
+        vops.delete_backing(backing)
+        self.assertEqual([('dc', 'vm-2')], vops._inventory.keys())
+
+    @mock.patch('eventlet.greenthread.spawn_n')
+    def test_inventory_cache_refresh(self, spawn_n):
+        vops = volumeops.VMwareVolumeOps(self.session, self.MAX_OBJECTS,
+                                         inventory_cache_ttl=300)
+        fetch = mock.Mock(side_effect=[mock.sentinel.old, mock.sentinel.new])
+        self.assertEqual(mock.sentinel.old, vops._cached(('key',), fetch))
+        vops._inventory[('key',)]['time'] -= 301
+
+        # Expired entries are still used while refreshed in the background.
+        self.assertEqual(mock.sentinel.old, vops._cached(('key',), fetch))
+        self.assertEqual(mock.sentinel.old, vops._cached(('key',), fetch))
+        spawn_n.assert_called_once_with(vops._refresh_cached, ('key',),
+                                        fetch)
+        vops._refresh_cached(('key',), fetch)
+        self.assertEqual(mock.sentinel.new, vops._cached(('key',), fetch))
+
+        fetch.side_effect = error_util.VimException('error')
+        vops._refresh_cached(('key',), fetch)
+        self.assertNotIn(('key',), vops._inventory)
+
+    def test_get_hosts_cached(self):
+        vops = volumeops.VMwareVolumeOps(self.session, self.MAX_OBJECTS,
+                                         inventory_cache_ttl=300)
+        page1 = mock.Mock(spec=object)
+        page1.objects = [mock.sentinel.host1]
+        page2 = mock.Mock(spec=object)
+        page2.objects = [mock.sentinel.host2]
+        self.session.invoke_api.return_value = page1
+        vops.continue_retrieval = mock.Mock(side_effect=[page2, None])
+
+        hosts = vops.get_hosts()
+        self.assertEqual([mock.sentinel.host1, mock.sentinel.host2],
+                         hosts.objects)
+        self.assertIs(hosts, vops.get_hosts())
+        self.assertEqual(1, self.session.invoke_api.call_count)
+
     def test_delete_backing(self):
         backing = mock.sentinel.backing
         task = mock.sentinel.task
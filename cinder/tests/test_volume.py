@@ -43,6 +43,7 @@ from cinder import keymgr
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import importutils
 from cinder.openstack.common import jsonutils
+from cinder.openstack.common import processutils
 import cinder.policy
 from cinder import quota
 from cinder import test
@@ -58,6 +59,7 @@ import cinder.volume
 from cinder.volume import configuration as conf
 from cinder.volume import driver
 from cinder.volume.drivers import lvm
+from cinder.volume import locks
 from cinder.volume.manager import VolumeManager
 from cinder.volume import rpcapi as volume_rpcapi
 from cinder.volume import utils as volutils
@@ -154,6 +156,119 @@ class VolumeTestCase(BaseVolumeTestCase):
         self.assertEqual("error", volume['status'])
         self.volume.delete_volume(self.context, volume_id)
 
+    def test_init_host_ensures_exports_in_bulk(self):
+        volume = tests_utils.create_volume(self.context, status='in-use',
+                                           size=1, host=CONF.host)
+        failed = tests_utils.create_volume(self.context, status='in-use',
+                                           size=1, host=CONF.host)
+        tests_utils.create_volume(self.context, status='available',
+                                  size=1, host=CONF.host)
+
+        def fake_ensure_exports(ctxt, volumes):
+            self.assertEqual(set([volume['id'], failed['id']]),
+                             set(vol['id'] for vol in volumes))
+            return {failed['id']: exception.NotFound()}
+
+        self.stubs.Set(self.volume.driver, 'ensure_exports',
+                       fake_ensure_exports)
+        self.stubs.Set(self.volume.driver, 'ensure_export',
+                       lambda ctxt, vol: self.fail('not called in bulk'))
+        self.volume.init_host()
+        self.volume.wait_for_startup_tasks()
+
+        admin_context = context.get_admin_context()
+        self.assertEqual('in-use',
+                         db.volume_get(admin_context, volume['id'])['status'])
+        self.assertEqual('error',
+                         db.volume_get(admin_context, failed['id'])['status'])
+        self.assertEqual(2, self.volume.stats['allocated_capacity_gb'])
+
+    def test_init_host_ensure_export_fallback(self):
+        volume = tests_utils.create_volume(self.context, status='in-use',
+                                           size=1, host=CONF.host)
+        failed = tests_utils.create_volume(self.context, status='in-use',
+                                           size=1, host=CONF.host)
+        exported = []
+
+        def fake_ensure_export(ctxt, vol):
+            if vol['id'] == failed['id']:
+                raise exception.ISCSITargetCreateFailed(volume_id=vol['id'])
+            exported.append(vol['id'])
+
+        def fake_ensure_exports(ctxt, volumes):
+            raise NotImplementedError()
+
+        self.stubs.Set(self.volume.driver, 'ensure_exports',
+                       fake_ensure_exports)
+        self.stubs.Set(self.volume.driver, 'ensure_export',
+                       fake_ensure_export)
+        self.volume.init_host()
+        self.volume.wait_for_startup_tasks()
+
+        admin_context = context.get_admin_context()
+        self.assertEqual([volume['id']], exported)
+        self.assertEqual('in-use',
+                         db.volume_get(admin_context, volume['id'])['status'])
+        self.assertEqual('error',
+                         db.volume_get(admin_context, failed['id'])['status'])
+
+    def test_init_host_runs_startup_tasks_in_background(self):
+        in_use = tests_utils.create_volume(self.context, status='in-use',
+                                           size=1, host=CONF.host)
+        deleting = tests_utils.create_volume(self.context, status='deleting',
+                                             size=1, host=CONF.host)
+        calls = []
+
+        def fake_ensure_exports(ctxt, volumes):
+            calls.append(('ensure_exports',
+                          [volume['id'] for volume in volumes]))
+            return {}
+
+        def fake_delete_volume(ctxt, volume_id):
+            calls.append(('delete_volume', volume_id))
+
+        def fake_publish(ctxt):
+            calls.append(('publish', self.volume.driver.initialized))
+
+        self.stubs.Set(self.volume.driver, 'ensure_exports',
+                       fake_ensure_exports)
+        self.stubs.Set(self.volume, 'delete_volume', fake_delete_volume)
+        self.stubs.Set(self.volume, 'publish_service_capabilities',
+                       fake_publish)
+        self.volume.init_host()
+
+        # Capabilities are published before any of the startup work ran.
+        self.assertEqual([('publish', True)], calls)
+        self.volume.wait_for_startup_tasks()
+        self.assertEqual([('publish', True),
+                          ('ensure_exports', [in_use['id']]),
+                          ('delete_volume', deleting['id'])], calls)
+
+    def test_init_host_bounds_startup_concurrency(self):
+        self.volume.configuration.volume_service_startup_workers = 2
+        for _i in range(5):
+            tests_utils.create_volume(self.context, status='in-use',
+                                      size=1, host=CONF.host)
+        running = [0]
+        peak = [0]
+
+        def fake_ensure_exports(ctxt, volumes):
+            raise NotImplementedError()
+
+        def fake_ensure_export(ctxt, volume):
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            eventlet.sleep(0.01)
+            running[0] -= 1
+
+        self.stubs.Set(self.volume.driver, 'ensure_exports',
+                       fake_ensure_exports)
+        self.stubs.Set(self.volume.driver, 'ensure_export',
+                       fake_ensure_export)
+        self.volume.init_host()
+        self.volume.wait_for_startup_tasks()
+        self.assertEqual(2, peak[0])
+
     @mock.patch.object(QUOTAS, 'reserve')
     @mock.patch.object(QUOTAS, 'commit')
     @mock.patch.object(QUOTAS, 'rollback')
@@ -488,6 +603,107 @@ class VolumeTestCase(BaseVolumeTestCase):
             mock_loads.side_effect = exception.CinderException('test')
             self.assertRaises(exception.CinderException, VolumeManager)
 
+    def test_report_driver_status_without_stats(self):
+        manager = VolumeManager()
+        manager.driver.set_initialized()
+        with mock.patch.object(manager._stats_collector, 'get_stats',
+                               return_value=(None, None)):
+            manager._report_driver_status(self.context)
+        self.assertIsNone(manager.last_capabilities)
+
+    def test_report_driver_status_cheap_stats(self):
+        manager = VolumeManager()
+        manager.driver.set_initialized()
+        with mock.patch.object(manager.driver, 'get_cheap_volume_stats',
+                               return_value={'fake_cheap': 1}):
+            manager._report_driver_status(self.context)
+        self.assertEqual(1, manager.last_capabilities['fake_cheap'])
+        self.assertIn('free_capacity_gb', manager.last_capabilities)
+
+    @mock.patch('cinder.volume.manager.LOG')
+    def test_report_db_pool_stats(self, mock_log):
+        manager = VolumeManager()
+        stats = {'primary': {'checkouts': 2}, 'slave': {'checkouts': 1}}
+        with mock.patch.object(manager.db, 'get_pool_stats',
+                               return_value=stats):
+            manager._report_db_pool_stats(self.context)
+        self.assertEqual(
+            [{'engine': 'primary', 'stats': {'checkouts': 2}},
+             {'engine': 'slave', 'stats': {'checkouts': 1}}],
+            [call[0][1] for call in mock_log.debug.call_args_list])
+
+    def test_publish_unchanged_capabilities_as_keepalive(self):
+        manager = VolumeManager()
+        seed = manager._capabilities_seed
+        self.assertNotEqual(seed, VolumeManager()._capabilities_seed)
+        with mock.patch.object(manager.scheduler_rpcapi,
+                               'update_service_capabilities') as mock_update:
+            manager.update_service_capabilities({'free_capacity_gb': 10})
+            manager._publish_service_capabilities(self.context)
+            mock_update.assert_called_once_with(
+                self.context, manager.service_name, manager.host,
+                {'free_capacity_gb': 10}, generation=[seed, 1])
+
+            mock_update.reset_mock()
+            manager.update_service_capabilities({'free_capacity_gb': 10})
+            manager._publish_service_capabilities(self.context)
+            mock_update.assert_called_once_with(
+                self.context, manager.service_name, manager.host,
+                None, generation=[seed, 1])
+
+            mock_update.reset_mock()
+            manager._publish_service_capabilities(self.context, force=True)
+            mock_update.assert_called_once_with(
+                self.context, manager.service_name, manager.host,
+                {'free_capacity_gb': 10}, generation=[seed, 1])
+
+            mock_update.reset_mock()
+            manager.update_service_capabilities({'free_capacity_gb': 9})
+            manager._publish_service_capabilities(self.context)
+            mock_update.assert_called_once_with(
+                self.context, manager.service_name, manager.host,
+                {'free_capacity_gb': 9}, generation=[seed, 2])
+
+    @mock.patch('eventlet.greenthread.spawn_after')
+    def test_push_capabilities_coalesced(self, mock_spawn_after):
+        self.flags(capabilities_push_delay=5)
+        manager = VolumeManager()
+        manager._push_capabilities(self.context)
+        manager._push_capabilities(self.context)
+        mock_spawn_after.assert_called_once_with(
+            5, manager._run_capabilities_push)
+
+        with contextlib.nested(
+                mock.patch.object(manager, '_report_driver_status'),
+                mock.patch.object(manager, '_publish_service_capabilities')
+        ) as (mock_report, mock_publish):
+            manager._run_capabilities_push()
+            mock_report.assert_called_once_with(mock.ANY, refresh=False)
+            self.assertTrue(mock_publish.called)
+
+        manager._push_capabilities(self.context)
+        self.assertEqual(2, mock_spawn_after.call_count)
+
+    def test_push_capabilities_reuses_driver_stats(self):
+        self.flags(capabilities_push_delay=0)
+        manager = VolumeManager()
+        manager.driver.set_initialized()
+        manager.stats['allocated_capacity_gb'] = 10
+        manager._report_driver_status(self.context)
+        free = manager.last_capabilities['free_capacity_gb']
+
+        manager.stats['allocated_capacity_gb'] += 1
+        with contextlib.nested(
+                mock.patch.object(manager.driver, 'get_volume_stats'),
+                mock.patch.object(manager, '_publish_service_capabilities')
+        ) as (mock_stats, mock_publish):
+            manager._push_capabilities(self.context)
+        self.assertFalse(mock_stats.called)
+        self.assertTrue(mock_publish.called)
+        self.assertEqual(free, manager.last_capabilities['free_capacity_gb'])
+        self.assertEqual(11,
+                         manager.last_capabilities['allocated_capacity_gb'])
+
     def test_delete_busy_volume(self):
         """Test volume survives deletion if driver reports it as busy."""
         volume = tests_utils.create_volume(self.context, **self.volume_params)
@@ -545,7 +761,7 @@ class VolumeTestCase(BaseVolumeTestCase):
         self.volume.delete_snapshot(self.context, snapshot_id)
         self.volume.delete_volume(self.context, volume_src['id'])
 
-    @mock.patch('cinder.volume.flows.api.create_volume.get_flow')
+    @mock.patch('cinder.volume.flows.api.create_volume.get_prebuilt_flow')
     def test_create_volume_from_snapshot_with_types(self, _get_flow):
         """Test volume create from snapshot with types including mistmatch."""
         volume_api = cinder.volume.api.API()
@@ -598,7 +814,7 @@ class VolumeTestCase(BaseVolumeTestCase):
         db.volume_type_destroy(context.get_admin_context(),
                                biz_type['id'])
 
-    @mock.patch('cinder.volume.flows.api.create_volume.get_flow')
+    @mock.patch('cinder.volume.flows.api.create_volume.get_prebuilt_flow')
     def test_create_volume_from_source_with_types(self, _get_flow):
         """Test volume create from source with types including mistmatch."""
         volume_api = cinder.volume.api.API()
@@ -690,7 +906,7 @@ class VolumeTestCase(BaseVolumeTestCase):
 
     def test_create_volume_from_snapshot_check_locks(self):
         # mock the synchroniser so we can record events
-        self.stubs.Set(utils, 'synchronized', self._mock_synchronized)
+        self.stubs.Set(locks, 'synchronized', self._mock_synchronized)
 
         self.stubs.Set(self.volume.driver, 'create_volume_from_snapshot',
                        lambda *args, **kwargs: None)
@@ -756,7 +972,7 @@ class VolumeTestCase(BaseVolumeTestCase):
 
     def test_create_volume_from_volume_check_locks(self):
         # mock the synchroniser so we can record events
-        self.stubs.Set(utils, 'synchronized', self._mock_synchronized)
+        self.stubs.Set(locks, 'synchronized', self._mock_synchronized)
 
         orig_flow = engine.ActionEngine.run
 
@@ -3036,6 +3252,78 @@ class LVMVolumeDriverTestCase(DriverTestCase):
 
         lvm_driver._delete_volume(fake_snapshot, is_snapshot=True)
 
+    def test_delete_volume_deferred_clear(self):
+        configuration = conf.Configuration(fake_opt, 'fake_group')
+        configuration.volume_clear = 'zero'
+        configuration.lvm_clear_deferred = True
+        vg_obj = mox.MockAnything()
+        lvm_driver = lvm.LVMVolumeDriver(configuration=configuration,
+                                         vg_obj=vg_obj)
+        volume = dict(self.FAKE_VOLUME, size=2)
+
+        self.mox.StubOutWithMock(volutils, 'clear_volume')
+        self.mox.StubOutWithMock(lvm.loopingcall,
+                                 'FixedIntervalLoopingCall')
+        loop = self.mox.CreateMockAnything()
+        vg_obj.rename_volume('test1', 'reclaim-test1')
+        lvm.loopingcall.FixedIntervalLoopingCall(
+            lvm_driver._reclaim_volumes).AndReturn(loop)
+        loop.start(interval=lvm_driver.RECLAIM_INTERVAL)
+        self.mox.ReplayAll()
+
+        lvm_driver._delete_volume(volume)
+        self.assertEqual({'reclaim-test1': 2}, lvm_driver._pending_reclaim)
+
+        self.mox.VerifyAll()
+
+    def test_reclaim_volumes(self):
+        configuration = conf.Configuration(fake_opt, 'fake_group')
+        configuration.volume_clear = 'zero'
+        configuration.volume_clear_size = 0
+        configuration.volume_clear_ionice = None
+        configuration.lvm_clear_bandwidth = 100
+        vg_obj = mox.MockAnything()
+        lvm_driver = lvm.LVMVolumeDriver(configuration=configuration,
+                                         vg_obj=vg_obj)
+        loop = self.mox.CreateMockAnything()
+        lvm_driver._reclaim_loop = loop
+        lvm_driver._pending_reclaim = {'reclaim-test1': '1.00'}
+
+        self.mox.StubOutWithMock(volutils, 'clear_volume')
+        volutils.clear_volume(
+            1024, '/dev/mapper/cinder--volumes-reclaim--test1',
+            volume_clear='zero', volume_clear_size=0,
+            volume_clear_ionice='-c3', volume_clear_bandwidth=100)
+        vg_obj.delete('reclaim-test1')
+        loop.stop()
+        self.mox.ReplayAll()
+
+        lvm_driver._reclaim_volumes()
+        self.assertEqual({}, lvm_driver._pending_reclaim)
+        self.assertIsNone(lvm_driver._reclaim_loop)
+
+    def test_reclaim_volumes_failure_retried(self):
+        configuration = conf.Configuration(fake_opt, 'fake_group')
+        configuration.volume_clear = 'zero'
+        vg_obj = mox.MockAnything()
+        lvm_driver = lvm.LVMVolumeDriver(configuration=configuration,
+                                         vg_obj=vg_obj)
+        lvm_driver._reclaim_loop = self.mox.CreateMockAnything()
+        lvm_driver._pending_reclaim = {'reclaim-test1': 1}
+
+        self.mox.StubOutWithMock(volutils, 'clear_volume')
+        volutils.clear_volume(
+            mox.IgnoreArg(), mox.IgnoreArg(), volume_clear=mox.IgnoreArg(),
+            volume_clear_size=mox.IgnoreArg(),
+            volume_clear_ionice=mox.IgnoreArg(),
+            volume_clear_bandwidth=mox.IgnoreArg()).AndRaise(
+                processutils.ProcessExecutionError)
+        self.mox.ReplayAll()
+
+        lvm_driver._reclaim_volumes()
+        self.assertEqual({'reclaim-test1': 1}, lvm_driver._pending_reclaim)
+        self.assertIsNotNone(lvm_driver._reclaim_loop)
+
 
 class ISCSITestCase(DriverTestCase):
     """Test Case for ISCSIDriver"""
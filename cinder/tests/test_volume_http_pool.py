@@ -0,0 +1,168 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the pooled HTTP connections of volume drivers."""
+
+import errno
+import httplib
+import socket
+import time
+
+import mock
+
+from cinder import test
+from cinder.volume import http_pool
+
+
+class FakeResponse(object):
+
+    def __init__(self, status=200, body='ok', will_close=False):
+        self.status = status
+        self.reason = 'OK'
+        self.will_close = will_close
+        self._body = body
+
+    def read(self):
+        return self._body
+
+
+class FakeConnection(object):
+
+    opened = []
+    errors = []
+    response_errors = []
+
+    def __init__(self, host, port, timeout=None):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.requests = []
+        self.closed = False
+        self.opened.append(self)
+
+    def request(self, method, url, body=None, headers=None):
+        if self.closed:
+            raise httplib.BadStatusLine('')
+        if self.errors:
+            raise self.errors.pop(0)
+        self.requests.append((method, url, body, headers))
+
+    def getresponse(self):
+        if self.response_errors:
+            raise self.response_errors.pop(0)
+        return FakeResponse()
+
+    def close(self):
+        self.closed = True
+
+
+class HTTPConnectionPoolTestCase(test.TestCase):
+
+    def setUp(self):
+        super(HTTPConnectionPoolTestCase, self).setUp()
+        self.stubs.Set(FakeConnection, 'opened', [])
+        self.stubs.Set(FakeConnection, 'errors', [])
+        self.stubs.Set(FakeConnection, 'response_errors', [])
+        self.stubs.Set(httplib, 'HTTPSConnection', FakeConnection)
+        self.sleeps = []
+        self.stubs.Set(time, 'sleep', self.sleeps.append)
+        self.pool = http_pool.HTTPConnectionPool('10.0.0.1', 443, timeout=30)
+
+    def test_connection_reused(self):
+        response, data = self.pool.request('POST', '/api', 'body',
+                                           {'Content-Type': 'text/xml'})
+        self.assertEqual(200, response.status)
+        self.assertEqual('ok', data)
+        self.pool.request('GET', '/api')
+
+        self.assertEqual(1, len(FakeConnection.opened))
+        conn = FakeConnection.opened[0]
+        self.assertEqual(('10.0.0.1', 443, 30),
+                         (conn.host, conn.port, conn.timeout))
+        self.assertEqual([('POST', '/api', 'body',
+                           {'Content-Type': 'text/xml'}),
+                          ('GET', '/api', None, None)], conn.requests)
+
+    def test_reconnect_after_idle_close(self):
+        self.pool.request('GET', '/api')
+        FakeConnection.opened[0].closed = True
+        self.pool.request('GET', '/api')
+        self.assertEqual(2, len(FakeConnection.opened))
+        self.assertEqual([], self.sleeps)
+
+    def test_response_error_not_resent(self):
+        self.pool.request('POST', '/api', 'create')
+        FakeConnection.response_errors.append(httplib.BadStatusLine(''))
+        self.assertRaises(httplib.BadStatusLine, self.pool.request,
+                          'POST', '/api', 'create')
+        self.assertEqual(1, len(FakeConnection.opened))
+        self.assertEqual(2, len(FakeConnection.opened[0].requests))
+
+    def test_idempotent_request_resent(self):
+        self.pool.request('GET', '/api')
+        FakeConnection.response_errors.append(
+            socket.error(errno.ECONNRESET, 'Connection reset by peer'))
+        self.pool.request('GET', '/api')
+        self.assertEqual(2, len(FakeConnection.opened))
+        self.assertEqual(1, len(FakeConnection.opened[1].requests))
+
+    def test_resend_disabled(self):
+        self.pool.request('GET', '/api/create')
+        FakeConnection.response_errors.append(
+            socket.error(errno.ECONNRESET, 'Connection reset by peer'))
+        self.assertRaises(socket.error, self.pool.request,
+                          'GET', '/api/create', resend=False)
+        self.assertEqual(1, len(FakeConnection.opened))
+        self.assertEqual(2, len(FakeConnection.opened[0].requests))
+
+    def test_old_idle_connection_not_reused(self):
+        self.pool.request('POST', '/api')
+        with mock.patch.object(time, 'time',
+                               return_value=time.time() + 60):
+            self.pool.request('POST', '/api')
+        self.assertEqual(2, len(FakeConnection.opened))
+        self.assertTrue(FakeConnection.opened[0].closed)
+
+    def test_connect_retried_with_backoff(self):
+        refused = socket.error(errno.ECONNREFUSED, 'Connection refused')
+        FakeConnection.errors.extend([refused, refused])
+        self.pool.request('GET', '/api')
+        self.assertEqual([1, 2], self.sleeps)
+
+        FakeConnection.errors.extend([refused] * 4)
+        self.assertRaises(socket.error, self.pool.request, 'GET', '/api')
+
+    def test_error_after_sending_not_retried(self):
+        FakeConnection.errors.append(socket.timeout('timed out'))
+        self.assertRaises(socket.timeout, self.pool.request, 'POST', '/api')
+        self.assertEqual(1, len(FakeConnection.opened))
+        self.assertTrue(FakeConnection.opened[0].closed)
+
+    def test_close(self):
+        self.pool.request('GET', '/api')
+        self.pool.close()
+        self.assertTrue(FakeConnection.opened[0].closed)
+        self.pool.request('GET', '/api')
+        self.assertEqual(2, len(FakeConnection.opened))
+
+    def test_stats(self):
+        self.pool.request('GET', '/api')
+        FakeConnection.errors.append(socket.timeout('timed out'))
+        self.assertRaises(socket.timeout, self.pool.request, 'GET', '/api')
+        stats = self.pool.get_stats()
+        self.assertEqual(2, stats['requests'])
+        self.assertEqual(1, stats['errors'])
+        self.assertEqual(1, stats['connects'])
+        self.assertTrue(stats['max_time'] >= stats['avg_time'] >= 0)
@@ -0,0 +1,189 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the volume operation lock manager."""
+
+import fcntl
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import eventlet
+
+from cinder import test
+from cinder.volume import locks
+
+
+VOLUME_ID = '2f9d6c52-7e3d-4ef1-8e4b-1b3c2c4b3f6a'
+
+# Holds the lock file given as argument until its stdin is closed.
+HOLDER = """
+import fcntl, sys
+f = open(sys.argv[1], 'a')
+fcntl.lockf(f, fcntl.LOCK_EX)
+sys.stdout.write('locked\\n')
+sys.stdout.flush()
+sys.stdin.read()
+"""
+
+
+class HistogramTestCase(test.TestCase):
+
+    def test_buckets(self):
+        histogram = locks.Histogram()
+        for value in (0.0005, 0.05, 0.05, 1000):
+            histogram.add(value)
+        stats = histogram.to_dict()
+        self.assertEqual(4, stats['count'])
+        self.assertEqual(1000, stats['max'])
+        self.assertEqual(1, stats['buckets']['0.001'])
+        self.assertEqual(2, stats['buckets']['0.1'])
+        self.assertEqual(0, stats['buckets']['300'])
+        self.assertEqual(1, stats['buckets']['+Inf'])
+
+
+class LockManagerTestCase(test.TestCase):
+
+    def setUp(self):
+        super(LockManagerTestCase, self).setUp()
+        self.lock_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.lock_path)
+        self.manager = locks.LockManager(lock_path=self.lock_path)
+        self.name = '%s-delete_volume' % VOLUME_ID
+        self.path = os.path.join(self.lock_path, 'cinder-%s' % self.name)
+
+    def test_lock_file_removed_after_release(self):
+        with self.manager.lock(self.name, 'delete_volume'):
+            self.assertTrue(os.path.exists(self.path))
+        self.assertFalse(os.path.exists(self.path))
+
+    def test_lock_file_kept_without_cleanup(self):
+        self.flags(lock_file_cleanup=False)
+        with self.manager.lock(self.name, 'delete_volume'):
+            pass
+        self.assertTrue(os.path.exists(self.path))
+
+    def test_greenthreads_are_serialized(self):
+        events = []
+
+        def _locked(tag):
+            with self.manager.lock(self.name, 'delete_volume'):
+                events.append(('start', tag))
+                eventlet.sleep(0.01)
+                events.append(('end', tag))
+
+        threads = [eventlet.spawn(_locked, tag) for tag in range(3)]
+        for thread in threads:
+            thread.wait()
+        for i in range(0, 6, 2):
+            self.assertEqual('start', events[i][0])
+            self.assertEqual(('end', events[i][1]), events[i + 1])
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual({}, self.manager._locks)
+
+    def test_waits_for_other_process_without_blocking(self):
+        holder = subprocess.Popen([sys.executable, '-c', HOLDER, self.path],
+                                  stdin=subprocess.PIPE,
+                                  stdout=subprocess.PIPE)
+        self.addCleanup(holder.wait)
+        self.assertEqual('locked\n', holder.stdout.readline())
+
+        ticks = []
+
+        def _ticker():
+            for _i in range(5):
+                ticks.append(1)
+                eventlet.sleep(0.01)
+
+        def _release():
+            eventlet.sleep(0.2)
+            # The holder removes the file the same way we do.
+            os.unlink(self.path)
+            holder.stdin.close()
+
+        ticker = eventlet.spawn(_ticker)
+        releaser = eventlet.spawn(_release)
+        with self.manager.lock(self.name, 'delete_volume'):
+            # We must hold a lock on the file now at the lock path.
+            fd = os.open(self.path, os.O_RDWR)
+            self.addCleanup(os.close, fd)
+            self.assertTrue(locks.LockManager._is_current(fd, self.path))
+        ticker.wait()
+        releaser.wait()
+        self.assertEqual(5, len(ticks))
+        stats = self.manager.get_stats()['delete_volume']
+        self.assertTrue(stats['wait']['max'] >= 0.15)
+
+    def test_stats_per_lock_class(self):
+        with self.manager.lock(self.name, 'delete_volume'):
+            pass
+        with self.manager.lock('%s-delete_snapshot' % VOLUME_ID,
+                               'delete_snapshot'):
+            pass
+        with self.manager.lock(self.name, 'delete_volume'):
+            pass
+        stats = self.manager.get_stats()
+        self.assertEqual(['delete_snapshot', 'delete_volume'],
+                         sorted(stats.keys()))
+        self.assertEqual(2, stats['delete_volume']['wait']['count'])
+        self.assertEqual(2, stats['delete_volume']['hold']['count'])
+
+    def test_synchronized(self):
+        @self.manager.synchronized(self.name, 'delete_volume')
+        def _func(value):
+            self.assertTrue(os.path.exists(self.path))
+            return value
+
+        self.assertEqual(42, _func(42))
+        self.assertEqual(1,
+                         self.manager.get_stats()['delete_volume']['hold'][
+                             'count'])
+
+    def test_remove_stale_lock_files(self):
+        stale = ['cinder-%s' % VOLUME_ID,
+                 'cinder-%s-delete_snapshot' % VOLUME_ID]
+        others = ['cinder-hds_hus', 'brick-connect_volume']
+        for filename in stale + others:
+            open(os.path.join(self.lock_path, filename), 'w').close()
+
+        busy = os.path.join(self.lock_path,
+                            'cinder-%s-detach' % VOLUME_ID)
+        with self.manager.lock('%s-detach' % VOLUME_ID, 'detach'):
+            self.assertEqual(2, self.manager.remove_stale_lock_files())
+            self.assertTrue(os.path.exists(busy))
+
+        self.assertEqual(sorted(others), sorted(os.listdir(self.lock_path)))
+
+    def test_remove_stale_lock_files_skips_locked_files(self):
+        path = os.path.join(self.lock_path, 'cinder-%s' % VOLUME_ID)
+        holder = subprocess.Popen([sys.executable, '-c', HOLDER, path],
+                                  stdin=subprocess.PIPE,
+                                  stdout=subprocess.PIPE)
+        self.addCleanup(holder.wait)
+        self.addCleanup(holder.stdin.close)
+        self.assertEqual('locked\n', holder.stdout.readline())
+
+        self.assertEqual(0, self.manager.remove_stale_lock_files())
+        self.assertTrue(os.path.exists(path))
+
+    def test_no_file_lock_without_lock_path(self):
+        self.flags(lock_path=None)
+        manager = locks.LockManager()
+        self.stubs.Set(fcntl, 'lockf',
+                       lambda *args: self.fail('no file lock expected'))
+        with manager.lock(self.name, 'delete_volume'):
+            pass
@@ -238,6 +238,12 @@ class VolumeRpcAPITestCase(test.TestCase):
                                           '-8ffd-0800200c9a66',
                               version='1.9')
 
+    def test_publish_service_capabilities_to_host(self):
+        self._test_volume_api('publish_service_capabilities',
+                              rpc_method='cast',
+                              host='fake_host',
+                              version='1.2')
+
     def test_extend_volume(self):
         self._test_volume_api('extend_volume',
                               rpc_method='cast',
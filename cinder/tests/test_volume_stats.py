@@ -0,0 +1,173 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Tests for the background volume stats collector."""
+
+import contextlib
+import time
+
+import eventlet
+import mock
+
+from cinder import test
+from cinder.volume import stats
+
+
+class FakeDriver(object):
+
+    def __init__(self):
+        self.free = 100
+        self.calls = 0
+        self.delay = 0
+        self.error = None
+
+    def get_volume_stats(self, refresh=False):
+        self.calls += 1
+        if self.delay:
+            eventlet.sleep(self.delay)
+        if self.error:
+            raise self.error
+        return {'free_capacity_gb': self.free, 'pending_reclaim_gb': 0}
+
+    def get_cheap_volume_stats(self):
+        return {'pending_reclaim_gb': 5}
+
+
+class StatsCollectorTestCase(test.TestCase):
+
+    def setUp(self):
+        super(StatsCollectorTestCase, self).setUp()
+        self.driver = FakeDriver()
+
+    def _collector(self, **kwargs):
+        collector = stats.StatsCollector(self.driver, **kwargs)
+        self.addCleanup(self._kill_worker, collector)
+        return collector
+
+    def _kill_worker(self, collector):
+        if collector._worker is not None:
+            collector._worker.kill()
+
+    def _wait_for_refresh(self, collector):
+        while collector._worker is not None:
+            eventlet.sleep(0)
+
+    def test_first_stats_are_waited_for(self):
+        collector = self._collector()
+        result, age = collector.get_stats()
+        self.assertEqual({'free_capacity_gb': 100, 'pending_reclaim_gb': 5},
+                         result)
+        self.assertTrue(0 <= age < 1)
+
+    def test_fast_refresh_is_waited_for(self):
+        collector = self._collector()
+        collector.get_stats()
+        self.driver.free = 50
+        result, _age = collector.get_stats()
+        self.assertEqual(50, result['free_capacity_gb'])
+        self.assertEqual(2, self.driver.calls)
+
+    def test_refresh_in_background(self):
+        collector = self._collector(wait=0.1)
+        collector.get_stats()
+        self.driver.free = 50
+        self.driver.delay = 0.5
+        # The refresh started here is not done within the wait.
+        result, age = collector.get_stats()
+        self.assertEqual(100, result['free_capacity_gb'])
+        self._wait_for_refresh(collector)
+        self.assertEqual(2, self.driver.calls)
+        self.assertEqual(50, collector._stats['free_capacity_gb'])
+
+    def test_refresh_interval(self):
+        collector = self._collector(interval=300)
+        collector.get_stats()
+        collector.get_stats()
+        self._wait_for_refresh(collector)
+        self.assertEqual(1, self.driver.calls)
+
+        with mock.patch.object(time, 'time',
+                               return_value=time.time() + 301):
+            collector.get_stats()
+        self._wait_for_refresh(collector)
+        self.assertEqual(2, self.driver.calls)
+
+    def test_get_stats_without_refresh(self):
+        collector = self._collector()
+        self.assertEqual((None, None), collector.get_stats(refresh=False))
+        self.assertEqual(0, self.driver.calls)
+
+        collector.get_stats()
+        self.driver.free = 50
+        result, _age = collector.get_stats(refresh=False)
+        self.assertEqual(100, result['free_capacity_gb'])
+        self.assertIsNone(collector._worker)
+        self.assertEqual(1, self.driver.calls)
+
+    def test_old_stats_warned_once(self):
+        collector = self._collector(interval=300, timeout=10)
+        collector.get_stats()
+        with contextlib.nested(
+            mock.patch.object(time, 'time',
+                              return_value=time.time() + 400),
+            mock.patch.object(collector, '_refresh_due',
+                              return_value=False),
+            mock.patch.object(stats.LOG, 'warning')
+        ) as (mock_time, mock_due, mock_warning):
+            collector.get_stats()
+            collector.get_stats()
+        self.assertEqual(1, mock_warning.call_count)
+
+    def test_failed_refresh_keeps_last_stats(self):
+        collector = self._collector()
+        collector.get_stats()
+        self.driver.error = Exception('backend down')
+        self.driver.free = 50
+        collector.get_stats()
+        self._wait_for_refresh(collector)
+        result, _age = collector.get_stats()
+        self.assertEqual(100, result['free_capacity_gb'])
+
+    def test_no_stats(self):
+        self.driver.error = Exception('backend down')
+        collector = self._collector()
+        self.assertEqual((None, None), collector.get_stats())
+
+    def test_slow_refresh_is_abandoned(self):
+        collector = self._collector(timeout=0.1, wait=0)
+        collector.get_stats()
+        self.driver.delay = 60
+        collector.get_stats()
+        eventlet.sleep(0)
+        slow_worker = collector._worker
+        self.assertIsNotNone(slow_worker)
+
+        eventlet.sleep(0.2)
+        result, _age = collector.get_stats()
+        self.assertEqual(100, result['free_capacity_gb'])
+        # The slow refresh was given up and a new one started.
+        self.assertTrue(slow_worker.dead)
+        self.assertIsNotNone(collector._worker)
+        self.assertIsNot(slow_worker, collector._worker)
+
+    def test_first_stats_wait_is_bounded(self):
+        self.driver.delay = 60
+        collector = self._collector(timeout=120, wait=0.1)
+        start = time.time()
+        self.assertEqual((None, None), collector.get_stats())
+        self.assertEqual((None, None), collector.get_stats())
+        self.assertTrue(time.time() - start < 10)
+        # The second report waited for the refresh the first one started.
+        self.assertEqual(1, self.driver.calls)
@@ -173,6 +173,78 @@ class ClearVolumeTestCase(test.TestCase):
         self.mox.ReplayAll()
         volume_utils.clear_volume(1024, "volume_path")
 
+    def test_clear_volume_discard(self):
+        CONF.volume_clear = 'discard'
+        CONF.volume_clear_size = 1
+        self.stubs.Set(volume_utils, '_discard_zeroes_data', lambda x: True)
+        clear_cmd = ['blkdiscard', '-l', '1048576', "volume_path"]
+        self.mox.StubOutWithMock(utils, "execute")
+        utils.execute(*clear_cmd, run_as_root=True)
+        self.mox.ReplayAll()
+        volume_utils.clear_volume(1024, "volume_path")
+
+    def test_clear_volume_discard_zeroout(self):
+        CONF.volume_clear = 'discard'
+        CONF.volume_clear_size = 1
+        self.stubs.Set(volume_utils, '_discard_zeroes_data', lambda x: False)
+        self.stubs.Set(volume_utils, '_supports_write_zeroes', lambda x: True)
+        clear_cmd = ['blkdiscard', '--zeroout', '-l', '1048576',
+                     "volume_path"]
+        self.mox.StubOutWithMock(utils, "execute")
+        utils.execute(*clear_cmd, run_as_root=True)
+        self.mox.ReplayAll()
+        volume_utils.clear_volume(1024, "volume_path")
+
+    def test_clear_volume_discard_unsupported(self):
+        CONF.volume_clear = 'discard'
+        CONF.volume_clear_size = 0
+        CONF.volume_clear_ionice = None
+        self.stubs.Set(volume_utils, '_discard_zeroes_data', lambda x: False)
+        self.stubs.Set(volume_utils, '_supports_write_zeroes',
+                       lambda x: False)
+        self.mox.StubOutWithMock(volume_utils, 'copy_volume')
+        volume_utils.copy_volume("/dev/zero", "volume_path", 1024,
+                                 CONF.volume_dd_blocksize, sync=True,
+                                 ionice=None, execute=utils.execute)
+        self.mox.ReplayAll()
+        volume_utils.clear_volume(1024, "volume_path")
+
+    def test_clear_volume_zero_bandwidth(self):
+        CONF.volume_clear = 'zero'
+        CONF.volume_clear_size = 0
+        self.stubs.Set(volume_utils.greenthread, 'sleep', lambda x: None)
+        self.mox.StubOutWithMock(utils, "execute")
+        utils.execute('ionice', '-c3', 'dd', 'if=/dev/zero',
+                      'of=volume_path', 'count=400', 'bs=1M', 'seek=0',
+                      'oflag=direct', run_as_root=True)
+        utils.execute('ionice', '-c3', 'dd', 'if=/dev/zero',
+                      'of=volume_path', 'count=400', 'bs=1M', 'seek=400',
+                      'oflag=direct', run_as_root=True)
+        utils.execute('ionice', '-c3', 'dd', 'if=/dev/zero',
+                      'of=volume_path', 'count=224', 'bs=1M', 'seek=800',
+                      'oflag=direct', run_as_root=True)
+        self.mox.ReplayAll()
+        volume_utils.clear_volume(1024, "volume_path",
+                                  volume_clear_ionice='-c3',
+                                  volume_clear_bandwidth=400)
+
+    def test_clear_volume_shred_bandwidth(self):
+        CONF.volume_clear = 'shred'
+        CONF.volume_clear_size = 0
+        self.stubs.Set(volume_utils.greenthread, 'sleep', lambda x: None)
+        self.mox.StubOutWithMock(utils, "execute")
+        for _i in range(3):
+            utils.execute('ionice', '-c3', 'dd', 'if=/dev/urandom',
+                          'of=volume_path', 'count=600', 'bs=1M', 'seek=0',
+                          'oflag=direct', run_as_root=True)
+            utils.execute('ionice', '-c3', 'dd', 'if=/dev/urandom',
+                          'of=volume_path', 'count=424', 'bs=1M',
+                          'seek=600', 'oflag=direct', run_as_root=True)
+        self.mox.ReplayAll()
+        volume_utils.clear_volume(1024, "volume_path",
+                                  volume_clear_ionice='-c3',
+                                  volume_clear_bandwidth=600)
+
     def test_clear_volume_invalid_opt(self):
         CONF.volume_clear = 'non_existent_volume_clearer'
         CONF.volume_clear_size = 0
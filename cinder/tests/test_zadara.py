@@ -445,11 +445,12 @@ class FakeRequest(object):
 
 class FakeHTTPConnection(object):
     """A fake httplib.HTTPConnection for zadara volume driver tests."""
-    def __init__(self, host, port, use_ssl=False):
+    def __init__(self, host, port, use_ssl=False, timeout=None):
         LOG.debug('Enter: __init__ FakeHTTPConnection')
         self.host = host
         self.port = port
         self.use_ssl = use_ssl
+        self.timeout = timeout
         self.req = None
 
     def request(self, method, url, body):
@@ -466,9 +467,10 @@ class FakeHTTPConnection(object):
 
 
 class FakeHTTPSConnection(FakeHTTPConnection):
-    def __init__(self, host, port):
+    def __init__(self, host, port, timeout=None):
         LOG.debug('Enter: __init__ FakeHTTPSConnection')
-        super(FakeHTTPSConnection, self).__init__(host, port, use_ssl=True)
+        super(FakeHTTPSConnection, self).__init__(host, port, use_ssl=True,
+                                                  timeout=timeout)
 
 
 class ZadaraVPSADriverTestCase(test.TestCase):
@@ -518,6 +520,18 @@ class ZadaraVPSADriverTestCase(test.TestCase):
         self.flags(zadara_vpsa_allow_nonexistent_delete=True)
         self.driver.delete_volume({'name': 'test_volume_04'})
 
+    def test_get_connection_stats(self):
+        self.driver.create_volume({'name': 'test_volume_01', 'size': 1})
+        stats = self.driver.get_connection_stats()
+        self.assertEqual(['http'], stats.keys())
+        self.assertTrue(stats['http']['requests'] > 0)
+
+    def test_api_timeout(self):
+        self.configuration.zadara_api_timeout = 10
+        driver = ZadaraVPSAISCSIDriver(configuration=self.configuration)
+        driver.do_setup(None)
+        self.assertEqual(10, driver.vpsa._http_pool.timeout)
+
     def test_destroy_non_existent(self):
         """Delete non-existent volume."""
         self.flags(zadara_vpsa_allow_nonexistent_delete=False)
@@ -30,6 +30,7 @@ import shutil
 import stat
 import sys
 import tempfile
+import time
 
 from eventlet import pools
 from oslo.config import cfg
@@ -46,8 +47,10 @@ from cinder import exception
 from cinder.openstack.common import importutils
 from cinder.openstack.common import lockutils
 from cinder.openstack.common import log as logging
+from cinder.openstack.common import loopingcall
 from cinder.openstack.common import processutils
 from cinder.openstack.common import timeutils
+from cinder import rootwrap_daemon
 
 
 CONF = cfg.CONF
@@ -129,8 +132,39 @@ def check_exclusive_options(**kwargs):
         raise exception.InvalidInput(reason=msg)
 
 
+_ROOTWRAP_DAEMON_KWARGS = set(['process_input', 'check_exit_code',
+                               'delay_on_retry', 'attempts', 'run_as_root',
+                               'root_helper'])
+_rootwrap_daemon = None
+
+
+def _get_rootwrap_daemon():
+    global _rootwrap_daemon
+    if _rootwrap_daemon is None:
+        _rootwrap_daemon = rootwrap_daemon.Client(
+            ['sudo', 'cinder-rootwrap-daemon', CONF.rootwrap_config])
+    return _rootwrap_daemon
+
+
 def execute(*cmd, **kwargs):
     """Convenience wrapper around oslo's execute() method."""
+    # NOTE: only commands that would otherwise go through the default
+    # rootwrap helper are handed to the daemon.
+    if (CONF.use_rootwrap_daemon and kwargs.get('run_as_root') and
+            set(kwargs).issubset(_ROOTWRAP_DAEMON_KWARGS) and
+            kwargs.get('root_helper', get_root_helper()) ==
+            get_root_helper() and
+            hasattr(os, 'geteuid') and os.geteuid() != 0 and
+            _get_rootwrap_daemon().available()):
+        daemon_kwargs = dict(kwargs)
+        del daemon_kwargs['run_as_root']
+        daemon_kwargs.pop('root_helper', None)
+        try:
+            return _get_rootwrap_daemon().execute(*cmd, **daemon_kwargs)
+        except rootwrap_daemon.DaemonUnavailable as exc:
+            LOG.warn(_('Rootwrap daemon unavailable, falling back to '
+                       'rootwrap: %s') % exc)
+
     if 'run_as_root' in kwargs and not 'root_helper' in kwargs:
         kwargs['root_helper'] = get_root_helper()
     return processutils.execute(*cmd, **kwargs)
@@ -179,7 +213,13 @@ def create_channel(client, width, height):
 
 
 class SSHPool(pools.Pool):
-    """A simple eventlet pool to hold ssh connections."""
+    """A simple eventlet pool to hold ssh connections.
+
+    min_size connections are opened when the pool is created, so the first
+    commands do not pay for the SSH handshake.  The idle connections can be
+    checked in the background with start_health_check(), which replaces the
+    ones the array has dropped before a command needs them.
+    """
 
     def __init__(self, ip, port, conn_timeout, login, password=None,
                  privatekey=None, *args, **kwargs):
@@ -197,6 +237,9 @@ class SSHPool(pools.Pool):
             self.hosts_key_file = kwargs.pop('hosts_key_file')
         else:
             self.hosts_key_file = None
+        self._health_check = None
+        self._stats = {'gets': 0, 'wait_time': 0.0, 'max_wait': 0.0,
+                       'created': 0, 'replaced': 0}
         super(SSHPool, self).__init__(*args, **kwargs)
 
     def create(self):
@@ -236,6 +279,7 @@ class SSHPool(pools.Pool):
                 transport = ssh.get_transport()
                 transport.sock.settimeout(None)
                 transport.set_keepalive(self.conn_timeout)
+            self._stats['created'] += 1
             return ssh
         except Exception as e:
             msg = _("Error connecting via ssh: %s") % e
@@ -250,12 +294,18 @@ class SSHPool(pools.Pool):
 
         For dead connections create and return a new connection.
         """
+        start = time.time()
         conn = super(SSHPool, self).get()
+        wait = time.time() - start
+        self._stats['gets'] += 1
+        self._stats['wait_time'] += wait
+        self._stats['max_wait'] = max(self._stats['max_wait'], wait)
         if conn:
             if conn.get_transport().is_active():
                 return conn
             else:
                 conn.close()
+                self._stats['replaced'] += 1
         return self.create()
 
     def remove(self, ssh):
@@ -267,6 +317,75 @@ class SSHPool(pools.Pool):
         if self.current_size > 0:
             self.current_size -= 1
 
+    @staticmethod
+    def _is_alive(ssh):
+        transport = ssh.get_transport()
+        if transport is None or not transport.is_active():
+            return False
+        try:
+            transport.send_ignore()
+        except Exception:
+            return False
+        return True
+
+    def check_idle(self):
+        """Replace the idle connections which are no longer usable.
+
+        Every idle connection is probed with an SSH ignore message.  Live
+        ones go back through put(), which hands them to a greenthread
+        waiting in get() meanwhile.  Dead ones are closed and the pool is
+        topped up to min_size again.
+        """
+        try:
+            for _i in range(len(self.free_items)):
+                if not self.free_items:
+                    break
+                ssh = self.free_items.popleft()
+                if self._is_alive(ssh):
+                    self.put(ssh)
+                    continue
+                LOG.debug(_('Closing dead ssh connection to %s.'), self.ip)
+                try:
+                    ssh.close()
+                except Exception:
+                    pass
+                self.current_size -= 1
+                self._stats['replaced'] += 1
+            while self.current_size < self.min_size:
+                self.current_size += 1
+                try:
+                    ssh = self.create()
+                except Exception:
+                    self.current_size -= 1
+                    raise
+                self.put(ssh)
+        except Exception:
+            LOG.exception(_('Error checking ssh connections to %s.'), self.ip)
+
+    def start_health_check(self, interval):
+        """Run check_idle() every interval seconds."""
+        if self._health_check is not None or not interval:
+            return
+        self._health_check = loopingcall.FixedIntervalLoopingCall(
+            self.check_idle)
+        self._health_check.start(interval=interval, initial_delay=interval)
+
+    def stop_health_check(self):
+        if self._health_check is not None:
+            self._health_check.stop()
+            self._health_check = None
+
+    def get_stats(self):
+        """Return the connection counts and checkout waits in seconds."""
+        stats = dict(self._stats)
+        stats['size'] = self.current_size
+        stats['idle'] = len(self.free_items)
+        if stats['gets']:
+            stats['avg_wait'] = stats['wait_time'] / stats['gets']
+        else:
+            stats['avg_wait'] = 0.0
+        return stats
+
 
 def cinderdir():
     import cinder
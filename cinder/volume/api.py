@@ -37,7 +37,7 @@ import cinder.policy
 from cinder import quota
 from cinder import quota_utils
 from cinder.scheduler import rpcapi as scheduler_rpcapi
-from cinder import utils
+from cinder import servicegroup
 from cinder.volume.flows.api import create_volume
 from cinder.volume import qos_specs
 from cinder.volume import rpcapi as volume_rpcapi
@@ -97,7 +97,22 @@ class API(base.Base):
         self.volume_rpcapi = volume_rpcapi.VolumeAPI()
         self.availability_zone_names = ()
         self.key_manager = keymgr.API()
+        self.servicegroup_api = servicegroup.API()
         super(API, self).__init__(db_driver)
+        self._create_flow = create_volume.get_prebuilt_flow(
+            self.scheduler_rpcapi,
+            self.volume_rpcapi,
+            self.db,
+            self.image_service,
+            self._check_volume_az_zone)
+
+    def _check_volume_az_zone(self, availability_zone):
+        try:
+            return self._valid_availability_zone(availability_zone)
+        except exception.CinderException:
+            LOG.exception(_("Unable to query if %s is in the "
+                            "availability zone set"), availability_zone)
+            return False
 
     def _valid_availability_zone(self, availability_zone):
         #NOTE(bcwaldon): This approach to caching fails to handle the case
@@ -150,14 +165,6 @@ class API(base.Base):
                         "You should omit the argument.")
                 raise exception.InvalidInput(reason=msg)
 
-        def check_volume_az_zone(availability_zone):
-            try:
-                return self._valid_availability_zone(availability_zone)
-            except exception.CinderException:
-                LOG.exception(_("Unable to query if %s is in the "
-                                "availability zone set"), availability_zone)
-                return False
-
         create_what = {
             'context': context,
             'raw_size': size,
@@ -175,12 +182,7 @@ class API(base.Base):
         }
 
         try:
-            flow_engine = create_volume.get_flow(self.scheduler_rpcapi,
-                                                 self.volume_rpcapi,
-                                                 self.db,
-                                                 self.image_service,
-                                                 check_volume_az_zone,
-                                                 create_what)
+            flow_engine = self._create_flow.load(create_what, logger=LOG)
         except Exception:
             LOG.exception(_("Failed to create api volume flow"))
             raise exception.CinderException(
@@ -810,7 +812,8 @@ class API(base.Base):
                                                     disabled=False)
         found = False
         for service in services:
-            if utils.service_is_up(service) and service['host'] == host:
+            if (self.servicegroup_api.is_up(service) and
+                    service['host'] == host):
                 found = True
         if not found:
             msg = (_('No available service named %s') % host)
@@ -59,6 +59,11 @@ volume_opts = [
                default=3,
                help='The maximum number of times to rescan targets'
                     ' to find volume'),
+    cfg.IntOpt('volume_device_scan_timeout',
+               default=None,
+               help='Maximum number of seconds to wait for a volume device '
+                    'to show up when attaching it, by default the wait is '
+                    'only bounded by num_volume_device_scan_tries'),
     cfg.StrOpt('volume_backend_name',
                default=None,
                help='The backend name for a given driver implementation'),
@@ -69,7 +74,9 @@ volume_opts = [
     cfg.StrOpt('volume_clear',
                default='zero',
                help='Method used to wipe old volumes (valid options are: '
-                    'none, zero, shred)'),
+                    'none, zero, shred, discard). discard uses BLKDISCARD '
+                    'or BLKZEROOUT where the device guarantees zeroed '
+                    'blocks and falls back to zero otherwise'),
     cfg.IntOpt('volume_clear_size',
                default=0,
                help='Size in MiB to wipe at start of old volumes. 0 => all'),
@@ -232,6 +239,17 @@ class VolumeDriver(object):
         """Synchronously recreates an export for a volume."""
         raise NotImplementedError()
 
+    def ensure_exports(self, context, volumes):
+        """Synchronously recreates the exports of a batch of volumes.
+
+        Called once at service startup with all the in-use volumes of the
+        host.  Drivers which can check all their exports at once should
+        implement it, otherwise ensure_export() is called for each volume.
+
+        :returns: dict of volume id to the exception raised re-exporting it
+        """
+        raise NotImplementedError()
+
     def create_export(self, context, volume):
         """Exports the volume. Can optionally return a Dictionary of changes
         to the volume object to be persisted.
@@ -265,6 +283,22 @@ class VolumeDriver(object):
         """
         return None
 
+    def get_cheap_volume_stats(self):
+        """Return the stats which are cheap to collect.
+
+        They are collected on every report, while get_volume_stats() with
+        refresh may only run every driver_stats_interval seconds.
+        """
+        return {}
+
+    def get_connection_stats(self):
+        """Return the statistics of the connection pools of the driver.
+
+        A dict of pool name to its statistics, logged periodically by the
+        volume manager.
+        """
+        return {}
+
     def do_setup(self, context):
         """Any initialization the volume driver does while starting."""
         pass
@@ -408,11 +442,14 @@ class VolumeDriver(object):
         # Use Brick's code to do attach/detach
         use_multipath = self.configuration.use_multipath_for_image_xfer
         device_scan_attempts = self.configuration.num_volume_device_scan_tries
+        device_scan_timeout = self.configuration.volume_device_scan_timeout
         protocol = conn['driver_volume_type']
         connector = utils.brick_get_connector(protocol,
                                               use_multipath=use_multipath,
                                               device_scan_attempts=
                                               device_scan_attempts,
+                                              device_scan_timeout=
+                                              device_scan_timeout,
                                               conn=conn)
         device = connector.connect_volume(conn['data'])
         host_device = device['path']
@@ -176,8 +176,11 @@ class BlockDeviceDriver(driver.ISCSIDriver):
         self._stats = data
 
     def _get_used_devices(self):
+        # Devices are picked from this, a stale replica could hand out a
+        # device twice.
         lst = api.volume_get_all_by_host(context.get_admin_context(),
-                                         self.configuration.host)
+                                         self.configuration.host,
+                                         use_slave=False)
         used_devices = set()
         for volume in lst:
             local_path = self.local_path(volume)
@@ -20,6 +20,7 @@ It supports VNX and VMAX arrays.
 
 """
 
+import os
 import time
 
 from oslo.config import cfg
@@ -44,6 +45,10 @@ CINDER_EMC_CONFIG_FILE = '/etc/cinder/cinder_emc_config.xml'
 EMC_ROOT = 'root/emc'
 PROVISIONING = 'storagetype:provisioning'
 POOL = 'storagetype:pool'
+# Seconds between the first polls of a job on the array, doubled up to the
+# maximum for jobs which take longer.
+POLL_INTERVAL_MIN = 0.5
+POLL_INTERVAL_MAX = 10
 
 emc_opts = [
     cfg.StrOpt('cinder_emc_config_file',
@@ -71,6 +76,9 @@ class EMCSMISCommon():
         self.protocol = prtcl
         self.configuration = configuration
         self.configuration.append_config_values(emc_opts)
+        self._config_doms = {}
+        self._services = {}
+        self._pools = {}
 
         ip, port = self._get_ecom_server()
         self.user, self.passwd = self._get_ecom_cred()
@@ -686,7 +694,7 @@ class EMCSMISCommon():
         # deleted immediately after the snapshot deletion because it
         # still has snapshot.
         wait_timeout = int(self._get_timeout())
-        wait_interval = 10
+        wait_intervals = self._poll_intervals()
         start = int(time.time())
         while True:
             try:
@@ -698,7 +706,7 @@ class EMCSMISCommon():
                              % {'snapshot': snapshotname,
                                 'volume': volumename})
                     break
-                time.sleep(wait_interval)
+                time.sleep(next(wait_intervals))
                 if int(time.time()) - start >= wait_timeout:
                     LOG.warn(_('Snapshot: %(snapshot)s: volume: %(volume)s. '
                                'Snapshot deleted but cleanup timed out.')
@@ -1040,15 +1048,24 @@ class EMCSMISCommon():
         LOG.debug(_("Storage Type: %s") % (specs))
         return specs
 
-    def _get_storage_type_conffile(self, filename=None):
-        """Get the storage type from the config file."""
-        if filename == None:
+    def _get_config_dom(self, filename=None):
+        """Parse the config file, again only once it has been modified."""
+        if filename is None:
             filename = self.configuration.cinder_emc_config_file
 
-        file = open(filename, 'r')
-        data = file.read()
-        file.close()
-        dom = parseString(data)
+        mtime = os.path.getmtime(filename)
+        cached = self._config_doms.get(filename)
+        if cached is None or cached[0] != mtime:
+            file = open(filename, 'r')
+            data = file.read()
+            file.close()
+            cached = (mtime, parseString(data))
+            self._config_doms[filename] = cached
+        return cached[1]
+
+    def _get_storage_type_conffile(self, filename=None):
+        """Get the storage type from the config file."""
+        dom = self._get_config_dom(filename)
         storageTypes = dom.getElementsByTagName('StorageType')
         if storageTypes is not None and len(storageTypes) > 0:
             storageType = storageTypes[0].toxml()
@@ -1065,13 +1082,7 @@ class EMCSMISCommon():
             raise exception.VolumeBackendAPIException(data=exception_message)
 
     def _get_masking_view(self, filename=None):
-        if filename is None:
-            filename = self.configuration.cinder_emc_config_file
-
-        file = open(filename, 'r')
-        data = file.read()
-        file.close()
-        dom = parseString(data)
+        dom = self._get_config_dom(filename)
         views = dom.getElementsByTagName('MaskingView')
         if views is not None and len(views) > 0:
             view = views[0].toxml().replace('<MaskingView>', '')
@@ -1083,13 +1094,7 @@ class EMCSMISCommon():
             return None
 
     def _get_timeout(self, filename=None):
-        if filename is None:
-            filename = self.configuration.cinder_emc_config_file
-
-        file = open(filename, 'r')
-        data = file.read()
-        file.close()
-        dom = parseString(data)
+        dom = self._get_config_dom(filename)
         timeouts = dom.getElementsByTagName('Timeout')
         if timeouts is not None and len(timeouts) > 0:
             timeout = timeouts[0].toxml().replace('<Timeout>', '')
@@ -1101,13 +1106,7 @@ class EMCSMISCommon():
             return 10
 
     def _get_ecom_cred(self, filename=None):
-        if filename is None:
-            filename = self.configuration.cinder_emc_config_file
-
-        file = open(filename, 'r')
-        data = file.read()
-        file.close()
-        dom = parseString(data)
+        dom = self._get_config_dom(filename)
         ecomUsers = dom.getElementsByTagName('EcomUserName')
         if ecomUsers is not None and len(ecomUsers) > 0:
             ecomUser = ecomUsers[0].toxml().replace('<EcomUserName>', '')
@@ -1123,13 +1122,7 @@ class EMCSMISCommon():
             return None
 
     def _get_ecom_server(self, filename=None):
-        if filename is None:
-            filename = self.configuration.cinder_emc_config_file
-
-        file = open(filename, 'r')
-        data = file.read()
-        file.close()
-        dom = parseString(data)
+        dom = self._get_config_dom(filename)
         ecomIps = dom.getElementsByTagName('EcomServerIp')
         if ecomIps is not None and len(ecomIps) > 0:
             ecomIp = ecomIps[0].toxml().replace('<EcomServerIp>', '')
@@ -1155,60 +1148,62 @@ class EMCSMISCommon():
 
         return conn
 
+    def _find_service(self, classname, storage_system):
+        """Find the service of the storage system.
+
+        Service instance names do not change, they are only enumerated
+        once per storage system.
+        """
+        key = (classname, storage_system)
+        if key not in self._services:
+            services = self.conn.EnumerateInstanceNames(classname)
+            for service in services:
+                if storage_system == service['SystemName']:
+                    self._services[key] = service
+                    break
+        return self._services.get(key)
+
     def _find_replication_service(self, storage_system):
-        foundRepService = None
-        repservices = self.conn.EnumerateInstanceNames(
-            'EMC_ReplicationService')
-        for repservice in repservices:
-            if storage_system == repservice['SystemName']:
-                foundRepService = repservice
-                LOG.debug(_("Found Replication Service: %s")
-                          % (repservice))
-                break
+        foundRepService = self._find_service('EMC_ReplicationService',
+                                             storage_system)
+        if foundRepService is not None:
+            LOG.debug(_("Found Replication Service: %s")
+                      % (foundRepService))
 
         return foundRepService
 
     def _find_storage_configuration_service(self, storage_system):
-        foundConfigService = None
-        configservices = self.conn.EnumerateInstanceNames(
-            'EMC_StorageConfigurationService')
-        for configservice in configservices:
-            if storage_system == configservice['SystemName']:
-                foundConfigService = configservice
-                LOG.debug(_("Found Storage Configuration Service: %s")
-                          % (configservice))
-                break
+        foundConfigService = self._find_service(
+            'EMC_StorageConfigurationService', storage_system)
+        if foundConfigService is not None:
+            LOG.debug(_("Found Storage Configuration Service: %s")
+                      % (foundConfigService))
 
         return foundConfigService
 
     def _find_controller_configuration_service(self, storage_system):
-        foundConfigService = None
-        configservices = self.conn.EnumerateInstanceNames(
-            'EMC_ControllerConfigurationService')
-        for configservice in configservices:
-            if storage_system == configservice['SystemName']:
-                foundConfigService = configservice
-                LOG.debug(_("Found Controller Configuration Service: %s")
-                          % (configservice))
-                break
+        foundConfigService = self._find_service(
+            'EMC_ControllerConfigurationService', storage_system)
+        if foundConfigService is not None:
+            LOG.debug(_("Found Controller Configuration Service: %s")
+                      % (foundConfigService))
 
         return foundConfigService
 
     def _find_storage_hardwareid_service(self, storage_system):
-        foundConfigService = None
-        configservices = self.conn.EnumerateInstanceNames(
-            'EMC_StorageHardwareIDManagementService')
-        for configservice in configservices:
-            if storage_system == configservice['SystemName']:
-                foundConfigService = configservice
-                LOG.debug(_("Found Storage Hardware ID Management Service: %s")
-                          % (configservice))
-                break
+        foundConfigService = self._find_service(
+            'EMC_StorageHardwareIDManagementService', storage_system)
+        if foundConfigService is not None:
+            LOG.debug(_("Found Storage Hardware ID Management Service: %s")
+                      % (foundConfigService))
 
         return foundConfigService
 
     # Find pool based on storage_type
     def _find_pool(self, storage_type, details=False):
+        if details is False and storage_type in self._pools:
+            return self._pools[storage_type]
+
         foundPool = None
         systemname = None
         # Only get instance names if details flag is False;
@@ -1260,6 +1255,8 @@ class EMCSMISCommon():
         LOG.debug(_("Pool: %(pool)s  SystemName: %(systemname)s.")
                   % {'pool': foundPool,
                      'systemname': systemname})
+        if details is False:
+            self._pools[storage_type] = (foundPool, systemname)
         return foundPool, systemname
 
     def _parse_pool_instance_id(self, instanceid):
@@ -1329,8 +1326,9 @@ class EMCSMISCommon():
                       % {'storage_system': storage_system,
                          'sync': foundsyncname})
             # Wait for SE_StorageSynchronized_SV_SV to be fully synced
+            wait_intervals = self._poll_intervals()
             while waitforsync and percent_synced < 100:
-                time.sleep(10)
+                time.sleep(next(wait_intervals))
                 sync_instance = self.conn.GetInstance(foundsyncname,
                                                       LocalOnly=False)
                 percent_synced = sync_instance['PercentSynced']
@@ -1359,8 +1357,20 @@ class EMCSMISCommon():
                      'initiator': foundinitiatornames})
         return foundinitiatornames
 
+    def _poll_intervals(self):
+        """Yield the seconds to wait before each poll of the array.
+
+        Most jobs complete within a few seconds, they are polled often at
+        first and less and less often the longer they run.
+        """
+        interval = POLL_INTERVAL_MIN
+        while True:
+            yield interval
+            interval = min(interval * 2, POLL_INTERVAL_MAX)
+
     def _wait_for_job_complete(self, job):
         jobinstancename = job['Job']
+        wait_intervals = self._poll_intervals()
 
         while True:
             jobinstance = self.conn.GetInstance(jobinstancename,
@@ -1374,7 +1384,7 @@ class EMCSMISCommon():
             # Completed, Terminated, Killed, Exception, Service,
             # Query Pending, DMTF Reserved, Vendor Reserved")]
             if jobstate in [2L, 3L, 4L, 32767L]:
-                time.sleep(10)
+                time.sleep(next(wait_intervals))
             else:
                 break
 
@@ -145,70 +145,83 @@ class DellEQLSanISCSIDriver(SanISCSIDriver):
                 return line[len(prefix):]
         return
 
-    @with_timeout
-    def _ssh_execute(self, ssh, command, *arg, **kwargs):
+    def _shell_execute(self, ssh, commands):
+        """Run commands one after the other in a single CLI shell."""
         transport = ssh.get_transport()
         chan = transport.open_session()
         chan.invoke_shell()
 
-        LOG.debug(_("Reading CLI MOTD"))
-        self._get_output(chan)
+        outputs = []
+        try:
+            LOG.debug(_("Reading CLI MOTD"))
+            self._get_output(chan)
+
+            cmd = 'stty columns 255'
+            LOG.debug(_("Setting CLI terminal width: '%s'"), cmd)
+            chan.send(cmd + '\r')
+            out = self._get_output(chan)
+
+            for command in commands:
+                LOG.debug(_("Sending CLI command: '%s'"), command)
+                chan.send(command + '\r')
+                out = self._get_output(chan)
+
+                if any(line.startswith(('% Error', 'Error:'))
+                       for line in out):
+                    desc = _("Error executing EQL command")
+                    cmdout = '\n'.join(out)
+                    LOG.error(cmdout)
+                    raise processutils.ProcessExecutionError(
+                        stdout=cmdout, cmd=command, description=desc)
+                outputs.append(out)
+        finally:
+            chan.close()
+        return outputs
 
-        cmd = 'stty columns 255'
-        LOG.debug(_("Setting CLI terminal width: '%s'"), cmd)
-        chan.send(cmd + '\r')
-        out = self._get_output(chan)
+    @with_timeout
+    def _ssh_execute(self, ssh, command, *arg, **kwargs):
+        return self._shell_execute(ssh, [command])[0]
 
-        LOG.debug(_("Sending CLI command: '%s'"), command)
-        chan.send(command + '\r')
-        out = self._get_output(chan)
+    @with_timeout
+    def _ssh_execute_batch(self, ssh, commands, *arg, **kwargs):
+        return self._shell_execute(ssh, commands)
 
-        chan.close()
+    def _run_ssh(self, cmd_list, attempts=1):
+        return self._run_ssh_batch([cmd_list], attempts=attempts)[0]
 
-        if any(line.startswith(('% Error', 'Error:')) for line in out):
-            desc = _("Error executing EQL command")
-            cmdout = '\n'.join(out)
-            LOG.error(cmdout)
-            raise processutils.ProcessExecutionError(
-                stdout=cmdout, cmd=command, description=desc)
-        return out
+    def _run_ssh_batch(self, cmd_lists, attempts=1):
+        """Run several CLI commands in one CLI session.
+
+        Saves opening a shell, reading the MOTD and setting the terminal
+        width for every command.  Returns the output lines of every command.
+        """
+        commands = []
+        for cmd_list in cmd_lists:
+            utils.check_ssh_injection(cmd_list)
+            commands.append(' '.join(cmd_list))
+        command = '; '.join(commands)
+        sshpool = self._get_ssh_pool()
 
-    def _run_ssh(self, cmd_list, attempts=1):
-        utils.check_ssh_injection(cmd_list)
-        command = ' '. join(cmd_list)
-
-        if not self.sshpool:
-            password = self.configuration.san_password
-            privatekey = self.configuration.san_private_key
-            min_size = self.configuration.ssh_min_pool_conn
-            max_size = self.configuration.ssh_max_pool_conn
-            self.sshpool = utils.SSHPool(self.configuration.san_ip,
-                                         self.configuration.san_ssh_port,
-                                         self.configuration.ssh_conn_timeout,
-                                         self.configuration.san_login,
-                                         password=password,
-                                         privatekey=privatekey,
-                                         min_size=min_size,
-                                         max_size=max_size)
         try:
             total_attempts = attempts
-            with self.sshpool.item() as ssh:
-                while attempts > 0:
-                    attempts -= 1
-                    try:
+            while attempts > 0:
+                attempts -= 1
+                try:
+                    with sshpool.item() as ssh:
                         LOG.info(_('EQL-driver: executing "%s"') % command)
-                        return self._ssh_execute(
-                            ssh, command,
+                        return self._ssh_execute_batch(
+                            ssh, commands,
                             timeout=self.configuration.eqlx_cli_timeout)
-                    except processutils.ProcessExecutionError:
-                        raise
-                    except Exception as e:
-                        LOG.exception(e)
+                except processutils.ProcessExecutionError:
+                    raise
+                except Exception as e:
+                    LOG.exception(e)
+                    if attempts > 0:
                         greenthread.sleep(random.randint(20, 500) / 100.0)
-                msg = (_("SSH Command failed after '%(total_attempts)r' "
-                         "attempts : '%(command)s'") %
-                       {'total_attempts': total_attempts, 'command': command})
-                raise exception.VolumeBackendAPIException(data=msg)
+            msg = (_("SSH Command failed after '%(total_attempts)r' "
+                     "attempts : '%(command)s'") %
+                   {'total_attempts': total_attempts, 'command': command})
+            raise exception.VolumeBackendAPIException(data=msg)
 
         except Exception:
             with excutils.save_and_reraise_exception():
@@ -218,6 +231,10 @@ class DellEQLSanISCSIDriver(SanISCSIDriver):
         return self._run_ssh(
             args, attempts=self.configuration.eqlx_cli_max_retries)
 
+    def _eql_execute_batch(self, *cmd_lists):
+        return self._run_ssh_batch(
+            cmd_lists, attempts=self.configuration.eqlx_cli_max_retries)
+
     def _get_volume_data(self, lines):
         prefix = 'iSCSI target name is '
         target_name = self._get_prefixed_value(lines, prefix)[:-1]
@@ -289,8 +306,8 @@ class DellEQLSanISCSIDriver(SanISCSIDriver):
         try:
             disabled_cli_features = ('confirmation', 'paging', 'events',
                                      'formatoutput')
-            for feature in disabled_cli_features:
-                self._eql_execute('cli-settings', feature, 'off')
+            self._eql_execute_batch(*[('cli-settings', feature, 'off')
+                                      for feature in disabled_cli_features])
 
             for line in self._eql_execute('grpparams', 'show'):
                 if line.startswith('Group-Ipaddress:'):
@@ -13,6 +13,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import copy
 import errno
 import hashlib
 import json
@@ -78,6 +79,10 @@ class GlusterfsDriver(nfs.RemoteFsDriver):
         super(GlusterfsDriver, self).__init__(*args, **kwargs)
         self.configuration.append_config_values(volume_opts)
         self._nova = None
+        # Parsed qemu-img info and .info files, by path.  An entry is used
+        # as long as the file keeps the same inode, size and mtime.
+        self._image_info_cache = {}
+        self._info_file_cache = {}
         self.base = getattr(self.configuration,
                             'glusterfs_mount_point_base',
                             CONF.glusterfs_mount_point_base)
@@ -142,18 +147,45 @@ class GlusterfsDriver(nfs.RemoteFsDriver):
     def _local_path_volume_info(self, volume):
         return '%s%s' % (self._local_path_volume(volume), '.info')
 
+    @staticmethod
+    def _file_signature(path):
+        """Return what tells whether a file changed, None if not found."""
+        try:
+            st = os.stat(path)
+        except OSError:
+            return None
+        return (st.st_ino, st.st_size, st.st_mtime)
+
+    def _invalidate_image_info(self, volume):
+        """Forget the cached metadata of the files of a volume."""
+        name = volume['name']
+        for cache in (self._image_info_cache, self._info_file_cache):
+            for path in cache.keys():
+                filename = os.path.basename(path)
+                if filename == name or filename.startswith(name + '.'):
+                    del cache[path]
+
     def _qemu_img_info(self, path):
         """Sanitize image_utils' qemu_img_info.
 
-        This code expects to deal only with relative filenames.
+        This code expects to deal only with relative filenames.  The result
+        is cached until the file changes, so walking a backing chain again
+        does not run qemu-img for every file of the chain.
         """
 
+        signature = self._file_signature(path)
+        cached = self._image_info_cache.get(path)
+        if signature is not None and cached and cached[0] == signature:
+            return copy.copy(cached[1])
+
         info = image_utils.qemu_img_info(path)
         if info.image:
             info.image = os.path.basename(info.image)
         if info.backing_file:
             info.backing_file = os.path.basename(info.backing_file)
 
+        if signature is not None:
+            self._image_info_cache[path] = (signature, copy.copy(info))
         return info
 
     def get_active_image_from_info(self, volume):
@@ -302,12 +334,16 @@ class GlusterfsDriver(nfs.RemoteFsDriver):
 
         info_path = self._local_path_volume_info(volume)
         fileutils.delete_if_exists(info_path)
+        self._invalidate_image_info(volume)
 
     @utils.synchronized('glusterfs', external=False)
     def create_snapshot(self, snapshot):
         """Apply locking to the create snapshot operation."""
 
-        return self._create_snapshot(snapshot)
+        try:
+            return self._create_snapshot(snapshot)
+        finally:
+            self._invalidate_image_info(snapshot['volume'])
 
     def _create_snapshot(self, snapshot):
         """Create a snapshot.
@@ -548,13 +584,22 @@ class GlusterfsDriver(nfs.RemoteFsDriver):
             if empty_if_missing is True:
                 return {}
 
-        return json.loads(self._read_file(info_path))
+        signature = self._file_signature(info_path)
+        cached = self._info_file_cache.get(info_path)
+        if signature is not None and cached and cached[0] == signature:
+            return dict(cached[1])
+
+        snap_info = json.loads(self._read_file(info_path))
+        if signature is not None:
+            self._info_file_cache[info_path] = (signature, dict(snap_info))
+        return snap_info
 
     def _write_info_file(self, info_path, snap_info):
         if 'active' not in snap_info.keys():
             msg = _("'active' must be present when writing snap_info.")
             raise exception.GlusterfsException(msg)
 
+        self._info_file_cache.pop(info_path, None)
         with open(info_path, 'w') as f:
             json.dump(snap_info, f, indent=1, sort_keys=True)
 
@@ -565,7 +610,10 @@ class GlusterfsDriver(nfs.RemoteFsDriver):
     @utils.synchronized('glusterfs', external=False)
     def delete_snapshot(self, snapshot):
         """Apply locking to the delete snapshot operation."""
-        self._delete_snapshot(snapshot)
+        try:
+            self._delete_snapshot(snapshot)
+        finally:
+            self._invalidate_image_info(snapshot['volume'])
 
     def _delete_snapshot(self, snapshot):
         """Delete a snapshot.
@@ -673,6 +721,7 @@ class GlusterfsDriver(nfs.RemoteFsDriver):
             base_file = snapshot_path_img_info.backing_file
 
             self._qemu_img_commit(snapshot_path)
+            self._invalidate_image_info(snapshot['volume'])
             self._execute('rm', '-f', snapshot_path, run_as_root=True)
 
             # Remove snapshot_file from info
@@ -728,6 +777,7 @@ class GlusterfsDriver(nfs.RemoteFsDriver):
             # And update pointer in highest_file
             higher_file_path = '%s/%s' % (vol_path, higher_file)
             self._qemu_img_commit(higher_file_path)
+            self._invalidate_image_info(snapshot['volume'])
             if highest_file is not None:
                 highest_file_path = '%s/%s' % (vol_path, highest_file)
                 info = self._qemu_img_info(snapshot_path)
@@ -1001,6 +1051,7 @@ class GlusterfsDriver(nfs.RemoteFsDriver):
 
         # qemu-img can resize both raw and qcow2 files
         image_utils.resize_image(volume_path, size_gb)
+        self._invalidate_image_info(volume)
 
     def _do_create_volume(self, volume):
         """Create a volume on given glusterfs_share.
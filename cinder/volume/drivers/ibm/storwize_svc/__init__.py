@@ -97,6 +97,11 @@ storwize_svc_opts = [
     cfg.BoolOpt('storwize_svc_multihostmap_enabled',
                 default=True,
                 help='Allows vdisk to multi host mapping'),
+    cfg.IntOpt('storwize_svc_host_index_ttl',
+               default=300,
+               help='Seconds the index of the ports of all the hosts on the '
+                    'storage system is used to decide that a connector has '
+                    'no host yet before it is rebuilt'),
 ]
 
 CONF = cfg.CONF
@@ -142,6 +147,9 @@ class StorwizeSVCDriver(san.SanDriver):
         """Check that we have all configuration details from the storage."""
         LOG.debug(_('enter: do_setup'))
 
+        self._helpers.host_index_ttl = (
+            self.configuration.storwize_svc_host_index_ttl)
+
         # Get storage system name, id, and code level
         self._state.update(self._helpers.get_system_info())
 
@@ -486,6 +494,10 @@ class StorwizeSVCDriver(san.SanDriver):
                 connector.pop('wwpns', None)
 
             host_name = self._helpers.get_host_from_connector(connector)
+            if host_name is None:
+                # The host may have been created since the index was built.
+                host_name = self._helpers.get_host_from_connector(
+                    connector, rebuild_index=True)
             if host_name is None:
                 msg = (_('terminate_connection: Failed to get host name from'
                          ' connector.'))
@@ -17,6 +17,7 @@
 import random
 import re
 import six
+import time
 import unicodedata
 
 from eventlet import greenthread
@@ -38,6 +39,11 @@ class StorwizeHelpers(object):
     def __init__(self, run_ssh):
         self.ssh = storwize_ssh.StorwizeSSH(run_ssh)
         self.check_fcmapping_interval = 3
+        # Seconds a port missing from the host index is trusted to really
+        # have no host, the index is rebuilt on a miss once older.
+        self.host_index_ttl = 0
+        self._host_index = None
+        self._host_index_time = None
 
     @staticmethod
     def handle_keyerror(cmd, out):
@@ -174,8 +180,12 @@ class StorwizeHelpers(object):
                 wwpns.add(wwpn)
         return list(wwpns)
 
-    def get_host_from_connector(self, connector):
-        """Return the Storwize host described by the connector."""
+    def get_host_from_connector(self, connector, rebuild_index=False):
+        """Return the Storwize host described by the connector.
+
+        A miss in the host index is trusted for host_index_ttl seconds,
+        unless rebuild_index is set.
+        """
         LOG.debug(_('enter: get_host_from_connector: %s') % connector)
 
         # If we have FC information, we have a faster lookup option
@@ -193,25 +203,87 @@ class StorwizeHelpers(object):
                     except KeyError:
                         self.handle_keyerror('lsfabric', wwpn_info)
 
-        # That didn't work, so try exhaustive search
+        # That didn't work, so look up the host of the ports
         if host_name is None:
-            hosts_info = self.ssh.lshost()
-            for name in hosts_info.select('name'):
-                resp = self.ssh.lshost(host=name)
-                for iscsi, wwpn in resp.select('iscsi_name', 'WWPN'):
-                    if ('initiator' in connector and
-                            iscsi == connector['initiator']):
-                        host_name = name
-                    elif ('wwpns' in connector and
-                          len(connector['wwpns']) and
-                          wwpn and
-                          wwpn.lower() in
-                          [str(x).lower() for x in connector['wwpns']]):
-                        host_name = name
+            host_name = self._find_host_by_ports(
+                self._get_connector_ports(connector), rebuild=rebuild_index)
 
         LOG.debug(_('leave: get_host_from_connector: host %s') % host_name)
         return host_name
 
+    @staticmethod
+    def _get_connector_ports(connector):
+        ports = []
+        if 'initiator' in connector:
+            ports.append(connector['initiator'])
+        for wwpn in connector.get('wwpns', []):
+            ports.append(str(wwpn).lower())
+        return ports
+
+    def _get_host_ports(self, host_name):
+        ports = []
+        resp = self.ssh.lshost(host=host_name)
+        for iscsi, wwpn in resp.select('iscsi_name', 'WWPN'):
+            if iscsi:
+                ports.append(iscsi)
+            if wwpn:
+                ports.append(wwpn.lower())
+        return ports
+
+    def _build_host_index(self):
+        """Map the ports of all the hosts on the storage system to them.
+
+        The CLI cannot list the ports of all the hosts at once, this takes
+        one command per host.
+        """
+        index = {}
+        hosts_info = self.ssh.lshost()
+        for name in hosts_info.select('name'):
+            for port in self._get_host_ports(name):
+                index[port] = name
+        self._host_index = index
+        self._host_index_time = time.time()
+
+    def _lookup_host_index(self, ports):
+        for port in ports:
+            if port in self._host_index:
+                return self._host_index[port]
+        return None
+
+    def _find_host_by_ports(self, ports, rebuild=False):
+        """Return the host having one of the ports.
+
+        A host found in the index is checked to still have the port, the
+        index is rebuilt if it does not.
+        """
+        if self._host_index is not None and not rebuild:
+            host_name = self._lookup_host_index(ports)
+            if host_name is not None:
+                try:
+                    host_ports = self._get_host_ports(host_name)
+                except exception.VolumeBackendAPIException:
+                    host_ports = []
+                if set(ports) & set(host_ports):
+                    return host_name
+                LOG.debug(_('Host %s no longer has the connector ports, '
+                            'rebuilding the host index.') % host_name)
+            elif (time.time() - self._host_index_time <
+                    self.host_index_ttl):
+                return None
+        self._build_host_index()
+        return self._lookup_host_index(ports)
+
+    def _index_host(self, host_name, ports):
+        if self._host_index is not None:
+            for port in ports:
+                self._host_index[port] = host_name
+
+    def _unindex_host(self, host_name):
+        if self._host_index is not None:
+            for port, name in self._host_index.items():
+                if name == host_name:
+                    del self._host_index[port]
+
     def create_host(self, connector):
         """Create a new host on the storage system.
 
@@ -261,11 +333,24 @@ class StorwizeHelpers(object):
 
         # Create a host with one port
         port = ports.pop(0)
-        self.ssh.mkhost(host_name, port[0], port[1])
+        try:
+            self.ssh.mkhost(host_name, port[0], port[1])
+        except exception.VolumeBackendAPIException:
+            # The ports may belong to a host created since the host index
+            # was built, e.g. by another Cinder node.
+            with excutils.save_and_reraise_exception() as ctxt:
+                existing = self._find_host_by_ports(
+                    self._get_connector_ports(connector), rebuild=True)
+                if existing is not None:
+                    LOG.info(_('create_host: using existing host %s')
+                             % existing)
+                    ctxt.reraise = False
+            return existing
 
         # Add any additional ports to the host
         for port in ports:
             self.ssh.addhostport(host_name, port[0], port[1])
+        self._index_host(host_name, self._get_connector_ports(connector))
 
         LOG.debug(_('leave: create_host: host %(host)s - %(host_name)s') %
                   {'host': connector['host'], 'host_name': host_name})
@@ -273,6 +358,7 @@ class StorwizeHelpers(object):
 
     def delete_host(self, host_name):
         self.ssh.rmhost(host_name)
+        self._unindex_host(host_name)
 
     def map_vol_to_host(self, volume_name, host_name, multihostmap):
         """Create a mapping between a volume to a host."""
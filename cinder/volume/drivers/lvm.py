@@ -30,6 +30,7 @@ from cinder import exception
 from cinder.image import image_utils
 from cinder.openstack.common import fileutils
 from cinder.openstack.common import log as logging
+from cinder.openstack.common import loopingcall
 from cinder.openstack.common import processutils
 from cinder import units
 from cinder import utils
@@ -49,6 +50,22 @@ volume_opts = [
     cfg.StrOpt('lvm_type',
                default='default',
                help='Type of LVM volumes to deploy; (default or thin)'),
+    cfg.BoolOpt('lvm_clear_deferred',
+                default=False,
+                help='If set, deleted volumes are renamed and wiped by a '
+                     'background task instead of during the delete '
+                     'request'),
+    cfg.IntOpt('lvm_clear_bandwidth',
+               default=0,
+               help='Maximum rate in MiB/s at which deferred wipes write '
+                    'to the volume group, for both volume_clear=zero and '
+                    'volume_clear=shred. 0 => unlimited'),
+    cfg.IntOpt('lvm_metadata_cache_interval',
+               default=0,
+               help='Seconds for which LV and VG information is served '
+                    'from memory between full lvs/vgs refreshes. Changes '
+                    'made by Cinder itself are applied to the cached view '
+                    'immediately. 0 => disabled'),
 ]
 
 CONF = cfg.CONF
@@ -60,6 +77,12 @@ class LVMVolumeDriver(driver.VolumeDriver):
 
     VERSION = '2.0.0'
 
+    # LVs waiting for a deferred wipe are renamed with this prefix so that
+    # they survive a service restart and can be picked up again.
+    RECLAIM_PREFIX = 'reclaim-'
+    RECLAIM_INTERVAL = 10
+    RECLAIM_IONICE = '-c3'
+
     def __init__(self, vg_obj=None, *args, **kwargs):
         super(LVMVolumeDriver, self).__init__(*args, **kwargs)
         self.configuration.append_config_values(volume_opts)
@@ -68,6 +91,8 @@ class LVMVolumeDriver(driver.VolumeDriver):
         self.backend_name =\
             self.configuration.safe_get('volume_backend_name') or 'LVM'
         self.protocol = 'local'
+        self._pending_reclaim = {}
+        self._reclaim_loop = None
 
     def set_execute(self, execute):
         self._execute = execute
@@ -77,10 +102,13 @@ class LVMVolumeDriver(driver.VolumeDriver):
         if self.vg is None:
             root_helper = utils.get_root_helper()
             try:
-                self.vg = lvm.LVM(self.configuration.volume_group,
-                                  root_helper,
-                                  lvm_type=self.configuration.lvm_type,
-                                  executor=self._execute)
+                self.vg = lvm.LVM(
+                    self.configuration.volume_group,
+                    root_helper,
+                    lvm_type=self.configuration.lvm_type,
+                    executor=self._execute,
+                    cache_interval=(
+                        self.configuration.lvm_metadata_cache_interval))
             except brick_exception.VolumeGroupNotFound:
                 message = ("Volume Group %s does not exist" %
                            self.configuration.volume_group)
@@ -113,6 +141,12 @@ class LVMVolumeDriver(driver.VolumeDriver):
                     raise exception.VolumeBackendAPIException(
                         data=exception_message)
 
+        # Resume wiping LVs whose deferred clear was interrupted.
+        if self.configuration.lvm_type != 'thin':
+            for lv in self.vg.get_volumes():
+                if lv['name'].startswith(self.RECLAIM_PREFIX):
+                    self._queue_reclaim(lv['name'], float(lv['size']))
+
     def _sizestr(self, size_in_g):
         if int(size_in_g) == 0:
             return '100m'
@@ -125,6 +159,11 @@ class LVMVolumeDriver(driver.VolumeDriver):
         """Deletes a logical volume."""
         if self.configuration.volume_clear != 'none' and \
                 self.configuration.lvm_type != 'thin':
+            # NOTE: snapshots are always cleared inline, a renamed snapshot
+            # would keep its origin busy until the wipe completes.
+            if self.configuration.lvm_clear_deferred and not is_snapshot:
+                self._defer_clear_volume(volume)
+                return
             self._clear_volume(volume, is_snapshot)
 
         name = volume['name']
@@ -132,9 +171,69 @@ class LVMVolumeDriver(driver.VolumeDriver):
             name = self._escape_snapshot(volume['name'])
         self.vg.delete(name)
 
+    def _get_clear_size(self, volume):
+        size_in_g = volume.get('size', volume.get('volume_size', None))
+        if size_in_g is None:
+            msg = (_("Size for volume: %s not found, "
+                     "cannot secure delete.") % volume['id'])
+            LOG.error(msg)
+            raise exception.InvalidParameterValue(msg)
+        return size_in_g
+
+    def _defer_clear_volume(self, volume):
+        """Hand a deleted volume over to the background reclaim task.
+
+        The LV is renamed so that its name can be reused straight away
+        and so that an interrupted wipe is found again at startup.
+        """
+        size_in_g = self._get_clear_size(volume)
+        reclaim_name = self.RECLAIM_PREFIX + volume['name']
+        self.vg.rename_volume(volume['name'], reclaim_name)
+        self._queue_reclaim(reclaim_name, size_in_g)
+
+    def _queue_reclaim(self, name, size_in_g):
+        LOG.debug(_('Queueing %s for deferred clear') % name)
+        self._pending_reclaim[name] = size_in_g
+        if self._reclaim_loop is None:
+            self._reclaim_loop = loopingcall.FixedIntervalLoopingCall(
+                self._reclaim_volumes)
+            self._reclaim_loop.start(interval=self.RECLAIM_INTERVAL)
+
+    def _reclaim_volumes(self):
+        """Wipe and remove LVs queued by deferred deletes."""
+        ionice = (self.configuration.volume_clear_ionice or
+                  self.RECLAIM_IONICE)
+        for name, size_in_g in self._pending_reclaim.items():
+            try:
+                self._clear_device(
+                    self.local_path({'name': name}), size_in_g,
+                    volume_clear_ionice=ionice,
+                    volume_clear_bandwidth=(
+                        self.configuration.lvm_clear_bandwidth))
+                self.vg.delete(name)
+            except Exception:
+                LOG.exception(_('Deferred clear of %s failed, will '
+                                'retry') % name)
+                continue
+            del self._pending_reclaim[name]
+
+        if not self._pending_reclaim:
+            self._reclaim_loop.stop()
+            self._reclaim_loop = None
+
+    def _clear_device(self, dev_path, size_in_g, **kwargs):
+        # clear_volume expects sizes in MiB, we store integer GiB
+        # be sure to convert before passing in
+        vol_sz_in_meg = int(math.ceil(float(size_in_g) * units.KiB))
+
+        volutils.clear_volume(
+            vol_sz_in_meg, dev_path,
+            volume_clear=self.configuration.volume_clear,
+            volume_clear_size=self.configuration.volume_clear_size,
+            **kwargs)
+
     def _clear_volume(self, volume, is_snapshot=False):
         # zero out old volumes to prevent data leaking between users
-        # TODO(ja): reclaiming space should be done lazy and low priority
         if is_snapshot:
             # if the volume to be cleared is a snapshot of another volume
             # we need to clear out the volume using the -cow instead of the
@@ -154,21 +253,8 @@ class LVMVolumeDriver(driver.VolumeDriver):
             LOG.error(msg)
             raise exception.VolumeBackendAPIException(data=msg)
 
-        size_in_g = volume.get('size', volume.get('volume_size', None))
-        if size_in_g is None:
-            msg = (_("Size for volume: %s not found, "
-                     "cannot secure delete.") % volume['id'])
-            LOG.error(msg)
-            raise exception.InvalidParameterValue(msg)
-
-        # clear_volume expects sizes in MiB, we store integer GiB
-        # be sure to convert before passing in
-        vol_sz_in_meg = size_in_g * units.KiB
-
-        volutils.clear_volume(
-            vol_sz_in_meg, dev_path,
-            volume_clear=self.configuration.volume_clear,
-            volume_clear_size=self.configuration.volume_clear_size)
+        size_in_g = self._get_clear_size(volume)
+        self._clear_device(dev_path, size_in_g)
 
     def _escape_snapshot(self, snapshot_name):
         # Linux LVM reserves name that starts with snapshot, so that
@@ -339,6 +425,12 @@ class LVMVolumeDriver(driver.VolumeDriver):
 
         return self._stats
 
+    def get_cheap_volume_stats(self):
+        # Space held by LVs waiting for a deferred clear is not free yet,
+        # but will be returned to the VG without further deletes.
+        return {'pending_reclaim_gb': sum(
+            float(size) for size in self._pending_reclaim.values())}
+
     def _update_volume_stats(self):
         """Retrieve stats info from volume group."""
 
@@ -349,6 +441,9 @@ class LVMVolumeDriver(driver.VolumeDriver):
             return
 
         self.vg.update_volume_group_info()
+        if self.configuration.lvm_metadata_cache_interval:
+            LOG.debug(_('LVM metadata cache counters: %s') %
+                      self.vg.cache_stats)
         data = {}
 
         # Note(zhiteng): These information are driver/backend specific,
@@ -370,6 +465,7 @@ class LVMVolumeDriver(driver.VolumeDriver):
         else:
             data['total_capacity_gb'] = self.vg.vg_size
             data['free_capacity_gb'] = self.vg.vg_free_space
+        data.update(self.get_cheap_volume_stats())
         data['reserved_percentage'] = self.configuration.reserved_percentage
         data['QoS_support'] = False
         data['location_info'] =\
@@ -506,12 +602,16 @@ class LVMISCSIDriver(LVMVolumeDriver, driver.ISCSIDriver):
                                   'creation for target: %s') % iscsi_name)
         return tid
 
-    def ensure_export(self, context, volume):
+    def _get_export_names(self, volume):
         volume_name = volume['name']
         iscsi_name = "%s%s" % (self.configuration.iscsi_target_prefix,
                                volume_name)
         volume_path = "/dev/%s/%s" % (self.configuration.volume_group,
                                       volume_name)
+        return iscsi_name, volume_path
+
+    def ensure_export(self, context, volume):
+        iscsi_name, volume_path = self._get_export_names(volume)
         # NOTE(jdg): For TgtAdm case iscsi_name is the ONLY param we need
         # should clean this all up at some point in the future
         model_update = self.target_helper.ensure_export(context, volume,
@@ -520,6 +620,11 @@ class LVMISCSIDriver(LVMVolumeDriver, driver.ISCSIDriver):
         if model_update:
             self.db.volume_update(context, volume['id'], model_update)
 
+    def ensure_exports(self, context, volumes):
+        exports = [(volume,) + self._get_export_names(volume)
+                   for volume in volumes]
+        return self.target_helper.ensure_exports(context, exports)
+
     def create_export(self, context, volume):
         return self._create_export(context, volume)
 
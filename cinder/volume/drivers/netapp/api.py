@@ -19,10 +19,12 @@ NetApp api for ONTAP and OnCommand DFM.
 Contains classes required to issue api calls to ONTAP and OnCommand DFM.
 """
 
+import base64
+
 from lxml import etree
-import urllib2
 
 from cinder.openstack.common import log as logging
+from cinder.volume import http_pool
 
 LOG = logging.getLogger(__name__)
 
@@ -53,6 +55,7 @@ class NaServer(object):
         self._username = username
         self._password = password
         self._refresh_conn = True
+        self._pool = None
 
     def get_transport_type(self):
         """Get the transport type protocol."""
@@ -156,6 +159,12 @@ class NaServer(object):
             return self._timeout
         return None
 
+    def get_connection_stats(self):
+        """Gets the statistics of the connection pool, if there is one."""
+        if self._pool is None:
+            return None
+        return self._pool.get_stats()
+
     def get_vfiler(self):
         """Get the vfiler to use in tunneling."""
         return self._vfiler
@@ -186,22 +195,32 @@ class NaServer(object):
         """Invoke the api on the server."""
         if na_element and not isinstance(na_element, NaElement):
             ValueError('NaElement must be supplied to invoke api')
-        request = self._create_request(na_element, enable_tunneling)
-        if not hasattr(self, '_opener') or not self._opener \
-                or self._refresh_conn:
-            self._build_opener()
+        request, headers = self._create_request(na_element, enable_tunneling)
         try:
-            if hasattr(self, '_timeout'):
-                response = self._opener.open(request, timeout=self._timeout)
-            else:
-                response = self._opener.open(request)
-        except urllib2.HTTPError as e:
-            raise NaApiError(e.code, e.msg)
+            response, xml = self._get_pool().request('POST', '/' + self._url,
+                                                     request, headers)
         except Exception as e:
             raise NaApiError('Unexpected error', e)
-        xml = response.read()
+        if response.status >= 400:
+            raise NaApiError(response.status, response.reason)
         return self._get_result(xml)
 
+    def _get_pool(self):
+        """Returns the pool of connections to the server.
+
+        A new pool is set up once the connection settings changed.
+        """
+        if (self._pool is None or self._refresh_conn or
+                self._pool.timeout != self.get_timeout()):
+            if self._pool is not None:
+                self._pool.close()
+            use_ssl = self._protocol == NaServer.TRANSPORT_TYPE_HTTPS
+            self._pool = http_pool.HTTPConnectionPool(
+                self._host, self._port, use_ssl=use_ssl,
+                timeout=self.get_timeout())
+            self._refresh_conn = False
+        return self._pool
+
     def invoke_successfully(self, na_element, enable_tunneling=False):
         """Invokes api and checks execution status as success.
 
@@ -234,10 +253,17 @@ class NaServer(object):
             self._enable_tunnel_request(netapp_elem)
         netapp_elem.add_child_elem(na_element)
         request_d = netapp_elem.to_string()
-        request = urllib2.Request(
-            self._get_url(), data=request_d,
-            headers={'Content-Type': 'text/xml', 'charset': 'utf-8'})
-        return request
+        headers = {'Content-Type': 'text/xml', 'charset': 'utf-8',
+                   'Content-Length': str(len(request_d))}
+        if self._auth_style == NaServer.STYLE_LOGIN_PASSWORD:
+            # Sent up front rather than after a 401 challenge, which would
+            # take a second round trip for every call.
+            credentials = '%s:%s' % (self._username, self._password)
+            headers['Authorization'] = ('Basic %s' %
+                                        base64.b64encode(credentials))
+        else:
+            self._create_certificate_auth_handler()
+        return request_d, headers
 
     def _enable_tunnel_request(self, netapp_elem):
         """Enables vserver or vfiler tunneling."""
@@ -272,25 +298,6 @@ class NaServer(object):
         processed_response = self._parse_response(response)
         return processed_response.get_child_by_name('results')
 
-    def _get_url(self):
-        return '%s://%s:%s/%s' % (self._protocol, self._host, self._port,
-                                  self._url)
-
-    def _build_opener(self):
-        if self._auth_style == NaServer.STYLE_LOGIN_PASSWORD:
-            auth_handler = self._create_basic_auth_handler()
-        else:
-            auth_handler = self._create_certificate_auth_handler()
-        opener = urllib2.build_opener(auth_handler)
-        self._opener = opener
-
-    def _create_basic_auth_handler(self):
-        password_man = urllib2.HTTPPasswordMgrWithDefaultRealm()
-        password_man.add_password(None, self._get_url(), self._username,
-                                  self._password)
-        auth_handler = urllib2.HTTPBasicAuthHandler(password_man)
-        return auth_handler
-
     def _create_certificate_auth_handler(self):
         raise NotImplementedError()
 
@@ -368,6 +368,13 @@ class NetAppDirectISCSIDriver(driver.ISCSIDriver):
         """Gets the list of luns on filer."""
         raise NotImplementedError()
 
+    def _get_lun_by_name(self, name):
+        """Gets the luns with the given name from the filer.
+
+        Cheaper than listing all the luns, but may miss a lun which exists.
+        """
+        return []
+
     def _extract_and_populate_luns(self, api_luns):
         """Extracts the luns from api.
 
@@ -507,9 +514,13 @@ class NetAppDirectISCSIDriver(driver.ISCSIDriver):
     def _get_lun_from_table(self, name):
         """Gets LUN from cache table.
 
-        Refreshes cache if lun not found in cache.
+        Looks up the lun on the filer if not found in cache and refreshes the
+        whole cache only if that did not find it either.
         """
         lun = self.lun_table.get(name)
+        if lun is None:
+            self._extract_and_populate_luns(self._get_lun_by_name(name))
+            lun = self.lun_table.get(name)
         if lun is None:
             self._get_lun_list()
             lun = self.lun_table.get(name)
@@ -568,6 +579,11 @@ class NetAppDirectISCSIDriver(driver.ISCSIDriver):
 
         return self._stats
 
+    def get_connection_stats(self):
+        client = getattr(self, 'client', None)
+        stats = client.get_connection_stats() if client else None
+        return {'http': stats} if stats else {}
+
     def _update_volume_stats(self):
         """Retrieve stats info from volume group."""
         raise NotImplementedError()
@@ -854,7 +870,8 @@ class NetAppDirectCmodeISCSIDriver(NetAppDirectISCSIDriver):
         tag = None
         while True:
             api = NaElement('lun-get-iter')
-            api.add_new_child('max-records', '100')
+            api.add_new_child('max-records',
+                              str(self.configuration.netapp_lun_page_size))
             if tag:
                 api.add_new_child('tag', tag, True)
             lun_info = NaElement('lun-info')
@@ -871,6 +888,19 @@ class NetAppDirectCmodeISCSIDriver(NetAppDirectISCSIDriver):
             if tag is None:
                 break
 
+    def _get_lun_by_name(self, name):
+        """Gets the luns with the given name in the vserver."""
+        api = NaElement('lun-get-iter')
+        query = NaElement('query')
+        api.add_child_elem(query)
+        query.add_node_with_children('lun-info', **{'vserver': self.vserver,
+                                                    'path': '*/%s' % name})
+        result = self.client.invoke_successfully(api)
+        attr_list = result.get_child_by_name('attributes-list')
+        if attr_list is None:
+            return []
+        return attr_list.get_children()
+
     def _find_mapped_lun_igroup(self, path, initiator, os=None):
         """Find the igroup for mapped lun with initiator."""
         initiator_igroups = self._get_igroup_by_initiator(initiator=initiator)
@@ -1303,6 +1333,17 @@ class NetAppDirect7modeISCSIDriver(NetAppDirectISCSIDriver):
             lun_list.extend(luns)
         self._extract_and_populate_luns(lun_list)
 
+    def _get_lun_by_name(self, name):
+        """Gets the lun with the given name in the configured volumes."""
+        for vol in self.volume_list or []:
+            try:
+                luns = self._get_lun_by_args(path='/vol/%s/%s' % (vol, name))
+            except NaApiError:
+                continue
+            if luns:
+                return luns
+        return []
+
     def _get_vol_luns(self, vol_name):
         """Gets the luns for a volume."""
         api = NaElement('lun-list-info')
@@ -657,6 +657,11 @@ class NetAppDirectNfsDriver (NetAppNFSDriver):
         """Returns an error if prerequisites aren't met."""
         self._check_flags()
 
+    def get_connection_stats(self):
+        client = getattr(self, '_client', None)
+        stats = client.get_connection_stats() if client else None
+        return {'http': stats} if stats else {}
+
     def _check_flags(self):
         """Raises error if any required configuration flag is missing."""
         required_flags = ['netapp_login',
@@ -98,7 +98,12 @@ netapp_cluster_opts = [
                      'Vserver will only be used for provisioning in the '
                      'future. Block storage volumes on exports not belonging '
                      'to the Vserver specified by this option will continue '
-                     'to function normally.')), ]
+                     'to function normally.')),
+    cfg.IntOpt('netapp_lun_page_size',
+               default=1000,
+               help=('The number of LUNs requested per call when the driver '
+                     'lists all the LUNs of the Vserver. Larger pages need '
+                     'fewer round trips to the storage cluster.')), ]
 
 netapp_7mode_opts = [
     cfg.StrOpt('netapp_vfiler',
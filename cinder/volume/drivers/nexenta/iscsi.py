@@ -71,6 +71,7 @@ class NexentaISCSIDriver(driver.ISCSIDriver):  # pylint: disable=R0921
         self.nms_port = self.configuration.nexenta_rest_port
         self.nms_user = self.configuration.nexenta_user
         self.nms_password = self.configuration.nexenta_password
+        self.nms_timeout = self.configuration.nexenta_rest_timeout
         self.volume = self.configuration.nexenta_volume
         self.rrmgr_compression = self.configuration.nexenta_rrmgr_compression
         self.rrmgr_tcp_buf_size = self.configuration.nexenta_rrmgr_tcp_buf_size
@@ -94,7 +95,7 @@ class NexentaISCSIDriver(driver.ISCSIDriver):  # pylint: disable=R0921
             protocol, auto = self.nms_protocol, False
         self.nms = jsonrpc.NexentaJSONProxy(
             protocol, self.nms_host, self.nms_port, '/rest/nms', self.nms_user,
-            self.nms_password, auto=auto)
+            self.nms_password, auto=auto, timeout=self.nms_timeout)
 
     def check_for_setup_error(self):
         """Verify that the volume for our zvols exists.
@@ -215,12 +216,12 @@ class NexentaISCSIDriver(driver.ISCSIDriver):  # pylint: disable=R0921
                                    connections=self.rrmgr_connections)
 
     @staticmethod
-    def get_nms_for_url(url):
+    def get_nms_for_url(url, timeout=None):
         """Returns initialized nms object for url."""
         auto, scheme, user, password, host, port, path =\
             utils.parse_nms_url(url)
         return jsonrpc.NexentaJSONProxy(scheme, host, port, path, user,
-                                        password, auto=auto)
+                                        password, auto=auto, timeout=timeout)
 
     def migrate_volume(self, ctxt, volume, host):
         """Migrate if volume and host are managed by Nexenta appliance.
@@ -303,7 +304,7 @@ class NexentaISCSIDriver(driver.ISCSIDriver):  # pylint: disable=R0921
                           "NexentaStor Appliance: %(exc)s"),
                         {'volume': volume['name'], 'exc': exc})
 
-        dst_nms = self.get_nms_for_url(nms_url)
+        dst_nms = self.get_nms_for_url(nms_url, timeout=self.nms_timeout)
         dst_snapshot = '%s/%s@%s' % (dst_volume, volume['name'],
                                      snapshot['name'])
         try:
@@ -21,11 +21,10 @@
 .. moduleauthor:: Victor Rodionov <victor.rodionov@nexenta.com>
 """
 
-import urllib2
-
 from cinder.openstack.common import jsonutils
 from cinder.openstack.common import log as logging
 from cinder.volume.drivers import nexenta
+from cinder.volume import http_pool
 
 LOG = logging.getLogger(__name__)
 
@@ -37,7 +36,7 @@ class NexentaJSONException(nexenta.NexentaException):
 class NexentaJSONProxy(object):
 
     def __init__(self, scheme, host, port, path, user, password, auto=False,
-                 obj=None, method=None):
+                 obj=None, method=None, pools=None, timeout=None):
         self.scheme = scheme.lower()
         self.host = host
         self.port = port
@@ -47,6 +46,10 @@ class NexentaJSONProxy(object):
         self.auto = auto
         self.obj = obj
         self.method = method
+        self.timeout = timeout
+        # Connection pools by scheme, shared with the proxies of the objects
+        # and methods below this one.
+        self.pools = {} if pools is None else pools
 
     def __getattr__(self, name):
         if not self.obj:
@@ -57,7 +60,7 @@ class NexentaJSONProxy(object):
             obj, method = '%s.%s' % (self.obj, self.method), name
         return NexentaJSONProxy(self.scheme, self.host, self.port, self.path,
                                 self.user, self.password, self.auto, obj,
-                                method)
+                                method, self.pools, self.timeout)
 
     @property
     def url(self):
@@ -69,6 +72,15 @@ class NexentaJSONProxy(object):
     def __repr__(self):
         return 'NMS proxy: %s' % self.url
 
+    def _request(self, data, headers):
+        pool = self.pools.get(self.scheme)
+        if pool is None:
+            pool = http_pool.HTTPConnectionPool(
+                self.host, self.port, use_ssl=self.scheme == 'https',
+                timeout=self.timeout)
+            self.pools[self.scheme] = pool
+        return pool.request('POST', self.path, data, headers)
+
     def __call__(self, *args):
         data = jsonutils.dumps({
             'object': self.obj,
@@ -81,18 +93,21 @@ class NexentaJSONProxy(object):
             'Authorization': 'Basic %s' % auth
         }
         LOG.debug(_('Sending JSON data: %s'), data)
-        request = urllib2.Request(self.url, data, headers)
-        response_obj = urllib2.urlopen(request)
-        if response_obj.info().status == 'EOF in headers':
+        response_obj, response_data = self._request(data, headers)
+        if response_obj.msg.status == 'EOF in headers':
             if not self.auto or self.scheme != 'http':
                 LOG.error(_('No headers in server response'))
                 raise NexentaJSONException(_('Bad response from server'))
             LOG.info(_('Auto switching to HTTPS connection to %s'), self.url)
             self.scheme = 'https'
-            request = urllib2.Request(self.url, data, headers)
-            response_obj = urllib2.urlopen(request)
+            response_obj, response_data = self._request(data, headers)
 
-        response_data = response_obj.read()
+        if response_obj.status != 200:
+            LOG.error(_('Server responded with status %(status)s '
+                        '%(reason)s'),
+                      {'status': response_obj.status,
+                       'reason': response_obj.reason})
+            raise NexentaJSONException(_('Bad response from server'))
         LOG.debug(_('Got response: %s'), response_data)
         response = jsonutils.loads(response_data)
         if response.get('error') is not None:
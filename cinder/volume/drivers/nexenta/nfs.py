@@ -59,6 +59,8 @@ class NexentaNfsDriver(nfs.NfsDriver):  # pylint: disable=R0921
     def __init__(self, *args, **kwargs):
         super(NexentaNfsDriver, self).__init__(*args, **kwargs)
         if self.configuration:
+            self.configuration.append_config_values(
+                options.NEXENTA_CONNECTION_OPTIONS)
             self.configuration.append_config_values(
                 options.NEXENTA_NFS_OPTIONS)
         conf = self.configuration
@@ -409,8 +411,9 @@ class NexentaNfsDriver(nfs.NfsDriver):  # pylint: disable=R0921
         """Returns initialized nms object for url."""
         auto, scheme, user, password, host, port, path =\
             utils.parse_nms_url(url)
-        return jsonrpc.NexentaJSONProxy(scheme, host, port, path, user,
-                                        password, auto=auto)
+        return jsonrpc.NexentaJSONProxy(
+            scheme, host, port, path, user, password, auto=auto,
+            timeout=self.configuration.nexenta_rest_timeout)
 
     def _get_snapshot_volume(self, snapshot):
         ctxt = context.get_admin_context()
@@ -34,6 +34,10 @@ NEXENTA_CONNECTION_OPTIONS = [
     cfg.StrOpt('nexenta_rest_protocol',
                default='auto',
                help='Use http or https for REST connection (default auto)'),
+    cfg.IntOpt('nexenta_rest_timeout',
+               default=60,
+               help='Seconds to wait for the REST API server to respond to '
+                    'a request before giving up'),
     cfg.StrOpt('nexenta_user',
                default='admin',
                help='User name to connect to Nexenta SA'),
@@ -14,12 +14,18 @@
 """RADOS Block Device Driver"""
 
 from __future__ import absolute_import
+import collections
 import io
 import json
 import os
 import tempfile
+import time
 import urllib
 
+import eventlet
+from eventlet import event
+from eventlet import greenthread
+from eventlet import tpool
 from oslo.config import cfg
 
 from cinder import exception
@@ -68,10 +74,31 @@ rbd_opts = [
                default=5,
                help='Maximum number of nested volume clones that are '
                     'taken before a flatten occurs. Set to 0 to disable '
-                    'cloning.')]
+                    'cloning.'),
+    cfg.IntOpt('rbd_flatten_workers',
+               default=1,
+               help='Number of volumes flattened at the same time in the '
+                    'background once rbd_max_clone_depth is reached. Set to '
+                    '0 to flatten while the clone is being created.'),
+    cfg.IntOpt('rbd_flatten_concurrent_ops',
+               default=4,
+               help='Number of objects copied in parallel by a background '
+                    'flatten, which bounds the bandwidth it takes from the '
+                    'cluster'),
+    cfg.BoolOpt('rbd_flatten_scan_on_startup',
+                default=False,
+                help='Look for volumes deeper than rbd_max_clone_depth when '
+                     'the volume service starts and queue their flatten. '
+                     'This opens every volume in rbd_pool and its parents.'),
+    cfg.IntOpt('rbd_flatten_wait_timeout',
+               default=300,
+               help='Seconds a clone or snapshot of a volume waiting to be '
+                    'flattened waits for the flatten before failing with '
+                    'VolumeIsBusy')]
 
 CONF = cfg.CONF
 CONF.register_opts(rbd_opts)
+CONF.import_opt('volume_name_template', 'cinder.db')
 
 
 def ascii_str(string):
@@ -192,6 +219,207 @@ class RBDImageIOWrapper(io.RawIOBase):
         pass
 
 
+class RADOSConnectionPool(object):
+    """Connected RADOS clients and open ioctxs, shared between drivers.
+
+    Connecting to the cluster means talking to the monitors and
+    authenticating, which takes long compared to most rbd calls.  All the
+    users of the same rados id and ceph.conf, e.g. the volume and the
+    backup driver, share one connected client, and ioctxs are kept open
+    between uses.
+
+    A client which was not used for check_interval seconds is probed
+    before being handed out again, and replaced by a new connection if the
+    probe fails.  So is one which was in use when an error occurred, and
+    the ioctx used then is closed.
+    """
+
+    _pools = {}
+
+    def __init__(self, rados_module, rados_id, conffile, max_idle=4,
+                 check_interval=60, conf=None):
+        self.rados = rados_module
+        self.rados_id = rados_id
+        self.conffile = conffile
+        self.conf = conf or {}
+        self.max_idle = max_idle
+        self.check_interval = check_interval
+        self._client = None
+        self._last_used = 0
+        self._idle = {}
+        self._ioctx_pools = {}
+        self._in_use = {}
+
+    @classmethod
+    def get_pool(cls, rados_module, rados_id, conffile):
+        """Return the pool of the given credentials, creating it if needed."""
+        key = (rados_module, rados_id, conffile)
+        if key not in cls._pools:
+            cls._pools[key] = cls(rados_module, rados_id, conffile)
+        return cls._pools[key]
+
+    def get(self, pool):
+        """Return a connected client and an ioctx open on pool."""
+        client = self._get_client()
+        idle = self._idle.get(pool)
+        if idle:
+            ioctx = idle.pop()
+        else:
+            try:
+                ioctx = client.open_ioctx(pool)
+            except self.rados.Error:
+                if not self._in_use[client]:
+                    self._retire(client)
+                raise
+        self._ioctx_pools[ioctx] = pool
+        self._in_use[client] += 1
+        return client, ioctx
+
+    def put(self, client, ioctx, error=None):
+        """Give back a client and ioctx returned by get()."""
+        pool = self._ioctx_pools.pop(ioctx, None)
+        self._in_use[client] -= 1
+        self._last_used = time.time()
+        if error is not None:
+            # Have the client checked before it is used again.
+            self._last_used = 0
+            pool = None
+        if (client is self._client and pool is not None and
+                len(self._idle.setdefault(pool, [])) < self.max_idle):
+            self._idle[pool].append(ioctx)
+        else:
+            # closing an ioctx cannot raise an exception
+            ioctx.close()
+        if client is not self._client and not self._in_use[client]:
+            del self._in_use[client]
+            client.shutdown()
+
+    def _get_client(self):
+        client = self._client
+        if (client is not None and
+                time.time() - self._last_used > self.check_interval):
+            try:
+                client.get_cluster_stats()
+            except self.rados.Error:
+                LOG.warning(_('Connection to the ceph cluster as %s failed, '
+                              'reconnecting.'), self.rados_id)
+                self._retire(client)
+                client = None
+
+        if client is None:
+            client = self.rados.Rados(rados_id=self.rados_id,
+                                      conffile=self.conffile)
+            try:
+                for option, value in self.conf.items():
+                    client.conf_set(option, value)
+                client.connect()
+            except self.rados.Error:
+                # shutdown cannot raise an exception
+                client.shutdown()
+                raise
+            self._client = client
+            self._in_use[client] = 0
+        self._last_used = time.time()
+        return client
+
+    def _retire(self, client):
+        """Stop handing out client, shut it down once it is no longer used."""
+        if client is self._client:
+            self._client = None
+            for ioctxs in self._idle.values():
+                for ioctx in ioctxs:
+                    ioctx.close()
+            self._idle = {}
+        if not self._in_use.get(client):
+            self._in_use.pop(client, None)
+            client.shutdown()
+
+
+class RBDFlattener(object):
+    """Flattens volumes in the background.
+
+    At most `workers` volumes are flattened at the same time, the others
+    wait in a queue.  flatten() is a blocking librbd call, so the driver
+    runs it in a native thread.
+    """
+
+    def __init__(self, driver, workers):
+        self.driver = driver
+        self.workers = workers
+        self._queue = collections.deque()
+        self._pending = {}
+        self._after = {}
+        self._running = set()
+        self._threads = 0
+
+    def queue(self, volume_name, after=None):
+        """Flatten volume_name once a worker is free.
+
+        If after is given, the flatten waits for the one of after to be
+        done first.
+        """
+        if volume_name in self._pending:
+            return
+        self._pending[volume_name] = event.Event()
+        if after is not None:
+            self._after[volume_name] = after
+        self._queue.append(volume_name)
+        while self._threads < self.workers and self._queue:
+            self._threads += 1
+            greenthread.spawn_n(self._work)
+
+    def is_pending(self, volume_name):
+        return volume_name in self._pending
+
+    def wait(self, volume_name, queued=True, timeout=None):
+        """Wait until volume_name is flattened, if it is queued.
+
+        A queued flatten waited for is moved to the front of the queue, so
+        it does not wait behind the flattens of unrelated volumes.  With
+        queued=False only a flatten which has already started is waited
+        for.  Returns False if the flatten was not done within timeout
+        seconds.
+        """
+        done = self._pending.get(volume_name)
+        if done is None:
+            return True
+        if not queued and volume_name not in self._running:
+            return True
+        self._prioritize(volume_name)
+        with eventlet.Timeout(timeout, False):
+            done.wait()
+            return True
+        return False
+
+    def _prioritize(self, volume_name):
+        """Move volume_name and the flatten it waits for to the front."""
+        if volume_name in self._queue:
+            self._queue.remove(volume_name)
+            self._queue.appendleft(volume_name)
+        after = self._after.get(volume_name)
+        if after is not None:
+            self._prioritize(after)
+
+    def _work(self):
+        try:
+            while self._queue:
+                volume_name = self._queue.popleft()
+                after = self._after.pop(volume_name, None)
+                if after is not None:
+                    self.wait(after)
+                self._running.add(volume_name)
+                try:
+                    self.driver._flatten_volume(volume_name)
+                except Exception:
+                    LOG.exception(_('Failed to flatten volume %s'),
+                                  volume_name)
+                finally:
+                    self._running.discard(volume_name)
+                    self._pending.pop(volume_name).send()
+        finally:
+            self._threads -= 1
+
+
 class RBDVolumeProxy(object):
     """Context manager for dealing with an existing rbd volume.
 
@@ -223,7 +451,8 @@ class RBDVolumeProxy(object):
         try:
             self.volume.close()
         finally:
-            self.driver._disconnect_from_rados(self.client, self.ioctx)
+            self.driver._disconnect_from_rados(self.client, self.ioctx,
+                                               error=value)
 
     def __getattr__(self, attrib):
         return getattr(self.volume, attrib)
@@ -239,7 +468,8 @@ class RADOSClient(object):
         return self
 
     def __exit__(self, type_, value, traceback):
-        self.driver._disconnect_from_rados(self.cluster, self.ioctx)
+        self.driver._disconnect_from_rados(self.cluster, self.ioctx,
+                                           error=value)
 
 
 class RBDDriver(driver.VolumeDriver):
@@ -251,6 +481,8 @@ class RBDDriver(driver.VolumeDriver):
         super(RBDDriver, self).__init__(*args, **kwargs)
         self.configuration.append_config_values(rbd_opts)
         self._stats = {}
+        self._flattener = None
+        self._flatten_rados = None
         # allow overrides for testing
         self.rados = kwargs.get('rados', rados)
         self.rbd = kwargs.get('rbd', rbd)
@@ -268,6 +500,43 @@ class RBDDriver(driver.VolumeDriver):
             LOG.exception(msg)
             raise exception.VolumeBackendAPIException(data=msg)
 
+    def do_setup(self, context):
+        """Re-queue the flattens lost with a restart of the service."""
+        if (self.configuration.rbd_flatten_scan_on_startup and
+                self.configuration.rbd_flatten_workers > 0 and
+                CONF.rbd_max_clone_depth > 0):
+            greenthread.spawn_n(self._queue_deep_clones)
+
+    def _is_volume_name(self, name):
+        prefix, _sep, suffix = CONF.volume_name_template.partition('%s')
+        return (len(name) > len(prefix) + len(suffix) and
+                name.startswith(prefix) and name.endswith(suffix))
+
+    def _queue_deep_clones(self):
+        """Queue flattens for the volumes deeper than rbd_max_clone_depth.
+
+        Only images named after volume_name_template are looked at, and
+        librbd is called in native threads so the service keeps running.
+        """
+        try:
+            with RADOSClient(self) as client:
+                names = tpool.execute(self.rbd.RBD().list, client.ioctx)
+                for name in names:
+                    name = str(name)
+                    if (name.endswith('.deleted') or
+                            not self._is_volume_name(name)):
+                        continue
+                    try:
+                        depth = tpool.execute(self._get_clone_depth, client,
+                                              name, check_limit=False)
+                    except self.rbd.ImageNotFound:
+                        continue
+                    if depth > CONF.rbd_max_clone_depth:
+                        LOG.info(_("queueing flatten of %s") % name)
+                        self._get_flattener().queue(name)
+        except Exception:
+            LOG.exception(_("failed to look for clones to flatten"))
+
     def _ceph_args(self):
         args = []
         if self.configuration.rbd_user:
@@ -276,24 +545,18 @@ class RBDDriver(driver.VolumeDriver):
             args.extend(['--conf', self.configuration.rbd_ceph_conf])
         return args
 
-    def _connect_to_rados(self, pool=None):
+    def _get_rados_pool(self):
         ascii_user = ascii_str(self.configuration.rbd_user)
         ascii_conf = ascii_str(self.configuration.rbd_ceph_conf)
-        client = self.rados.Rados(rados_id=ascii_user, conffile=ascii_conf)
-        try:
-            client.connect()
-            pool_to_open = str(pool or self.configuration.rbd_pool)
-            ioctx = client.open_ioctx(pool_to_open)
-            return client, ioctx
-        except self.rados.Error:
-            # shutdown cannot raise an exception
-            client.shutdown()
-            raise
+        return RADOSConnectionPool.get_pool(self.rados, ascii_user,
+                                            ascii_conf)
+
+    def _connect_to_rados(self, pool=None):
+        pool_to_open = str(pool or self.configuration.rbd_pool)
+        return self._get_rados_pool().get(pool_to_open)
 
-    def _disconnect_from_rados(self, client, ioctx):
-        # closing an ioctx cannot raise an exception
-        ioctx.close()
-        client.shutdown()
+    def _disconnect_from_rados(self, client, ioctx, error=None):
+        self._get_rados_pool().put(client, ioctx, error=error)
 
     def _get_backup_snaps(self, rbd_image):
         """Get list of any backup snapshots that exist on this volume.
@@ -360,7 +623,8 @@ class RBDDriver(driver.VolumeDriver):
     def _supports_layering(self):
         return hasattr(self.rbd, 'RBD_FEATURE_LAYERING')
 
-    def _get_clone_depth(self, client, volume_name, depth=0):
+    def _get_clone_depth(self, client, volume_name, depth=0,
+                         check_limit=True):
         """Returns the number of ancestral clones (if any) of the given volume.
         """
         parent_volume = self.rbd.Image(client.ioctx, volume_name)
@@ -375,11 +639,12 @@ class RBDDriver(driver.VolumeDriver):
 
         # If clone depth was reached, flatten should have occurred so if it has
         # been exceeded then something has gone wrong.
-        if depth > CONF.rbd_max_clone_depth:
+        if check_limit and depth > CONF.rbd_max_clone_depth:
             raise Exception(_("clone depth exceeds limit of %s") %
                             (CONF.rbd_max_clone_depth))
 
-        return self._get_clone_depth(client, parent, depth + 1)
+        return self._get_clone_depth(client, parent, depth + 1,
+                                     check_limit=check_limit)
 
     def create_cloned_volume(self, volume, src_vref):
         """Create a cloned volume from another volume.
@@ -390,11 +655,14 @@ class RBDDriver(driver.VolumeDriver):
         The user has the option to limit how long a volume's clone chain can be
         by setting rbd_max_clone_depth. If a clone is made of another clone
         and that clone has rbd_max_clone_depth clones behind it, the source
-        volume will be flattened.
+        volume will be flattened. Unless rbd_flatten_workers is 0, the new
+        clone and then the source are flattened in the background instead,
+        so the clone is available right away.
         """
         src_name = str(src_vref['name'])
         dest_name = str(volume['name'])
         flatten_parent = False
+        flatten_later = False
 
         # Do full copy if requested
         if CONF.rbd_max_clone_depth <= 0:
@@ -403,17 +671,35 @@ class RBDDriver(driver.VolumeDriver):
 
             return
 
+        # Snapshots taken before a flatten still depend on the parent, so
+        # do not clone a volume which is waiting to be flattened.
+        self._wait_for_flatten(
+            src_name, timeout=self.configuration.rbd_flatten_wait_timeout)
+
         # Otherwise do COW clone.
         with RADOSClient(self) as client:
-            depth = self._get_clone_depth(client, src_name)
+            background = self.configuration.rbd_flatten_workers > 0
+            depth = self._get_clone_depth(client, src_name,
+                                          check_limit=not background)
+            if background and depth > CONF.rbd_max_clone_depth:
+                # The background flatten of the source failed or was lost
+                # with a restart, so flatten it now.
+                LOG.warn(_("clone depth of %(vol)s exceeds limit of %(max)s, "
+                           "flattening it") %
+                         {'vol': src_name, 'max': CONF.rbd_max_clone_depth})
+                self._flatten_volume(src_name)
+                depth = 0
             # If source volume is a clone and rbd_max_clone_depth reached,
             # flatten the source before cloning. Zero rbd_max_clone_depth means
             # infinite is allowed.
-            if depth == CONF.rbd_max_clone_depth:
+            if depth >= CONF.rbd_max_clone_depth:
                 LOG.debug(_("maximum clone depth (%d) has been reached - "
                             "flattening source volume") %
                           (CONF.rbd_max_clone_depth))
-                flatten_parent = True
+                if background:
+                    flatten_later = True
+                else:
+                    flatten_parent = True
 
             src_volume = self.rbd.Image(client.ioctx, src_name)
             try:
@@ -459,6 +745,76 @@ class RBDDriver(driver.VolumeDriver):
                 src_volume.close()
 
         LOG.debug(_("clone created successfully"))
+        if flatten_later:
+            # The clone snapshot of the new volume keeps the parent of the
+            # source in use until the new volume is flattened.
+            flattener = self._get_flattener()
+            flattener.queue(dest_name)
+            flattener.queue(src_name, after=dest_name)
+
+    def _get_flattener(self):
+        if self._flattener is None:
+            self._flattener = RBDFlattener(
+                self, self.configuration.rbd_flatten_workers)
+        return self._flattener
+
+    def _wait_for_flatten(self, volume_name, queued=True, timeout=None):
+        if self._flattener is None:
+            return
+        if not self._flattener.wait(volume_name, queued=queued,
+                                    timeout=timeout):
+            msg = (_("Volume %(vol)s is still being flattened after "
+                     "%(timeout)s seconds.") %
+                   {'vol': volume_name, 'timeout': timeout})
+            raise exception.VolumeIsBusy(msg, volume_name=volume_name)
+
+    def _flatten_volume(self, volume_name):
+        """Flatten a clone and drop the reference to its parent.
+
+        Uses connections of its own, on which librbd copies at most
+        rbd_flatten_concurrent_ops objects at a time.  The volume may have
+        been deleted since the flatten was queued.
+        """
+        if self._flatten_rados is None:
+            ops = self.configuration.rbd_flatten_concurrent_ops
+            self._flatten_rados = RADOSConnectionPool(
+                self.rados, ascii_str(self.configuration.rbd_user),
+                ascii_str(self.configuration.rbd_ceph_conf),
+                conf={'rbd_concurrent_management_ops': str(ops)})
+
+        client, ioctx = self._flatten_rados.get(
+            str(self.configuration.rbd_pool))
+        error = None
+        try:
+            try:
+                volume = self.rbd.Image(ioctx, volume_name)
+            except self.rbd.ImageNotFound:
+                LOG.debug(_("volume %s was deleted, not flattening") %
+                          volume_name)
+                return
+            try:
+                pool, parent, snap = self._get_clone_info(volume,
+                                                          volume_name)
+                if parent:
+                    LOG.debug(_("flattening volume %s") % volume_name)
+                    tpool.execute(volume.flatten)
+            finally:
+                volume.close()
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            self._flatten_rados.put(client, ioctx, error=error)
+
+        if parent:
+            with RADOSClient(self) as client:
+                try:
+                    self._delete_clone_parent_refs(client, parent, snap)
+                except self.rbd.ImageBusy:
+                    # Snapshots taken before the flatten still use it.
+                    LOG.debug(_("snapshot %(snap)s of %(parent)s is still "
+                                "in use, not deleting it") %
+                              {'snap': snap, 'parent': parent})
 
     def create_volume(self, volume):
         """Creates a logical volume."""
@@ -559,7 +915,15 @@ class RBDDriver(driver.VolumeDriver):
 
         Deletes references i.e. deleted parent volumes and snapshots.
         """
-        parent_rbd = self.rbd.Image(client.ioctx, parent_name)
+        try:
+            parent_rbd = self.rbd.Image(client.ioctx, parent_name)
+        except self.rbd.ImageNotFound:
+            # The parent may have been deleted in Cinder since its clone was
+            # looked at, e.g. during a flatten, in which case it was renamed.
+            if parent_name.endswith('.deleted'):
+                raise
+            parent_name = parent_name + '.deleted'
+            parent_rbd = self.rbd.Image(client.ioctx, parent_name)
         parent_has_snaps = False
         try:
             # Check for grandparent
@@ -590,6 +954,8 @@ class RBDDriver(driver.VolumeDriver):
         # NOTE(dosaboy): this was broken by commit cbe1d5f. Ensure names are
         #                utf-8 otherwise librbd will barf.
         volume_name = strutils.safe_encode(volume['name'])
+        # A volume being flattened is open and cannot be removed.
+        self._wait_for_flatten(volume_name, queued=False)
         with RADOSClient(self) as client:
             try:
                 rbd_image = self.rbd.Image(client.ioctx, volume_name)
@@ -654,6 +1020,11 @@ class RBDDriver(driver.VolumeDriver):
 
     def create_snapshot(self, snapshot):
         """Creates an rbd snapshot."""
+        # The snapshot would still depend on the parent of a volume which
+        # is waiting to be flattened.
+        self._wait_for_flatten(
+            snapshot['volume_name'],
+            timeout=self.configuration.rbd_flatten_wait_timeout)
         with RBDVolumeProxy(self, snapshot['volume_name']) as volume:
             snap = str(snapshot['name'])
             volume.create_snap(snap)
@@ -278,9 +278,9 @@ class HPLeftHandCLIQProxy(SanISCSIDriver):
         else:
             cliq_args['size'] = '%sGB' % volume['size']
 
-        self._cliq_run_xml("createVolume", cliq_args)
-
-        return self._get_model_update(volume['name'])
+        with self._ssh_session():
+            self._cliq_run_xml("createVolume", cliq_args)
+            return self._get_model_update(volume['name'])
 
     def extend_volume(self, volume, new_size):
         """Extend the size of an existing volume."""
@@ -296,9 +296,9 @@ class HPLeftHandCLIQProxy(SanISCSIDriver):
         cliq_args['snapshotName'] = snapshot['name']
         cliq_args['volumeName'] = volume['name']
 
-        self._cliq_run_xml("cloneSnapshot", cliq_args)
-
-        return self._get_model_update(volume['name'])
+        with self._ssh_session():
+            self._cliq_run_xml("cloneSnapshot", cliq_args)
+            return self._get_model_update(volume['name'])
 
     def create_snapshot(self, snapshot):
         """Creates a snapshot."""
@@ -313,15 +313,20 @@ class HPLeftHandCLIQProxy(SanISCSIDriver):
         cliq_args = {}
         cliq_args['volumeName'] = volume['name']
         cliq_args['prompt'] = 'false'  # Don't confirm
-        try:
-            self._cliq_get_volume_info(volume['name'])
-        except processutils.ProcessExecutionError:
-            LOG.error(_("Volume did not exist. It will not be deleted"))
-            return
-        self._cliq_run_xml("deleteVolume", cliq_args)
+        with self._ssh_session():
+            try:
+                self._cliq_get_volume_info(volume['name'])
+            except processutils.ProcessExecutionError:
+                LOG.error(_("Volume did not exist. It will not be deleted"))
+                return
+            self._cliq_run_xml("deleteVolume", cliq_args)
 
     def delete_snapshot(self, snapshot):
         """Deletes a snapshot."""
+        with self._ssh_session():
+            self._delete_snapshot(snapshot)
+
+    def _delete_snapshot(self, snapshot):
         cliq_args = {}
         cliq_args['snapshotName'] = snapshot['name']
         cliq_args['prompt'] = 'false'  # Don't confirm
@@ -365,11 +370,12 @@ class HPLeftHandCLIQProxy(SanISCSIDriver):
             }
 
         """
-        self._create_server(connector)
         cliq_args = {}
         cliq_args['volumeName'] = volume['name']
         cliq_args['serverName'] = connector['host']
-        self._cliq_run_xml("assignVolumeToServer", cliq_args)
+        with self._ssh_session():
+            self._create_server(connector)
+            self._cliq_run_xml("assignVolumeToServer", cliq_args)
 
         iscsi_data = self._get_iscsi_properties(volume)
         return {
@@ -13,10 +13,13 @@
 #    under the License.
 #
 from hashlib import md5
-import urllib2
+import httplib
+import socket
 
 from lxml import etree
 
+from cinder.volume import http_pool
+
 
 class HPMSAConnectionError(Exception):
     pass
@@ -31,11 +34,30 @@ class HPMSARequestError(Exception):
 
 
 class HPMSAClient(object):
-    def __init__(self, host, login, password, protocol='http'):
+    def __init__(self, host, login, password, protocol='http', timeout=None):
         self._login = login
         self._password = password
-        self._base_url = "%s://%s/api" % (protocol, host)
+        self._base_url = "/api"
         self._session_key = None
+        use_ssl = protocol == 'https'
+        self._pool = http_pool.HTTPConnectionPool(
+            host, 443 if use_ssl else 80, use_ssl=use_ssl, timeout=timeout)
+
+    def _get(self, url, headers=None, resend=True):
+        """Sends a GET request to the device and returns the reply.
+
+        Commands which change the configuration of the device are sent as
+        GETs too, they must be sent with resend=False so that the pool
+        never runs them twice.
+        """
+        try:
+            response, data = self._pool.request('GET', url, headers=headers,
+                                                resend=resend)
+        except (httplib.HTTPException, socket.error):
+            raise HPMSAConnectionError()
+        if response.status != 200:
+            raise HPMSAConnectionError()
+        return data
 
     def _get_auth_token(self, xml):
         """Parse an XML authentication reply to extract the session key."""
@@ -53,10 +75,7 @@ class HPMSAClient(object):
         digest = hash.hexdigest()
 
         url = self._base_url + "/login/" + digest
-        try:
-            xml = urllib2.urlopen(url).read()
-        except urllib2.URLError:
-            raise HPMSAConnectionError()
+        xml = self._get(url)
 
         self._get_auth_token(xml)
 
@@ -110,11 +129,7 @@ class HPMSAClient(object):
 
         url = self._build_request_url(path, args, **kargs)
         headers = {'dataType': 'api', 'sessionKey': self._session_key}
-        req = urllib2.Request(url, headers=headers)
-        try:
-            xml = urllib2.urlopen(req).read()
-        except urllib2.URLError:
-            raise HPMSAConnectionError()
+        xml = self._get(url, headers, resend=path.startswith('/show/'))
 
         try:
             tree = etree.XML(xml)
@@ -127,7 +142,7 @@ class HPMSAClient(object):
     def logout(self):
         url = self._base_url + '/exit'
         try:
-            urllib2.urlopen(url)
+            self._get(url)
             return True
         except HPMSARequestError:
             return False
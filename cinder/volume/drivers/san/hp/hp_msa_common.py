@@ -31,6 +31,10 @@ hpmsa_opt = [
     cfg.StrOpt('msa_vdisk',
                default='OpenStack',
                help="The VDisk to use for volume creation."),
+    cfg.IntOpt('msa_api_timeout',
+               default=60,
+               help="Seconds to wait for the array to respond to a request "
+                    "before giving up."),
 ]
 
 CONF = cfg.CONF
@@ -46,7 +50,8 @@ class HPMSACommon(object):
         self.config = config
         self.client = msa.HPMSAClient(self.config.san_ip,
                                       self.config.san_login,
-                                      self.config.san_password)
+                                      self.config.san_password,
+                                      timeout=self.config.msa_api_timeout)
 
         self.vdisk = self.config.msa_vdisk
 
@@ -19,8 +19,10 @@ The unique thing about a SAN is that we don't expect that we can run the volume
 controller on the SAN hardware.  We expect to access it over SSH or some API.
 """
 
+import contextlib
 import random
 
+from eventlet import corolocal
 from eventlet import greenthread
 from oslo.config import cfg
 
@@ -69,6 +71,10 @@ san_opts = [
     cfg.IntOpt('ssh_max_pool_conn',
                default=5,
                help='Maximum ssh connections in the pool'),
+    cfg.IntOpt('ssh_pool_check_interval',
+               default=60,
+               help='Interval in seconds between checks of the idle ssh '
+                    'connections in the pool, 0 to disable the checks'),
 ]
 
 CONF = cfg.CONF
@@ -90,6 +96,8 @@ class SanDriver(driver.VolumeDriver):
         self.configuration.append_config_values(san_opts)
         self.run_local = self.configuration.san_is_local
         self.sshpool = None
+        # Greenthread local, set while an _ssh_session() is open.
+        self._ssh_local = corolocal.local()
 
     def san_execute(self, *cmd, **kwargs):
         if self.run_local:
@@ -99,10 +107,12 @@ class SanDriver(driver.VolumeDriver):
             command = ' '.join(cmd)
             return self._run_ssh(command, check_exit_code)
 
-    def _run_ssh(self, cmd_list, check_exit_code=True, attempts=1):
-        utils.check_ssh_injection(cmd_list)
-        command = ' '. join(cmd_list)
+    def _get_ssh_pool(self):
+        """Return the ssh pool, creating it on first use.
 
+        The pool opens ssh_min_pool_conn connections right away and checks
+        the idle ones every ssh_pool_check_interval seconds.
+        """
         if not self.sshpool:
             password = self.configuration.san_password
             privatekey = self.configuration.san_private_key
@@ -116,37 +126,91 @@ class SanDriver(driver.VolumeDriver):
                                          privatekey=privatekey,
                                          min_size=min_size,
                                          max_size=max_size)
+            self.sshpool.start_health_check(
+                self.configuration.ssh_pool_check_interval)
+        return self.sshpool
+
+    def _run_ssh(self, cmd_list, check_exit_code=True, attempts=1):
+        utils.check_ssh_injection(cmd_list)
+        command = ' '. join(cmd_list)
+        sshpool = self._get_ssh_pool()
+
         last_exception = None
         try:
-            with self.sshpool.item() as ssh:
-                while attempts > 0:
-                    attempts -= 1
-                    try:
+            while attempts > 0:
+                attempts -= 1
+                try:
+                    # The connection goes back to the pool before waiting
+                    # for the next attempt.
+                    with self._ssh_connection(sshpool) as ssh:
                         return processutils.ssh_execute(
                             ssh,
                             command,
                             check_exit_code=check_exit_code)
-                    except Exception as e:
-                        LOG.error(e)
-                        last_exception = e
+                except Exception as e:
+                    LOG.error(e)
+                    last_exception = e
+                    if attempts > 0:
                         greenthread.sleep(random.randint(20, 500) / 100.0)
-                try:
-                    raise processutils.ProcessExecutionError(
-                        exit_code=last_exception.exit_code,
-                        stdout=last_exception.stdout,
-                        stderr=last_exception.stderr,
-                        cmd=last_exception.cmd)
-                except AttributeError:
-                    raise processutils.ProcessExecutionError(
-                        exit_code=-1,
-                        stdout="",
-                        stderr="Error running SSH command",
-                        cmd=command)
+            try:
+                raise processutils.ProcessExecutionError(
+                    exit_code=last_exception.exit_code,
+                    stdout=last_exception.stdout,
+                    stderr=last_exception.stderr,
+                    cmd=last_exception.cmd)
+            except AttributeError:
+                raise processutils.ProcessExecutionError(
+                    exit_code=-1,
+                    stdout="",
+                    stderr="Error running SSH command",
+                    cmd=command)
 
         except Exception:
             with excutils.save_and_reraise_exception():
                 LOG.error(_("Error running SSH command: %s") % command)
 
+    @contextlib.contextmanager
+    def _ssh_session(self):
+        """Run the _run_ssh() calls made within on one pooled connection.
+
+        Meant for operations made of several CLI commands, where the next
+        command depends on the output of the previous one.  A connection
+        is only checked out by the first command and goes back to the pool
+        when the session ends.
+        """
+        if getattr(self._ssh_local, 'session', None) is not None:
+            yield
+            return
+        session = self._ssh_local.session = {}
+        try:
+            yield
+        finally:
+            self._ssh_local.session = None
+            if 'ssh' in session:
+                self.sshpool.put(session['ssh'])
+
+    @contextlib.contextmanager
+    def _ssh_connection(self, sshpool):
+        session = getattr(self._ssh_local, 'session', None)
+        if session is None:
+            with sshpool.item() as ssh:
+                yield ssh
+            return
+        if 'ssh' not in session:
+            session['ssh'] = sshpool.get()
+        try:
+            yield session['ssh']
+        except Exception:
+            # The connection may be broken, the next command of the
+            # session checks out another one.
+            sshpool.put(session.pop('ssh'))
+            raise
+
+    def get_connection_stats(self):
+        if not self.sshpool:
+            return {}
+        return {'ssh': self.sshpool.get_stats()}
+
     def ensure_export(self, context, volume):
         """Synchronously recreates an export for a logical volume."""
         pass
@@ -14,7 +14,6 @@
 #    under the License.
 
 import base64
-import httplib
 import json
 import random
 import socket
@@ -30,6 +29,7 @@ from cinder.openstack.common import log as logging
 from cinder.openstack.common import timeutils
 from cinder import units
 from cinder.volume.drivers.san.san import SanISCSIDriver
+from cinder.volume import http_pool
 from cinder.volume import qos_specs
 from cinder.volume import volume_types
 
@@ -54,7 +54,12 @@ sf_opts = [
     cfg.IntOpt('sf_api_port',
                default=443,
                help='SolidFire API port. Useful if the device api is behind '
-                    'a proxy on a different port.'), ]
+                    'a proxy on a different port.'),
+
+    cfg.IntOpt('sf_api_timeout',
+               default=60,
+               help='Seconds to wait for the SolidFire API to respond to a '
+                    'request before giving up.'), ]
 
 
 CONF = cfg.CONF
@@ -92,11 +97,26 @@ class SolidFireDriver(SanISCSIDriver):
     def __init__(self, *args, **kwargs):
         super(SolidFireDriver, self).__init__(*args, **kwargs)
         self.configuration.append_config_values(sf_opts)
+        self._http_pool = None
         try:
             self._update_cluster_status()
         except exception.SolidFireAPIException:
             pass
 
+    def _get_http_pool(self):
+        """Get the pool of connections to the cluster's API endpoint."""
+        host = self.configuration.san_ip
+        port = self.configuration.sf_api_port
+        timeout = self.configuration.sf_api_timeout
+        if (self._http_pool is None or self._http_pool.host != host or
+                self._http_pool.port != port or
+                self._http_pool.timeout != timeout):
+            if self._http_pool is not None:
+                self._http_pool.close()
+            self._http_pool = http_pool.HTTPConnectionPool(host, port,
+                                                           timeout=timeout)
+        return self._http_pool
+
     def _issue_api_request(self, method_name, params, version='1.0'):
         """All API requests to SolidFire device go through this method.
 
@@ -109,9 +129,6 @@ class SolidFireDriver(SanISCSIDriver):
                                    'xMaxClonesPerVolumeExceeded',
                                    'xMaxSnapshotsPerNodeExceeded',
                                    'xMaxClonesPerNodeExceeded']
-        host = self.configuration.san_ip
-        port = self.configuration.sf_api_port
-
         cluster_admin = self.configuration.san_login
         cluster_password = self.configuration.san_password
 
@@ -142,20 +159,17 @@ class SolidFireDriver(SanISCSIDriver):
             LOG.debug(_("Payload for SolidFire API call: %s"), payload)
 
             api_endpoint = '/json-rpc/%s' % version
-            connection = httplib.HTTPSConnection(host, port)
             try:
-                connection.request('POST', api_endpoint, payload, header)
+                response, data = self._get_http_pool().request(
+                    'POST', api_endpoint, payload, header)
             except Exception as ex:
                 LOG.error(_('Failed to make httplib connection '
                             'SolidFire Cluster: %s (verify san_ip '
                             'settings)') % ex.message)
                 msg = _("Failed to make httplib connection: %s") % ex.message
                 raise exception.SolidFireAPIException(msg)
-            response = connection.getresponse()
 
-            data = {}
             if response.status != 200:
-                connection.close()
                 LOG.error(_('Request to SolidFire cluster returned '
                             'bad status: %(status)s / %(reason)s (check '
                             'san_login/san_password settings)') %
@@ -167,17 +181,13 @@ class SolidFireDriver(SanISCSIDriver):
                 raise exception.SolidFireAPIException(msg)
 
             else:
-                data = response.read()
                 try:
                     data = json.loads(data)
                 except (TypeError, ValueError) as exc:
-                    connection.close()
                     msg = _("Call to json.loads() raised "
                             "an exception: %s") % exc
                     raise exception.SfJsonEncodeFailure(msg)
 
-                connection.close()
-
             LOG.debug(_("Results of SolidFire API call: %s"), data)
 
             if 'error' in data:
@@ -615,6 +625,12 @@ class SolidFireDriver(SanISCSIDriver):
 
         return model
 
+    def get_connection_stats(self):
+        stats = super(SolidFireDriver, self).get_connection_stats()
+        if self._http_pool is not None:
+            stats['http'] = self._http_pool.get_stats()
+        return stats
+
     def get_volume_stats(self, refresh=False):
         """Get volume status.
 
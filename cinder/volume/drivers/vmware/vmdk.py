@@ -89,6 +89,21 @@ vmdk_opts = [
                     'The driver attempts to retrieve the version from VMware '
                     'VC server. Set this configuration only if you want to '
                     'override the VC server version.'),
+    cfg.IntOpt('vmware_backing_index_ttl',
+               default=600,
+               help='Seconds after which the index of volume backing names '
+                    'is rebuilt by listing all the VMs on the server. '
+                    'Backings are otherwise looked up in the index, which '
+                    'is kept up to date by the operations of the driver. '
+                    '0 disables the index and lists the VMs on every '
+                    'lookup.'),
+    cfg.IntOpt('vmware_inventory_cache_ttl',
+               default=300,
+               help='Seconds after which the hosts, datastores, resource '
+                    'pools and storage profile matches used to place '
+                    'volumes are refreshed in the background. Placement '
+                    'uses the cached inventory meanwhile. 0 disables the '
+                    'cache.'),
 ]
 
 CONF = cfg.CONF
@@ -175,12 +190,18 @@ class VMwareEsxVmdkDriver(driver.VolumeDriver):
                                                  wsdl_loc=wsdl_loc)
         return self._session
 
+    def _create_volumeops(self):
+        max_objects = self.configuration.vmware_max_objects_retrieval
+        index_ttl = self.configuration.vmware_backing_index_ttl
+        inventory_ttl = self.configuration.vmware_inventory_cache_ttl
+        return volumeops.VMwareVolumeOps(self.session, max_objects,
+                                         backing_index_ttl=index_ttl,
+                                         inventory_cache_ttl=inventory_ttl)
+
     @property
     def volumeops(self):
         if not self._volumeops:
-            max_objects = self.configuration.vmware_max_objects_retrieval
-            self._volumeops = volumeops.VMwareVolumeOps(self.session,
-                                                        max_objects)
+            self._volumeops = self._create_volumeops()
         return self._volumeops
 
     def do_setup(self, context):
@@ -200,9 +221,7 @@ class VMwareEsxVmdkDriver(driver.VolumeDriver):
         # Create the session object for the first time for ESX driver
         driver = self.__class__.__name__
         if driver == 'VMwareEsxVmdkDriver':
-            max_objects = self.configuration.vmware_max_objects_retrieval
-            self._volumeops = volumeops.VMwareVolumeOps(self.session,
-                                                        max_objects)
+            self._volumeops = self._create_volumeops()
             LOG.info(_("Successfully setup driver: %(driver)s for "
                        "server: %(ip)s.") %
                      {'driver': driver,
@@ -1188,8 +1207,7 @@ class VMwareVcVmdkDriver(VMwareEsxVmdkDriver):
             self._session = None
 
         # recreate session and initialize volumeops
-        max_objects = self.configuration.vmware_max_objects_retrieval
-        self._volumeops = volumeops.VMwareVolumeOps(self.session, max_objects)
+        self._volumeops = self._create_volumeops()
 
         LOG.info(_("Successfully setup driver: %(driver)s for server: "
                    "%(ip)s.") % {'driver': self.__class__.__name__,
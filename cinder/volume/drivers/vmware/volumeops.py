@@ -17,6 +17,10 @@
 Implements operations on volumes residing on VMware datastores.
 """
 
+import time
+
+from eventlet import greenthread
+
 from cinder.openstack.common import log as logging
 from cinder import units
 from cinder.volume.drivers.vmware import error_util
@@ -57,12 +61,38 @@ def split_datastore_path(datastore_path):
     return (datastore_name.strip(), folder_path.strip(), file_name.strip())
 
 
+def _ref_value(ref):
+    # References returned by different calls are distinct objects, only
+    # their values can be compared.
+    return getattr(ref, 'value', ref)
+
+
+class _HostsResult(object):
+    """All the hosts, in the format of a RetrievePropertiesEx result."""
+
+    def __init__(self, objects):
+        self.objects = objects
+
+
 class VMwareVolumeOps(object):
     """Manages volume operations."""
 
-    def __init__(self, session, max_objects):
+    def __init__(self, session, max_objects, backing_index_ttl=0,
+                 inventory_cache_ttl=0):
         self._session = session
         self._max_objects = max_objects
+        # The hosts, datastores, resource pools and storage profile matches
+        # used to place backings, cached for inventory_cache_ttl seconds.
+        # Older entries keep being used while they are refreshed in the
+        # background.  0 disables the cache.
+        self._inventory_cache_ttl = inventory_cache_ttl
+        self._inventory = {}
+        # Backing name -> managed object reference, rebuilt from a single
+        # listing of all the VMs at most every backing_index_ttl seconds.
+        # 0 disables the index.
+        self._backing_index_ttl = backing_index_ttl
+        self._backing_index = {}
+        self._backing_index_time = None
 
     def get_backing(self, name):
         """Get the backing based on name.
@@ -70,7 +100,27 @@ class VMwareVolumeOps(object):
         :param name: Name of the backing
         :return: Managed object reference to the backing
         """
+        if not self._backing_index_ttl:
+            return self._find_backing(name)
+
+        backing = None
+        if not self._backing_index_expired():
+            backing = self._backing_index.get(name)
+            if backing is not None and not self._is_named(backing, name):
+                LOG.debug(_("Backing: %(backing)s is no longer named: "
+                            "%(name)s.") % {'backing': backing, 'name': name})
+                del self._backing_index[name]
+                backing = None
+        if backing is None:
+            # Not indexed, or the index is stale: list all the VMs again,
+            # which is what looking for a single backing costs anyway.
+            self._build_backing_index()
+            backing = self._backing_index.get(name)
+        if backing is None:
+            LOG.debug(_("Did not find any backing with name: %s") % name)
+        return backing
 
+    def _find_backing(self, name):
         retrieve_result = self._session.invoke_api(vim_util, 'get_objects',
                                                    self._session.vim,
                                                    'VirtualMachine',
@@ -87,6 +137,93 @@ class VMwareVolumeOps(object):
 
         LOG.debug(_("Did not find any backing with name: %s") % name)
 
+    def _backing_index_expired(self):
+        return (self._backing_index_time is None or
+                time.time() - self._backing_index_time >
+                self._backing_index_ttl)
+
+    def _build_backing_index(self):
+        index = {}
+        retrieve_result = self._session.invoke_api(vim_util, 'get_objects',
+                                                   self._session.vim,
+                                                   'VirtualMachine',
+                                                   self._max_objects)
+        while retrieve_result:
+            for vm in retrieve_result.objects:
+                index[vm.propSet[0].val] = vm.obj
+            retrieve_result = self.continue_retrieval(retrieve_result)
+        LOG.debug(_("Indexed %d backings.") % len(index))
+        self._backing_index = index
+        self._backing_index_time = time.time()
+
+    def _is_named(self, backing, name):
+        try:
+            return self.get_entity_name(backing) == name
+        except error_util.VimException:
+            # E.g. ManagedObjectNotFound, the backing has been deleted.
+            return False
+
+    def _index_backing(self, name, backing):
+        if self._backing_index_ttl:
+            self._backing_index[name] = backing
+
+    def _unindex_backing(self, backing):
+        value = _ref_value(backing)
+        for name, indexed in self._backing_index.items():
+            if _ref_value(indexed) == value:
+                del self._backing_index[name]
+
+    def _cached(self, key, fetch, *args):
+        """Return fetch(*args) from the inventory cache."""
+        if not self._inventory_cache_ttl:
+            return fetch(*args)
+        entry = self._inventory.get(key)
+        if entry is None:
+            value = fetch(*args)
+            self._inventory[key] = {'value': value,
+                                    'time': time.time(),
+                                    'refreshing': False}
+            return value
+        if (not entry['refreshing'] and
+                time.time() - entry['time'] > self._inventory_cache_ttl):
+            entry['refreshing'] = True
+            greenthread.spawn_n(self._refresh_cached, key, fetch, *args)
+        return entry['value']
+
+    def _refresh_cached(self, key, fetch, *args):
+        try:
+            value = fetch(*args)
+        except Exception as excep:
+            # Fetched again by the next lookup.
+            LOG.debug(_("Unable to refresh %(key)s: %(excep)s") %
+                      {'key': key, 'excep': excep})
+            self._inventory.pop(key, None)
+            return
+        self._inventory[key] = {'value': value,
+                                'time': time.time(),
+                                'refreshing': False}
+
+    def _consume_space(self, ds_name, size_kb):
+        """Account for space used by a backing in the cached summaries."""
+        for key, entry in self._inventory.items():
+            if key[0] == 'summary' and entry['value'].name == ds_name:
+                entry['value'].freeSpace -= size_kb * units.KiB
+
+    def _forget_summary(self, datastore):
+        """Fetch the summary of a datastore again on its next lookup.
+
+        Used after operations whose space usage is not known here, such as
+        copying the disks of an existing backing.
+        """
+        self._inventory.pop(('summary', _ref_value(datastore)), None)
+
+    def _forget_entity(self, entity):
+        """Drop the cached lookups made for a managed entity."""
+        value = _ref_value(entity)
+        for key in self._inventory.keys():
+            if len(key) > 1 and key[1] == value:
+                self._inventory.pop(key, None)
+
     def delete_backing(self, backing):
         """Delete the backing.
 
@@ -97,6 +234,8 @@ class VMwareVolumeOps(object):
                                         backing)
         LOG.debug(_("Initiated deletion of VM backing: %s.") % backing)
         self._session.wait_for_task(task)
+        self._unindex_backing(backing)
+        self._forget_entity(backing)
         LOG.info(_("Deleted the VM backing: %s.") % backing)
 
     # TODO(kartikaditya) Keep the methods not specific to volume in
@@ -116,9 +255,22 @@ class VMwareVolumeOps(object):
 
         :return: All the hosts from the inventory
         """
-        return self._session.invoke_api(vim_util, 'get_objects',
-                                        self._session.vim,
-                                        'HostSystem', self._max_objects)
+        if not self._inventory_cache_ttl:
+            return self._session.invoke_api(vim_util, 'get_objects',
+                                            self._session.vim,
+                                            'HostSystem', self._max_objects)
+        return self._cached(('hosts',), self._get_all_hosts)
+
+    def _get_all_hosts(self):
+        hosts = []
+        retrieve_result = self._session.invoke_api(vim_util, 'get_objects',
+                                                   self._session.vim,
+                                                   'HostSystem',
+                                                   self._max_objects)
+        while retrieve_result:
+            hosts.extend(retrieve_result.objects)
+            retrieve_result = self.continue_retrieval(retrieve_result)
+        return _HostsResult(hosts)
 
     def continue_retrieval(self, retrieve_result):
         """Continue retrieval of results if necessary.
@@ -175,7 +327,10 @@ class VMwareVolumeOps(object):
         :return: List of managed object references of all connected
                  hosts
         """
+        return self._cached(('connected_hosts', _ref_value(datastore)),
+                            self._get_connected_hosts, datastore)
 
+    def _get_connected_hosts(self, datastore):
         host_mounts = self._session.invoke_api(vim_util, 'get_object_property',
                                                self._session.vim, datastore,
                                                'host')
@@ -209,7 +364,10 @@ class VMwareVolumeOps(object):
         :return: Datastores accessible to the host and resource pool to which
                  the host belongs to
         """
+        return self._cached(('dss_rp', _ref_value(host)),
+                            self._get_dss_rp, host)
 
+    def _get_dss_rp(self, host):
         props = self._session.invoke_api(vim_util, 'get_object_properties',
                                          self._session.vim, host,
                                          ['datastore', 'parent'])
@@ -267,7 +425,8 @@ class VMwareVolumeOps(object):
         :param child: Reference of the child entity
         :return: Parent Datacenter of the param child entity
         """
-        return self._get_parent(child, 'Datacenter')
+        return self._cached(('dc', _ref_value(child)),
+                            self._get_parent, child, 'Datacenter')
 
     def get_vmfolder(self, datacenter):
         """Get the vmFolder.
@@ -275,9 +434,10 @@ class VMwareVolumeOps(object):
         :param datacenter: Reference to the datacenter entity
         :return: vmFolder property of the datacenter
         """
-        return self._session.invoke_api(vim_util, 'get_object_property',
-                                        self._session.vim, datacenter,
-                                        'vmFolder')
+        return self._cached(('vmfolder', _ref_value(datacenter)),
+                            self._session.invoke_api, vim_util,
+                            'get_object_property', self._session.vim,
+                            datacenter, 'vmFolder')
 
     def create_folder(self, parent_folder, child_folder_name):
         """Creates child folder with given name under the given parent folder.
@@ -438,6 +598,8 @@ class VMwareVolumeOps(object):
         LOG.debug(_("Initiated creation of volume backing: %s.") % name)
         task_info = self._session.wait_for_task(task)
         backing = task_info.result
+        self._index_backing(name, backing)
+        self._consume_space(ds_name, size_kb)
         LOG.info(_("Successfully created volume backing: %s.") % backing)
         return backing
 
@@ -457,9 +619,10 @@ class VMwareVolumeOps(object):
         :param datastore: Reference to the datastore
         :return: 'summary' property of the datastore
         """
-        return self._session.invoke_api(vim_util, 'get_object_property',
-                                        self._session.vim, datastore,
-                                        'summary')
+        return self._cached(('summary', _ref_value(datastore)),
+                            self._session.invoke_api, vim_util,
+                            'get_object_property', self._session.vim,
+                            datastore, 'summary')
 
     def _get_relocate_spec(self, datastore, resource_pool, host,
                            disk_move_type):
@@ -504,6 +667,7 @@ class VMwareVolumeOps(object):
                                         backing, spec=relocate_spec)
         LOG.debug(_("Initiated relocation of volume backing: %s.") % backing)
         self._session.wait_for_task(task)
+        self._forget_summary(datastore)
         LOG.info(_("Successfully relocated volume backing: %(backing)s "
                    "to datastore: %(ds)s and resource pool: %(rp)s.") %
                  {'backing': backing, 'ds': datastore, 'rp': resource_pool})
@@ -670,6 +834,9 @@ class VMwareVolumeOps(object):
         LOG.debug(_("Initiated clone of backing: %s.") % name)
         task_info = self._session.wait_for_task(task)
         new_backing = task_info.result
+        self._index_backing(name, new_backing)
+        if datastore is not None:
+            self._forget_summary(datastore)
         LOG.info(_("Successfully created clone: %s.") % new_backing)
         return new_backing
 
@@ -797,6 +964,10 @@ class VMwareVolumeOps(object):
         :param profile_name: profile name as string
         :return: profile id as string
         """
+        return self._cached(('profile_id', profile_name),
+                            self._retrieve_profile_id, profile_name)
+
+    def _retrieve_profile_id(self, profile_name):
         LOG.debug(_("Trying to retrieve profile id for %s"), profile_name)
         for profile in self.get_all_profiles():
             if profile.name == profile_name:
@@ -812,6 +983,12 @@ class VMwareVolumeOps(object):
         :param profile_id: profile id string
         :return: subset of hubs that match given profile_id
         """
+        key = ('matching_hubs', getattr(profile_id, 'uniqueId', profile_id),
+               tuple(sorted(getattr(hub, 'hubId', hub) for hub in hubs)))
+        return self._cached(key, self._filter_matching_hubs, hubs,
+                            profile_id)
+
+    def _filter_matching_hubs(self, hubs, profile_id):
         LOG.debug(_("Filtering hubs %(hubs)s that match profile "
                     "%(profile)s."), {'hubs': hubs, 'profile': profile_id})
         pbm = self._session.pbm
@@ -20,14 +20,13 @@ This driver requires VPSA with API ver.13.07 or higher.
 """
 
 
-import httplib
-
 from lxml import etree
 from oslo.config import cfg
 
 from cinder import exception
 from cinder.openstack.common import log as logging
 from cinder.volume import driver
+from cinder.volume import http_pool
 
 LOG = logging.getLogger(__name__)
 
@@ -41,6 +40,9 @@ zadara_opts = [
     cfg.BoolOpt('zadara_vpsa_use_ssl',
                 default=False,
                 help='Use SSL connection'),
+    cfg.IntOpt('zadara_api_timeout',
+               default=60,
+               help='Seconds to wait for the VPSA to respond to a request'),
     cfg.StrOpt('zadara_user',
                default=None,
                help='User name for the VPSA'),
@@ -79,6 +81,10 @@ class ZadaraVPSAConnection(object):
     def __init__(self, conf):
         self.conf = conf
         self.access_key = None
+        self._http_pool = http_pool.HTTPConnectionPool(
+            conf.zadara_vpsa_ip, conf.zadara_vpsa_port,
+            use_ssl=conf.zadara_vpsa_use_ssl,
+            timeout=conf.zadara_api_timeout)
 
         self.ensure_connection()
 
@@ -227,6 +233,10 @@ class ZadaraVPSAConnection(object):
 
         self.access_key = access_key
 
+    def get_stats(self):
+        """Return the statistics of the HTTP connection pool."""
+        return self._http_pool.get_stats()
+
     def send_cmd(self, cmd, **kwargs):
         """Send command to VPSA Controller."""
 
@@ -236,20 +246,10 @@ class ZadaraVPSAConnection(object):
         LOG.debug(_('Sending %(method)s to %(url)s. Body "%(body)s"'),
                   {'method': method, 'url': url, 'body': body})
 
-        if self.conf.zadara_vpsa_use_ssl:
-            connection = httplib.HTTPSConnection(self.conf.zadara_vpsa_ip,
-                                                 self.conf.zadara_vpsa_port)
-        else:
-            connection = httplib.HTTPConnection(self.conf.zadara_vpsa_ip,
-                                                self.conf.zadara_vpsa_port)
-        connection.request(method, url, body)
-        response = connection.getresponse()
+        response, data = self._http_pool.request(method, url, body)
 
         if response.status != 200:
-            connection.close()
             raise exception.BadHTTPResponseStatus(status=response.status)
-        data = response.read()
-        connection.close()
 
         xml_tree = etree.fromstring(data)
         status = xml_tree.findtext('status')
@@ -281,6 +281,11 @@ class ZadaraVPSAISCSIDriver(driver.ISCSIDriver):
         """Returns an error (exception) if prerequisites aren't met."""
         self.vpsa.ensure_connection()
 
+    def get_connection_stats(self):
+        if getattr(self, 'vpsa', None) is None:
+            return {}
+        return {'http': self.vpsa.get_stats()}
+
     def local_path(self, volume):
         """Return local path to existing local volume."""
         raise NotImplementedError()
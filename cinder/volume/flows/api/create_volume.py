@@ -688,22 +688,8 @@ class VolumeCastTask(flow_utils.CinderTask):
         LOG.error(_('Unexpected build error:'), exc_info=exc_info)
 
 
-def get_flow(scheduler_rpcapi, volume_rpcapi, db,
-             image_service,
-             az_check_functor,
-             create_what):
-    """Constructs and returns the api entrypoint flow.
-
-    This flow will do the following:
-
-    1. Inject keys & values for dependent tasks.
-    2. Extracts and validates the input keys & values.
-    3. Reserves the quota (reverts quota on any failures).
-    4. Creates the database entry.
-    5. Commits the quota.
-    6. Casts to volume manager or scheduler for further processing.
-    """
-
+def _build_flow(scheduler_rpcapi, volume_rpcapi, db, image_service,
+                az_check_functor):
     flow_name = ACTION.replace(":", "_") + "_api"
     api_flow = linear_flow.Flow(flow_name)
 
@@ -720,6 +706,39 @@ def get_flow(scheduler_rpcapi, volume_rpcapi, db,
     # This will cast it out to either the scheduler or volume manager via
     # the rpc apis provided.
     api_flow.add(VolumeCastTask(scheduler_rpcapi, volume_rpcapi, db))
+    return api_flow
+
+
+def get_flow(scheduler_rpcapi, volume_rpcapi, db,
+             image_service,
+             az_check_functor,
+             create_what):
+    """Constructs and returns the api entrypoint flow.
+
+    This flow will do the following:
+
+    1. Inject keys & values for dependent tasks.
+    2. Extracts and validates the input keys & values.
+    3. Reserves the quota (reverts quota on any failures).
+    4. Creates the database entry.
+    5. Commits the quota.
+    6. Casts to volume manager or scheduler for further processing.
+    """
+
+    api_flow = _build_flow(scheduler_rpcapi, volume_rpcapi, db,
+                           image_service, az_check_functor)
 
     # Now load (but do not run) the flow using the provided initial data.
     return taskflow.engines.load(api_flow, store=create_what)
+
+
+def get_prebuilt_flow(scheduler_rpcapi, volume_rpcapi, db, image_service,
+                      az_check_functor):
+    """Returns the api entrypoint flow of get_flow() prebuilt.
+
+    Engines are loaded with its load() method, given the create_what
+    get_flow() takes.
+    """
+    return flow_utils.PrebuiltFlow(_build_flow, scheduler_rpcapi,
+                                   volume_rpcapi, db, image_service,
+                                   az_check_functor)
@@ -52,14 +52,14 @@ class OnFailureRescheduleTask(flow_utils.CinderTask):
     this volume elsewhere.
     """
 
-    def __init__(self, reschedule_context, db, scheduler_rpcapi):
+    def __init__(self, db, scheduler_rpcapi):
         requires = ['filter_properties', 'image_id', 'request_spec',
-                    'snapshot_id', 'volume_id', 'context']
+                    'snapshot_id', 'volume_id', 'context',
+                    'reschedule_context']
         super(OnFailureRescheduleTask, self).__init__(addons=[ACTION],
                                                       requires=requires)
         self.scheduler_rpcapi = scheduler_rpcapi
         self.db = db
-        self.reschedule_context = reschedule_context
         # These exception types will trigger the volume to be set into error
         # status rather than being rescheduled.
         self.no_reschedule_types = [
@@ -142,7 +142,8 @@ class OnFailureRescheduleTask(flow_utils.CinderTask):
             LOG.exception(_("Volume %s: resetting 'creating' status failed."),
                           volume_id)
 
-    def revert(self, context, result, flow_failures, **kwargs):
+    def revert(self, context, result, flow_failures, reschedule_context,
+               **kwargs):
         # Check if we have a cause which can tell us not to reschedule.
         for failure in flow_failures.values():
             if failure.check(*self.no_reschedule_types):
@@ -150,8 +151,8 @@ class OnFailureRescheduleTask(flow_utils.CinderTask):
 
         volume_id = kwargs['volume_id']
         # Use a different context when rescheduling.
-        if self.reschedule_context:
-            context = self.reschedule_context
+        if reschedule_context:
+            context = reschedule_context
             try:
                 cause = list(flow_failures.values())[0]
                 self._pre_reschedule(context, volume_id)
@@ -657,6 +658,42 @@ class CreateVolumeOnFinishTask(NotifyVolumeActionTask):
         })
 
 
+def _build_flow(db, driver, scheduler_rpcapi, host, reschedule):
+    flow_name = ACTION.replace(":", "_") + "_manager"
+    volume_flow = linear_flow.Flow(flow_name)
+
+    volume_flow.add(ExtractVolumeRefTask(db, host))
+
+    if reschedule:
+        volume_flow.add(OnFailureRescheduleTask(db, scheduler_rpcapi))
+
+    volume_flow.add(ExtractVolumeSpecTask(db),
+                    NotifyVolumeActionTask(db, "create.start"),
+                    CreateVolumeFromSpecTask(db, driver),
+                    CreateVolumeOnFinishTask(db, "create.end"))
+    return volume_flow
+
+
+def get_store(context, volume_id, reschedule_context, request_spec,
+              filter_properties, snapshot_id=None, image_id=None,
+              source_volid=None):
+    """Returns the initial values the manager entrypoint flow works on."""
+
+    # This injects the initial starting flow values into the workflow so that
+    # the dependency order of the tasks provides/requires can be correctly
+    # determined.
+    return {
+        'context': context,
+        'filter_properties': filter_properties,
+        'image_id': image_id,
+        'request_spec': request_spec,
+        'reschedule_context': reschedule_context,
+        'snapshot_id': snapshot_id,
+        'source_volid': source_volid,
+        'volume_id': volume_id,
+    }
+
+
 def get_flow(context, db, driver, scheduler_rpcapi, host, volume_id,
              allow_reschedule, reschedule_context, request_spec,
              filter_properties, snapshot_id=None, image_id=None,
@@ -676,32 +713,23 @@ def get_flow(context, db, driver, scheduler_rpcapi, host, volume_id,
        has ended and performs further database status updates.
     """
 
-    flow_name = ACTION.replace(":", "_") + "_manager"
-    volume_flow = linear_flow.Flow(flow_name)
+    volume_flow = _build_flow(db, driver, scheduler_rpcapi, host,
+                              allow_reschedule and request_spec)
+    create_what = get_store(context, volume_id, reschedule_context,
+                            request_spec, filter_properties,
+                            snapshot_id=snapshot_id, image_id=image_id,
+                            source_volid=source_volid)
 
-    # This injects the initial starting flow values into the workflow so that
-    # the dependency order of the tasks provides/requires can be correctly
-    # determined.
-    create_what = {
-        'context': context,
-        'filter_properties': filter_properties,
-        'image_id': image_id,
-        'request_spec': request_spec,
-        'snapshot_id': snapshot_id,
-        'source_volid': source_volid,
-        'volume_id': volume_id,
-    }
-
-    volume_flow.add(ExtractVolumeRefTask(db, host))
+    # Now load (but do not run) the flow using the provided initial data.
+    return taskflow.engines.load(volume_flow, store=create_what)
 
-    if allow_reschedule and request_spec:
-        volume_flow.add(OnFailureRescheduleTask(reschedule_context,
-                                                db, scheduler_rpcapi))
 
-    volume_flow.add(ExtractVolumeSpecTask(db),
-                    NotifyVolumeActionTask(db, "create.start"),
-                    CreateVolumeFromSpecTask(db, driver),
-                    CreateVolumeOnFinishTask(db, "create.end"))
+def get_prebuilt_flow(db, driver, scheduler_rpcapi, host, reschedule):
+    """Returns the manager entrypoint flow of get_flow() prebuilt.
 
-    # Now load (but do not run) the flow using the provided initial data.
-    return taskflow.engines.load(volume_flow, store=create_what)
+    Whether the flow reschedules on failure is decided when building it,
+    callers need one prebuilt flow with and one without rescheduling.
+    Engines are loaded with its load() method, given a get_store() result.
+    """
+    return flow_utils.PrebuiltFlow(_build_flow, db, driver, scheduler_rpcapi,
+                                   host, reschedule)
@@ -0,0 +1,192 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Keep-alive HTTP(S) connections to the API endpoint of a storage backend.
+
+Drivers talking to a REST or JSON-RPC API used to open a new connection,
+and for HTTPS do a new TLS handshake, for every call.  A pool keeps the
+connections to one endpoint open between calls instead.
+"""
+
+import errno
+import httplib
+import socket
+import time
+
+from cinder.openstack.common.gettextutils import _
+from cinder.openstack.common import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+# Errors raised while connecting, the request was not sent yet and can be
+# sent again safely.
+_CONNECT_ERRNOS = (errno.ECONNREFUSED, errno.EHOSTUNREACH, errno.ENETUNREACH)
+# Errors raised when the server closed a connection while it was idle.
+_CLOSED_ERRNOS = (errno.ECONNRESET, errno.EPIPE)
+# Methods which may be sent again once the server may have received them.
+_IDEMPOTENT_METHODS = ('GET', 'HEAD', 'PUT', 'DELETE', 'OPTIONS')
+
+
+class HTTPConnectionPool(object):
+    """Keep-alive connections to one endpoint.
+
+    request() sends the request over an idle connection if there is one,
+    or a new one otherwise, and puts the connection back once the response
+    has been read.  Connections idle for more than idle_timeout seconds are
+    closed rather than reused, as servers close them after a while.
+    """
+
+    def __init__(self, host, port, use_ssl=True, timeout=None, max_idle=4,
+                 idle_timeout=5, retries=3, retry_interval=1):
+        self.host = host
+        self.port = port
+        self.use_ssl = use_ssl
+        self.timeout = timeout
+        self.max_idle = max_idle
+        self.idle_timeout = idle_timeout
+        self.retries = retries
+        self.retry_interval = retry_interval
+        self._idle = []
+        self._stats = {'requests': 0, 'errors': 0, 'connects': 0,
+                       'total_time': 0.0, 'max_time': 0.0}
+
+    def __str__(self):
+        return '%s://%s:%s' % ('https' if self.use_ssl else 'http',
+                               self.host, self.port)
+
+    def request(self, method, url, body=None, headers=None, resend=True):
+        """Send a request and return the response and its body.
+
+        A request which could not be sent because an idle connection had
+        been closed by the server is sent again right away over a new
+        connection.  One which failed to connect is sent again after waiting
+        retry_interval seconds, doubled on every further attempt.  Once
+        sent, only idempotent requests are sent again, since the server may
+        have acted on the request before the connection broke.  Pass
+        resend=False for a request which changes state on the server even
+        though its method is idempotent, such as a command sent as a GET.
+        """
+        attempt = 0
+        while True:
+            conn, reused = self._get_connection()
+            start = time.time()
+            try:
+                if headers:
+                    conn.request(method, url, body, headers)
+                else:
+                    conn.request(method, url, body)
+            except (httplib.HTTPException, socket.error) as e:
+                self._close(conn)
+                self._record(start, error=True)
+                if reused and self._closed_by_peer(e):
+                    LOG.debug(_('Connection to %s closed while idle, '
+                                'reconnecting.'), self)
+                    continue
+                err = getattr(e, 'errno', None)
+                if err in _CONNECT_ERRNOS and attempt < self.retries:
+                    interval = self.retry_interval * 2 ** attempt
+                    attempt += 1
+                    LOG.warning(_('Failed to connect to %(endpoint)s: '
+                                  '%(error)s, retrying in %(interval)s '
+                                  'seconds.'),
+                                {'endpoint': self, 'error': e,
+                                 'interval': interval})
+                    time.sleep(interval)
+                    continue
+                raise
+            except Exception:
+                self._close(conn)
+                self._record(start, error=True)
+                raise
+
+            try:
+                response = conn.getresponse()
+                data = response.read()
+            except (httplib.HTTPException, socket.error) as e:
+                self._close(conn)
+                self._record(start, error=True)
+                if (reused and resend and
+                        method.upper() in _IDEMPOTENT_METHODS and
+                        self._closed_by_peer(e)):
+                    LOG.debug(_('Connection to %s closed while idle, '
+                                'reconnecting.'), self)
+                    continue
+                raise
+            except Exception:
+                self._close(conn)
+                self._record(start, error=True)
+                raise
+            self._record(start)
+            if (getattr(response, 'will_close', False) or
+                    len(self._idle) >= self.max_idle):
+                self._close(conn)
+            else:
+                self._idle.append((conn, time.time()))
+            return response, data
+
+    def close(self):
+        """Close all the idle connections."""
+        while self._idle:
+            self._close(self._idle.pop()[0])
+
+    def get_stats(self):
+        """Return the number of requests and their latency in seconds."""
+        stats = dict(self._stats)
+        if stats['requests']:
+            stats['avg_time'] = stats['total_time'] / stats['requests']
+        else:
+            stats['avg_time'] = 0.0
+        return stats
+
+    def _get_connection(self):
+        """Return an idle connection or a new one, and whether it is idle."""
+        while self._idle:
+            conn, idle_since = self._idle.pop()
+            if time.time() - idle_since <= self.idle_timeout:
+                return conn, True
+            self._close(conn)
+        return self._connect(), False
+
+    def _connect(self):
+        self._stats['connects'] += 1
+        if self.use_ssl:
+            conn_class = httplib.HTTPSConnection
+        else:
+            conn_class = httplib.HTTPConnection
+        if self.timeout is None:
+            return conn_class(self.host, self.port)
+        return conn_class(self.host, self.port, timeout=self.timeout)
+
+    @staticmethod
+    def _close(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    @staticmethod
+    def _closed_by_peer(e):
+        if isinstance(e, (httplib.BadStatusLine, httplib.CannotSendRequest)):
+            return True
+        return getattr(e, 'errno', None) in _CLOSED_ERRNOS
+
+    def _record(self, start, error=False):
+        elapsed = time.time() - start
+        self._stats['requests'] += 1
+        self._stats['total_time'] += elapsed
+        self._stats['max_time'] = max(self._stats['max_time'], elapsed)
+        if error:
+            self._stats['errors'] += 1
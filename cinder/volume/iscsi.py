@@ -94,8 +94,7 @@ class _ExportMixin(object):
         chap_auth = None
         # Check for https://bugs.launchpad.net/cinder/+bug/1065702
         old_name = None
-        if (volume['provider_location'] is not None and
-                volume['name'] not in volume['provider_location']):
+        if self._provider_location_mismatch(volume):
 
             msg = _('Detected inconsistency in provider_location id')
             LOG.debug(_('%s'), msg)
@@ -106,6 +105,50 @@ class _ExportMixin(object):
                                  chap_auth, check_exit_code=False,
                                  old_name=old_name)
 
+    def ensure_exports(self, context, exports):
+        """Ensure the exports of a batch of volumes.
+
+        :param exports: list of (volume, iscsi_name, volume_path) tuples
+        :returns: dict of volume id to the exception raised re-exporting it
+        """
+        failures = {}
+        for volume, iscsi_name, volume_path in exports:
+            try:
+                self.ensure_export(context, volume, iscsi_name, volume_path)
+            except Exception as exc:
+                failures[volume['id']] = exc
+        return failures
+
+    def _ensure_exports_in_bulk(self, context, exports):
+        """Reconcile the targets of a batch of volumes in one go.
+
+        Volumes still affected by bug 1065702 need their export renamed
+        and go through ensure_export() one by one.
+        """
+        targets = []
+        volume_ids = {}
+        renamed = []
+        for volume, iscsi_name, volume_path in exports:
+            if self._provider_location_mismatch(volume):
+                renamed.append((volume, iscsi_name, volume_path))
+                continue
+            targets.append((iscsi_name, volume_path,
+                            self._get_chap_auth_for_ensure_export(volume)))
+            volume_ids[iscsi_name] = volume['id']
+
+        failures = _ExportMixin.ensure_exports(self, context, renamed)
+        if targets:
+            for name, exc in self.ensure_iscsi_targets(targets).iteritems():
+                failures[volume_ids[name]] = exc
+        return failures
+
+    def _get_chap_auth_for_ensure_export(self, volume):
+        return None
+
+    def _provider_location_mismatch(self, volume):
+        return (volume['provider_location'] is not None and
+                volume['name'] not in volume['provider_location'])
+
     def _ensure_iscsi_targets(self, context, host):
         """Ensure that target ids have been created in datastore."""
         # NOTE(jdg): tgtadm doesn't use the iscsi_targets table
@@ -207,6 +250,9 @@ class TgtAdm(_ExportMixin, iscsi.TgtAdm):
     def _get_target_for_ensure_export(self, context, volume_id):
         return 1
 
+    def ensure_exports(self, context, exports):
+        return self._ensure_exports_in_bulk(context, exports)
+
 
 class FakeIscsiHelper(_ExportMixin, iscsi.FakeIscsiHelper):
 
@@ -257,6 +303,21 @@ class LioAdm(_ExportMixin, iscsi.LioAdm):
         self.create_iscsi_target(iscsi_name, iscsi_target, 0, volume_path,
                                  chap_auth, check_exit_code=False)
 
+    def ensure_exports(self, context, exports):
+        return self._ensure_exports_in_bulk(context, exports)
+
+    def _get_chap_auth_for_ensure_export(self, volume):
+        if not volume['provider_auth']:
+            return None
+        (auth_method,
+         auth_user,
+         auth_pass) = volume['provider_auth'].split(' ', 3)
+        return self._iscsi_authentication(auth_method, auth_user, auth_pass)
+
+    def _provider_location_mismatch(self, volume):
+        # LIO targets are always created under the current name.
+        return False
+
 
 class IetAdm(_ExportMixin, iscsi.IetAdm):
     pass
@@ -0,0 +1,292 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""External locks for volume and snapshot operations.
+
+The volume manager serializes operations on a volume or snapshot with a
+lock file per object in lock_path.  lockutils polls such a lock every
+10ms, and never removes the files, so lock_path ends up holding one file
+for every volume and snapshot that ever existed on the host.
+
+The lock manager here waits for a contended file lock in a native thread,
+so other greenthreads keep running and the waiter wakes up as soon as the
+lock is released.  The lock file is removed by the last holder; waiters
+which locked a file that has been removed in the meantime notice it and
+start over with a new one.  Wait and hold times are recorded per lock
+class (e.g. delete_volume) so contention can be looked at.
+
+Lock files are named like the ones of utils.synchronized(), so the same
+names keep excluding each other across processes.
+"""
+
+import bisect
+import contextlib
+import errno
+import fcntl
+import functools
+import os
+import re
+import time
+
+from eventlet import greenthread
+from eventlet import semaphore
+from eventlet import tpool
+from oslo.config import cfg
+
+from cinder.openstack.common import fileutils
+from cinder.openstack.common.gettextutils import _
+from cinder.openstack.common import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+lock_opts = [
+    cfg.BoolOpt('lock_file_cleanup',
+                default=True,
+                help='Remove the lock files of volume and snapshot '
+                     'operations once they are released'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(lock_opts)
+CONF.import_opt('lock_path', 'cinder.openstack.common.lockutils')
+CONF.import_opt('disable_process_locking',
+                'cinder.openstack.common.lockutils')
+
+LOCK_FILE_PREFIX = 'cinder-'
+
+# Upper bounds, in seconds, of the wait and hold time histogram buckets.
+BUCKETS = (0.001, 0.01, 0.1, 1, 10, 60, 300)
+
+_UUID_LOCK_RE = re.compile(r'^%s[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-'
+                           r'[0-9a-f]{4}-[0-9a-f]{12}(-\w+)?$' %
+                           LOCK_FILE_PREFIX)
+
+
+class Histogram(object):
+    """Counts observed durations in the BUCKETS ranges."""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def add(self, value):
+        self.counts[bisect.bisect_left(BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def to_dict(self):
+        buckets = {}
+        for bound, count in zip(BUCKETS, self.counts):
+            buckets[str(bound)] = count
+        buckets['+Inf'] = self.counts[-1]
+        return {'count': self.count, 'sum': self.sum, 'max': self.max,
+                'buckets': buckets}
+
+
+class _LocalLock(object):
+
+    def __init__(self):
+        self.semaphore = semaphore.Semaphore()
+        self.users = 0
+
+
+class LockManager(object):
+    """Hands out named locks shared by greenthreads and processes."""
+
+    def __init__(self, lock_path=None):
+        self._lock_path = lock_path
+        self._locks = {}
+        self._stats = {}
+
+    @property
+    def lock_path(self):
+        return self._lock_path or CONF.lock_path
+
+    def _lock_file_path(self, name):
+        # NOTE(mikal): the lock name cannot contain directory separators
+        safe_name = name.replace(os.sep, '_')
+        return os.path.join(self.lock_path,
+                            '%s%s' % (LOCK_FILE_PREFIX, safe_name))
+
+    @staticmethod
+    def _is_current(fd, path):
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        fst = os.fstat(fd)
+        return (st.st_dev, st.st_ino) == (fst.st_dev, fst.st_ino)
+
+    def _acquire_file(self, path):
+        while True:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                try:
+                    fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except IOError as e:
+                    if e.errno not in (errno.EACCES, errno.EAGAIN):
+                        raise
+                    # Wait in a native thread, which sleeps in the kernel
+                    # until the holder lets go instead of polling.
+                    tpool.execute(fcntl.lockf, fd, fcntl.LOCK_EX)
+                # The previous holder may have removed the file while we
+                # were waiting, in which case the lock protects nothing.
+                if self._is_current(fd, path):
+                    return fd
+            except Exception:
+                os.close(fd)
+                raise
+            os.close(fd)
+
+    @staticmethod
+    def _release_file(fd, path, remove):
+        try:
+            if remove:
+                # Removed while still locked, see _acquire_file().
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+            fcntl.lockf(fd, fcntl.LOCK_UN)
+        except IOError:
+            LOG.exception(_("Could not release the acquired lock `%s`"),
+                          path)
+        finally:
+            os.close(fd)
+
+    def _record(self, lock_class, wait, hold):
+        stats = self._stats.get(lock_class)
+        if stats is None:
+            stats = self._stats[lock_class] = {'wait': Histogram(),
+                                               'hold': Histogram()}
+        stats['wait'].add(wait)
+        stats['hold'].add(hold)
+
+    @contextlib.contextmanager
+    def lock(self, name, lock_class):
+        """Hold the lock called ``name``.
+
+        :param lock_class: what the lock protects, e.g. delete_volume;
+                           wait and hold times are accounted to it.
+        """
+        start = time.time()
+        local_lock = self._locks.get(name)
+        if local_lock is None:
+            local_lock = self._locks[name] = _LocalLock()
+        local_lock.users += 1
+        acquired = None
+        try:
+            with local_lock.semaphore:
+                fd = None
+                path = None
+                if not CONF.disable_process_locking and self.lock_path:
+                    fileutils.ensure_tree(self.lock_path)
+                    path = self._lock_file_path(name)
+                    fd = self._acquire_file(path)
+                acquired = time.time()
+                LOG.debug(_('Got lock "%(lock)s" after %(wait).3fs'),
+                          {'lock': name, 'wait': acquired - start})
+                try:
+                    yield
+                finally:
+                    if fd is not None:
+                        # Local waiters would just create the file again.
+                        remove = (CONF.lock_file_cleanup and
+                                  local_lock.users == 1)
+                        self._release_file(fd, path, remove)
+        finally:
+            local_lock.users -= 1
+            if not local_lock.users:
+                del self._locks[name]
+            if acquired is not None:
+                self._record(lock_class, acquired - start,
+                             time.time() - acquired)
+
+    def synchronized(self, name, lock_class):
+        """Decorator running the wrapped function under lock()."""
+        def wrap(f):
+            @functools.wraps(f)
+            def inner(*args, **kwargs):
+                with self.lock(name, lock_class):
+                    return f(*args, **kwargs)
+            return inner
+        return wrap
+
+    def get_stats(self):
+        """Return {lock_class: {'wait': histogram, 'hold': histogram}}."""
+        return dict((lock_class, {'wait': stats['wait'].to_dict(),
+                                  'hold': stats['hold'].to_dict()})
+                    for lock_class, stats in self._stats.items())
+
+    def remove_stale_lock_files(self):
+        """Remove lock files of volume and snapshot ids nobody holds.
+
+        Cleans up after releases which did not remove their lock file,
+        like the ones of earlier releases.  Returns the number of files
+        removed.
+        """
+        lock_path = self.lock_path
+        if not lock_path or not os.path.isdir(lock_path):
+            return 0
+
+        removed = 0
+        for count, filename in enumerate(os.listdir(lock_path)):
+            if count % 1000 == 999:
+                greenthread.sleep(0)
+            if not _UUID_LOCK_RE.match(filename):
+                continue
+            # POSIX locks belong to the process: locking and closing a
+            # file we hold ourselves would drop our lock.
+            if filename[len(LOCK_FILE_PREFIX):] in self._locks:
+                continue
+            path = os.path.join(lock_path, filename)
+            try:
+                fd = os.open(path, os.O_RDWR)
+            except OSError:
+                continue
+            try:
+                fcntl.lockf(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except IOError:
+                os.close(fd)
+                continue
+            if self._is_current(fd, path):
+                removed += 1
+                self._release_file(fd, path, True)
+            else:
+                self._release_file(fd, path, False)
+        return removed
+
+
+_MANAGER = LockManager()
+
+
+def lock(name, lock_class):
+    return _MANAGER.lock(name, lock_class)
+
+
+def synchronized(name, lock_class):
+    return _MANAGER.synchronized(name, lock_class)
+
+
+def get_stats():
+    return _MANAGER.get_stats()
+
+
+def remove_stale_lock_files():
+    return _MANAGER.remove_stale_lock_files()
@@ -44,6 +44,7 @@ from oslo import messaging
 from cinder import compute
 from cinder import context
 from cinder import exception
+from cinder import flow_utils
 from cinder.image import glance
 from cinder import manager
 from cinder.openstack.common import excutils
@@ -58,12 +59,15 @@ from cinder import utils
 from cinder.volume.configuration import Configuration
 from cinder.volume.flows.manager import create_volume
 from cinder.volume.flows.manager import manage_existing
+from cinder.volume import locks
 from cinder.volume import rpcapi as volume_rpcapi
+from cinder.volume import stats as volume_stats
 from cinder.volume import utils as volume_utils
 from cinder.volume import volume_types
 from cinder.zonemanager.fc_zone_manager import ZoneManager
 
 from eventlet.greenpool import GreenPool
+from eventlet import greenthread
 
 LOG = logging.getLogger(__name__)
 
@@ -81,6 +85,11 @@ volume_manager_opts = [
                 default=False,
                 help='Offload pending volume delete during '
                      'volume service startup'),
+    cfg.IntOpt('volume_service_startup_workers',
+               default=8,
+               help='Number of re-exports and resumed deletes run '
+                    'concurrently in the background during volume service '
+                    'startup'),
     cfg.StrOpt('zoning_mode',
                default='none',
                help='FC Zoning mode configured'),
@@ -88,6 +97,30 @@ volume_manager_opts = [
                default='{}',
                help='User defined capabilities, a JSON formatted string '
                     'specifying key/value pairs.'),
+    cfg.IntOpt('capabilities_push_delay',
+               default=2,
+               help='Seconds to wait before pushing capabilities to the '
+                    'schedulers after an operation changed the allocated '
+                    'capacity, operations finishing meanwhile share one '
+                    'push. 0 pushes right away'),
+    cfg.IntOpt('driver_stats_interval',
+               default=0,
+               help='Minimum seconds between two collections of the full '
+                    'volume stats of the driver. Stats the driver declares '
+                    'as cheap are collected on every report. 0 collects '
+                    'the full stats on every report'),
+    cfg.IntOpt('driver_stats_timeout',
+               default=120,
+               help='Seconds after which a collection of the volume stats '
+                    'of the driver is abandoned and the last stats '
+                    'collected are reported instead'),
+    cfg.IntOpt('driver_stats_wait',
+               default=10,
+               help='Seconds a report waits for the collection of the '
+                    'volume stats of the driver it started. If the '
+                    'collection takes longer, the last stats collected are '
+                    'reported and the new ones go out with the next '
+                    'report'),
 ]
 
 CONF = cfg.CONF
@@ -118,7 +151,7 @@ def locked_volume_operation(f):
     volume e.g. delete VolA while create volume VolB from VolA is in progress.
     """
     def lvo_inner1(inst, context, volume_id, **kwargs):
-        @utils.synchronized("%s-%s" % (volume_id, f.__name__), external=True)
+        @locks.synchronized("%s-%s" % (volume_id, f.__name__), f.__name__)
         def lvo_inner2(*_args, **_kwargs):
             return f(*_args, **_kwargs)
         return lvo_inner2(inst, context, volume_id, **kwargs)
@@ -140,7 +173,7 @@ def locked_snapshot_operation(f):
     progress.
     """
     def lso_inner1(inst, context, snapshot_id, **kwargs):
-        @utils.synchronized("%s-%s" % (snapshot_id, f.__name__), external=True)
+        @locks.synchronized("%s-%s" % (snapshot_id, f.__name__), f.__name__)
         def lso_inner2(*_args, **_kwargs):
             return f(*_args, **_kwargs)
         return lso_inner2(inst, context, snapshot_id, **kwargs)
@@ -163,6 +196,8 @@ class VolumeManager(manager.SchedulerDependentManager):
         self.configuration = Configuration(volume_manager_opts,
                                            config_group=service_name)
         self._tp = GreenPool()
+        self._startup_thread = None
+        self._capabilities_push = None
         self.stats = {}
 
         if not volume_driver:
@@ -178,6 +213,18 @@ class VolumeManager(manager.SchedulerDependentManager):
             configuration=self.configuration,
             db=self.db,
             host=self.host)
+        self._stats_collector = volume_stats.StatsCollector(
+            self.driver,
+            interval=self.configuration.driver_stats_interval,
+            timeout=self.configuration.driver_stats_timeout,
+            wait=self.configuration.driver_stats_wait)
+
+        # The create volume flows are built once, when first used.
+        self._create_volume_flows = dict(
+            (reschedule, create_volume.get_prebuilt_flow(
+                self.db, self.driver, self.scheduler_rpcapi, self.host,
+                reschedule))
+            for reschedule in (True, False))
 
         self.zonemanager = None
         try:
@@ -193,6 +240,93 @@ class VolumeManager(manager.SchedulerDependentManager):
     def _add_to_threadpool(self, func, *args, **kwargs):
         self._tp.spawn_n(func, *args, **kwargs)
 
+    def _ensure_exports(self, ctxt, volumes, pool):
+        """Re-export the in-use volumes, in bulk if the driver can.
+
+        Drivers without a bulk implementation get one ensure_export()
+        call per volume, run concurrently in the given pool.
+        """
+        if not volumes:
+            return
+        try:
+            failures = self.driver.ensure_exports(ctxt, volumes)
+        except NotImplementedError:
+            failures = {}
+
+            def _ensure_export(volume):
+                try:
+                    self.driver.ensure_export(ctxt, volume)
+                except Exception as export_ex:
+                    LOG.exception(export_ex)
+                    failures[volume['id']] = export_ex
+
+            for volume in volumes:
+                pool.spawn_n(_ensure_export, volume)
+            pool.waitall()
+
+        for volume in volumes:
+            if volume['id'] not in failures:
+                continue
+            LOG.error(_("Failed to re-export volume %(vol_id)s: "
+                        "setting to error state: %(err)s"),
+                      {'vol_id': volume['id'], 'err': failures[volume['id']]})
+            self.db.volume_update(ctxt,
+                                  volume['id'],
+                                  {'status': 'error'})
+
+    def _resume_delete(self, ctxt, volume_id):
+        try:
+            self.delete_volume(ctxt, volume_id)
+        except Exception:
+            LOG.exception(_('Failed to resume delete on volume: %s'),
+                          volume_id)
+
+    def _run_startup_tasks(self, ctxt, in_use, deleting):
+        """Re-export in-use volumes, then resume the pending deletes.
+
+        Runs in the background once the driver is initialized, so the
+        service handles requests while the host is brought back in sync.
+        Re-exports come first as attached instances depend on them.
+        """
+        start = time.time()
+        pool = GreenPool(self.configuration.volume_service_startup_workers)
+        LOG.debug(_("Re-exporting %s volumes"), len(in_use))
+        try:
+            self._ensure_exports(ctxt, in_use, pool)
+        except Exception as ex:
+            LOG.error(_("Error encountered during "
+                        "re-exporting phase of driver initialization: "
+                        " %(name)s") %
+                      {'name': self.driver.__class__.__name__})
+            LOG.exception(ex)
+
+        LOG.debug(_('Resuming any in progress delete operations'))
+        for volume in deleting:
+            LOG.info(_('Resuming delete on volume: %s') % volume['id'])
+            if CONF.volume_service_inithost_offload:
+                # Hand the delete over to the manager's threadpool so it
+                # does not hold up the rest of the startup work.
+                self._add_to_threadpool(self._resume_delete, ctxt,
+                                        volume['id'])
+            else:
+                pool.spawn_n(self._resume_delete, ctxt, volume['id'])
+        pool.waitall()
+
+        try:
+            removed = locks.remove_stale_lock_files()
+            LOG.debug(_('Removed %s stale lock files'), removed)
+        except Exception:
+            LOG.exception(_('Failed to remove stale lock files'))
+        LOG.info(_("Startup tasks of volume driver %(name)s finished in "
+                   "%(secs).1fs") %
+                 {'name': self.driver.__class__.__name__,
+                  'secs': time.time() - start})
+
+    def wait_for_startup_tasks(self):
+        """Block until the startup work spawned by init_host is done."""
+        if self._startup_thread is not None:
+            self._startup_thread.wait()
+
     def init_host(self):
         """Do any initialization that needs to be run if this is a
            standalone service.
@@ -222,26 +356,21 @@ class VolumeManager(manager.SchedulerDependentManager):
             # to initialize the driver correctly.
             return
 
-        volumes = self.db.volume_get_all_by_host(ctxt, self.host)
-        LOG.debug(_("Re-exporting %s volumes"), len(volumes))
+        # The volume states decide what is done next, they must be current.
+        volumes = self.db.volume_get_all_by_host(ctxt, self.host,
+                                                 use_slave=False)
 
         try:
             sum = 0
             self.stats.update({'allocated_capacity_gb': sum})
+            in_use = []
+            deleting = []
             for volume in volumes:
                 if volume['status'] in ['in-use']:
                     # calculate allocated capacity for driver
                     sum += volume['size']
                     self.stats['allocated_capacity_gb'] = sum
-                    try:
-                        self.driver.ensure_export(ctxt, volume)
-                    except Exception as export_ex:
-                        LOG.error(_("Failed to re-export volume %s: "
-                                    "setting to error state"), volume['id'])
-                        LOG.exception(export_ex)
-                        self.db.volume_update(ctxt,
-                                              volume['id'],
-                                              {'status': 'error'})
+                    in_use.append(volume)
                 elif volume['status'] == 'downloading':
                     LOG.info(_("volume %s stuck in a downloading state"),
                              volume['id'])
@@ -249,6 +378,8 @@ class VolumeManager(manager.SchedulerDependentManager):
                     self.db.volume_update(ctxt,
                                           volume['id'],
                                           {'status': 'error'})
+                elif volume['status'] == 'deleting':
+                    deleting.append(volume)
                 else:
                     LOG.info(_("volume %s: skipping export"), volume['id'])
         except Exception as ex:
@@ -262,23 +393,12 @@ class VolumeManager(manager.SchedulerDependentManager):
         # at this point the driver is considered initialized.
         self.driver.set_initialized()
 
-        LOG.debug(_('Resuming any in progress delete operations'))
-        for volume in volumes:
-            if volume['status'] == 'deleting':
-                LOG.info(_('Resuming delete on volume: %s') % volume['id'])
-                if CONF.volume_service_inithost_offload:
-                    # Offload all the pending volume delete operations to the
-                    # threadpool to prevent the main volume service thread
-                    # from being blocked.
-                    self._add_to_threadpool(self.delete_volume(ctxt,
-                                                               volume['id']))
-                else:
-                    # By default, delete volumes sequentially
-                    self.delete_volume(ctxt, volume['id'])
-
         # collect and publish service capabilities
         self.publish_service_capabilities(ctxt)
 
+        self._startup_thread = greenthread.spawn(
+            self._run_startup_tasks, ctxt, in_use, deleting)
+
     def create_volume(self, context, volume_id, request_spec=None,
                       filter_properties=None, allow_reschedule=True,
                       snapshot_id=None, image_id=None, source_volid=None):
@@ -292,20 +412,18 @@ class VolumeManager(manager.SchedulerDependentManager):
         try:
             # NOTE(flaper87): Driver initialization is
             # verified by the task itself.
-            flow_engine = create_volume.get_flow(
-                context,
-                self.db,
-                self.driver,
-                self.scheduler_rpcapi,
-                self.host,
-                volume_id,
-                snapshot_id=snapshot_id,
-                image_id=image_id,
-                source_volid=source_volid,
-                allow_reschedule=allow_reschedule,
-                reschedule_context=context_saved,
-                request_spec=request_spec,
-                filter_properties=filter_properties)
+            reschedule = bool(allow_reschedule and request_spec)
+            flow_engine = self._create_volume_flows[reschedule].load(
+                create_volume.get_store(
+                    context,
+                    volume_id,
+                    reschedule_context=context_saved,
+                    request_spec=request_spec,
+                    filter_properties=filter_properties,
+                    snapshot_id=snapshot_id,
+                    image_id=image_id,
+                    source_volid=source_volid),
+                logger=LOG)
         except Exception:
             LOG.exception(_("Failed to create manager volume flow"))
             raise exception.CinderException(
@@ -313,11 +431,14 @@ class VolumeManager(manager.SchedulerDependentManager):
 
         if snapshot_id is not None:
             # Make sure the snapshot is not deleted until we are done with it.
-            locked_action = "%s-%s" % (snapshot_id, 'delete_snapshot')
+            lock_class = 'delete_snapshot'
+            locked_action = "%s-%s" % (snapshot_id, lock_class)
         elif source_volid is not None:
             # Make sure the volume is not deleted until we are done with it.
-            locked_action = "%s-%s" % (source_volid, 'delete_volume')
+            lock_class = 'delete_volume'
+            locked_action = "%s-%s" % (source_volid, lock_class)
         else:
+            lock_class = None
             locked_action = None
 
         def _run_flow():
@@ -327,7 +448,7 @@ class VolumeManager(manager.SchedulerDependentManager):
             # in flow engine's storage.
             flow_engine.run()
 
-        @utils.synchronized(locked_action, external=True)
+        @locks.synchronized(locked_action, lock_class)
         def _run_flow_locked():
             _run_flow()
 
@@ -340,6 +461,7 @@ class VolumeManager(manager.SchedulerDependentManager):
         volume_ref = flow_engine.storage.fetch('volume')
         # Update volume stats
         self.stats['allocated_capacity_gb'] += volume_ref['size']
+        self._push_capabilities(context)
         return volume_ref['id']
 
     @locked_volume_operation
@@ -425,7 +547,7 @@ class VolumeManager(manager.SchedulerDependentManager):
             QUOTAS.commit(context, reservations, project_id=project_id)
 
         self.stats['allocated_capacity_gb'] -= volume_ref['size']
-        self.publish_service_capabilities(context)
+        self._push_capabilities(context)
 
         return True
 
@@ -557,7 +679,7 @@ class VolumeManager(manager.SchedulerDependentManager):
     def attach_volume(self, context, volume_id, instance_uuid, host_name,
                       mountpoint, mode):
         """Updates db to show volume is attached."""
-        @utils.synchronized(volume_id, external=True)
+        @locks.synchronized(volume_id, 'attach_volume')
         def do_attach():
             # check the volume status before attaching
             volume = self.db.volume_get(context, volume_id)
@@ -1086,7 +1208,7 @@ class VolumeManager(manager.SchedulerDependentManager):
                     self.db.volume_update(ctxt, volume_ref['id'], updates)
 
     @periodic_task.periodic_task
-    def _report_driver_status(self, context):
+    def _report_driver_status(self, context, refresh=True):
         LOG.info(_("Updating volume status"))
         if not self.driver.initialized:
             if self.driver.configuration.config_group is None:
@@ -1102,19 +1224,78 @@ class VolumeManager(manager.SchedulerDependentManager):
                          'driver_version': self.driver.get_version(),
                          'config_group': config_group})
         else:
-            volume_stats = self.driver.get_volume_stats(refresh=True)
+            stats, _age = self._stats_collector.get_stats(refresh=refresh)
+            if stats is None:
+                LOG.warning(_('No volume stats collected yet from '
+                              '%(driver_name)s.'),
+                            {'driver_name': self.driver.__class__.__name__})
+                return
             if self.extra_capabilities:
-                volume_stats.update(self.extra_capabilities)
-            if volume_stats:
-                # Append volume stats with 'allocated_capacity_gb'
-                volume_stats.update(self.stats)
-                # queue it to be sent to the Schedulers.
-                self.update_service_capabilities(volume_stats)
+                stats.update(self.extra_capabilities)
+            # Append volume stats with 'allocated_capacity_gb'
+            stats.update(self.stats)
+            # queue it to be sent to the Schedulers.
+            self.update_service_capabilities(stats)
+
+    @periodic_task.periodic_task
+    def _report_flow_stats(self, context):
+        for task_name, stats in sorted(flow_utils.get_task_stats().items()):
+            LOG.debug(_('Task %(task)s: %(stats)s'),
+                      {'task': task_name, 'stats': stats})
+
+    @periodic_task.periodic_task
+    def _report_lock_stats(self, context):
+        for lock_class, stats in sorted(locks.get_stats().items()):
+            LOG.debug(_('Lock %(class)s: wait %(wait)s, hold %(hold)s'),
+                      {'class': lock_class,
+                       'wait': stats['wait'],
+                       'hold': stats['hold']})
+
+    @periodic_task.periodic_task
+    def _report_connection_stats(self, context):
+        for pool_name, stats in sorted(
+                self.driver.get_connection_stats().items()):
+            LOG.debug(_('Connection pool %(pool)s: %(stats)s'),
+                      {'pool': pool_name, 'stats': stats})
+
+    @periodic_task.periodic_task
+    def _report_db_pool_stats(self, context):
+        for engine_name, stats in sorted(self.db.get_pool_stats().items()):
+            LOG.debug(_('DB connection pool %(engine)s: %(stats)s'),
+                      {'engine': engine_name, 'stats': stats})
 
     def publish_service_capabilities(self, context):
         """Collect driver status and then publish."""
         self._report_driver_status(context)
-        self._publish_service_capabilities(context)
+        self._publish_service_capabilities(context, force=True)
+
+    def _push_capabilities(self, context):
+        """Let the schedulers know about a change in allocated capacity.
+
+        Without waiting for the next periodic report.  Operations finishing
+        within capabilities_push_delay of each other share a single push.
+        """
+        delay = self.configuration.capabilities_push_delay
+        if delay <= 0:
+            self._send_capabilities(context)
+        elif self._capabilities_push is None:
+            self._capabilities_push = greenthread.spawn_after(
+                delay, self._run_capabilities_push)
+
+    def _run_capabilities_push(self):
+        self._capabilities_push = None
+        self._send_capabilities(context.get_admin_context())
+
+    def _send_capabilities(self, ctxt):
+        # The operation that asked for the push already succeeded, the next
+        # periodic report will catch up if this one fails.  Only the
+        # allocated capacity changed, a push reuses the driver stats
+        # collected last instead of waiting for new ones.
+        try:
+            self._report_driver_status(ctxt, refresh=False)
+            self._publish_service_capabilities(ctxt)
+        except Exception:
+            LOG.exception(_('Failed to push capabilities to the schedulers'))
 
     def notification(self, context, event):
         LOG.info(_("Notification {%s} received"), event)
@@ -1172,6 +1353,7 @@ class VolumeManager(manager.SchedulerDependentManager):
         self.db.volume_update(context, volume['id'], {'size': int(new_size),
                                                       'status': 'available'})
         self.stats['allocated_capacity_gb'] += size_increase
+        self._push_capabilities(context)
         self._notify_about_volume_usage(
             context, volume, "resize.end",
             extra_usage_info={'size': int(new_size)})
@@ -1287,7 +1469,7 @@ class VolumeManager(manager.SchedulerDependentManager):
             QUOTAS.commit(context, old_reservations, project_id=project_id)
         if new_reservations:
             QUOTAS.commit(context, new_reservations, project_id=project_id)
-        self.publish_service_capabilities(context)
+        self._push_capabilities(context)
 
     def manage_existing(self, ctxt, volume_id, ref=None):
         LOG.debug('manage_existing: managing %s' % ref)
@@ -1309,6 +1491,7 @@ class VolumeManager(manager.SchedulerDependentManager):
         volume_ref = flow_engine.storage.fetch('volume')
         # Update volume stats
         self.stats['allocated_capacity_gb'] += volume_ref['size']
+        self._push_capabilities(ctxt)
         return volume_ref['id']
 
     def _add_or_delete_fc_connection(self, conn_info, zone_op):
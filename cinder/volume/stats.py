@@ -0,0 +1,119 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Background collection of volume driver stats.
+
+get_volume_stats(refresh=True) may take a long time, e.g. running du on
+every NFS share or talking to a storage array over SSH.  The collector
+runs it in a green thread of its own, so a slow backend does not hold up
+the other periodic tasks of the volume service.  A refresh is waited for
+up to a short budget, after which the last stats collected successfully
+are handed out together with their age.
+
+Drivers can also return stats that are cheap to collect from
+get_cheap_volume_stats().  Those are collected on every report and
+merged over the last full snapshot, which is only refreshed every
+driver_stats_interval seconds.
+"""
+
+import time
+
+import eventlet
+from eventlet import greenthread
+
+from cinder.openstack.common.gettextutils import _
+from cinder.openstack.common import log as logging
+
+
+LOG = logging.getLogger(__name__)
+
+
+class StatsCollector(object):
+
+    def __init__(self, driver, interval=0, timeout=120, wait=10):
+        self.driver = driver
+        self.interval = interval
+        self.timeout = timeout
+        self.wait = wait
+        self._stats = None
+        self._updated_at = None
+        self._warned_at = None
+        self._worker = None
+        self._started_at = None
+
+    def get_stats(self, refresh=True):
+        """Return the last stats collected and their age in seconds.
+
+        Starts a refresh in the background when one is due, unless refresh
+        is False.  A refresh started here, or one still running while no
+        stats have been collected yet, is waited for at most wait seconds.
+        Returns (None, None) when there are no stats.
+        """
+        self._check_worker()
+        started = False
+        if refresh and self._worker is None and self._refresh_due():
+            self._started_at = time.time()
+            self._worker = greenthread.spawn(self._refresh)
+            started = True
+
+        if self._worker is not None and (
+                started or (refresh and self._stats is None)):
+            remaining = min(self._started_at + self.timeout - time.time(),
+                            self.wait)
+            with eventlet.Timeout(max(remaining, 0), False):
+                self._worker.wait()
+            self._check_worker()
+
+        if self._stats is None:
+            return None, None
+        age = time.time() - self._updated_at
+        if (age > self.interval + self.timeout and
+                self._warned_at != self._updated_at):
+            LOG.warning(_('Reporting stats of %(driver)s collected %(age)d '
+                          'seconds ago.'),
+                        {'driver': self.driver.__class__.__name__,
+                         'age': age})
+            self._warned_at = self._updated_at
+        stats = dict(self._stats)
+        stats.update(self.driver.get_cheap_volume_stats() or {})
+        return stats, age
+
+    def _refresh_due(self):
+        return (self._started_at is None or
+                time.time() - self._started_at >= self.interval)
+
+    def _check_worker(self):
+        """Abandon a refresh which took longer than timeout seconds."""
+        if self._worker is None:
+            return
+        if time.time() - self._started_at > self.timeout:
+            LOG.warning(_('Collecting stats of %(driver)s took more than '
+                          '%(timeout)d seconds, giving up.'),
+                        {'driver': self.driver.__class__.__name__,
+                         'timeout': self.timeout})
+            self._worker.kill()
+            self._worker = None
+
+    def _refresh(self):
+        try:
+            stats = self.driver.get_volume_stats(refresh=True)
+            if stats:
+                self._stats = dict(stats)
+                self._updated_at = time.time()
+        except Exception:
+            LOG.exception(_('Failed to collect stats of %s'),
+                          self.driver.__class__.__name__)
+        finally:
+            self._worker = None
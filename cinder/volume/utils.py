@@ -16,7 +16,10 @@
 
 
 import math
+import os
+import time
 
+from eventlet import greenthread
 from oslo.config import cfg
 
 from cinder.brick.local_dev import lvm as brick_lvm
@@ -160,8 +163,68 @@ def copy_volume(srcstr, deststr, size_in_m, blocksize, sync=False,
     execute(*cmd, run_as_root=True)
 
 
+def _get_queue_attribute(volume_path, attribute):
+    """Read a block queue attribute of the device behind volume_path."""
+    device = os.path.basename(os.path.realpath(volume_path))
+    try:
+        with open('/sys/block/%s/queue/%s' % (device, attribute)) as f:
+            return int(f.read().strip())
+    except (IOError, ValueError):
+        return 0
+
+
+def _discard_zeroes_data(volume_path):
+    return _get_queue_attribute(volume_path, 'discard_zeroes_data') == 1
+
+
+def _supports_write_zeroes(volume_path):
+    return _get_queue_attribute(volume_path, 'write_zeroes_max_bytes') > 0
+
+
+def _discard_volume(volume_size, volume_path):
+    """Wipe a volume by discarding its blocks.
+
+    Plain BLKDISCARD is only used when the device guarantees that
+    discarded blocks read back as zeroes, otherwise the zeroing is
+    offloaded to the device with BLKZEROOUT.  Returns False when the
+    device supports neither, so the caller can fall back to dd.
+    """
+    if _discard_zeroes_data(volume_path):
+        clear_cmd = ['blkdiscard']
+    elif _supports_write_zeroes(volume_path):
+        clear_cmd = ['blkdiscard', '--zeroout']
+    else:
+        return False
+
+    clear_cmd.extend(['-l', '%d' % (volume_size * units.MiB), volume_path])
+    utils.execute(*clear_cmd, run_as_root=True)
+    return True
+
+
+def _write_volume_throttled(volume_size, volume_path, bandwidth,
+                           source='/dev/zero', ionice=None):
+    """Overwrite a volume in one second chunks of at most bandwidth MiB."""
+    offset = 0
+    while offset < volume_size:
+        count = min(bandwidth, volume_size - offset)
+        cmd = ['dd', 'if=%s' % source, 'of=%s' % volume_path,
+               'count=%d' % count, 'bs=1M', 'seek=%d' % offset,
+               'oflag=direct']
+        if ionice is not None:
+            cmd = ['ionice', ionice] + cmd
+
+        start = time.time()
+        utils.execute(*cmd, run_as_root=True)
+        offset += count
+
+        elapsed = time.time() - start
+        if offset < volume_size and elapsed < 1:
+            greenthread.sleep(1 - elapsed)
+
+
 def clear_volume(volume_size, volume_path, volume_clear=None,
-                 volume_clear_size=None, volume_clear_ionice=None):
+                 volume_clear_size=None, volume_clear_ionice=None,
+                 volume_clear_bandwidth=None):
     """Unprovision old volumes to prevent data leaking between users."""
     if volume_clear is None:
         volume_clear = CONF.volume_clear
@@ -177,12 +240,32 @@ def clear_volume(volume_size, volume_path, volume_clear=None,
 
     LOG.info(_("Performing secure delete on volume: %s") % volume_path)
 
+    if volume_clear == 'discard':
+        if _discard_volume(volume_clear_size, volume_path):
+            return
+        LOG.warn(_("Device behind %s does not guarantee zeroed blocks on "
+                   "discard, falling back to zeroing it.") % volume_path)
+        volume_clear = 'zero'
+
     if volume_clear == 'zero':
+        if volume_clear_bandwidth:
+            return _write_volume_throttled(volume_clear_size, volume_path,
+                                           volume_clear_bandwidth,
+                                           ionice=volume_clear_ionice)
         return copy_volume('/dev/zero', volume_path, volume_clear_size,
                            CONF.volume_dd_blocksize,
                            sync=True, execute=utils.execute,
                            ionice=volume_clear_ionice)
     elif volume_clear == 'shred':
+        if volume_clear_bandwidth:
+            # shred cannot write part of a volume, so its three random
+            # passes are made with dd to keep them under the cap.
+            for _i in range(3):
+                _write_volume_throttled(volume_clear_size or volume_size,
+                                        volume_path, volume_clear_bandwidth,
+                                        source='/dev/urandom',
+                                        ionice=volume_clear_ionice)
+            return
         clear_cmd = ['shred', '-n3']
         if volume_clear_size:
             clear_cmd.append('-s%dMiB' % volume_clear_size)
@@ -0,0 +1,101 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Microbenchmark of API list response serialization.
+
+Serializes a ``volumes/detail`` response body the way the v2 API does,
+with the host, tenant and migration status extension templates attached
+to the XML master template, and reports the time per response for XML
+and JSON.
+
+Usage: tools/with_venv.sh python tools/api_serialization_benchmark.py \
+           [volumes] [iterations]
+"""
+
+import datetime
+import sys
+import time
+
+from cinder.api.contrib import volume_host_attribute
+from cinder.api.contrib import volume_mig_status_attribute
+from cinder.api.contrib import volume_tenant_attribute
+from cinder.api.openstack import wsgi
+from cinder.api.v2 import volumes
+
+
+def _volume(idx):
+    volume_id = '00000000-0000-0000-0000-%012d' % idx
+    return {
+        'id': volume_id,
+        'status': 'in-use',
+        'size': 1,
+        'availability_zone': 'nova',
+        'created_at': datetime.datetime(2014, 1, 1, 1, 1, 1),
+        'attachments': [{'id': volume_id,
+                         'volume_id': volume_id,
+                         'server_id': 'fakeuuid',
+                         'host_name': None,
+                         'device': '/dev/vdb'}],
+        'name': 'vol%d' % idx,
+        'description': 'volume %d' % idx,
+        'volume_type': 'lvm',
+        'snapshot_id': None,
+        'source_volid': None,
+        'metadata': {'key%d' % i: 'value%d' % i for i in range(3)},
+        'links': [{'rel': 'self',
+                   'href': 'http://localhost/v2/fake/volumes/%s' %
+                           volume_id},
+                  {'rel': 'bookmark',
+                   'href': 'http://localhost/fake/volumes/%s' % volume_id}],
+        'user_id': 'fakeuser',
+        'bootable': 'false',
+        'encrypted': False,
+        'os-vol-host-attr:host': 'host@lvm',
+        'os-vol-tenant-attr:tenant_id': 'fake',
+        'os-vol-mig-status-attr:migstat': None,
+        'os-vol-mig-status-attr:name_id': None,
+    }
+
+
+def _xml_serializer():
+    serializer = volumes.VolumesTemplate()
+    serializer.attach(volume_host_attribute.VolumeListHostAttributeTemplate())
+    serializer.attach(
+        volume_tenant_attribute.VolumeListTenantAttributeTemplate())
+    serializer.attach(
+        volume_mig_status_attribute.VolumeListMigStatusAttributeTemplate())
+    return serializer
+
+
+def _bench(label, make_serializer, body, iterations):
+    start = time.time()
+    for _i in xrange(iterations):
+        make_serializer().serialize(body)
+    elapsed = time.time() - start
+    print('%-6s %8.1f ms/response' % (label, elapsed * 1000 / iterations))
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    iterations = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    body = {'volumes': [_volume(i) for i in range(count)]}
+
+    print('volumes/detail with %d volumes' % count)
+    _bench('xml', _xml_serializer, body, iterations)
+    _bench('json', wsgi.JSONDictSerializer, body, iterations)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,81 @@
+# Copyright (c) 2014 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Microbenchmark of cinder.policy.enforce().
+
+Reports enforce() calls per second for the shipped policy.json, using the
+uncompiled common policy brain, the compiled rules and the compiled rules
+with per-request decision caching.
+
+Usage: tools/with_venv.sh python tools/policy_benchmark.py [iterations]
+"""
+
+import os
+import sys
+import time
+
+from oslo.config import cfg
+
+from cinder.common import config  # noqa
+from cinder import context
+from cinder.openstack.common import policy as common_policy
+from cinder import policy
+
+
+ACTIONS = ['volume:get', 'volume:get_all', 'volume_extension:types_manage',
+           'volume:get_volume_admin_metadata']
+
+
+def _bench(label, enforce, ctxt, iterations):
+    target = {'project_id': ctxt.project_id, 'user_id': ctxt.user_id}
+    start = time.time()
+    for _i in xrange(iterations):
+        for action in ACTIONS:
+            try:
+                enforce(ctxt, action, target)
+            except Exception:
+                pass
+    elapsed = time.time() - start
+    calls = iterations * len(ACTIONS)
+    print('%-28s %10.0f calls/sec' % (label, calls / elapsed))
+
+
+def _uncompiled_enforce(ctxt, action, target):
+    policy.init()
+    common_policy.enforce(('rule:%s' % action,), target, ctxt.to_dict(),
+                          Exception)
+
+
+def main():
+    iterations = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    topdir = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    cfg.CONF([], project='cinder', default_config_files=[])
+    cfg.CONF.set_override('policy_file',
+                          os.path.join(topdir, 'etc', 'cinder',
+                                       'policy.json'))
+
+    ctxt = context.RequestContext('fake_user', 'fake_project',
+                                  roles=['member'])
+    _bench('common policy brain', _uncompiled_enforce, ctxt, iterations)
+
+    cfg.CONF.set_override('policy_cache_decisions', False)
+    _bench('compiled rules', policy.enforce, ctxt, iterations)
+
+    cfg.CONF.set_override('policy_cache_decisions', True)
+    _bench('compiled rules, cached', policy.enforce, ctxt, iterations)
+
+
+if __name__ == '__main__':
+    main()